@@ -124,3 +124,8 @@ if(CERES_FOUND)
 else()
     message(STATUS "Google's ceres-solver not found; MaterialOptimization_cli won't be built")
 endif()
+
+find_package(ZLIB QUIET) # provides ZLIB::ZLIB
+if(NOT ZLIB_FOUND)
+    message(STATUS "zlib not found; mesh archive compression will be unavailable")
+endif()
@@ -10,35 +10,31 @@ class MassMatrixType(enum.Enum):
     LUMPED = 3
 
 def compute_vibrational_modes(r, fixedVars, mtype = MassMatrixType.FULL, n = 7, sigma=-0.001):
+    """
+    Compute the n vibrational modes of `r` with eigenvalues closest to sigma
+    in-process: H - sigma M is factorized once with CHOLMOD and reused for
+    every shift-invert iteration (no conversion to scipy).
+    """
     H = r.hessian()
-    Htrip = H if isinstance(H, sparse_matrices.TripletMatrix) else H.getTripletMatrix()
-
-    M_scipy = None
 
+    M = None
     if (mtype != MassMatrixType.IDENTITY):
         objectMethods = dir(r)
         if (mtype == MassMatrixType.FULL):
-            if ("massMatrix" in objectMethods):
-                Mtrip = r.massMatrix()
-                Mtrip.reflectUpperTriangle()
-                Mtrip.rowColRemoval(fixedVars)
-                M_scipy = Mtrip.compressedColumn()
-            else:
-                print("WARNING: object does not implement `massMatrix`; falling back to identity metric")
+            if ("massMatrix" in objectMethods): M = r.massMatrix()
+            else: print("WARNING: object does not implement `massMatrix`; falling back to identity metric")
         elif (mtype == MassMatrixType.LUMPED):
-            if ("lumpedMassMatrix" in objectMethods):
-                M_scipy = scipy.sparse.diags(np.delete(r.lumpedMassMatrix(), fixedVars))
-            else:
-                print("WARNING: object does not implement `lumpedMassMatrix`; falling back to identity metric")
+            if ("lumpedMassMatrix" in objectMethods): M = np.asarray(r.lumpedMassMatrix(), dtype=np.float64)
+            else: print("WARNING: object does not implement `lumpedMassMatrix`; falling back to identity metric")
         else: raise Exception('Unknown mass matrix type.')
 
-    return compute_vibrational_modes_from_triplet_matrices(Htrip, fixedVars, n, sigma, M_scipy)
+    return sparse_matrices.shift_invert_eigs(H, n, sigma, M, list(fixedVars))
 
 def compute_vibrational_modes_from_triplet_matrices(Htrip, fixedVars, n, sigma, M_scipy = None):
     numVars = Htrip.m
     Htrip.rowColRemoval(fixedVars)
     Htrip.reflectUpperTriangle()
-    H = Htrip.compressedColumn()
+    H = Htrip.to_scipy().tocsc()
 
     print("m:", Htrip.m, " nnz:", Htrip.nnz)
     if (M_scipy is None): lambdas, modes = eigsh(H, n,            sigma=sigma, which='LM')
@@ -56,7 +52,7 @@ def save_triplet(Htrip, filename, fixedVars = None):
     if fixedVars is not None:
         Htrip.rowColRemoval(fixedVars)
     Htrip.dumpBinary(filename+".mat")
-    H = Htrip.compressedColumn()
+    H = Htrip.to_scipy().tocsc()
     save_npz(filename, H)
 
 def load_triplet(filename):
@@ -1,36 +1,118 @@
 import numpy as np
 
+def _quantize(V, tolerance):
+    '''
+    Keys identifying the points of V to be merged: the exact coordinates if
+    tolerance is None or 0, otherwise the coordinates rounded to a grid of
+    spacing tolerance (so points closer than the tolerance are usually, but
+    not always, merged: a pair straddling a grid cell boundary is kept apart;
+    use mesh.merge_duplicate_vertices for a strict distance threshold).
+    '''
+    V = np.asarray(V, dtype=np.float64)
+    if not tolerance: return V
+    return np.floor(V / tolerance + 0.5).astype(np.int64)
+
+def _uniqueRows(keys):
+    '''
+    Group the identical rows of keys. Returns (first, inverse), where first[g]
+    is the first row of group g and inverse[i] is the group of row i; groups
+    are numbered in order of first appearance.
+    '''
+    n = len(keys)
+    if n == 0: return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    keys = keys.reshape(n, -1)
+    # Stable sort, so the first row of each group comes first.
+    order = np.lexsort(keys.T[::-1])
+    sortedKeys = keys[order]
+    startsGroup = np.empty(n, dtype=bool)
+    startsGroup[0] = True
+    np.any(sortedKeys[1:] != sortedKeys[:-1], axis=1, out=startsGroup[1:])
+    first = order[startsGroup]
+    # Renumber the groups (currently in sorted order) by first appearance.
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(len(first))
+    inverse = np.empty(n, dtype=np.int64)
+    inverse[order] = rank[np.cumsum(startsGroup) - 1]
+    return np.sort(first), inverse
+
 class VertexMerger:
-    def __init__(self, dim = 3):
+    def __init__(self, dim = 3, tolerance = None):
         self.mergedVertices = {}
         self.dim = dim
+        self.tolerance = tolerance
+        self._points = []
+
+    def _key(self, pt):
+        return tuple(_quantize(np.reshape(pt, (self.dim, )), self.tolerance))
 
     def add(self, pt):
         '''
         Add a point to the collection if it doesn't exist and return its index.
         '''
-        key = tuple(pt)
+        key = self._key(pt)
         idx = self.mergedVertices.get(key, -1)
         if (idx == -1):
             idx = len(self.mergedVertices)
             self.mergedVertices[key] = idx
+            self._points.append(np.array(pt, dtype=np.float64).reshape(1, self.dim))
         return idx
+
+    def addPoints(self, P):
+        '''
+        Add the rows of P (an Nxdim array) to the collection, returning the
+        index of each. Only the distinct points of P are looked up in the
+        collection, so this is much faster than calling `add` in a loop.
+        '''
+        P = np.asarray(P, dtype=np.float64).reshape(-1, self.dim)
+        if len(P) == 0: return np.empty(0, dtype=np.int64)
+        keys = _quantize(P, self.tolerance)
+        first, inverse = _uniqueRows(keys)
+        # Insert the distinct points in order of first appearance, so the
+        # numbering matches a sequence of `add` calls.
+        numBefore = len(self.mergedVertices)
+        idx = np.array([self.mergedVertices.setdefault(tuple(k), len(self.mergedVertices)) for k in keys[first]], dtype=np.int64)
+        self._points.append(P[first[idx >= numBefore]])
+        return idx[inverse]
+
     def numVertices(self): return len(self.mergedVertices)
     def vertices(self):
-        V = np.empty((self.numVertices(), self.dim, ))
-        for pt_tuple, idx in self.mergedVertices.items():
-            V[idx, :] = pt_tuple
-        return V
+        if len(self._points) == 0: return np.empty((0, self.dim))
+        return np.vstack(self._points)
+
+def mergedVertexIndices(V, tolerance = None):
+    '''
+    Index of the merged vertex for each row of V, numbering the merged
+    vertices in order of first appearance. Returns (index, firstOccurrence),
+    where firstOccurrence[i] is the row of V providing merged vertex i.
+    '''
+    first, inverse = _uniqueRows(_quantize(V, tolerance))
+    return inverse, first
 
 # Construct a single mesh including a copy of all the triangles of the input meshes,
-# but with duplicate vertices merged and dangling vertices removed.
-def mergedMesh(meshes):
-    vm = VertexMerger()
-    mergedTris = []
+# but with duplicate vertices merged and (optionally) dangling vertices removed.
+# Vertices are merged if their coordinates are identical or, if `tolerance`
+# is given, round to the same point on a grid with this spacing.
+def mergedMesh(meshes, tolerance = None, removeDanglingVertices = True):
+    Vs, Fs = [], []
+    offset = 0
     for mesh in meshes:
         if isinstance(mesh, list) or isinstance(mesh, tuple):
             V, F = mesh
         else:
             V, F = mesh.vertices(), mesh.triangles()
-        mergedTris.append(np.vectorize(lambda i: vm.add(V[i]))(F))
-    return vm.vertices(), np.vstack(mergedTris)
+        V, F = np.asarray(V, dtype=np.float64), np.asarray(F)
+        Vs.append(V)
+        Fs.append(F.astype(np.int64) + offset)
+        offset += len(V)
+    V = np.vstack(Vs)
+    F = np.vstack(Fs)
+
+    if removeDanglingVertices:
+        # Only the referenced vertices participate, numbered in the order the
+        # triangles first reference them.
+        corners = F.ravel()
+        idx, first = mergedVertexIndices(V[corners], tolerance)
+        return V[corners[first]], idx.reshape(F.shape)
+
+    idx, first = mergedVertexIndices(V, tolerance)
+    return V[first], idx[F]
@@ -20,6 +20,7 @@
 #include <MeshFEM/LinearElasticity.hh>
 #include <MeshFEM/Materials.hh>
 #include <MeshFEM/PeriodicHomogenization.hh>
+#include <MeshFEM/HomogenizationCache.hh>
 #include <MeshFEM/MSHFieldWriter.hh>
 #include <MeshFEM/filters/remove_dangling_vertices.hh>
 
@@ -59,6 +60,7 @@ po::variables_map parseCmdLine(int argc, const char *argv[])
         ("tile,t",     po::value<string>(), "tilings 'nx ny nz' (default: 1)")
         ("out,o",      po::value<string>(), "output file of deformed geometry (and w_ij fields if homogenization is run)")
         ("dumpJson",   po::value<string>(), "dump info into a json file)")
+        ("cacheDir",   po::value<string>(), "reuse/store results in this homogenization cache directory (default: $MESHFEM_HOMOGENIZATION_CACHE_DIR)")
         ;
 
     po::options_description cli_opts;
@@ -125,6 +127,29 @@ void dumpJson(const T &EhDefo, const std::string &filename) {
     out << data;
 }
 
+// Homogenized elasticity tensor of the undeformed cell for the current base
+// material, reusing the result from the homogenization cache when possible.
+template<class Simulator>
+typename Simulator::ETensor homogenizedTensor(Simulator &sim, const typename Simulator::ETensor &Cbase) {
+    auto &cache = HomogenizationCache::instance();
+    HomogenizationCache::Key cacheKey;
+    HomogenizationCache::Entry cached;
+    typename Simulator::ETensor Eh;
+    std::vector<typename Simulator::VField> w_ij;
+    const bool useCache = cache.enabled();
+    if (useCache) {
+        cacheKey = homogenizationCacheKey(sim.mesh(), Cbase, false, false);
+        if (cache.load(cacheKey, cached)) {
+            extractHomogenizationCacheEntry(cached, sim.mesh().numNodes(), Eh, w_ij);
+            return Eh;
+        }
+    }
+    solveCellProblems(w_ij, sim);
+    Eh = homogenizedElasticityTensorDisplacementForm(w_ij, sim);
+    if (useCache) cache.store(cacheKey, homogenizationCacheEntry(Eh, w_ij));
+    return Eh;
+}
+
 template<size_t _N, size_t _FEMDegree>
 void execute(const po::variables_map &args,
              const vector<MeshIO::IOVertex> &inVertices,
@@ -171,9 +196,7 @@ void execute(const po::variables_map &args,
             std::cout << jacobian << std::endl;
             mat.setTensor(EBase.transform(jacobian.inverse()));
 
-            vector<VField> w_ij;
-            solveCellProblems(w_ij, sim);
-            auto EhDefo = homogenizedElasticityTensorDisplacementForm(w_ij, sim).transform(jacobian);
+            auto EhDefo = homogenizedTensor(sim, mat.getTensor()).transform(jacobian);
             auto ShDefo = EhDefo.inverse();
 
             cout << theta << '\t' << lambda << '\t'
@@ -219,11 +242,9 @@ void execute(const po::variables_map &args,
     Real deformedCellVolume = bbox.volume() * jacobian.determinant();
 
     if (args.count("homogenize") && args.count("transformVersion")) {
-        vector<VField> w_ij;
         // Morteza's transformation formulas
         mat.setTensor(mat.getTensor().transform(jacobian.inverse()));
-        solveCellProblems(w_ij, sim);
-        auto EhDefo = homogenizedElasticityTensorDisplacementForm(w_ij, sim).transform(jacobian);
+        auto EhDefo = homogenizedTensor(sim, mat.getTensor()).transform(jacobian);
         cout << "Elasticity tensor:" << endl;
         cout << EhDefo << endl << endl;
         cout << "Homogenized Moduli: ";
@@ -399,6 +420,7 @@ void execute(const po::variables_map &args,
 int main(int argc, const char *argv[])
 {
     po::variables_map args = parseCmdLine(argc, argv);
+    if (args.count("cacheDir")) HomogenizationCache::instance().setDirectory(args["cacheDir"].as<string>());
 
     vector<MeshIO::IOVertex>  inVertices;
     vector<MeshIO::IOElement> inElements;
@@ -154,6 +154,8 @@ void execute(const string &meshPath, const vector<MeshIO::IOVertex> &inVertices,
     // }
 
     MSHFieldWriter writer(outMSH, matOpt.mesh());
+    // Overlap writing each iteration's fields with the next iteration's solve.
+    writer.setAsynchronous(true);
 
     // Propagate the cell_index field.
     if (cell_index.domainSize() == matOpt.mesh().numElements())
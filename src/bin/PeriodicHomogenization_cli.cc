@@ -5,17 +5,21 @@
 #include <MeshFEM/PeriodicHomogenization.hh>
 #include <MeshFEM/OrthotropicHomogenization.hh>
 #include <MeshFEM/GlobalBenchmark.hh>
+#include <MeshFEM/HomogenizationCache.hh>
 #include <MeshFEM/TensorProjection.hh>
 #include <vector>
 #include <queue>
 #include <iostream>
 #include <iomanip>
+#include <sstream>
 #include <memory>
 #include <cmath>
 
 #include <boost/program_options.hpp>
 #include <boost/filesystem.hpp>
 
+#include "SolverOptions.hh"
+
 namespace po = boost::program_options;
 using namespace std;
 using namespace PeriodicHomogenization;
@@ -48,8 +52,12 @@ po::variables_map parseCmdLine(int argc, const char *argv[])
         ("ignorePeriodicMismatch",                         "Ignore mismatched nodes on the periodic faces (useful for voxel grids)")
         ("manualPeriodicVertices", po::value<string>(),    "Manually specify identified periodic vertices using a hacky file format (see PeriodicCondition constructor)")
         ("orthotropicCell,O",                              "Analyze the orthotropic symmetry base cell only")
+        ("numThreads",           po::value<size_t>()->default_value(0),              "number of threads used for assembly and post-processing (0: all available)")
+        ("cacheDir",             po::value<string>(),                                "reuse/store results in this homogenization cache directory (default: $MESHFEM_HOMOGENIZATION_CACHE_DIR)")
         ;
 
+    visible_opts.add(solverOptions());
+
     po::options_description cli_opts;
     cli_opts.add(visible_opts).add(hidden_opts);
 
@@ -70,6 +78,13 @@ po::variables_map parseCmdLine(int argc, const char *argv[])
         fail = true;
     }
 
+    if (!validateSolverOptions(vm)) fail = true;
+
+    if ((vm["solver"].as<string>() == "pcg") && vm.count("orthotropicCell")) {
+        cout << "Error: the pcg solver doesn't support orthotropic base cells" << endl;
+        fail = true;
+    }
+
     int d = vm["degree"].as<int>();
     if (d < 1 || d > 2) {
         cout << "Error: FEM Degree must be 1 or 2" << endl;
@@ -85,6 +100,15 @@ po::variables_map parseCmdLine(int argc, const char *argv[])
 template<size_t _N>
 using HMG = LinearElasticity::HomogenousMaterialGetter<Materials::Constant>::template Getter<_N>;
 
+// Solver settings influencing the result (part of the cache key).
+string solverDescription(const po::variables_map &args) {
+    if (args["solver"].as<string>() != "pcg") return "direct";
+    ostringstream ss;
+    ss << setprecision(17) << "pcg " << args["pcgPreconditioner"].as<string>()
+       << " tol=" << args["pcgTol"].as<double>() << " maxIters=" << args["pcgMaxIters"].as<size_t>();
+    return ss.str();
+}
+
 template<size_t _N, size_t _FEMDegree>
 void execute(const po::variables_map &args,
              const vector<MeshIO::IOVertex> &inVertices,
@@ -95,29 +119,54 @@ void execute(const po::variables_map &args,
     typedef LinearElasticity::Mesh<_N, _FEMDegree, HMG> Mesh;
     typedef LinearElasticity::Simulator<Mesh> Simulator;
     Simulator sim(inElements, inVertices);
+    configureSolver(sim, args);
     typedef typename Simulator::ETensor ETensor;
     typedef typename Simulator::VField  VField;
 
-    BENCHMARK_START_TIMER_SECTION("Cell Problems");
+    const bool orthotropicCell = args.count("orthotropicCell");
+    const bool ignorePeriodicMismatch = args.count("ignorePeriodicMismatch");
+    const string manualPeriodicVertices = args.count("manualPeriodicVertices") ? args["manualPeriodicVertices"].as<string>() : string();
+    // The fluctuation displacements are only needed for the field outputs.
+    const bool needFluctuations = args.count("m2mstress") || args.count("fieldOutput");
+
     std::vector<VField> w_ij;
+    ETensor Eh;
+    auto &cache = HomogenizationCache::instance();
+    HomogenizationCache::Entry cached;
+    HomogenizationCache::Key cacheKey;
+    const bool useCache = cache.enabled();
+    if (useCache) cacheKey = homogenizationCacheKey(sim.mesh(), mat.getTensor(), orthotropicCell, ignorePeriodicMismatch,
+                                                    manualPeriodicVertices, solverDescription(args));
     std::unique_ptr<PeriodicCondition<_N>> pc;
-    if (args.count("manualPeriodicVertices"))
-        pc = Future::make_unique<PeriodicCondition<_N>>(sim.mesh(), args["manualPeriodicVertices"].as<string>());
-    if (args.count("orthotropicCell") == 0) {
-        solveCellProblems(w_ij, sim, 1e-7, args.count("ignorePeriodicMismatch"), std::move(pc));
+    if (!manualPeriodicVertices.empty())
+        pc = Future::make_unique<PeriodicCondition<_N>>(sim.mesh(), manualPeriodicVertices);
+    if (useCache && cache.load(cacheKey, cached, needFluctuations)) {
+        extractHomogenizationCacheEntry(cached, sim.mesh().numNodes(), Eh, w_ij);
+        // The output load fields are expressed in the DoFs (and boundary
+        // conditions) that solving the cell problems would have set up.
+        if (args.count("fieldOutput")) {
+            if (!orthotropicCell) sim.applyPeriodicConditions(1e-7, ignorePeriodicMismatch, std::move(pc));
+            else PeriodicHomogenization::Orthotropic::prepareSimulator(sim, 1e-7);
+        }
     }
     else {
-        auto systems = PeriodicHomogenization::Orthotropic::solveCellProblems(w_ij, sim, 1e-7);
-    }
+        BENCHMARK_START_TIMER_SECTION("Cell Problems");
+        if (!orthotropicCell) {
+            solveCellProblems(w_ij, sim, 1e-7, ignorePeriodicMismatch, std::move(pc));
+        }
+        else {
+            auto systems = PeriodicHomogenization::Orthotropic::solveCellProblems(w_ij, sim, 1e-7);
+        }
 
-    BENCHMARK_STOP_TIMER_SECTION("Cell Problems");
+        BENCHMARK_STOP_TIMER_SECTION("Cell Problems");
 
-    BENCHMARK_START_TIMER_SECTION("Compute Tensor");
-    // ETensor Eh = homogenizedElasticityTensor(w_ij, sim);
-    ETensor Eh;
-    if (args.count("orthotropicCell") == 0)   Eh = homogenizedElasticityTensorDisplacementForm(w_ij, sim);
-    else Eh = PeriodicHomogenization::Orthotropic::homogenizedElasticityTensorDisplacementForm(w_ij, sim);
-    BENCHMARK_STOP_TIMER_SECTION("Compute Tensor");
+        BENCHMARK_START_TIMER_SECTION("Compute Tensor");
+        // Eh = homogenizedElasticityTensor(w_ij, sim);
+        if (!orthotropicCell) Eh = homogenizedElasticityTensorDisplacementForm(w_ij, sim);
+        else Eh = PeriodicHomogenization::Orthotropic::homogenizedElasticityTensorDisplacementForm(w_ij, sim);
+        BENCHMARK_STOP_TIMER_SECTION("Compute Tensor");
+        if (useCache) cache.store(cacheKey, homogenizationCacheEntry(Eh, w_ij));
+    }
 
     cout << setprecision(16);
     cout << "Homogenized elasticity tensor:" << endl;
@@ -251,6 +300,7 @@ void execute(const po::variables_map &args,
 int main(int argc, const char *argv[])
 {
     po::variables_map args = parseCmdLine(argc, argv);
+    if (args.count("cacheDir")) HomogenizationCache::instance().setDirectory(args["cacheDir"].as<string>());
 
     vector<MeshIO::IOVertex>  inVertices;
     vector<MeshIO::IOElement> inElements;
@@ -269,7 +319,15 @@ int main(int argc, const char *argv[])
     auto exec = (dim == 3) ? ((deg == 2) ? execute<3, 2> : execute<3, 1>)
                            : ((deg == 2) ? execute<2, 2> : execute<2, 1>);
 
+#if MESHFEM_WITH_TBB
+    // Limit the parallelism (e.g., to compare the per-stage timings in the
+    // benchmark report across thread counts).
+    size_t numThreads = args["numThreads"].as<size_t>();
+    tbb::task_arena arena((numThreads > 0) ? int(numThreads) : int(tbb::task_arena::automatic));
+    arena.execute([&]() { exec(args, inVertices, inElements); });
+#else
     exec(args, inVertices, inElements);
+#endif
 
     return 0;
 }
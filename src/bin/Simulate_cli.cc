@@ -15,6 +15,8 @@
 #include <boost/program_options.hpp>
 #include <boost/filesystem.hpp>
 
+#include "SolverOptions.hh"
+
 namespace po = boost::program_options;
 using namespace std;
 
@@ -45,6 +47,8 @@ po::variables_map parseCmdLine(int argc, const char *argv[])
         ("extraMesh,e",          po::value<string>(),                    "adds another independent input mesh to problem")
         ;
 
+    visible_opts.add(solverOptions());
+
     po::options_description cli_opts;
     cli_opts.add(visible_opts).add(hidden_opts);
 
@@ -72,6 +76,8 @@ po::variables_map parseCmdLine(int argc, const char *argv[])
         }
     }
 
+    if (!validateSolverOptions(vm)) fail = true;
+
     if (vm.count("outputMSH") && (vm.count("boundaryConditions") == 0)) {
         cout << "Error: must specify boundary conditions to run a simulation" << endl;
         fail = true;
@@ -91,6 +97,7 @@ void execute(const po::variables_map &args,
     typedef LinearElasticity::Mesh<_N, _Deg> Mesh;
     using Simulator = LinearElasticity::Simulator<Mesh>;
     Simulator sim(inElements, inVertices);
+    configureSolver(sim, args);
 
     typedef ScalarField<Real> SField;
     const string &materialPath = args[    "material"].as<string>(),
@@ -205,6 +212,8 @@ void execute(const po::variables_map &args,
     bool linearSubsampleFields = args.count("fullDegreeFieldOutput") == 0;
 
     MSHFieldWriter writer(outMSH, sim.mesh(), linearSubsampleFields);
+    // Write the fields in the background while the remaining ones are computed.
+    writer.setAsynchronous(true);
     writer.addField("u",      u, DomainType::PER_NODE);
     writer.addField("load",   f, DomainType::PER_NODE);
     if ((Simulator::Strain::Deg == 0) || linearSubsampleFields) {
@@ -0,0 +1,59 @@
+////////////////////////////////////////////////////////////////////////////////
+// SolverOptions.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Command line options selecting and configuring the linear elasticity
+//      simulator's solver backend, shared by the command line tools.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef SOLVEROPTIONS_HH
+#define SOLVEROPTIONS_HH
+
+#include <MeshFEM/MatrixFreePCG.hh>
+#include <iostream>
+#include <string>
+
+#include <boost/program_options.hpp>
+
+inline boost::program_options::options_description solverOptions() {
+    namespace po = boost::program_options;
+    po::options_description opts;
+    opts.add_options()
+        ("solver",               po::value<std::string>()->default_value("direct"),       "linear solver: direct (sparse Cholesky) or pcg (matrix-free preconditioned conjugate gradients)")
+        ("pcgPreconditioner",    po::value<std::string>()->default_value("block_jacobi"), "PCG preconditioner: none, jacobi, or block_jacobi")
+        ("pcgTol",               po::value<double>()->default_value(1e-10),               "PCG relative residual tolerance")
+        ("pcgMaxIters",          po::value<size_t>()->default_value(0),                   "PCG iteration limit (0: number of variables)")
+        ("pcgCacheElementStiffness",                                                      "store element stiffness matrices for PCG instead of recomputing them in each iteration")
+        ;
+    return opts;
+}
+
+// Report invalid solver options; returns false if any were found.
+inline bool validateSolverOptions(const boost::program_options::variables_map &vm) {
+    bool valid = true;
+    const std::string &solver = vm["solver"].as<std::string>();
+    if ((solver != "direct") && (solver != "pcg")) {
+        std::cout << "Error: solver must be direct or pcg" << std::endl;
+        valid = false;
+    }
+    try { pcgPreconditionerFromString(vm["pcgPreconditioner"].as<std::string>()); }
+    catch (const std::exception &e) {
+        std::cout << "Error: " << e.what() << std::endl;
+        valid = false;
+    }
+    return valid;
+}
+
+template<class _Simulator>
+void configureSolver(_Simulator &sim, const boost::program_options::variables_map &args) {
+    if (args["solver"].as<std::string>() != "pcg") return;
+    PCGOptions opts;
+    opts.preconditioner        = pcgPreconditionerFromString(args["pcgPreconditioner"].as<std::string>());
+    opts.tolerance             = args["pcgTol"].as<double>();
+    opts.maxIterations         = args["pcgMaxIters"].as<size_t>();
+    opts.cacheElementStiffness = args.count("pcgCacheElementStiffness");
+    sim.setPCGOptions(opts);
+    sim.setSolverBackend(_Simulator::SolverBackend::MATRIX_FREE_PCG);
+}
+
+#endif /* end of include guard: SOLVEROPTIONS_HH */
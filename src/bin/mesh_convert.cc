@@ -14,6 +14,7 @@
 #include <MeshFEM/filters/quad_subdiv_high_aspect.hh>
 #include <MeshFEM/filters/hex_tet_subdiv.hh>
 #include <MeshFEM/filters/remove_dangling_vertices.hh>
+#include <MeshFEM/filters/merge_duplicate_vertices.hh>
 #include <MeshFEM/filters/highlight_dangling_vertices.hh>
 #include <MeshFEM/filters/reflect.hh>
 #include <MeshFEM/filters/CurveCleanup.hh>
@@ -28,6 +29,7 @@
 #include <vector>
 #include <queue>
 #include <algorithm>
+#include <numeric>
 #include <boost/program_options.hpp>
 
 namespace po = boost::program_options;
@@ -62,6 +64,8 @@ po::variables_map parseCmdLine(int argc, const char *argv[]) {
         ("extrudeTriQuad,E",  po::value<double>(),                          "Extrude a planar mesh in its (negative) normal direction by a distance, creating a mixed triangle and quad mesh.")
         ("truncateElements",  po::value<int>(),                             "Truncate to the specified number of elements")
         ("stripFields",                                                     "Suppress output of MSH fields")
+        ("copyFields,F",                                                    "Copy the input's MSH/archive fields to the output (the mesh must be unchanged)")
+        ("compress,z",                                                      "Compress mesh archive (.mfa) output")
         ("Sx",                po::value<double>(),                          "Scale x coordinates (performed after translation)")
         ("Sy",                po::value<double>(),                          "Scale y coordinates (performed after translation)")
         ("Sz",                po::value<double>(),                          "Scale z coordinates (performed after translation)")
@@ -86,6 +90,7 @@ po::variables_map parseCmdLine(int argc, const char *argv[]) {
         ("sortElementCorners",                                              "sort the indices appearing in an element (useful for comparisons when orientation doesn't matter, done after sortVertices, before sortElements)")
         ("sortElements",                                                    "sort elements lexicographically by their vertex indices (done after sortVertices and sortElementCorners, if called)")
         ("extraMesh",             po::value<string>(),                      "merge another mesh to the original one in the output")
+        ("mergeDuplicateVertices,m", po::value<double>(),                   "merge vertices closer than the given distance (e.g., to stitch STL/OBJ triangle soups); done after extraMesh, before sortVertices")
         ;
 
     po::options_description cli_opts;
@@ -143,6 +148,42 @@ void transferField(const std::vector<size_t> cellIndex,
     writer.addField(name, outField, DomainType::PER_ELEMENT);
 }
 
+// Reorder a field of the input mesh for the output mesh: origin[i] is the
+// input index of output entity i (empty if the order is unchanged).
+template<class _Field>
+_Field reorderedField(const _Field &inField, const vector<size_t> &origin) {
+    if (origin.empty()) return inField;
+    _Field outField(origin.size());
+    for (size_t i = 0; i < origin.size(); ++i)
+        outField(i) = inField(origin.at(i));
+    return outField;
+}
+
+// Write the output mesh along with all fields of the input MSH file or mesh
+// archive (e.g., to convert between the two). The output mesh must have the
+// input's vertices and elements, possibly reordered: vertexOrigin and
+// elementOrigin give the input index of each output vertex/element (empty if
+// the order is unchanged).
+void copyFields(const string &inPath, const string &outPath,
+                const vector<MeshIO::IOVertex> &vertices, const vector<MeshIO::IOElement> &elements,
+                const vector<size_t> &vertexOrigin, const vector<size_t> &elementOrigin,
+                MeshIO::MeshType type, bool compress) {
+    MSHFieldParser<3> fields(inPath, true, true);
+    if ((fields.numVertices() != vertices.size()) || (fields.numElements() != elements.size()))
+        throw runtime_error("Fields can only be copied to an unmodified mesh");
+    MSHFieldWriter writer(outPath, vertices, elements, type);
+    if (compress) writer.setArchiveCompression(true);
+
+    DomainType dtype;
+    auto origin = [&]() -> const vector<size_t> & { return (dtype == DomainType::PER_ELEMENT) ? elementOrigin : vertexOrigin; };
+    for (const string &name : fields.vectorFieldNames())          { auto f = fields.         vectorField(name, DomainType::ANY, dtype); writer.addField(name, reorderedField(f, origin()), dtype); }
+    for (const string &name : fields.scalarFieldNames())          { auto f = fields.         scalarField(name, DomainType::ANY, dtype); writer.addField(name, reorderedField(f, origin()), dtype); }
+    for (const string &name : fields.symmetricMatrixFieldNames()) { auto f = fields.symmetricMatrixField(name, DomainType::ANY, dtype); writer.addField(name, reorderedField(f, origin()), dtype); }
+    if (!fields.vectorInterpolantFieldNames().empty() || !fields.scalarInterpolantFieldNames().empty() ||
+        !fields.symmetricMatrixInterpolantFieldNames().empty())
+        cout << "per-element-node field copying unsupported; skipping interpolant fields" << endl;
+}
+
 ////////////////////////////////////////////////////////////////////////////////
 /*! Program entry point
 //  @param[in]  argc    Number of arguments
@@ -191,8 +232,18 @@ int main(int argc, const char *argv[])
         inElements.insert(inElements.end(), inExtraElements.begin(), inExtraElements.end());
     }
 
+    if (args.count("mergeDuplicateVertices")) {
+        const size_t numInputVertices = inVertices.size();
+        merge_duplicate_vertices(inVertices, inElements, inVertices, inElements,
+                                 args["mergeDuplicateVertices"].as<double>());
+        cout << "Merged " << numInputVertices - inVertices.size() << " duplicate vertice(s)" << endl;
+    }
+
     size_t origSize = inVertices.size();
 
+    // Input index of each vertex/element after sorting (empty if unsorted);
+    // copyFields reorders the fields accordingly.
+    vector<size_t> vertexOrigin, elementOrigin;
     if (args.count("sortVertices")) {
         // Permute vertex indices into sorted order
         // order[i] is the ith vertex in sorted order (orig index corresponding
@@ -210,6 +261,7 @@ int main(int argc, const char *argv[])
             for (size_t &j : e)
                 j = newIndex[j];
         }
+        vertexOrigin = order;
     }
 
     if (args.count("sortElementCorners")) {
@@ -218,7 +270,14 @@ int main(int argc, const char *argv[])
     }
 
     if (args.count("sortElements")) {
-        std::sort(inElements.begin(), inElements.end());
+        elementOrigin.resize(inElements.size());
+        std::iota(elementOrigin.begin(), elementOrigin.end(), 0);
+        std::sort(elementOrigin.begin(), elementOrigin.end(),
+                  [&](size_t a, size_t b) { return inElements[a] < inElements[b]; });
+        vector<MeshIO::IOElement> sorted;
+        sorted.reserve(inElements.size());
+        for (size_t ei : elementOrigin) sorted.push_back(inElements[ei]);
+        inElements.swap(sorted);
     }
 
     if (args.count("danglingVertexHighlightPath"))
@@ -581,7 +640,12 @@ int main(int argc, const char *argv[])
         throw runtime_error("Unrecognized mesh type.");
     }
 
-    if (outPath != "") save(outPath, outVertices, outElements);
+    if (outPath == "") return 0;
+    const bool compress = args.count("compress");
+    if (compress && (MeshIO::guessFormat(outPath) != MeshIO::FMT_MFA))
+        throw runtime_error("Compression is only supported for mesh archive (.mfa) output");
+    if (args.count("copyFields")) copyFields(inPath, outPath, outVertices, outElements, vertexOrigin, elementOrigin, type, compress);
+    else save(outPath, outVertices, outElements, compress ? MeshIO::FMT_MFA_COMPRESSED : MeshIO::FMT_GUESS);
 
     return 0;
 }
@@ -0,0 +1,153 @@
+////////////////////////////////////////////////////////////////////////////////
+// benchmark_mesh_construction.cc
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Time the construction of the mesh data structures (TetMesh/TriMesh
+//      topology and the degree 1 and 2 FEMMesh built on it) for a collection
+//      of meshes and synthetic tessellated grids.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/MeshIO.hh>
+#include <MeshFEM/FEMMesh.hh>
+#include <MeshFEM/TetMesh.hh>
+#include <MeshFEM/TriMesh.hh>
+#include <MeshFEM/filters/gen_grid.hh>
+#include <MeshFEM/filters/voxels_to_simplices.hh>
+
+#include <algorithm>
+#include <chrono>
+#include <iomanip>
+#include <iostream>
+#include <string>
+#include <vector>
+
+#include <boost/program_options.hpp>
+#include <boost/algorithm/string.hpp>
+
+namespace po = boost::program_options;
+using namespace std;
+
+[[ noreturn ]] void usage(int exitVal, const po::options_description &visible_opts) {
+    cout << "Usage: benchmark_mesh_construction [mesh1.msh mesh2.msh ...] [options]" << endl;
+    cout << visible_opts << endl;
+    exit(exitVal);
+}
+
+po::variables_map parseCmdLine(int argc, const char *argv[]) {
+    po::options_description hidden_opts("Hidden Arguments");
+    hidden_opts.add_options()
+        ("meshes", po::value<vector<string>>(), "input meshes")
+        ;
+
+    po::positional_options_description p;
+    p.add("meshes", -1);
+
+    po::options_description visible_opts;
+    visible_opts.add_options()("help", "Produce this help message")
+        ("grid,g",   po::value<vector<string>>(), "also benchmark a tessellated grid of size CxR[xS] (can be repeated)")
+        ("repeat,r", po::value<size_t>()->default_value(3), "number of timed runs (the fastest is reported)")
+        ;
+
+    po::options_description cli_opts;
+    cli_opts.add(visible_opts).add(hidden_opts);
+
+    po::variables_map vm;
+    try {
+        po::store(po::command_line_parser(argc, argv).
+                  options(cli_opts).positional(p).run(), vm);
+        po::notify(vm);
+    }
+    catch (std::exception &e) {
+        cout << "Error: " << e.what() << endl << endl;
+        usage(1, visible_opts);
+    }
+
+    if (vm.count("help"))
+        usage(0, visible_opts);
+
+    if ((vm.count("meshes") == 0) && (vm.count("grid") == 0)) {
+        cout << "Must specify at least one mesh or grid" << endl;
+        usage(1, visible_opts);
+    }
+
+    return vm;
+}
+
+// Fastest of "repeat" runs of f.
+template<class F>
+double timeRuns(size_t repeat, const F &f) {
+    double best = std::numeric_limits<double>::max();
+    for (size_t r = 0; r < repeat; ++r) {
+        auto start = chrono::steady_clock::now();
+        f();
+        best = std::min(best, chrono::duration<double>(chrono::steady_clock::now() - start).count());
+    }
+    return best;
+}
+
+template<size_t N>
+void benchmark(const string &name, const vector<MeshIO::IOVertex> &vertices,
+               const vector<MeshIO::IOElement> &elements, size_t repeat) {
+    using Topology = typename std::conditional<N == 3, TetMesh<>, TriMesh<>>::type;
+    double tTopology = timeRuns(repeat, [&]() { Topology m(elements, vertices.size()); });
+    double tFEM1     = timeRuns(repeat, [&]() { FEMMesh<N, 1, VectorND<N>> m(elements, vertices); });
+    double tFEM2     = timeRuns(repeat, [&]() { FEMMesh<N, 2, VectorND<N>> m(elements, vertices); });
+    cout << setw(48) << left << name
+         << setw(12) << right << elements.size()
+         << setw(14) << tTopology
+         << setw(14) << tFEM1
+         << setw(14) << tFEM2 << endl;
+}
+
+void benchmark(const string &name, const vector<MeshIO::IOVertex> &vertices,
+               const vector<MeshIO::IOElement> &elements, size_t repeat) {
+    if (elements.empty()) throw std::runtime_error("Empty mesh " + name);
+    if      (elements[0].size() == 4) benchmark<3>(name, vertices, elements, repeat);
+    else if (elements[0].size() == 3) benchmark<2>(name, vertices, elements, repeat);
+    else throw std::runtime_error("Mesh must be pure triangle or tet: " + name);
+}
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Program entry point
+//  @param[in]  argc    Number of arguments
+//  @param[in]  argv    Argument strings
+//  @return     status  (0 on success)
+*///////////////////////////////////////////////////////////////////////////////
+int main(int argc, const char *argv[])
+{
+    po::variables_map args = parseCmdLine(argc, argv);
+    const size_t repeat = args["repeat"].as<size_t>();
+
+    cout << setw(48) << left << "mesh"
+         << setw(12) << right << "elements"
+         << setw(14) << "topology (s)"
+         << setw(14) << "FEM deg 1 (s)"
+         << setw(14) << "FEM deg 2 (s)" << endl;
+
+    if (args.count("meshes")) {
+        for (const string &path : args["meshes"].as<vector<string>>()) {
+            vector<MeshIO::IOVertex>  vertices;
+            vector<MeshIO::IOElement> elements;
+            MeshIO::load(path, vertices, elements);
+            benchmark(path, vertices, elements, repeat);
+        }
+    }
+
+    if (args.count("grid")) {
+        for (const string &gridSize : args["grid"].as<vector<string>>()) {
+            vector<string> sizeStrings;
+            boost::split(sizeStrings, gridSize, boost::is_any_of("x"));
+            vector<size_t> sizes;
+            for (const string &s : sizeStrings) sizes.push_back(std::stoul(s));
+
+            vector<MeshIO::IOVertex>  gridVertices, vertices;
+            vector<MeshIO::IOElement> gridElements, elements;
+            vector<size_t> cellIdx;
+            gen_grid(sizes, gridVertices, gridElements);
+            voxels_to_simplices(gridVertices, gridElements, vertices, elements, cellIdx);
+            benchmark("grid " + gridSize, vertices, elements, repeat);
+        }
+    }
+
+    return 0;
+}
@@ -0,0 +1,190 @@
+////////////////////////////////////////////////////////////////////////////////
+// benchmark_mesh_io.cc
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Measure the throughput (MB/s) of the ASCII mesh parsers on a collection
+//      of mesh files and on synthetic tessellated grids. The grids are written
+//      to memory in each ASCII format they support (MSH, plus OFF and OBJ for
+//      triangle meshes) and parsed back, checking that the parsed mesh is
+//      identical to the one written.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/MeshIO.hh>
+#include <MeshFEM/filters/gen_grid.hh>
+#include <MeshFEM/filters/voxels_to_simplices.hh>
+#include <MeshFEM/util.h>
+
+#include <algorithm>
+#include <chrono>
+#include <fstream>
+#include <iomanip>
+#include <iostream>
+#include <sstream>
+#include <string>
+#include <vector>
+
+#include <boost/program_options.hpp>
+#include <boost/algorithm/string.hpp>
+
+namespace po = boost::program_options;
+using namespace std;
+
+[[ noreturn ]] void usage(int exitVal, const po::options_description &visible_opts) {
+    cout << "Usage: benchmark_mesh_io [mesh1.msh mesh2.obj ...] [options]" << endl;
+    cout << visible_opts << endl;
+    exit(exitVal);
+}
+
+po::variables_map parseCmdLine(int argc, const char *argv[]) {
+    po::options_description hidden_opts("Hidden Arguments");
+    hidden_opts.add_options()
+        ("meshes", po::value<vector<string>>(), "input meshes")
+        ;
+
+    po::positional_options_description p;
+    p.add("meshes", -1);
+
+    po::options_description visible_opts;
+    visible_opts.add_options()("help", "Produce this help message")
+        ("grid,g",   po::value<vector<string>>(), "also benchmark a tessellated grid of size CxR[xS] (can be repeated)")
+        ("repeat,r", po::value<size_t>()->default_value(3), "number of timed runs (the fastest is reported)")
+        ;
+
+    po::options_description cli_opts;
+    cli_opts.add(visible_opts).add(hidden_opts);
+
+    po::variables_map vm;
+    try {
+        po::store(po::command_line_parser(argc, argv).
+                  options(cli_opts).positional(p).run(), vm);
+        po::notify(vm);
+    }
+    catch (std::exception &e) {
+        cout << "Error: " << e.what() << endl << endl;
+        usage(1, visible_opts);
+    }
+
+    if (vm.count("help"))
+        usage(0, visible_opts);
+
+    if ((vm.count("meshes") == 0) && (vm.count("grid") == 0)) {
+        cout << "Must specify at least one mesh or grid" << endl;
+        usage(1, visible_opts);
+    }
+
+    return vm;
+}
+
+// Fastest of "repeat" runs of f.
+template<class F>
+double timeRuns(size_t repeat, const F &f) {
+    double best = std::numeric_limits<double>::max();
+    for (size_t r = 0; r < repeat; ++r) {
+        auto start = chrono::steady_clock::now();
+        f();
+        best = std::min(best, chrono::duration<double>(chrono::steady_clock::now() - start).count());
+    }
+    return best;
+}
+
+size_t fileSize(const string &path) {
+    ifstream is(path, ifstream::in | ifstream::binary | ifstream::ate);
+    if (!is) throw std::runtime_error("Couldn't open " + path);
+    return is.tellg();
+}
+
+void report(const string &name, const string &format, size_t bytes, size_t numElements, double seconds, const string &check) {
+    cout << setw(40) << left << name
+         << setw(10) << format
+         << setw(12) << right << numElements
+         << setw(12) << fixed << setprecision(1) << bytes / 1e6
+         << setw(12) << setprecision(4) << seconds
+         << setw(12) << setprecision(1) << bytes / 1e6 / seconds
+         << setw(10) << check << endl;
+}
+
+void benchmarkFile(const string &path, size_t repeat) {
+    auto format = MeshIO::guessFormat(path);
+    size_t bytes = 0;
+    if (format == MeshIO::FMT_NODE_ELE) {
+        const string basePath = path.substr(0, path.find_last_of('.'));
+        bytes = fileSize(basePath + ".node") + fileSize(basePath + ".ele");
+    }
+    else bytes = fileSize(path);
+
+    vector<MeshIO::IOVertex>  vertices;
+    vector<MeshIO::IOElement> elements;
+    double t = timeRuns(repeat, [&]() { MeshIO::load(path, vertices, elements, format); });
+    report(path, fileExtension(path), bytes, elements.size(), t, "");
+}
+
+void benchmarkGrid(const string &name, const vector<MeshIO::IOVertex> &vertices,
+                   const vector<MeshIO::IOElement> &elements, size_t repeat) {
+    vector<pair<string, MeshIO::Format>> formats = { {".msh", MeshIO::FMT_MSH_ASCII} };
+    if (elements.at(0).size() == 3) {
+        formats.emplace_back(".off", MeshIO::FMT_OFF);
+        formats.emplace_back(".obj", MeshIO::FMT_OBJ);
+    }
+
+    for (const auto &fmt : formats) {
+        stringstream ss;
+        MeshIO::save(ss, vertices, elements, fmt.second);
+        const string data = ss.str();
+
+        vector<MeshIO::IOVertex>  loadedVertices;
+        vector<MeshIO::IOElement> loadedElements;
+        double t = timeRuns(repeat, [&]() {
+            istringstream is(data);
+            MeshIO::load(is, loadedVertices, loadedElements, fmt.second);
+        });
+
+        // The grid coordinates are integers, so every format stores them exactly.
+        bool identical = (loadedElements == elements) && (loadedVertices.size() == vertices.size());
+        for (size_t i = 0; identical && (i < vertices.size()); ++i)
+            identical = (loadedVertices[i].point == vertices[i].point);
+        report(name, fmt.first, data.size(), elements.size(), t, identical ? "ok" : "MISMATCH");
+    }
+}
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Program entry point
+//  @param[in]  argc    Number of arguments
+//  @param[in]  argv    Argument strings
+//  @return     status  (0 on success)
+*///////////////////////////////////////////////////////////////////////////////
+int main(int argc, const char *argv[])
+{
+    po::variables_map args = parseCmdLine(argc, argv);
+    const size_t repeat = args["repeat"].as<size_t>();
+
+    cout << setw(40) << left << "mesh"
+         << setw(10) << "format"
+         << setw(12) << right << "elements"
+         << setw(12) << "size (MB)"
+         << setw(12) << "load (s)"
+         << setw(12) << "MB/s"
+         << setw(10) << "check" << endl;
+
+    if (args.count("meshes")) {
+        for (const string &path : args["meshes"].as<vector<string>>())
+            benchmarkFile(path, repeat);
+    }
+
+    if (args.count("grid")) {
+        for (const string &gridSize : args["grid"].as<vector<string>>()) {
+            vector<string> sizeStrings;
+            boost::split(sizeStrings, gridSize, boost::is_any_of("x"));
+            vector<size_t> sizes;
+            for (const string &s : sizeStrings) sizes.push_back(std::stoul(s));
+
+            vector<MeshIO::IOVertex>  gridVertices, vertices;
+            vector<MeshIO::IOElement> gridElements, elements;
+            vector<size_t> cellIdx;
+            gen_grid(sizes, gridVertices, gridElements);
+            voxels_to_simplices(gridVertices, gridElements, vertices, elements, cellIdx);
+            benchmarkGrid("grid " + gridSize, vertices, elements, repeat);
+        }
+    }
+
+    return 0;
+}
@@ -0,0 +1,214 @@
+////////////////////////////////////////////////////////////////////////////////
+// benchmark_periodic_matching.cc
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Benchmark the sort-based periodic boundary matchers against the
+//      original CollisionGrid-based implementations and verify that both
+//      produce the same node identification.
+//
+//      The boundary nodes are either taken from a mesh (the nodes of a degree
+//      1 or 2 FEMMesh, like PeriodicCondition) or generated synthetically as
+//      the boundary points of a regular lattice with nxn[xn] cells, randomly
+//      shuffled and perturbed well below the matching tolerance.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/MeshIO.hh>
+#include <MeshFEM/FEMMesh.hh>
+#include <MeshFEM/PeriodicBoundaryMatcher.hh>
+
+#include <algorithm>
+#include <chrono>
+#include <iomanip>
+#include <iostream>
+#include <random>
+#include <string>
+#include <vector>
+
+#include <boost/program_options.hpp>
+
+namespace po = boost::program_options;
+using namespace std;
+
+[[ noreturn ]] void usage(int exitVal, const po::options_description &visible_opts) {
+    cout << "Usage: benchmark_periodic_matching [mesh.msh] [options]" << endl;
+    cout << visible_opts << endl;
+    exit(exitVal);
+}
+
+po::variables_map parseCmdLine(int argc, const char *argv[]) {
+    po::options_description hidden_opts("Hidden Arguments");
+    hidden_opts.add_options()
+        ("mesh", po::value<string>(), "input mesh")
+        ;
+
+    po::positional_options_description p;
+    p.add("mesh", 1);
+
+    po::options_description visible_opts;
+    visible_opts.add_options()("help", "Produce this help message")
+        ("lattice,l",        po::value<size_t>(),                  "use the boundary points of a synthetic lattice with this many cells per direction instead of a mesh")
+        ("dimension,D",      po::value<size_t>()->default_value(3), "dimension of the synthetic lattice (2 or 3)")
+        ("degree,d",         po::value<size_t>()->default_value(1), "FEM degree of the mesh (1 or 2)")
+        ("ignoreMismatch,I",                                       "benchmark the matchers permitting mismatches")
+        ("epsilon,e",        po::value<double>()->default_value(1e-7), "matching tolerance")
+        ("repeat,r",         po::value<size_t>()->default_value(3), "number of timed runs (the fastest is reported)")
+        ;
+
+    po::options_description cli_opts;
+    cli_opts.add(visible_opts).add(hidden_opts);
+
+    po::variables_map vm;
+    try {
+        po::store(po::command_line_parser(argc, argv).
+                  options(cli_opts).positional(p).run(), vm);
+        po::notify(vm);
+    }
+    catch (std::exception &e) {
+        cout << "Error: " << e.what() << endl << endl;
+        usage(1, visible_opts);
+    }
+
+    if (vm.count("help"))
+        usage(0, visible_opts);
+
+    if (vm.count("mesh") == vm.count("lattice")) {
+        cout << "Must specify either a mesh or a lattice size" << endl;
+        usage(1, visible_opts);
+    }
+
+    size_t deg = vm["degree"].as<size_t>();
+    if (deg < 1 || deg > 2) {
+        cout << "Error: FEM Degree must be 1 or 2" << endl;
+        usage(1, visible_opts);
+    }
+
+    size_t dim = vm["dimension"].as<size_t>();
+    if (dim < 2 || dim > 3) {
+        cout << "Error: dimension must be 2 or 3" << endl;
+        usage(1, visible_opts);
+    }
+
+    return vm;
+}
+
+template<size_t N>
+void latticeBoundaryPoints(size_t n, Real epsilon, vector<VectorND<N>> &pts) {
+    pts.clear();
+    std::array<size_t, N> idx;
+    idx.fill(0);
+    while (true) {
+        bool onBoundary = false;
+        VectorND<N> p;
+        for (size_t c = 0; c < N; ++c) {
+            onBoundary |= (idx[c] == 0) || (idx[c] == n);
+            p[c] = Real(idx[c]) / n;
+        }
+        if (onBoundary) pts.push_back(p);
+
+        size_t c = 0;
+        for (; c < N; ++c) {
+            if (idx[c] < n) { ++idx[c]; break; }
+            idx[c] = 0;
+        }
+        if (c == N) break;
+    }
+
+    std::mt19937 gen(0);
+    std::shuffle(pts.begin(), pts.end(), gen);
+    // Perturb the points tangentially to the faces they lie on so that the
+    // matchers actually have to search for their partners.
+    std::uniform_real_distribution<Real> perturbation(-0.1 * epsilon / N, 0.1 * epsilon / N);
+    for (auto &p : pts) {
+        for (size_t c = 0; c < N; ++c)
+            if ((p[c] != 0.0) && (p[c] != 1.0)) p[c] += perturbation(gen);
+    }
+}
+
+template<size_t N, size_t Deg>
+void meshBoundaryPoints(const vector<MeshIO::IOVertex> &inVertices,
+                        const vector<MeshIO::IOElement> &inElements,
+                        vector<VectorND<N>> &pts, BBox<VectorND<N>> &cell) {
+    FEMMesh<N, Deg, VectorND<N>> mesh(inElements, inVertices);
+    cell = mesh.boundingBox();
+    pts.clear();
+    pts.reserve(mesh.numBoundaryNodes());
+    for (auto bn : mesh.boundaryNodes()) pts.push_back(bn.volumeNode()->p);
+}
+
+template<size_t N>
+void execute(const po::variables_map &args,
+             const vector<MeshIO::IOVertex> &inVertices,
+             const vector<MeshIO::IOElement> &inElements) {
+    const Real epsilon = args["epsilon"].as<double>();
+    const bool ignoreMismatch = args.count("ignoreMismatch");
+
+    vector<VectorND<N>> pts;
+    BBox<VectorND<N>> cell(VectorND<N>(VectorND<N>::Zero()), VectorND<N>(VectorND<N>::Ones()));
+    if (args.count("lattice"))
+        latticeBoundaryPoints<N>(args["lattice"].as<size_t>(), epsilon, pts);
+    else if (args["degree"].as<size_t>() == 1) meshBoundaryPoints<N, 1>(inVertices, inElements, pts, cell);
+    else                                       meshBoundaryPoints<N, 2>(inVertices, inElements, pts, cell);
+
+    using namespace PeriodicBoundaryMatcher;
+    vector<FaceMembership<N>> fm;
+    determineCellBoundaryFaceMembership(pts, cell, fm, epsilon);
+    cout << "Matching " << pts.size() << " boundary nodes" << endl;
+
+    using Matcher = void (*)(const vector<VectorND<N>> &, const BBox<VectorND<int(N)>> &,
+                             const vector<FaceMembership<N>> &, vector<vector<size_t>> &,
+                             vector<size_t> &, Real);
+    Matcher reference = ignoreMismatch ? matchPermittingMismatchCollisionGrid<N, vector<VectorND<N>>>
+                                       : matchCollisionGrid<N, vector<VectorND<N>>>;
+    Matcher sorted    = ignoreMismatch ? matchPermittingMismatch<N, vector<VectorND<N>>>
+                                       : match<N, vector<VectorND<N>>>;
+
+    auto run = [&](Matcher matcher, const string &name, vector<vector<size_t>> &nodeSets, vector<size_t> &nodeSetForNode) {
+        double best = std::numeric_limits<double>::max();
+        for (size_t r = 0; r < args["repeat"].as<size_t>(); ++r) {
+            auto start = chrono::steady_clock::now();
+            matcher(pts, cell, fm, nodeSets, nodeSetForNode, epsilon);
+            best = std::min(best, chrono::duration<double>(chrono::steady_clock::now() - start).count());
+        }
+        cout << setw(16) << left << name << best << "s" << endl;
+        return best;
+    };
+
+    vector<vector<size_t>> refSets, sortedSets;
+    vector<size_t> refSetForNode, sortedSetForNode;
+    double tRef    = run(reference, "CollisionGrid:", refSets,    refSetForNode);
+    double tSorted = run(sorted,    "Sort-based:",    sortedSets, sortedSetForNode);
+    cout << "Speedup: " << tRef / tSorted << endl;
+
+    if ((refSets != sortedSets) || (refSetForNode != sortedSetForNode)) {
+        cout << "ERROR: node identifications differ" << endl;
+        exit(-1);
+    }
+    cout << "Identified " << sortedSets.size() << " node sets (identical)" << endl;
+}
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Program entry point
+//  @param[in]  argc    Number of arguments
+//  @param[in]  argv    Argument strings
+//  @return     status  (0 on success)
+*///////////////////////////////////////////////////////////////////////////////
+int main(int argc, const char *argv[])
+{
+    po::variables_map args = parseCmdLine(argc, argv);
+
+    vector<MeshIO::IOVertex>  inVertices;
+    vector<MeshIO::IOElement> inElements;
+    size_t dim = args["dimension"].as<size_t>();
+    if (args.count("mesh")) {
+        auto type = MeshIO::load(args["mesh"].as<string>(), inVertices, inElements,
+                                 MeshIO::FMT_GUESS, MeshIO::MESH_GUESS);
+        if      (type == MeshIO::MESH_TET) dim = 3;
+        else if (type == MeshIO::MESH_TRI) dim = 2;
+        else    throw std::runtime_error("Mesh must be pure triangle or tet.");
+    }
+
+    if (dim == 3) execute<3>(args, inVertices, inElements);
+    else          execute<2>(args, inVertices, inElements);
+
+    return 0;
+}
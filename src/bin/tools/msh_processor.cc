@@ -430,7 +430,7 @@ size_t elementBarycenterFieldTransfer(const string &, const string &arg, Stack &
     auto &sampler = getElementSampler<N>();
     sampler.accelerate();
 
-    MSHFieldParser<N> targetMesh(arg);
+    MSHFieldParser<N> targetMesh(arg, false, true); // (only the mesh is needed)
 
     PointND<N> center;
     std::vector<ElementSampler::Sample> samplePts; samplePts.reserve(targetMesh.elements().size());
@@ -464,7 +464,7 @@ size_t elementBarycenterFieldTransfer(const string &, const string &arg, Stack &
 template<size_t N>
 size_t loadNewMSH(const string &, const string &arg, Stack &, const Modifiers &) {
     auto &currentMesh = getMutableParser<N>();
-    currentMesh = MSHFieldParser<N>(arg);
+    currentMesh = MSHFieldParser<N>(arg, false, true);
     g_sampler2D.reset();
     g_sampler3D.reset();
     return 0;
@@ -853,9 +853,16 @@ int main(int argc, char *argv[])
     auto forcedDim = boost::make_optional(false, size_t()); // work around maybe-uninitialized GCC warning bug
     tie(mshFile, filters, forcedDim) = parseCmdLine(argc, argv);
 
-    ifstream infile(mshFile);
-    if (!infile.is_open()) throw runtime_error("Couldn't open " + mshFile);
-	MeshIO::MeshType type = io.load(infile, v, e, MeshIO::MESH_GUESS);
+    // Mesh archives are memory-mapped by MSHFieldParser itself.
+    const bool archive = (MeshIO::guessFormat(mshFile) == MeshIO::FMT_MFA);
+    ifstream infile;
+    MeshIO::MeshType type;
+    if (archive) type = MeshIO::MeshArchive(mshFile).meshType();
+    else {
+        infile.open(mshFile);
+        if (!infile.is_open()) throw runtime_error("Couldn't open " + mshFile);
+        type = io.load(infile, v, e, MeshIO::MESH_GUESS);
+    }
     size_t meshDim = ::MeshIO::meshDimension(type);
 
     size_t dim = forcedDim ? *forcedDim : meshDim;
@@ -864,8 +871,15 @@ int main(int argc, char *argv[])
     if (meshDim != dim)
         cerr << "Warning: some operations won't work properly on non-full-dimension meshes" << endl;
 
-    if (dim == 3) parseMSH<3>(infile, type, std::move(e), std::move(v), io.binary(), meshDim != dim);
-    else          parseMSH<2>(infile, type, std::move(e), std::move(v), io.binary(), meshDim != dim);
+    // Fields are decoded lazily: most invocations only need a few of them.
+    if (archive) {
+        if (dim == 3) parseMSH<3>(mshFile, meshDim != dim, true);
+        else          parseMSH<2>(mshFile, meshDim != dim, true);
+    }
+    else {
+        if (dim == 3) parseMSH<3>(infile, type, std::move(e), std::move(v), io.binary(), meshDim != dim, mshFile);
+        else          parseMSH<2>(infile, type, std::move(e), std::move(v), io.binary(), meshDim != dim, mshFile);
+    }
 
     if (dim == 3) execute<3>(filters);
     else          execute<2>(filters);
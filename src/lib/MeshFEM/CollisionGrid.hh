@@ -7,7 +7,14 @@
 //      quick hack to get around needing a true AABB or similar datastructure.
 //
 //      (This is a grid centered around the origin with lattice width cellSize)
-*/ 
+//
+//      The nonempty cells are stored in an open-addressing hash table (linear
+//      probing) keyed on their integer coordinates. Points can be added in
+//      bulk, and batches of closest point queries are answered in parallel
+//      (queries are read-only, so they are safe to run concurrently as long
+//      as no points are being added). For best performance, the cell size
+//      should be on the order of the query radius.
+*/
 //  Author:  Julian Panetta (jpanetta), julian.panetta@gmail.com
 //  Company:  New York University
 //  Created:  06/16/2014 07:22:33
@@ -15,11 +22,14 @@
 #ifndef COLLISIONGRID_HH
 #define COLLISIONGRID_HH
 
-#include <map>
 #include <vector>
 #include <cassert>
+#include <cmath>
+#include <cstdint>
 #include <utility>
 
+#include <MeshFEM/Parallelism.hh>
+
 template<typename Real, typename Point>
 class CollisionGrid {
 public:
@@ -29,22 +39,65 @@ public:
         assert(Dim() <= 3);
         reset(cellSize);
     }
-    void reset() { m_cells.clear(); }
+    void reset() { m_slots.clear(); m_bins.clear(); }
     void reset(Real cellsize) { m_cellSize = cellsize; reset(); }
 
+    Real cellSize() const { return m_cellSize; }
+    size_t numNonemptyCells() const { return m_bins.size(); }
+
     ////////////////////////////////////////////////////////////////////////////
     /*! Add a tagged point to the collection, creating a new bin for it if
     //  necessary.
     *///////////////////////////////////////////////////////////////////////////
     void addPoint(const Point &p, size_t tag) {
-        CellIdx idx;
-        for (size_t i = 0; i < Dim(); ++i)
-            idx[i] = floor(p[i] / m_cellSize);
-        auto it = m_cells.find(idx);
-        if (it != m_cells.end())
-            it->second.emplace_back(std::make_pair(p, tag));
-        else {
-            m_cells.emplace(idx, Bin { std::make_pair(p, tag) } );
+        m_findOrCreateBin(cellIndex(p)).emplace_back(p, tag);
+    }
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Add points[i] with tag firstTag + i for each point in a collection
+    //  supporting size() and operator[] (equivalent to calling addPoint for
+    //  each point in order). The cell indices are computed in parallel.
+    *///////////////////////////////////////////////////////////////////////////
+    template<class Points>
+    void addPoints(const Points &points, size_t firstTag = 0) {
+        const size_t n = points.size();
+        std::vector<CellIdx> cells(n);
+        auto computeCell = [&](size_t i) { cells[i] = cellIndex(points[i]); };
+#if MESHFEM_WITH_TBB
+        tbb::parallel_for(tbb::blocked_range<size_t>(0, n),
+            [&](const tbb::blocked_range<size_t> &r) { for (size_t i = r.begin(); i < r.end(); ++i) computeCell(i); });
+#else
+        for (size_t i = 0; i < n; ++i) computeCell(i);
+#endif
+        // The table grows with the number of nonempty cells as they are
+        // created (many points typically share a cell).
+        for (size_t i = 0; i < n; ++i)
+            m_findOrCreateBin(cells[i]).emplace_back(points[i], firstTag + i);
+    }
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Call visitor(point, tag, dist) for every point within distance eps of
+    //  p. The points are visited in a deterministic order: cells in
+    //  lexicographic order, points within a cell in order of insertion.
+    *///////////////////////////////////////////////////////////////////////////
+    template<class Visitor>
+    void visitPointsWithin(const Point &p, Real eps, const Visitor &visitor) const {
+        CellIdx idxMin, idxMax;
+        for (size_t i = 0; i < Dim(); ++i) {
+            idxMin[i] = m_cellCoordinate(p[i] - eps);
+            idxMax[i] = m_cellCoordinate(p[i] + eps);
+        }
+        for (int64_t i = idxMin[0]; i <= idxMax[0]; ++i) {
+            for (int64_t j = idxMin[1]; j <= idxMax[1]; ++j) {
+                for (int64_t k = idxMin[2]; k <= idxMax[2]; ++k) {
+                    const Bin *b = m_findBin(CellIdx(i, j, k));
+                    if (b == nullptr) continue;
+                    for (const auto &entry : *b) {
+                        Real dist = (p - entry.first).norm();
+                        if (dist <= eps) visitor(entry.first, entry.second, dist);
+                    }
+                }
+            }
         }
     }
 
@@ -56,45 +109,45 @@ public:
     //                          "tag" is -1 if not found.
     *///////////////////////////////////////////////////////////////////////////
     std::pair<int, Point> getClosestPoint(const Point &p, Real eps) const {
-        CellIdx idxMin, idxMax;
-        for (size_t i = 0; i < Dim(); ++i) {
-            idxMin[i] = floor((p[i] - eps) / m_cellSize);
-            idxMax[i] = floor((p[i] + eps) / m_cellSize);
-        }
         int closestTag = -1;
         Real closestDist = eps;
         Point closestPoint(Point::Zero()); // Zero-init to avoid warnings
-        for (int i = idxMin[0]; i <= idxMax[0]; ++i) {
-            for (int j = idxMin[1]; j <= idxMax[1]; ++j) {
-                for (int k = idxMin[2]; k <= idxMax[2]; ++k) {
-                    CellIdx bin(i, j, k);
-                    auto it = m_cells.find(bin);
-                    if (it != m_cells.end()) {
-                        const Bin &b = it->second;
-                        for (size_t l = 0; l < b.size(); ++l) {
-                            Real dist = (p - b[l].first).norm();
-                            if (dist <= closestDist) {
-                                closestDist = dist;
-                                closestPoint = b[l].first;
-                                closestTag = b[l].second;
-                            }
-                        }
-                    }
-                }
+        visitPointsWithin(p, eps, [&](const Point &q, size_t tag, Real dist) {
+            if (dist <= closestDist) {
+                closestDist = dist;
+                closestPoint = q;
+                closestTag = tag;
             }
-        }
+        });
 
         return std::make_pair(closestTag, closestPoint);
     }
 
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Closest point queries for each point in a collection supporting size()
+    //  and operator[], answered in parallel.
+    *///////////////////////////////////////////////////////////////////////////
+    template<class Points>
+    std::vector<std::pair<int, Point>> getClosestPoints(const Points &queries, Real eps) const {
+        const size_t n = queries.size();
+        std::vector<std::pair<int, Point>> result(n);
+        auto query = [&](size_t i) { result[i] = getClosestPoint(queries[i], eps); };
+#if MESHFEM_WITH_TBB
+        tbb::parallel_for(tbb::blocked_range<size_t>(0, n),
+            [&](const tbb::blocked_range<size_t> &r) { for (size_t i = r.begin(); i < r.end(); ++i) query(i); });
+#else
+        for (size_t i = 0; i < n; ++i) query(i);
+#endif
+        return result;
+    }
 
     // In {1,2}D, higher-dim components are effectively ignored since they all
     // equal (0)
     struct CellIdx {
-        CellIdx(int a = 0, int b = 0, int c = 0) {
+        CellIdx(int64_t a = 0, int64_t b = 0, int64_t c = 0) {
             idx[0] = a; idx[1] = b; idx[2] = c;
         }
-        int idx[3];
+        int64_t idx[3];
         // Lexicographic ordering.
         bool operator<(const CellIdx &b) const {
             for (size_t i = 0; i < 3; ++i) {
@@ -103,15 +156,84 @@ public:
             }
             return false;
         }
+        bool operator==(const CellIdx &b) const {
+            return (idx[0] == b.idx[0]) && (idx[1] == b.idx[1]) && (idx[2] == b.idx[2]);
+        }
 
-              int &operator[](size_t i)       { assert(i < 3); return idx[i]; }
-        const int &operator[](size_t i) const { assert(i < 3); return idx[i]; }
+              int64_t &operator[](size_t i)       { assert(i < 3); return idx[i]; }
+        const int64_t &operator[](size_t i) const { assert(i < 3); return idx[i]; }
     };
 
+    CellIdx cellIndex(const Point &p) const {
+        CellIdx idx;
+        for (size_t i = 0; i < Dim(); ++i)
+            idx[i] = m_cellCoordinate(p[i]);
+        return idx;
+    }
+
 private:
-    Real m_cellSize;
     typedef std::vector<std::pair<Point, size_t> > Bin;
-    std::map<CellIdx, Bin> m_cells;
+
+    int64_t m_cellCoordinate(Real x) const { return int64_t(std::floor(x / m_cellSize)); }
+
+    static size_t m_hash(const CellIdx &c) {
+        // splitmix64 finalizer applied to a combination of the coordinates.
+        uint64_t h = uint64_t(c.idx[0]) * 0x9E3779B97F4A7C15ull;
+        h ^= uint64_t(c.idx[1]) + 0x7F4A7C159E3779B9ull + (h << 6) + (h >> 2);
+        h ^= uint64_t(c.idx[2]) + 0x94D049BB133111EBull + (h << 6) + (h >> 2);
+        h = (h ^ (h >> 30)) * 0xBF58476D1CE4E5B9ull;
+        h = (h ^ (h >> 27)) * 0x94D049BB133111EBull;
+        return size_t(h ^ (h >> 31));
+    }
+
+    const Bin *m_findBin(const CellIdx &c) const {
+        if (m_slots.empty()) return nullptr;
+        const size_t mask = m_slots.size() - 1;
+        for (size_t s = m_hash(c) & mask; ; s = (s + 1) & mask) {
+            const Slot &slot = m_slots[s];
+            if (slot.bin < 0) return nullptr;
+            if (slot.cell == c) return &m_bins[slot.bin];
+        }
+    }
+
+    Bin &m_findOrCreateBin(const CellIdx &c) {
+        m_reserve(m_bins.size() + 1);
+        const size_t mask = m_slots.size() - 1;
+        size_t s = m_hash(c) & mask;
+        for (; m_slots[s].bin >= 0; s = (s + 1) & mask)
+            if (m_slots[s].cell == c) return m_bins[m_slots[s].bin];
+        m_slots[s].cell = c;
+        m_slots[s].bin = m_bins.size();
+        m_bins.emplace_back();
+        return m_bins.back();
+    }
+
+    // Grow the table (keeping the load factor <= 1/2) to hold numBins bins.
+    void m_reserve(size_t numBins) {
+        if (2 * numBins <= m_slots.size()) return;
+        size_t capacity = 16;
+        while (capacity < 2 * numBins) capacity *= 2;
+        std::vector<Slot> oldSlots(capacity);
+        oldSlots.swap(m_slots);
+        const size_t mask = capacity - 1;
+        for (const Slot &slot : oldSlots) {
+            if (slot.bin < 0) continue;
+            size_t s = m_hash(slot.cell) & mask;
+            while (m_slots[s].bin >= 0) s = (s + 1) & mask;
+            m_slots[s] = slot;
+        }
+    }
+
+    // Hash table entry: a cell and the index of its bin (-1 if empty). The
+    // cell is stored inline so that probing touches a single array.
+    struct Slot {
+        CellIdx cell;
+        int64_t bin = -1;
+    };
+
+    Real m_cellSize;
+    std::vector<Slot> m_slots;
+    std::vector<Bin>  m_bins;
 };
 
 #endif /* end of include guard: COLLISIONGRID_HH */
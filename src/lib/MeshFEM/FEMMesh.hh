@@ -25,6 +25,7 @@
 #include <MeshFEM/SimplicialMesh.hh>
 #include <MeshFEM/BoundaryMesh.hh>
 #include <MeshFEM/Handles/FEMMeshHandles.hh>
+#include <MeshFEM/MeshReordering.hh>
 
 #include <MeshFEM/Utilities/VertexArrayAdaptor.hh>
 
@@ -119,7 +120,23 @@ public:
 
     template<typename Elements, typename Vertices>
     FEMMesh(const Elements &elems, const Vertices &vertices);
-    static std::unique_ptr<FEMMesh> load(const std::string &path);
+    // Construct with the vertices and elements renumbered for locality (see
+    // MeshReordering.hh); permutation() relates the mesh's numbering to the
+    // input's.
+    template<typename Elements, typename Vertices>
+    FEMMesh(const Elements &elems, const Vertices &vertices, MeshOrdering ordering)
+        : FEMMesh(reorderMesh(elems, vertices, ordering)) { }
+    // Construct from already renumbered vertices and elements (e.g., when
+    // restoring a serialized mesh), keeping their permutation.
+    explicit FEMMesh(ReorderedMesh &&m) : FEMMesh(m.elements, m.vertices) {
+        m_permutation = std::move(m.permutation);
+    }
+    static std::unique_ptr<FEMMesh> load(const std::string &path, MeshOrdering ordering = MeshOrdering::None);
+
+    // Map between this mesh's vertex/element indices and those of the input
+    // it was constructed from (the identity unless a reordering was applied).
+    const MeshPermutation &permutation() const { return m_permutation; }
+    bool isReordered() const { return !m_permutation.isIdentity(); }
 
     // ~FEMMesh() { std::cout << "FEMMesh (" << getMeshName<FEMMesh>() << ") destructor called" << std::endl; }
 
@@ -218,8 +235,13 @@ public:
 
         m_embedElements();
         m_computeBBox();
+        ++m_geometryVersion;
     }
 
+    // Incremented every time the node positions change (so that derived data
+    // like cached vertex arrays can be validated cheaply).
+    size_t geometryVersion() const { return m_geometryVersion; }
+
     const UnorderedPair& edgeForEdgeNode(size_t edgeNodeIndex) const {
         assert(edgeNodeIndex >= 0 && edgeNodeIndex < m_edgeForEdgeNode.size());
         return m_edgeForEdgeNode.at(edgeNodeIndex);
@@ -290,6 +312,8 @@ public:
     BoundaryMesh<const FEMMesh> boundary() const { return BoundaryMesh<const FEMMesh>(*this); }
 
 private:
+    MeshPermutation m_permutation;
+
     // Table of **non-vertex** node indices for each element. We needn't store
     // vertex node indices because our mesh data structure knows them.
     // The true node index is numVertexNodes() + m_N[i]
@@ -316,6 +340,8 @@ private:
     // setNodePositions()
     BBox<EmbeddingSpace> m_bbox;
 
+    size_t m_geometryVersion = 0;
+
     // Handles need access to private traversal operations below
     template<class Mesh> friend class _FEMMeshHandles::VHandle;
     template<class Mesh> friend class _FEMMeshHandles::NHandle;
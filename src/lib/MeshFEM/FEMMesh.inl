@@ -75,9 +75,9 @@ FEMMesh(const Elements &elems, const Vertices &vertices)
 template<size_t _K, size_t _Deg, class EmbeddingSpace, template <size_t, size_t, class> class _FEMData>
 auto
 FEMMesh<_K, _Deg, EmbeddingSpace, _FEMData>::
-load(const std::string &path) -> std::unique_ptr<FEMMesh> {
+load(const std::string &path, MeshOrdering ordering) -> std::unique_ptr<FEMMesh> {
     std::vector<MeshIO::IOVertex > vertices;
     std::vector<MeshIO::IOElement> elements;
     MeshIO::load(path, vertices, elements);
-    return Future::make_unique<FEMMesh>(elements, vertices);
+    return Future::make_unique<FEMMesh>(elements, vertices, ordering);
 }
@@ -1,5 +1,6 @@
 #include "GlobalBenchmark.hh"
 #include <iostream>
+#include <mutex>
 
 #ifdef BENCHMARK
 
@@ -7,25 +8,42 @@ using namespace std;
 
 static Timer g_timer;
 static vector<string> g_benchmarkMessages;
-void BENCHMARK_START_TIMER_SECTION(const string &name) { g_timer.startSection(name); }
-void  BENCHMARK_STOP_TIMER_SECTION(const string &name) { g_timer.stopSection(name); }
-void         BENCHMARK_START_TIMER(const string &name) { g_timer.start(name); }
-void          BENCHMARK_STOP_TIMER(const string &name) { g_timer.stop(name); }
-void               BENCHMARK_RESET()                   { g_timer.reset(); }
+static mutex g_benchmarkMutex;
+
+// Concurrent jobs (e.g., batched homogenization) suppress the benchmark calls
+// made from their threads: their nested sections would interleave in the
+// global timer. Everything else is recorded, from any thread.
+static thread_local bool g_suppressed = false;
+
+bool BENCHMARK_SET_THREAD_SUPPRESSED(bool suppress) {
+    const bool prev = g_suppressed;
+    g_suppressed = suppress;
+    return prev;
+}
+
+void BENCHMARK_START_TIMER_SECTION(const string &name) { if (g_suppressed) return; lock_guard<mutex> lock(g_benchmarkMutex); g_timer.startSection(name); }
+void  BENCHMARK_STOP_TIMER_SECTION(const string &name) { if (g_suppressed) return; lock_guard<mutex> lock(g_benchmarkMutex); g_timer.stopSection(name); }
+void         BENCHMARK_START_TIMER(const string &name) { if (g_suppressed) return; lock_guard<mutex> lock(g_benchmarkMutex); g_timer.start(name); }
+void          BENCHMARK_STOP_TIMER(const string &name) { if (g_suppressed) return; lock_guard<mutex> lock(g_benchmarkMutex); g_timer.stop(name); }
+void               BENCHMARK_RESET()                   { lock_guard<mutex> lock(g_benchmarkMutex); g_timer.reset(); }
 
 void BENCHMARK_ADD_MESSAGE(const string &msg) {
+    if (g_suppressed) return;
+    lock_guard<mutex> lock(g_benchmarkMutex);
     g_benchmarkMessages.push_back(msg);
 }
 
-void BENCHMARK_CLEAR_MESSAGES() { g_benchmarkMessages.clear(); }
+void BENCHMARK_CLEAR_MESSAGES() { lock_guard<mutex> lock(g_benchmarkMutex); g_benchmarkMessages.clear(); }
 
 void BENCHMARK_REPORT() {
+    lock_guard<mutex> lock(g_benchmarkMutex);
     for (const auto &message : g_benchmarkMessages)
         cout << message << endl;
     g_timer.report(cout);
 }
 
 void BENCHMARK_REPORT_NO_MESSAGES() {
+    lock_guard<mutex> lock(g_benchmarkMutex);
     g_timer.report(cout);
 }
 
@@ -15,6 +15,10 @@ void BENCHMARK_ADD_MESSAGE(const std::string &msg);
 void BENCHMARK_CLEAR_MESSAGES();
 void BENCHMARK_REPORT();
 void BENCHMARK_REPORT_NO_MESSAGES();
+
+// Ignore (or stop ignoring) the benchmark calls made from the current thread;
+// returns the previous setting.
+bool BENCHMARK_SET_THREAD_SUPPRESSED(bool suppress);
 #else
 inline void BENCHMARK_START_TIMER_SECTION(const std::string &/* name */) { }
 inline void  BENCHMARK_STOP_TIMER_SECTION(const std::string &/* name */) { }
@@ -25,6 +29,7 @@ inline void BENCHMARK_ADD_MESSAGE(const std::string &/* msg */) { }
 inline void BENCHMARK_CLEAR_MESSAGES() { }
 inline void BENCHMARK_REPORT() { }
 inline void BENCHMARK_REPORT_NO_MESSAGES() { }
+inline bool BENCHMARK_SET_THREAD_SUPPRESSED(bool /* suppress */) { return false; }
 #endif
 
 struct BENCHMARK_SCOPED_TIMER_SECTION {
@@ -39,5 +44,13 @@ private:
     std::string m_name;
 };
 
+// Suppress the current thread's benchmark calls while in scope (used by
+// concurrently running jobs).
+struct BENCHMARK_SCOPED_SUPPRESS {
+    BENCHMARK_SCOPED_SUPPRESS() : m_prev(BENCHMARK_SET_THREAD_SUPPRESSED(true)) { }
+    ~BENCHMARK_SCOPED_SUPPRESS() { BENCHMARK_SET_THREAD_SUPPRESSED(m_prev); }
+private:
+    bool m_prev;
+};
 
 #endif /* end of include guard: GLOBALBENCHMARK_HH */
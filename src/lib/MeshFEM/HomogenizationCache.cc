@@ -0,0 +1,192 @@
+#include "HomogenizationCache.hh"
+
+#include <algorithm>
+#include <cstdlib>
+#include <ctime>
+#include <fstream>
+#include <iostream>
+#include <sstream>
+#include <stdexcept>
+#include <tuple>
+#include <boost/filesystem.hpp>
+
+namespace fs = boost::filesystem;
+
+namespace {
+
+const uint64_t RESULT_FILE_MAGIC = 0x4d4645484d473031ull; // "MFEHMG01"
+const char *RESULT_FILE_EXTENSION = ".hmg";
+
+fs::path entryPath(const std::string &dir, const HomogenizationCache::Key &k) {
+    return fs::path(dir) / (k.str() + RESULT_FILE_EXTENSION);
+}
+
+void writeMatrix(std::ostream &os, const Eigen::MatrixXd &A) {
+    const uint64_t dims[2] = { uint64_t(A.rows()), uint64_t(A.cols()) };
+    os.write(reinterpret_cast<const char *>(dims), sizeof(dims));
+    os.write(reinterpret_cast<const char *>(A.data()), A.size() * sizeof(double));
+}
+
+bool readMatrix(std::istream &is, Eigen::MatrixXd &A) {
+    uint64_t dims[2];
+    if (!is.read(reinterpret_cast<char *>(dims), sizeof(dims))) return false;
+    // Guard against corrupted sizes before allocating.
+    if ((dims[0] > (uint64_t(1) << 32)) || (dims[1] > (uint64_t(1) << 32))) return false;
+    A.resize(dims[0], dims[1]);
+    return bool(is.read(reinterpret_cast<char *>(A.data()), A.size() * sizeof(double)));
+}
+
+}
+
+std::string fileContentHash(const std::string &path) {
+    std::ifstream is(path, std::ios::binary);
+    if (!is) throw std::runtime_error("Couldn't open " + path);
+    std::stringstream ss;
+    ss << is.rdbuf();
+    ContentHasher h;
+    h.add(ss.str());
+    return h.str();
+}
+
+HomogenizationCache &HomogenizationCache::instance() {
+    static HomogenizationCache cache;
+    return cache;
+}
+
+HomogenizationCache::HomogenizationCache() {
+    const char *dir = std::getenv("MESHFEM_HOMOGENIZATION_CACHE_DIR");
+    if (dir != nullptr) m_directory = dir;
+    const char *maxBytes = std::getenv("MESHFEM_HOMOGENIZATION_CACHE_MAX_BYTES");
+    if (maxBytes != nullptr) m_maxBytes = std::strtoull(maxBytes, nullptr, 10);
+}
+
+// File layout (all 64-bit): magic, hash1, hash2, number of w_ij, Ch, w_ij...
+// where each matrix is stored as rows, cols, column-major data.
+bool HomogenizationCache::load(const Key &k, Entry &e, bool needFluctuations) {
+    const std::string dir = directory();
+    if (dir.empty()) return false;
+
+    Entry result;
+    bool found = false;
+    const fs::path path = entryPath(dir, k);
+    {
+        std::ifstream is(path.string(), std::ios::binary);
+        uint64_t header[4];
+        if (is && is.read(reinterpret_cast<char *>(header), sizeof(header)) &&
+            (header[0] == RESULT_FILE_MAGIC) && (header[1] == k.hash1) && (header[2] == k.hash2) &&
+            (header[3] <= 64) && (!needFluctuations || (header[3] > 0)) && readMatrix(is, result.Ch)) {
+            found = true;
+            result.w_ij.resize(header[3]);
+            for (auto &w : result.w_ij) found = found && readMatrix(is, w);
+        }
+    }
+
+    std::lock_guard<std::mutex> lock(m_mutex);
+    if (!found) { ++m_misses; return false; }
+    ++m_hits;
+
+    // Mark the entry as recently used for the eviction policy.
+    boost::system::error_code ec;
+    fs::last_write_time(path, std::time(nullptr), ec);
+
+    e = std::move(result);
+    return true;
+}
+
+void HomogenizationCache::store(const Key &k, const Entry &e) {
+    std::string dir;
+    size_t maxBytes;
+    bool storeFluctuations;
+    {
+        std::lock_guard<std::mutex> lock(m_mutex);
+        dir = m_directory;
+        maxBytes = m_maxBytes;
+        storeFluctuations = m_storeFluctuations;
+    }
+    if (dir.empty()) return;
+
+    try {
+        fs::create_directories(dir);
+        const fs::path path = entryPath(dir, k);
+        // Write to a temporary file and rename it so that concurrent
+        // processes never read a partially written entry.
+        const fs::path tmpPath = fs::unique_path(path.string() + ".%%%%-%%%%-%%%%.tmp");
+        {
+            std::ofstream os(tmpPath.string(), std::ios::binary);
+            const uint64_t numW = storeFluctuations ? e.w_ij.size() : 0;
+            const uint64_t header[4] = { RESULT_FILE_MAGIC, k.hash1, k.hash2, numW };
+            os.write(reinterpret_cast<const char *>(header), sizeof(header));
+            writeMatrix(os, e.Ch);
+            for (size_t i = 0; i < numW; ++i) writeMatrix(os, e.w_ij[i]);
+            if (!os) throw std::runtime_error("write failed");
+        }
+        fs::rename(tmpPath, path);
+
+        std::lock_guard<std::mutex> lock(m_mutex);
+        if (maxBytes > 0) m_evict(dir, maxBytes);
+    }
+    catch (const std::exception &ex) {
+        std::cerr << "WARNING: couldn't store homogenization result in " << dir << ": " << ex.what() << std::endl;
+    }
+}
+
+// Delete the least recently used entries until the directory fits in maxBytes.
+void HomogenizationCache::m_evict(const std::string &dir, size_t maxBytes) {
+    std::vector<std::tuple<std::time_t, uintmax_t, fs::path>> entries;
+    uintmax_t total = 0;
+    boost::system::error_code ec;
+    for (fs::directory_iterator it(dir, ec), end; !ec && (it != end); it.increment(ec)) {
+        const fs::path &p = it->path();
+        if (p.extension() != RESULT_FILE_EXTENSION) continue;
+        boost::system::error_code ec2;
+        const uintmax_t size = fs::file_size(p, ec2);
+        const std::time_t time = fs::last_write_time(p, ec2);
+        if (ec2) continue;
+        entries.emplace_back(time, size, p);
+        total += size;
+    }
+    if (total <= maxBytes) return;
+
+    std::sort(entries.begin(), entries.end());
+    for (const auto &entry : entries) {
+        if (total <= maxBytes) break;
+        boost::system::error_code ec2;
+        if (fs::remove(std::get<2>(entry), ec2)) total -= std::get<1>(entry);
+    }
+}
+
+void HomogenizationCache::setDirectory(const std::string &dir) {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_directory = dir;
+}
+
+std::string HomogenizationCache::directory() const {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    return m_directory;
+}
+
+void HomogenizationCache::setMaxBytes(size_t maxBytes) {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_maxBytes = maxBytes;
+    if ((maxBytes > 0) && !m_directory.empty() && fs::is_directory(m_directory))
+        m_evict(m_directory, maxBytes);
+}
+
+size_t HomogenizationCache::maxBytes() const { std::lock_guard<std::mutex> lock(m_mutex); return m_maxBytes; }
+
+void HomogenizationCache::setStoreFluctuations(bool store) { std::lock_guard<std::mutex> lock(m_mutex); m_storeFluctuations = store; }
+bool HomogenizationCache::storeFluctuations() const { std::lock_guard<std::mutex> lock(m_mutex); return m_storeFluctuations; }
+
+size_t HomogenizationCache::hits()   const { std::lock_guard<std::mutex> lock(m_mutex); return m_hits; }
+size_t HomogenizationCache::misses() const { std::lock_guard<std::mutex> lock(m_mutex); return m_misses; }
+
+void HomogenizationCache::clear() {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_hits = m_misses = 0;
+    if (m_directory.empty()) return;
+    boost::system::error_code ec;
+    std::vector<fs::path> paths;
+    for (fs::directory_iterator it(m_directory, ec), end; !ec && (it != end); it.increment(ec))
+        if (it->path().extension() == RESULT_FILE_EXTENSION) paths.push_back(it->path());
+    for (const auto &p : paths) fs::remove(p, ec);
+}
@@ -0,0 +1,171 @@
+////////////////////////////////////////////////////////////////////////////////
+// HomogenizationCache.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Opt-in, content-addressed on-disk cache of periodic homogenization
+//      results shared by the command line tools and the Python bindings.
+//
+//      A result is keyed on a hash of everything that determines it: the
+//      mesh's vertex and element arrays, the FEM degree, the base elasticity
+//      tensor, the periodicity options and the solver configuration. Each
+//      entry is a compact binary file holding the flattened homogenized
+//      tensor and, optionally, the fluctuation displacements w_ij. When the
+//      cache directory exceeds its size limit, the least recently used
+//      entries are deleted.
+//
+//      The cache is disabled unless a directory is configured with
+//      setDirectory or the MESHFEM_HOMOGENIZATION_CACHE_DIR environment
+//      variable; MESHFEM_HOMOGENIZATION_CACHE_MAX_BYTES sets the size limit.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef HOMOGENIZATIONCACHE_HH
+#define HOMOGENIZATIONCACHE_HH
+
+#include <cstdint>
+#include <cstddef>
+#include <mutex>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include <Eigen/Dense>
+
+#include <MeshFEM/Flattening.hh>
+#include <MeshFEM/Utilities/ContentHash.hh>
+#include <MeshFEM/Utilities/MeshConversion.hh>
+
+class HomogenizationCache {
+public:
+    struct Key {
+        uint64_t hash1 = 0, hash2 = 0;
+        std::string str() const { return ContentHasher::str(hash1, hash2); }
+    };
+
+    struct Entry {
+        Eigen::MatrixXd Ch;                 // flattened homogenized tensor (D matrix)
+        std::vector<Eigen::MatrixXd> w_ij;  // fluctuation displacements (numNodes x N); may be empty
+    };
+
+    static HomogenizationCache &instance();
+
+    bool enabled() const { return !directory().empty(); }
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Look up the entry for key k.
+    //  @param[in]  needFluctuations    only accept entries storing w_ij
+    //  @return     whether the entry was found (and loaded into e)
+    *///////////////////////////////////////////////////////////////////////////
+    bool load(const Key &k, Entry &e, bool needFluctuations = false);
+
+    // Store an entry (w_ij is dropped unless storeFluctuations() is set).
+    // Failures are reported as warnings: the cache is only an optimization.
+    void store(const Key &k, const Entry &e);
+
+    // Directory holding the entries ("" disables the cache).
+    void setDirectory(const std::string &dir);
+    std::string directory() const;
+
+    // Size limit of the cache directory in bytes (0: unlimited).
+    void   setMaxBytes(size_t maxBytes);
+    size_t maxBytes() const;
+
+    void setStoreFluctuations(bool store);
+    bool storeFluctuations() const;
+
+    // Delete all entries in the cache directory and reset the statistics.
+    void clear();
+
+    size_t hits()   const;
+    size_t misses() const;
+
+private:
+    HomogenizationCache();
+    HomogenizationCache(const HomogenizationCache &) = delete;
+    HomogenizationCache &operator=(const HomogenizationCache &) = delete;
+
+    void m_evict(const std::string &dir, size_t maxBytes);
+
+    mutable std::mutex m_mutex;
+    std::string m_directory;
+    size_t m_maxBytes = size_t(1) << 30;
+    bool m_storeFluctuations = true;
+    size_t m_hits = 0, m_misses = 0;
+};
+
+// Hex digest of a file's contents (throws if the file can't be read).
+std::string fileContentHash(const std::string &path);
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Key identifying the homogenization of mesh with base material Cbase.
+//  @param[in] manualPeriodicVerticesFile   its contents are hashed (if set)
+//  @param[in] solver                       description of the linear solver
+//                                          and its settings (e.g., "direct")
+*///////////////////////////////////////////////////////////////////////////////
+template<class Mesh, class ETensor>
+HomogenizationCache::Key homogenizationCacheKey(const Mesh &mesh, const ETensor &Cbase,
+                                                bool orthotropicCell, bool ignorePeriodicMismatch,
+                                                const std::string &manualPeriodicVerticesFile = std::string(),
+                                                const std::string &solver = "direct") {
+    const auto V = getV(mesh);
+    const auto F = getF(mesh);
+
+    ContentHasher h;
+    h.add(std::string("MeshFEM homogenization v1"));
+    h.add(uint64_t(Mesh::EmbeddingDimension));
+    h.add(uint64_t(Mesh::Deg));
+    h.add(uint64_t(V.rows())); h.add(uint64_t(V.cols()));
+    for (int i = 0; i < V.rows(); ++i)
+        for (int j = 0; j < V.cols(); ++j) h.addReal(V(i, j));
+    h.add(uint64_t(F.rows())); h.add(uint64_t(F.cols()));
+    for (int i = 0; i < F.rows(); ++i)
+        for (int j = 0; j < F.cols(); ++j) h.add(uint64_t(F(i, j)));
+
+    const size_t flen = flatLen(Mesh::EmbeddingDimension);
+    for (size_t i = 0; i < flen; ++i)
+        for (size_t j = 0; j < flen; ++j) h.addReal(Cbase.D(i, j));
+
+    h.add(uint64_t(orthotropicCell));
+    h.add(uint64_t(ignorePeriodicMismatch));
+    h.add(manualPeriodicVerticesFile.empty() ? std::string() : fileContentHash(manualPeriodicVerticesFile));
+    h.add(solver);
+
+    HomogenizationCache::Key k;
+    k.hash1 = h.h1;
+    k.hash2 = h.h2;
+    return k;
+}
+
+// Conversion between homogenization outputs (an ElasticityTensor and
+// VectorField fluctuation displacements) and cache entries.
+template<class ETensor, class VField>
+HomogenizationCache::Entry homogenizationCacheEntry(const ETensor &Ch, const std::vector<VField> &w_ij) {
+    constexpr size_t N = ETensor::Dim;
+    constexpr size_t flen = flatLen(N);
+    HomogenizationCache::Entry e;
+    e.Ch.resize(flen, flen);
+    for (size_t i = 0; i < flen; ++i)
+        for (size_t j = 0; j < flen; ++j) e.Ch(i, j) = Ch.D(i, j);
+    for (const auto &w : w_ij) {
+        e.w_ij.emplace_back(w.domainSize(), N);
+        for (size_t ii = 0; ii < w.domainSize(); ++ii) e.w_ij.back().row(ii) = w(ii).transpose();
+    }
+    return e;
+}
+
+template<class ETensor, class VField>
+void extractHomogenizationCacheEntry(const HomogenizationCache::Entry &e, size_t numNodes, ETensor &Ch, std::vector<VField> &w_ij) {
+    constexpr size_t N = ETensor::Dim;
+    constexpr size_t flen = flatLen(N);
+    if ((size_t(e.Ch.rows()) != flen) || (size_t(e.Ch.cols()) != flen)) throw std::runtime_error("Cached tensor size mismatch");
+    for (size_t i = 0; i < flen; ++i)
+        for (size_t j = 0; j < flen; ++j) Ch.D(i, j) = e.Ch(i, j);
+    w_ij.clear();
+    for (const auto &w : e.w_ij) {
+        if ((size_t(w.rows()) != numNodes) || (size_t(w.cols()) != N))
+            throw std::runtime_error("Cached fluctuation displacement size mismatch");
+        w_ij.emplace_back(numNodes);
+        for (size_t ii = 0; ii < numNodes; ++ii) w_ij.back()(ii) = w.row(ii).transpose();
+    }
+}
+
+#endif /* end of include guard: HOMOGENIZATIONCACHE_HH */
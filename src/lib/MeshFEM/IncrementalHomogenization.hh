@@ -0,0 +1,207 @@
+////////////////////////////////////////////////////////////////////////////////
+// IncrementalHomogenization.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Incremental periodic homogenization under small shape perturbations.
+//
+//      Shape optimization line searches evaluate the homogenized tensor at
+//      many vertex positions close to the last accepted design. Instead of
+//      re-solving the cell problems for each of them, IncrementalHomogenizer
+//      keeps the fluctuation displacements and the discrete shape
+//      differential dCh (homogenizedElasticityTensorDiscreteDifferential) at a
+//      reference geometry and predicts
+//          Ch(p_ref + delta_p) ~= Ch(p_ref) + dCh[delta_p],
+//      which is a sparse dot product over the perturbed vertices. The cell
+//      problems are re-solved (and the reference updated) only when
+//          - the estimated error of the prediction exceeds a tolerance,
+//          - a vertex moved too far relative to the smallest element size
+//            (the linearization and the elements' conditioning can no longer
+//            be trusted), or
+//          - the periodic cell (bounding box) changed.
+//
+//      The prediction error is estimated from the size of the first-order
+//      change: err ~= c * (|dCh[delta_p]| / |Ch|)^2. The constant c is
+//      calibrated against the true error whenever a full solve happens at a
+//      point where a prediction was available.
+//
+//      Full solves within the same periodic cell keep the simulator's
+//      periodic conditions and the symbolic factorization of its stiffness
+//      matrix (the homogenizer enables the simulator's stiffness pattern
+//      cache), so only the numeric factorization is redone.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef INCREMENTALHOMOGENIZATION_HH
+#define INCREMENTALHOMOGENIZATION_HH
+
+#include <MeshFEM/PeriodicHomogenization.hh>
+#include <MeshFEM/Utilities/VertexArrayAdaptor.hh>
+
+#include <algorithm>
+#include <cmath>
+#include <limits>
+#include <vector>
+
+namespace PeriodicHomogenization {
+
+struct IncrementalHomogenizationOptions {
+    // Maximum estimated relative (Frobenius norm) error of a predicted tensor.
+    Real tolerance = 1e-4;
+    // Maximum vertex displacement from the reference geometry relative to the
+    // reference's smallest element size (volume^(1/N)).
+    Real maxRelativePerturbation = 0.1;
+};
+
+template<class _Sim>
+class IncrementalHomogenizer {
+public:
+    static constexpr size_t N = _Sim::N;
+    using VField  = typename _Sim::VField;
+    using ETensor = typename _Sim::ETensor;
+    using OF      = OneForm<ETensor, N>;
+
+    IncrementalHomogenizer(_Sim &sim, const IncrementalHomogenizationOptions &opts = IncrementalHomogenizationOptions())
+        : m_sim(sim), m_opts(opts) {
+        m_sim.setCacheStiffnessPattern(true);
+    }
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Homogenized elasticity tensor of the cell with the given vertex
+    //  positions (any array supported by VertexArrayAdaptor), predicted from
+    //  the reference geometry when possible. A full solve moves the
+    //  simulator's mesh to the new positions and makes them the reference.
+    *///////////////////////////////////////////////////////////////////////////
+    template<class Vertices>
+    ETensor evaluate(const Vertices &vertices) {
+        const auto &mesh = m_sim.mesh();
+        if (VertexArrayAdaptor<Vertices>::numVertices(vertices) != mesh.numVertices())
+            throw std::runtime_error("Vertex count mismatch");
+
+        if (m_valid) {
+            VField delta_p(mesh.numVertices());
+            BBox<VectorND<N>> bbox;
+            for (size_t vi = 0; vi < mesh.numVertices(); ++vi) {
+                VectorND<N> p = truncateFrom3D<VectorND<N>>(VertexArrayAdaptor<Vertices>::get(vertices, vi));
+                delta_p(vi) = p - m_referencePositions(vi);
+                if (vi == 0) bbox = BBox<VectorND<N>>(p);
+                else         bbox.unionPoint(p);
+            }
+
+            const Real maxDisplacement = delta_p.maxMag();
+            const Real cellTol = 1e-10 * (m_referenceBBox.maxCorner - m_referenceBBox.minCorner).norm();
+            const bool cellChanged = ((bbox.minCorner - m_referenceBBox.minCorner).norm() > cellTol) ||
+                                     ((bbox.maxCorner - m_referenceBBox.maxCorner).norm() > cellTol);
+
+            if (!cellChanged && (maxDisplacement <= m_opts.maxRelativePerturbation * m_minElementSize)) {
+                m_lastPrediction = predict(delta_p);
+                m_lastFirstOrderChange = m_firstOrderChange(m_lastPrediction);
+                if (m_errorConstant * m_lastFirstOrderChange * m_lastFirstOrderChange <= m_opts.tolerance) {
+                    ++m_numPredictions;
+                    m_lastWasPredicted = true;
+                    return m_lastPrediction;
+                }
+                m_havePrediction = true;
+            }
+            // The periodic node identification must be redone for a new cell.
+            if (cellChanged) m_cellProblemsSetUp = false;
+        }
+
+        m_sim.updateMeshNodePositions(vertices);
+        recompute();
+        return m_Ch;
+    }
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Solve the cell problems at the simulator's current geometry and make
+    //  it the reference for subsequent predictions. Call invalidate() first
+    //  if the simulator's periodic cell was changed outside evaluate().
+    *///////////////////////////////////////////////////////////////////////////
+    const ETensor &recompute() {
+        BENCHMARK_SCOPED_TIMER_SECTION timer("Incremental Homogenization Solve");
+        const auto &mesh = m_sim.mesh();
+        if (m_cellProblemsSetUp) resolveCellProblems(m_w, m_sim);
+        else                     solveCellProblems(m_w, m_sim);
+        m_cellProblemsSetUp = true;
+        m_Ch  = homogenizedElasticityTensorDisplacementForm(m_w, m_sim);
+        m_dCh = homogenizedElasticityTensorDiscreteDifferential(m_w, m_sim);
+
+        // Calibrate the error estimate against the prediction we just rejected.
+        if (m_havePrediction && (m_lastFirstOrderChange > 0)) {
+            const Real err = std::sqrt((m_lastPrediction - m_Ch).frobeniusNormSq() / m_Ch.frobeniusNormSq());
+            m_errorConstant = std::max<Real>(1.0, err / (m_lastFirstOrderChange * m_lastFirstOrderChange));
+        }
+        m_havePrediction = false;
+
+        m_referencePositions.resizeDomain(mesh.numVertices());
+        for (auto v : mesh.vertices())
+            m_referencePositions(v.index()) = v.node()->p;
+        m_referenceBBox = mesh.boundingBox();
+        m_minElementSize = std::numeric_limits<Real>::max();
+        for (auto e : mesh.elements())
+            m_minElementSize = std::min<Real>(m_minElementSize, std::pow(e->volume(), 1.0 / N));
+
+        m_valid = true;
+        m_lastWasPredicted = false;
+        ++m_numFullSolves;
+        return m_Ch;
+    }
+
+    // First-order prediction of the homogenized tensor after perturbing the
+    // reference vertex positions by delta_p (only perturbed vertices are
+    // visited).
+    ETensor predict(const VField &delta_p) const {
+        if (!m_valid) throw std::runtime_error("No reference solution; call recompute() first");
+        if (delta_p.domainSize() != m_dCh.domainSize()) throw std::runtime_error("Perturbation size mismatch");
+        ETensor result(m_Ch);
+        for (size_t vi = 0; vi < delta_p.domainSize(); ++vi) {
+            for (size_t c = 0; c < N; ++c) {
+                if (delta_p(vi)[c] == 0.0) continue;
+                ETensor contrib = m_dCh(vi)[c];
+                contrib *= delta_p(vi)[c];
+                result += contrib;
+            }
+        }
+        return result;
+    }
+
+    // Force a full solve in the next evaluate() call (e.g., after changing
+    // the material or the simulator's boundary conditions).
+    void invalidate() { m_valid = false; m_havePrediction = false; m_cellProblemsSetUp = false; }
+
+    bool          lastEvaluationPredicted()  const { return m_lastWasPredicted; }
+    size_t        numFullSolves()            const { return m_numFullSolves; }
+    size_t        numPredictions()           const { return m_numPredictions; }
+    const ETensor &referenceTensor()         const { return m_Ch; }
+    const OF      &referenceDifferential()   const { return m_dCh; }
+    const std::vector<VField> &fluctuationDisplacements() const { return m_w; }
+    const IncrementalHomogenizationOptions &options() const { return m_opts; }
+    void setOptions(const IncrementalHomogenizationOptions &opts) { m_opts = opts; }
+
+private:
+    // Relative size of the first-order change predicted - Ch.
+    Real m_firstOrderChange(const ETensor &predicted) const {
+        return std::sqrt((predicted - m_Ch).frobeniusNormSq() / m_Ch.frobeniusNormSq());
+    }
+
+    _Sim &m_sim;
+    IncrementalHomogenizationOptions m_opts;
+
+    bool m_valid = false;
+    bool m_cellProblemsSetUp = false; // simulator's periodic conditions are current
+    std::vector<VField> m_w;
+    ETensor m_Ch;
+    OF m_dCh;
+    VField m_referencePositions;
+    BBox<VectorND<N>> m_referenceBBox;
+    Real m_minElementSize = 0;
+
+    Real m_errorConstant = 1.0;
+    bool m_havePrediction = false, m_lastWasPredicted = false;
+    ETensor m_lastPrediction;
+    Real m_lastFirstOrderChange = 0;
+
+    size_t m_numFullSolves = 0, m_numPredictions = 0;
+};
+
+} // namespace PeriodicHomogenization
+
+#endif /* end of include guard: INCREMENTALHOMOGENIZATION_HH */
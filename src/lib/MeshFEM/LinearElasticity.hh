@@ -8,6 +8,8 @@
 #include <MeshFEM/GlobalBenchmark.hh>
 #include <MeshFEM/Fields.hh>
 #include <MeshFEM/SparseMatrices.hh>
+#include <MeshFEM/MatrixFreePCG.hh>
+#include <MeshFEM/ParallelAssembly.hh>
 #include <MeshFEM/Parallelism.hh>
 #include <MeshFEM/Materials.hh>
 #include <MeshFEM/OneForm.hh>
@@ -477,7 +479,10 @@ public:
 
     // Solve for equilibrium under DoF load f
     VField solve(const VField &f) const {
-        if (!m_system.isSet()) m_buildConstrainedSystem();
+        if (m_solverBackend == SolverBackend::MATRIX_FREE_PCG)
+            return dofToNodeField(m_solvePCG(f));
+
+        if (!m_system.isSet() || m_systemValuesStale) m_buildConstrainedSystem();
 
         BENCHMARK_START_TIMER_SECTION("Elasticity Solve");
         std::vector<Real> x;
@@ -486,10 +491,58 @@ public:
         return dofToNodeField(x);
     }
 
+    // Solve for equilibrium under several DoF loads at once. The loads are
+    // stacked into a single (N * numDoFs) x k right-hand side block so that
+    // all solutions are obtained with one block backsubstitution.
+    std::vector<VField> solve(const std::vector<VField> &f) const {
+        if (m_solverBackend == SolverBackend::MATRIX_FREE_PCG) {
+            // The loads are solved concurrently (each matvec is parallelized
+            // too). The shared PCG setup is built up front.
+            if (!m_pcg.isSet()) m_buildPCGSystem();
+            m_ensureElementColoring();
+            BENCHMARK_SCOPED_TIMER_SECTION timer("Elasticity Solve Batch");
+            std::vector<VField> u(f.size());
+            auto solveLoad = [&](size_t k) {
+                BENCHMARK_SCOPED_SUPPRESS suppressBenchmark; // concurrent solves' sections would interleave
+                u[k] = dofToNodeField(m_solvePCG(f[k]));
+            };
+#if MESHFEM_WITH_TBB
+            tbb::parallel_for(size_t(0), f.size(), solveLoad);
+#else
+            for (size_t k = 0; k < f.size(); ++k) solveLoad(k);
+#endif
+            return u;
+        }
+
+        if (!m_system.isSet() || m_systemValuesStale) m_buildConstrainedSystem();
+
+        const size_t nvars = N * numDoFs();
+        using MXd = typename SPSDSystem<Real>::MXd;
+        MXd F(nvars, f.size()), U;
+        for (size_t k = 0; k < f.size(); ++k) {
+            if (f[k].size() != nvars) throw std::runtime_error("Bad load size");
+            F.col(k) = Eigen::Map<const Eigen::Matrix<Real, Eigen::Dynamic, 1>>(f[k].data().data(), nvars);
+        }
+
+        BENCHMARK_START_TIMER_SECTION("Elasticity Solve");
+        m_system.solveBlock(F, U);
+        BENCHMARK_STOP_TIMER_SECTION("Elasticity Solve");
+
+        std::vector<VField> u;
+        u.reserve(f.size());
+        for (size_t k = 0; k < f.size(); ++k)
+            u.push_back(dofToNodeField(U.col(k)));
+        return u;
+    }
+
     VField solveAdjoint(const VField &f, const VField &/*u*/) const {
         return solve(f);
     }
 
+    std::vector<VField> solveAdjoint(const std::vector<VField> &f) const {
+        return solve(f);
+    }
+
     // Get strain on element i (interpolant)
     void elementStrain(size_t i, const VField &u, Strain &e) const {
         assert(i < m_mesh.numElements());
@@ -511,40 +564,36 @@ public:
     // Strain field as a per-element interpolant
     std::vector<Strain> strainField(const VField &u) const {
         std::vector<Strain> sfield(m_mesh.numElements());
-        for (size_t i = 0; i < m_mesh.numElements(); ++i)
-            elementStrain(i, u, sfield[i]);
+        m_forEachElement([&](size_t i) { elementStrain(i, u, sfield[i]); });
         return sfield;
     }
 
     // Stress field as a per-element interpolant
     std::vector<Stress> stressField(const VField &u) const {
         std::vector<Stress> sfield(m_mesh.numElements());
-        for (size_t i = 0; i < m_mesh.numElements(); ++i)
-            elementStress(i, u, sfield[i]);
+        m_forEachElement([&](size_t i) { elementStress(i, u, sfield[i]); });
         return sfield;
     }
 
     // Strain averaged over each element.
     SMField averageStrainField(const VField &u) const {
         SMField strainField(m_mesh.numElements());
-        Strain s;
-        for (size_t i = 0; i < m_mesh.numElements(); ++i) {
+        m_forEachElement([&](size_t i) {
+            Strain s;
             elementStrain(i, u, s);
             strainField(i) = s.average();
-        }
-
+        });
         return strainField;
     }
 
     // Stress averaged over each element.
     SMField averageStressField(const VField &u) const {
         SMField stressField(m_mesh.numElements());
-        Stress s;
-        for (size_t i = 0; i < m_mesh.numElements(); ++i) {
+        m_forEachElement([&](size_t i) {
+            Stress s;
             elementStress(i, u, s);
             stressField(i) = s.average();
-        }
-
+        });
         return stressField;
     }
 
@@ -552,12 +601,13 @@ public:
     VField constantStrainLoad(const _SymMat &strain) const {
         VField load(numDoFs());
         load.clear();
-        typename _Mesh::ElementData::ElementLoad eLoad;
-        for (auto e : m_mesh.elements()) {
-            e->perElementConstantStrainLoad(strain, eLoad);
-            for (auto n : e.nodes())
-                load(DoF(n.index())) += eLoad.col(n.localIndex());
-        }
+        assemble_parallel([&](size_t ei, typename VField::ArrayType &l) {
+                typename _Mesh::ElementData::ElementLoad eLoad;
+                auto e = m_mesh.element(ei);
+                e->perElementConstantStrainLoad(strain, eLoad);
+                for (auto n : e.nodes())
+                    l.col(DoF(n.index())) += eLoad.col(n.localIndex());
+            }, load.data(), m_mesh.numElements());
         return load;
     }
 
@@ -566,12 +616,13 @@ public:
         BENCHMARK_START_TIMER("perElementStressFieldLoad");
         VField load(numDoFs());
         load.clear();
-        typename _Mesh::ElementData::ElementLoad eLoad;
-        for (auto e : m_mesh.elements()) {
-            e->perElementConstantStressLoad(stress(e.index()), eLoad);
-            for (size_t n = 0; n < e.numNodes(); ++n)
-                load(DoF(e.node(n).index())) += eLoad.col(n);
-        }
+        assemble_parallel([&](size_t ei, typename VField::ArrayType &l) {
+                typename _Mesh::ElementData::ElementLoad eLoad;
+                auto e = m_mesh.element(ei);
+                e->perElementConstantStressLoad(stress(ei), eLoad);
+                for (size_t n = 0; n < e.numNodes(); ++n)
+                    l.col(DoF(e.node(n).index())) += eLoad.col(n);
+            }, load.data(), m_mesh.numElements());
         BENCHMARK_STOP_TIMER("perElementStressFieldLoad");
         return load;
     }
@@ -665,7 +716,7 @@ public:
     VField dofToNodeField(const _Vec &x) const {
         // This also trims off lagrange multipliers, but they should be gone
         // by this point anyway.
-        assert(x.size() >= N * numDoFs());
+        assert(size_t(x.size()) >= N * numDoFs());
 
         VField f(m_mesh.numNodes());
         for (size_t i = 0; i < m_mesh.numNodes(); ++i) {
@@ -845,7 +896,8 @@ public:
     void applyPeriodicConditions(Real epsilon = 1e-7,
                                  bool ignoreMismatch = false,
                                  std::unique_ptr<PeriodicCondition<N>> pc = nullptr) {
-        m_system.clear();
+        m_clearSystem();
+        m_clearStiffnessPattern();
         if (!pc) pc = Future::make_unique<PeriodicCondition<N>>(m_mesh, epsilon, ignoreMismatch);
         m_dofForNode = pc->periodicDoFsForNodes();
         m_numDoFs = pc->numPeriodicDoFs();
@@ -872,7 +924,8 @@ public:
     }
 
     void removePeriodicConditions() {
-        m_system.clear();
+        m_clearSystem();
+        m_clearStiffnessPattern();
         m_dofForNode.clear();
         for (size_t i = 0; i < m_mesh.numBoundaryElements(); ++i)
             m_mesh.boundaryElement(i)->isInternal = false;
@@ -887,7 +940,7 @@ public:
         env.setVectorValue("mesh_max_", mbb.maxCorner);
 
         size_t dirichletRegionIdx = 0;
-        if (conds.size() > 0) m_system.clear();
+        if (conds.size() > 0) m_clearSystem();
         for (const auto &cond : conds) {
             env.setVectorValue("region_size_", cond->region->dimensions());
             env.setVectorValue("region_min_",  cond->region->minCorner);
@@ -1036,7 +1089,7 @@ public:
             }
         }
         if (removeCount > 0)
-            m_system.clear();
+            m_clearSystem();
     }
 
     void removeNeumanConditions() {
@@ -1053,7 +1106,7 @@ public:
         if (!m_useRigidMotionConstraint ||
              m_rigidMotionConstraintRHS.size() != 0) {
             m_rigidMotionConstraintRHS.clear();
-            m_system.clear();
+            m_clearSystem();
             m_useRigidMotionConstraint = true;
         }
     }
@@ -1072,13 +1125,13 @@ public:
         // Currently we must rebuild the system--in the future, we should
         // support rebuilding the constraint RHS without
         // rebuilding/factoring the system matrix.
-        m_system.clear();
+        m_clearSystem();
         getRigidInnerProduct(u, m_rigidMotionConstraintRHS);
     }
 
     void removeNoRigidMotionConstraint() {
         if (m_useRigidMotionConstraint) {
-            m_system.clear();
+            m_clearSystem();
             m_useRigidMotionConstraint = false;
         }
     }
@@ -1205,7 +1258,17 @@ public:
             bool allowIllPosed = false) const {
         BENCHMARK_START_TIMER("Assemble System");
         m_assembleStiffnessMatrix(Ktrip);
+        assembleConstraints(constraintRows, constraintRHS, fixedVars, fixedVarValues, allowIllPosed);
+        BENCHMARK_STOP_TIMER("Assemble System");
+    }
 
+    // The constraint part of assembleConstrainedSystem (everything but the
+    // stiffness matrix).
+    void assembleConstraints(TMatrix &constraintRows,
+            std::vector<Real> &constraintRHS,
+            std::vector<size_t> &fixedVars,
+            std::vector<Real>   &fixedVarValues,
+            bool allowIllPosed = false) const {
         constraintRows.clear();
         constraintRHS.clear();
         fixedVars.clear();
@@ -1244,8 +1307,6 @@ public:
 
         // TODO: test by fixing variables in batches.
         m_getDirichletVarsAndValues(fixedVars, fixedVarValues);
-
-        BENCHMARK_STOP_TIMER("Assemble System");
     }
 
     void reportRegionSurfaceForces(const VField &u) const {
@@ -1270,7 +1331,7 @@ public:
     }
 
     void dumpSystem(const std::string &path) const {
-        if (!m_system.isSet()) m_buildConstrainedSystem();
+        if (!m_system.isSet() || m_systemValuesStale) m_buildConstrainedSystem();
         // side effect: sums and sorts nonzeros in system--ok since m_system is
         // mutable.
         m_system.sumAndDumpUpper(path);
@@ -1280,7 +1341,7 @@ public:
     template<typename Vertices>
     void updateMeshNodePositions(const Vertices &vertices) {
         m_mesh.setNodePositions(vertices);
-        m_system.clear();
+        m_stiffnessValuesChanged();
     }
 
     ////////////////////////////////////////////////////////////////////////////
@@ -1379,6 +1440,27 @@ private:
         std::vector<Real> constraintRHS;
         std::vector<size_t> fixedVars;
         std::vector<Real>   fixedVarValues;
+#ifndef USE_LAGRANGE_MULTIPLIERS
+        if (m_cacheStiffnessPattern) {
+            BENCHMARK_START_TIMER("Assemble System");
+            assembleConstraints(C, constraintRHS, fixedVars, fixedVarValues);
+            if (C.m == 0) {
+                // Hand the matrix assembled into the cached pattern straight
+                // to the factorizer. When only the stiffness values changed
+                // since the last build, the symbolic factorization is reused.
+                SuiteSparseMatrix K;
+                assembleStiffnessMatrix(K);
+                BENCHMARK_STOP_TIMER("Assemble System");
+                BENCHMARK_START_TIMER_SECTION("Set System");
+                m_system.setWithFixedVariables(K, fixedVars, fixedVarValues, m_systemValuesStale);
+                BENCHMARK_STOP_TIMER_SECTION("Set System");
+                m_systemValuesStale = false;
+                return;
+            }
+            BENCHMARK_STOP_TIMER("Assemble System");
+        }
+#endif // USE_LAGRANGE_MULTIPLIERS
+        m_systemValuesStale = false;
         assembleConstrainedSystem(Ktrip, C, constraintRHS, fixedVars, fixedVarValues);
 #ifdef USE_LAGRANGE_MULTIPLIERS
             C.m += fixedVars.size();
@@ -1404,65 +1486,358 @@ private:
     }
 
 public:
-    // Build *upper triangle* of stiffness matrix
-    void m_assembleStiffnessMatrix(TMatrix &Ktrip) const {
+    ////////////////////////////////////////////////////////////////////////////
+    // Linear solver backend.
+    // DIRECT assembles the constrained system and factorizes it with
+    // CHOLMOD/UMFPACK (see SPSDSystem). MATRIX_FREE_PCG never assembles the
+    // stiffness matrix: it runs preconditioned conjugate gradients, applying K
+    // element by element. Its memory use is linear in the mesh size, making
+    // meshes solvable whose Cholesky factors don't fit in memory, at the cost
+    // of an iterative solve per load.
+    ////////////////////////////////////////////////////////////////////////////
+    enum class SolverBackend { DIRECT, MATRIX_FREE_PCG };
+
+    void setSolverBackend(SolverBackend backend) {
+        if (backend != m_solverBackend) m_clearSystem();
+        m_solverBackend = backend;
+    }
+    SolverBackend solverBackend() const { return m_solverBackend; }
+
+    void setPCGOptions(const PCGOptions &opts) {
+        m_clearSystem();
+        m_pcgOptions = opts;
+    }
+    const PCGOptions &pcgOptions() const { return m_pcgOptions; }
+
+    // Apply the stiffness matrix to a per-DoF variable vector (y = K x),
+    // accounting for periodic DoFs. Parallelized over the elements of each
+    // color, which accumulate directly into y (no per-thread copies of y).
+    void applyStiffnessMatrixDoFs(const Eigen::VectorXd &x, Eigen::VectorXd &y) const {
         typedef typename _Mesh::ElementData::PerElementStiffness PerElementStiffness;
         constexpr size_t KeSize = PerElementStiffness::RowsAtCompileTime;
+        constexpr size_t nNodes = Mesh::ElementData::nNodes;
+        if (size_t(x.size()) != N * numDoFs()) throw std::runtime_error("Bad vector size");
+        const bool cached = m_pcgElementStiffness.size() == m_mesh.numElements();
+
+        m_ensureElementColoring();
+        y.setZero(x.size());
+        m_forEachElementByColor([&](size_t ei) {
+                PerElementStiffness KeStorage;
+                const PerElementStiffness *Ke = &KeStorage;
+                if (cached) Ke = &m_pcgElementStiffness[ei];
+                else        m_mesh.element(ei)->perElementStiffness(KeStorage);
+
+                auto elem = m_mesh.element(ei);
+                Eigen::Matrix<Real, KeSize, 1> xe, ye;
+                for (size_t i = 0; i < nNodes; ++i)
+                    xe.template segment<N>(N * i) = x.template segment<N>(N * DoF(elem.node(i).index()));
+                // Only the upper triangle of Ke is valid.
+                ye = Ke->template selfadjointView<Eigen::Upper>() * xe;
+                for (size_t i = 0; i < nNodes; ++i)
+                    y.template segment<N>(N * DoF(elem.node(i).index())) += ye.template segment<N>(N * i);
+            });
+    }
+
+private:
+    // Run f(ei) for every element; f must only write per-element output.
+    template<class F>
+    void m_forEachElement(const F &f) const {
         const size_t nelem = m_mesh.numElements();
-        const size_t n = N * numDoFs();
+#if MESHFEM_WITH_TBB
+        tbb::parallel_for(tbb::blocked_range<size_t>(0, nelem),
+            [&](const tbb::blocked_range<size_t> &r) {
+                for (size_t ei = r.begin(); ei < r.end(); ++ei) f(ei);
+            });
+#else
+        for (size_t ei = 0; ei < nelem; ++ei) f(ei);
+#endif
+    }
 
-        auto accumToSparseMatrix = [&](size_t ei, const PerElementStiffness &Ke, TMatrix &_K) {
-            auto elem = m_mesh.element(ei);
-            constexpr size_t nNodes = Mesh::ElementData::nNodes;
-            for (size_t i = 0; i < nNodes; ++i) {
-                int di = DoF(elem.node(i).index());
-                for (size_t j = 0; j < nNodes; ++j) {
-                    int dj = DoF(elem.node(j).index());
-                    if (di > dj) continue;
-                    // xx, xy, xz, yx, yy, yz, zx, zy, zz
-                    for (size_t ci = 0; ci < N; ++ci) {
-                        for (size_t cj = 0; cj < N; ++cj) {
-                            if (N * di + ci > N * dj + cj) continue;
-                            int row = N * i + ci, col = N * j + cj;
-                            // Only read upper triangle of symmetric Ke.
-                            Real val = (row <= col) ? Ke(row, col) : Ke(col, row);
-                            _K.addNZ(N * di + ci, N * dj + cj, val);
+    Eigen::VectorXd m_solvePCG(const VField &f) const {
+        const size_t nvars = N * numDoFs();
+        if (f.size() != nvars) throw std::runtime_error("Bad load size");
+        if (!m_pcg.isSet()) m_buildPCGSystem();
+
+        BENCHMARK_SCOPED_TIMER_SECTION timer("Elasticity Solve");
+        Eigen::VectorXd x;
+        m_pcg.solve([&](const Eigen::VectorXd &u, Eigen::VectorXd &Ku) { applyStiffnessMatrixDoFs(u, Ku); },
+                    Eigen::Map<const Eigen::VectorXd>(f.data().data(), nvars), x, m_pcgOptions);
+        return x;
+    }
+
+    // Set up the PCG solver's constraints, preconditioner, and (optionally)
+    // the element stiffness matrix cache.
+    void m_buildPCGSystem() const {
+        typedef typename _Mesh::ElementData::PerElementStiffness PerElementStiffness;
+        constexpr size_t nNodes = Mesh::ElementData::nNodes;
+        BENCHMARK_SCOPED_TIMER_SECTION timer("Build PCG System");
+        const size_t nelem = m_mesh.numElements();
+
+        TMatrix C;
+        std::vector<Real> constraintRHS;
+        std::vector<size_t> fixedVars;
+        std::vector<Real>   fixedVarValues;
+        assembleConstraints(C, constraintRHS, fixedVars, fixedVarValues);
+        m_pcg.setConstraints(N * numDoFs(), fixedVars, fixedVarValues, std::move(C), constraintRHS);
+
+        m_pcgElementStiffness.clear();
+        if (m_pcgOptions.cacheElementStiffness) {
+            m_pcgElementStiffness.resize(nelem);
+#if MESHFEM_WITH_TBB
+            tbb::parallel_for(tbb::blocked_range<size_t>(0, nelem),
+                [&](const tbb::blocked_range<size_t> &r) {
+                    for (size_t ei = r.begin(); ei < r.end(); ++ei)
+                        m_mesh.element(ei)->perElementStiffness(m_pcgElementStiffness[ei]);
+                }
+            );
+#else
+            for (size_t ei = 0; ei < nelem; ++ei)
+                m_mesh.element(ei)->perElementStiffness(m_pcgElementStiffness[ei]);
+#endif
+        }
+
+        if (m_pcgOptions.preconditioner == PCGPreconditioner::NONE) return;
+
+        // Diagonal N x N blocks of K, stored side by side.
+        const bool cached = m_pcgElementStiffness.size() == nelem;
+        Eigen::Matrix<Real, N, Eigen::Dynamic> diagBlocks;
+        diagBlocks.setZero(N, N * numDoFs());
+        assemble_parallel([&](size_t ei, Eigen::Matrix<Real, N, Eigen::Dynamic> &_D) {
+                PerElementStiffness KeStorage;
+                const PerElementStiffness *Ke = &KeStorage;
+                if (cached) Ke = &m_pcgElementStiffness[ei];
+                else        m_mesh.element(ei)->perElementStiffness(KeStorage);
+
+                auto elem = m_mesh.element(ei);
+                for (size_t i = 0; i < nNodes; ++i) {
+                    size_t di = DoF(elem.node(i).index());
+                    for (size_t j = 0; j < nNodes; ++j) {
+                        if (DoF(elem.node(j).index()) != di) continue;
+                        for (size_t ci = 0; ci < N; ++ci) {
+                            for (size_t cj = 0; cj < N; ++cj) {
+                                size_t row = N * i + ci, col = N * j + cj;
+                                _D(ci, N * di + cj) += (row <= col) ? (*Ke)(row, col) : (*Ke)(col, row);
+                            }
                         }
                     }
                 }
+            }, diagBlocks, nelem);
+
+        aligned_std_vector<Eigen::Matrix<Real, N, N>> blocks(numDoFs());
+        for (size_t d = 0; d < numDoFs(); ++d)
+            blocks[d] = diagBlocks.template middleCols<N>(N * d);
+        m_pcg.setPreconditioner(m_pcgOptions.preconditioner, blocks);
+    }
+
+public:
+    ////////////////////////////////////////////////////////////////////////////
+    // Cached stiffness matrix sparsity pattern.
+    // When enabled, the compressed column sparsity pattern of the stiffness
+    // matrix's upper triangle is computed once, along with a map scattering
+    // each element stiffness matrix entry into the compressed nonzero array.
+    // Subsequent assemblies (e.g., after material field or node position
+    // updates) write the element matrices directly into this pattern in
+    // parallel, skipping triplet generation and compression. The direct
+    // solver takes the compressed matrix as is and, when only the stiffness
+    // values changed, keeps its symbolic factorization.
+    // The pattern is discarded whenever the DoFs change (e.g., when periodic
+    // conditions are applied or removed).
+    ////////////////////////////////////////////////////////////////////////////
+    void setCacheStiffnessPattern(bool cache) {
+        m_cacheStiffnessPattern = cache;
+        if (!cache) m_clearStiffnessPattern();
+    }
+    bool cacheStiffnessPattern() const { return m_cacheStiffnessPattern; }
+
+    // Assemble *upper triangle* of stiffness matrix into the cached
+    // sparsity pattern (building the pattern first if necessary).
+    void assembleStiffnessMatrix(SuiteSparseMatrix &K) const {
+        typedef typename _Mesh::ElementData::PerElementStiffness PerElementStiffness;
+        constexpr size_t KeSize = PerElementStiffness::RowsAtCompileTime;
+        if (m_elemStiffnessScatter.size() != KeSize * KeSize * m_mesh.numElements()) m_buildStiffnessPattern();
+
+        BENCHMARK_SCOPED_TIMER_SECTION timer("Assemble Into Pattern");
+        K.zeros_like(m_stiffnessPattern);
+        K.symmetry_mode = SuiteSparseMatrix::SymmetryMode::UPPER_TRIANGLE;
+        auto accumulate = [&](size_t ei) {
+            PerElementStiffness Ke;
+            m_mesh.element(ei)->perElementStiffness(Ke);
+            const SuiteSparse_long *scatter = &m_elemStiffnessScatter[ei * KeSize * KeSize];
+            for (size_t row = 0; row < KeSize; ++row) {
+                for (size_t col = 0; col < KeSize; ++col) {
+                    const SuiteSparse_long idx = scatter[row * KeSize + col];
+                    if (idx == SuiteSparseMatrix::INDEX_NONE) continue;
+                    // Only read upper triangle of symmetric Ke.
+                    K.Ax[idx] += (row <= col) ? Ke(row, col) : Ke(col, row);
+                }
             }
         };
+        m_forEachElementByColor(accumulate);
+    }
+
+    // Build *upper triangle* of stiffness matrix
+    void m_assembleStiffnessMatrix(TMatrix &Ktrip) const {
+        typedef typename _Mesh::ElementData::PerElementStiffness PerElementStiffness;
+        constexpr size_t KeSize = PerElementStiffness::RowsAtCompileTime;
+        const size_t nelem = m_mesh.numElements();
+        const size_t n = N * numDoFs();
 
-        // Note: it's difficult to predict the nonzero count of the stiffness
-        // matrix's upper triangle due to periodic DoFs. For now, allocate space
-        // for the full matrix's triplets. If memory is an issue, we can
-        // precompute the size by using a loop similar to the accumulation loop
-        // below.
-        const size_t preallocSize = KeSize * KeSize * nelem;
+        if (m_cacheStiffnessPattern) {
+            // The pattern's triplets come out sorted and unique, so the
+            // subsequent sumRepeated() calls are cheap.
+            SuiteSparseMatrix K;
+            assembleStiffnessMatrix(K);
+            Ktrip = K.getTripletMatrix();
+            Ktrip.symmetry_mode = TMatrix::SymmetryMode::NONE;
+            return;
+        }
+
+        // Elements are processed in chunks whose (uncompressed) triplets fit
+        // in the assembly memory budget. A chunk's element matrices are
+        // computed in parallel, each writing its triplets to its own slot, so
+        // the triplets come out in element order regardless of scheduling.
+        // The chunk is then compressed and merged in place into the
+        // (compressed) result, which is preallocated to an upper bound on the
+        // final nonzero count. Peak memory is thus the final matrix plus one
+        // chunk, and every repeated entry is summed in a fixed order.
+        const size_t entriesPerElem = KeSize * KeSize;
+        const size_t chunkSize = std::min(nelem, std::max<size_t>(1, m_assemblyMemoryBudget / (entriesPerElem * sizeof(typename TMatrix::Triplet))));
         Ktrip.init(n, n);
-        Ktrip.reserve(preallocSize);
+        Ktrip.reserve(m_stiffnessUpperNNZBound() + chunkSize * entriesPerElem);
+
+        TMatrix chunk(n, n);
+        std::vector<size_t> elemNNZ(chunkSize);
+        for (size_t chunkBegin = 0; chunkBegin < nelem; chunkBegin += chunkSize) {
+            const size_t chunkEnd = std::min(nelem, chunkBegin + chunkSize);
+            chunk.nz.resize((chunkEnd - chunkBegin) * entriesPerElem);
+            auto elementTriplets = [&](size_t ei) {
+                PerElementStiffness Ke;
+                m_mesh.element(ei)->perElementStiffness(Ke);
+                const size_t slot = ei - chunkBegin;
+                typename TMatrix::Triplet *out = &chunk.nz[slot * entriesPerElem];
+                size_t count = 0;
+                m_visitElementStiffnessEntries(ei, [&](size_t row, size_t col, size_t globalRow, size_t globalCol) {
+                    // Only read upper triangle of symmetric Ke.
+                    Real val = (row <= col) ? Ke(row, col) : Ke(col, row);
+                    if (val != 0.0) out[count++] = typename TMatrix::Triplet(globalRow, globalCol, val);
+                });
+                elemNNZ[slot] = count;
+            };
 #if MESHFEM_WITH_TBB
-        // Build all per-element matrices in parallel, then collect nonzeros
-        std::vector<PerElementStiffness> elemMatrices(nelem);
-        tbb::parallel_for(tbb::blocked_range<size_t>(0, nelem),
-            [&](const tbb::blocked_range<size_t> &r) {
-                for (size_t ei = r.begin(); ei < r.end(); ++ei)
-                    m_mesh.element(ei)->perElementStiffness(elemMatrices[ei]);
+            tbb::parallel_for(tbb::blocked_range<size_t>(chunkBegin, chunkEnd),
+                [&](const tbb::blocked_range<size_t> &r) {
+                    for (size_t ei = r.begin(); ei < r.end(); ++ei) elementTriplets(ei);
+                }
+            );
+#else
+            for (size_t ei = chunkBegin; ei < chunkEnd; ++ei) elementTriplets(ei);
+#endif
+            // Close the gaps between the element slots.
+            size_t back = 0;
+            for (size_t slot = 0; slot < chunkEnd - chunkBegin; ++slot) {
+                const size_t begin = slot * entriesPerElem;
+                std::move(chunk.nz.begin() + begin, chunk.nz.begin() + begin + elemNNZ[slot], chunk.nz.begin() + back);
+                back += elemNNZ[slot];
             }
-        );
+            chunk.nz.resize(back);
+            chunk.needs_sum_repeated = true;
+            chunk.sumRepeated();
+            m_mergeCompressedTriplets(Ktrip, chunk);
+        }
+        // Drop entries that cancelled out, like sumRepeated does.
+        Ktrip.nz.erase(std::remove_if(Ktrip.nz.begin(), Ktrip.nz.end(),
+                    [](const typename TMatrix::Triplet &t) { return t.v == 0.0; }),
+                Ktrip.nz.end());
+    }
 
-        for (size_t i = 0; i < nelem; ++i)
-            accumToSparseMatrix(i, elemMatrices[i], Ktrip);
-#else
-        for (size_t i = 0; i < nelem; ++i) {
-            PerElementStiffness Ke;
-            m_mesh.element(i)->perElementStiffness(Ke);
-            accumToSparseMatrix(i, Ke, Ktrip);
+    // Merge the sorted, unique triplets of B into those of A in place (A must
+    // have spare capacity for B's triplets to avoid a reallocation). The
+    // merge runs back to front, summing entries present in both.
+    static void m_mergeCompressedTriplets(TMatrix &A, const TMatrix &B) {
+        using Triplet = typename TMatrix::Triplet;
+        const size_t na = A.nz.size(), nb = B.nz.size();
+        if (nb == 0) return;
+        A.nz.resize(na + nb);
+        size_t a = na, b = nb, out = na + nb; // one past the next entry to read/write
+        while (b > 0) {
+            const Triplet &tb = B.nz[b - 1];
+            if ((a > 0) && (tb < A.nz[a - 1]))   { A.nz[--out] = A.nz[--a]; }
+            else if ((a > 0) && !(A.nz[a - 1] < tb)) {
+                Triplet t = A.nz[--a];
+                t.v += tb.v;
+                A.nz[--out] = t;
+                --b;
+            }
+            else { A.nz[--out] = tb; --b; }
         }
-        // Make sure our upper bound was correct--reallocation is undesirable.
-        assert(Ktrip.nnz() <= preallocSize);
-#endif
+        // Entries summed in the merge leave a gap between the untouched
+        // prefix A.nz[0, a) and the merged suffix A.nz[out, na + nb).
+        if (out > a) {
+            std::move(A.nz.begin() + out, A.nz.end(), A.nz.begin() + a);
+            A.nz.resize(a + (na + nb - out));
+        }
+    }
+
+    // Upper bound on the number of nonzeros in the stiffness matrix's upper
+    // triangle: the scalar entries coupling every pair of DoFs that share an
+    // element.
+    size_t m_stiffnessUpperNNZBound() const {
+        std::vector<size_t> dofElemStart, dofElems;
+        m_dofElementAdjacency(dofElemStart, dofElems);
+        size_t numPairs = 0; // DoF pairs di < dj sharing an element
+        std::vector<size_t> lastSeen(numDoFs(), 0); // lastSeen[dj] == di + 1 if the pair was counted
+        for (size_t di = 0; di < numDoFs(); ++di) {
+            for (size_t k = dofElemStart[di]; k < dofElemStart[di + 1]; ++k) {
+                for (auto n : m_mesh.element(dofElems[k]).nodes()) {
+                    const size_t dj = DoF(n.index());
+                    if ((dj > di) && (lastSeen[dj] != di + 1)) { lastSeen[dj] = di + 1; ++numPairs; }
+                }
+            }
+        }
+        return numPairs * N * N + numDoFs() * (N * (N + 1)) / 2;
+    }
 
+    // Compressed DoF -> incident element adjacency: the elements containing
+    // DoF d are dofElems[dofElemStart[d]...dofElemStart[d + 1]) (an element is
+    // listed once per node it has on the DoF).
+    void m_dofElementAdjacency(std::vector<size_t> &dofElemStart, std::vector<size_t> &dofElems) const {
+        dofElemStart.assign(numDoFs() + 1, 0);
+        for (auto e : m_mesh.elements())
+            for (auto n : e.nodes()) ++dofElemStart[DoF(n.index()) + 1];
+        for (size_t d = 0; d < numDoFs(); ++d) dofElemStart[d + 1] += dofElemStart[d];
+        dofElems.resize(dofElemStart.back());
+        std::vector<size_t> fill(dofElemStart.begin(), dofElemStart.end() - 1);
+        for (auto e : m_mesh.elements())
+            for (auto n : e.nodes()) dofElems[fill[DoF(n.index())]++] = e.index();
+    }
+
+    // Limit (in bytes) on the uncompressed triplet storage for one chunk of
+    // elements in m_assembleStiffnessMatrix.
+    void setAssemblyMemoryBudget(size_t bytes) { m_assemblyMemoryBudget = bytes; }
+    size_t assemblyMemoryBudget() const { return m_assemblyMemoryBudget; }
+
+    // Call visit(row, col, globalRow, globalCol) for each entry of element
+    // ei's stiffness matrix that contributes to the global stiffness matrix's
+    // upper triangle. (row, col) index the local element matrix and
+    // (globalRow, globalCol) the global variables it is accumulated to.
+    template<class F>
+    void m_visitElementStiffnessEntries(size_t ei, const F &visit) const {
+        auto elem = m_mesh.element(ei);
+        constexpr size_t nNodes = Mesh::ElementData::nNodes;
+        for (size_t i = 0; i < nNodes; ++i) {
+            int di = DoF(elem.node(i).index());
+            for (size_t j = 0; j < nNodes; ++j) {
+                int dj = DoF(elem.node(j).index());
+                if (di > dj) continue;
+                // xx, xy, xz, yx, yy, yz, zx, zy, zz
+                for (size_t ci = 0; ci < N; ++ci) {
+                    for (size_t cj = 0; cj < N; ++cj) {
+                        if (N * di + ci > N * dj + cj) continue;
+                        visit(N * i + ci, N * j + cj, N * di + ci, N * dj + cj);
+                    }
+                }
+            }
+        }
     }
 
     // Append to dirichletVars and dirichletValues
@@ -1517,6 +1892,113 @@ public:
         }
     }
 private:
+    // Compute the stiffness matrix sparsity pattern and the per-element
+    // scatter map into its nonzero array.
+    void m_buildStiffnessPattern() const {
+        typedef typename _Mesh::ElementData::PerElementStiffness PerElementStiffness;
+        constexpr size_t KeSize = PerElementStiffness::RowsAtCompileTime;
+        BENCHMARK_SCOPED_TIMER_SECTION timer("Build Stiffness Pattern");
+        const size_t nelem = m_mesh.numElements();
+        const size_t n = N * numDoFs();
+
+        // Structural nonzeros: entries are inserted regardless of their value
+        // (addNZ would drop entries that happen to be zero for the current
+        // geometry/material).
+        TMatrix pattern(n, n);
+        pattern.reserve(KeSize * KeSize * nelem);
+        for (size_t ei = 0; ei < nelem; ++ei) {
+            m_visitElementStiffnessEntries(ei, [&](size_t /* row */, size_t /* col */, size_t globalRow, size_t globalCol) {
+                pattern.nz.emplace_back(globalRow, globalCol, 1.0);
+            });
+        }
+        pattern.symmetry_mode = TMatrix::SymmetryMode::UPPER_TRIANGLE;
+        m_stiffnessPattern.setFromTMatrix(std::move(pattern));
+
+        m_elemStiffnessScatter.assign(KeSize * KeSize * nelem, SuiteSparse_long(SuiteSparseMatrix::INDEX_NONE));
+        auto computeScatter = [&](size_t ei) {
+            SuiteSparse_long *scatter = &m_elemStiffnessScatter[ei * KeSize * KeSize];
+            m_visitElementStiffnessEntries(ei, [&](size_t row, size_t col, size_t globalRow, size_t globalCol) {
+                scatter[row * KeSize + col] = m_stiffnessPattern.findEntry(globalRow, globalCol);
+            });
+        };
+#if MESHFEM_WITH_TBB
+        tbb::parallel_for(tbb::blocked_range<size_t>(0, nelem),
+            [&](const tbb::blocked_range<size_t> &r) {
+                for (size_t ei = r.begin(); ei < r.end(); ++ei) computeScatter(ei);
+            }
+        );
+#else
+        for (size_t ei = 0; ei < nelem; ++ei) computeScatter(ei);
+#endif
+
+        m_buildElementColoring();
+    }
+
+    // Greedily color the elements so that no two elements sharing a DoF get
+    // the same color.
+    void m_buildElementColoring() const {
+        const size_t nelem = m_mesh.numElements();
+        std::vector<size_t> dofElemStart, dofElems;
+        m_dofElementAdjacency(dofElemStart, dofElems);
+
+        std::vector<size_t> color(nelem), colorSize;
+        std::vector<size_t> usedByNeighbor; // usedByNeighbor[c] == ei + 1 if a neighbor of ei has color c
+        for (size_t ei = 0; ei < nelem; ++ei) {
+            for (auto n : m_mesh.element(ei).nodes()) {
+                const size_t d = DoF(n.index());
+                for (size_t k = dofElemStart[d]; k < dofElemStart[d + 1]; ++k) {
+                    const size_t ej = dofElems[k];
+                    if (ej < ei) usedByNeighbor[color[ej]] = ei + 1;
+                }
+            }
+            size_t c = 0;
+            while ((c < usedByNeighbor.size()) && (usedByNeighbor[c] == ei + 1)) ++c;
+            if (c == usedByNeighbor.size()) { usedByNeighbor.push_back(0); colorSize.push_back(0); }
+            color[ei] = c;
+            ++colorSize[c];
+        }
+
+        m_elementColorStart.assign(1, 0);
+        for (size_t cs : colorSize) m_elementColorStart.push_back(m_elementColorStart.back() + cs);
+        m_elementsByColor.resize(nelem);
+        {
+            std::vector<size_t> fill(m_elementColorStart.begin(), m_elementColorStart.end() - 1);
+            for (size_t ei = 0; ei < nelem; ++ei) m_elementsByColor[fill[color[ei]]++] = ei;
+        }
+    }
+
+    void m_ensureElementColoring() const {
+        if (m_elementsByColor.size() != m_mesh.numElements()) m_buildElementColoring();
+    }
+
+    // Run f(ei) for every element, color by color. Elements of the same color
+    // share no DoF, so f may accumulate directly into per-DoF (or stiffness
+    // nonzero) storage. Colors are processed in a fixed order, making such
+    // sums deterministic. The coloring must be built.
+    template<class F>
+    void m_forEachElementByColor(const F &f) const {
+        for (size_t c = 0; c + 1 < m_elementColorStart.size(); ++c) {
+#if MESHFEM_WITH_TBB
+            tbb::parallel_for(tbb::blocked_range<size_t>(m_elementColorStart[c], m_elementColorStart[c + 1]),
+                [&](const tbb::blocked_range<size_t> &r) {
+                    for (size_t i = r.begin(); i < r.end(); ++i) f(m_elementsByColor[i]);
+                }
+            );
+#else
+            for (size_t i = m_elementColorStart[c]; i < m_elementColorStart[c + 1]; ++i)
+                f(m_elementsByColor[i]);
+#endif
+        }
+    }
+
+    void m_clearStiffnessPattern() {
+        m_stiffnessPattern = SuiteSparseMatrix();
+        m_elemStiffnessScatter.clear();
+        m_elemStiffnessScatter.shrink_to_fit();
+        m_elementColorStart.clear();
+        m_elementsByColor.clear();
+        m_elementsByColor.shrink_to_fit();
+    }
 
     static constexpr size_t numRotModes = (N == 3) ? 3 : 1;
     void m_assembleRigidModeMatrix(TMatrix &R) const {
@@ -1649,11 +2131,53 @@ private:
     // load vector; stored in a sparse format to avoid wasting space if unused.
     std::vector<std::pair<size_t, VectorND<N>>> m_nodalDeltaFunctionForces;
 
+    size_t m_assemblyMemoryBudget = size_t(256) << 20;
+
+    // Cached stiffness sparsity pattern and per-element scatter map
+    // (KeSize x KeSize indices per element, row major, INDEX_NONE for entries
+    // not contributing to the upper triangle).
+    bool m_cacheStiffnessPattern = false;
+    mutable SuiteSparseMatrix m_stiffnessPattern;
+    mutable std::vector<SuiteSparse_long> m_elemStiffnessScatter;
+    // Elements grouped by color (m_elementsByColor[m_elementColorStart[c]...]
+    // holds the elements of color c); elements of one color share no DoF.
+    mutable std::vector<size_t> m_elementColorStart, m_elementsByColor;
+
+    // Matrix-free PCG backend state (see setSolverBackend).
+    SolverBackend m_solverBackend = SolverBackend::DIRECT;
+    PCGOptions m_pcgOptions;
+    mutable ConstrainedPCG<N> m_pcg;
+    mutable aligned_std_vector<typename _Mesh::ElementData::PerElementStiffness> m_pcgElementStiffness;
+
 protected:
+    // Discard the cached system (factorization or PCG setup); it is rebuilt
+    // on the next solve.
+    void m_clearSystem() {
+        m_system.clear();
+        m_systemValuesStale = false;
+        m_pcg.clear();
+        m_pcgElementStiffness.clear();
+    }
+
+    // Invalidate the cached system after a change to the stiffness matrix's
+    // values only (e.g., a material or node position update). With a cached
+    // stiffness pattern and the direct solver, the factorizer is kept and the
+    // next solve only redoes the numeric factorization.
+    void m_stiffnessValuesChanged() {
+        if (m_cacheStiffnessPattern && (m_solverBackend == SolverBackend::DIRECT) && m_system.isSet()) {
+            m_systemValuesStale = true;
+            return;
+        }
+        m_clearSystem();
+    }
+
     // m_system implements caching of system matrices for multiple solves.
     // It should be mutable because building and solving the system doesn't
     // affect user-visible state.
     mutable SPSDSystem<Real> m_system;
+    // Whether m_system's stiffness values are out of date (its sparsity
+    // pattern and constraints are still valid).
+    mutable bool m_systemValuesStale = false;
 
     _Mesh m_mesh;
 };
@@ -2,7 +2,9 @@
 #include <MeshFEM/Types.hh>
 
 #include <boost/algorithm/string.hpp>
+#include <fstream>
 #include <iostream>
+#include <limits>
 #include <vector>
 #include <map>
 
@@ -22,7 +24,11 @@ double readDoubleLine(istream &is) {
 }
 
 template<size_t N>
-MSHFieldParser<N>::MSHFieldParser(const string &mshPath, bool permitDimMismatch) {
+MSHFieldParser<N>::MSHFieldParser(const string &mshPath, bool permitDimMismatch, bool lazy) {
+    if (MeshIO::guessFormat(mshPath) == MeshIO::FMT_MFA) {
+        m_loadArchive(mshPath, permitDimMismatch, lazy);
+        return;
+    }
     ifstream infile(mshPath);
     if (!infile.is_open()) throw runtime_error("Couldn't open " + mshPath);
 
@@ -30,6 +36,7 @@ MSHFieldParser<N>::MSHFieldParser(const string &mshPath, bool permitDimMismatch)
     m_type = io.load(infile, m_vertices, m_elements, MeshIO::MESH_GUESS);
     if (!permitDimMismatch && (meshDimension() != N))
         throw runtime_error("Illegal mesh type for " + to_string(N) + "D MSHFieldParser");
+    if (lazy) m_lazyPath = mshPath;
     m_parseFields(infile, io.binary());
 }
 
@@ -38,8 +45,10 @@ template<size_t N>
 MSHFieldParser<N>::MSHFieldParser(istream &is, const ::MeshIO::MeshType type,
                                   std::vector<::MeshIO::IOElement> &&elements,
                                   std::vector<::MeshIO::IOVertex>  &&vertices,
-                                  const bool binary, bool permitDimMismatch)
-    : m_elements(std::move(elements)), m_vertices(std::move(vertices)), m_type(type)
+                                  const bool binary, bool permitDimMismatch,
+                                  const std::string &lazyPath)
+    : m_elements(std::move(elements)), m_vertices(std::move(vertices)), m_type(type),
+      m_lazyPath(lazyPath)
 {
     if (!permitDimMismatch && (meshDimension() != N))
         throw runtime_error("Illegal mesh type for " + to_string(N) + "D MSHFieldParser");
@@ -63,126 +72,212 @@ void extractSymmetricMatrix(_SymmetricMatrix &m, const Eigen::DenseBase<Derived>
     }
 }
 
+template<size_t N>
+typename MSHFieldParser<N>::FieldKind MSHFieldParser<N>::m_fieldKind(const FieldRecord &record) const {
+    const size_t npe = nodesPerElement();
+    if (!record.elementNodeData) {
+        if (record.dim == 1) return FieldKind::Scalar;
+        if (record.dim == 3) return FieldKind::Vector;
+        if (record.dim == 9) return FieldKind::SymmetricMatrix;
+    }
+    else {
+        if (record.dim == npe    ) return FieldKind::ScalarInterpolant;
+        if (record.dim == npe * 3) return FieldKind::VectorInterpolant;
+        if (record.dim == npe * 9) return FieldKind::SymmetricMatrixInterpolant;
+    }
+    throw runtime_error("Bad field dimension");
+}
+
 template<size_t N>
 void MSHFieldParser<N>::m_parseFields(istream &is, const bool binary) {
-    string header;
-    bool upscaleLinearInterp;
     // Interpolants are (currently) only quadratic--we must upscale linear ones
-    if      (meshDegree() == 1) upscaleLinearInterp = true;
-    else if (meshDegree() == 2) upscaleLinearInterp = false;
-    else {
+    // (see m_storeField).
+    if ((meshDegree() != 1) && (meshDegree() != 2))
         std::cerr << "WARNING: Unknown or unsupported mesh degree: " + to_string(meshDegree()) << std::endl;
-        upscaleLinearInterp = false;
-    }
+    m_binary = binary;
 
+    string header;
     while (getline(is, header)) {
         string fieldName;
-        Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic> fieldData;
-        DomainType ftype;
-        bool isElementNodeData = m_parseField(is, header, fieldName, fieldData, ftype, binary);
-        size_t npe = nodesPerElement();
-        size_t numEntries = fieldData.cols();
-        if (!isElementNodeData && (fieldData.rows() == 1)) {
-            ScalarField<Real> field(numEntries);
-            for (size_t i = 0; i < numEntries; ++i)
-                field[i] = fieldData(0, i);
-            m_scalarFields.emplace(make_pair(fieldName,
-                        make_pair(ftype, std::move(field))));
+        FieldRecord record;
+        m_parseFieldHeader(is, header, fieldName, record);
+        FieldKind kind = m_fieldKind(record);
+        if (lazy()) {
+            record.payload = is.tellg();
+            m_skipFieldData(is, record, binary);
         }
-        else if (!isElementNodeData && (fieldData.rows() == 3)) {
-            VectorField<Real, N> field(numEntries);
-            for (size_t i = 0; i < numEntries; ++i)
-                field(i) = truncateFromND<VectorND<N> >(fieldData.col(i));
-            m_vectorFields.emplace(make_pair(fieldName,
-                        make_pair(ftype, std::move(field))));
+        else {
+            Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic> fieldData;
+            m_parseFieldData(is, record, fieldData, binary);
+            m_storeField(kind, fieldName, record.domainType, fieldData);
         }
-        else if (!isElementNodeData && (fieldData.rows() == 9)) {
-            SymmetricMatrixField<Real, N> field(numEntries);
-            for (size_t i = 0; i < numEntries; ++i) {
-                auto mref = field(i);
-                extractSymmetricMatrix<N>(mref, fieldData.col(i));
-            }
-            m_symmetricMatrixFields.emplace(make_pair(fieldName,
-                        make_pair(ftype, std::move(field))));
+        m_fieldIndex[size_t(kind)].emplace(fieldName, std::move(record));
+    }
+}
+
+// Index the fields of a mesh archive (decoding them unless lazy).
+template<size_t N>
+void MSHFieldParser<N>::m_loadArchive(const string &path, bool permitDimMismatch, bool lazy) {
+    m_archive = std::make_shared<MeshIO::MeshArchive>(path);
+    m_type = m_archive->loadMesh(m_vertices, m_elements);
+    if (!permitDimMismatch && (meshDimension() != N))
+        throw runtime_error("Illegal mesh type for " + to_string(N) + "D MSHFieldParser");
+    if (lazy) m_lazyPath = path;
+
+    for (const auto &a : m_archive->arrays()) {
+        if (!a.isField()) continue;
+        FieldRecord record;
+        record.elementNodeData = (a.role == MeshIO::ArchiveArrayRole::ElementNodeField);
+        record.domainType = (a.role == MeshIO::ArchiveArrayRole::NodeField) ? DomainType::PER_NODE : DomainType::PER_ELEMENT;
+        record.header = (a.role == MeshIO::ArchiveArrayRole::NodeField) ? "$NodeData" : (record.elementNodeData ? "$ElementNodeData" : "$ElementData");
+        record.dim        = a.cols;
+        record.numEntries = a.rows;
+        record.array      = &a;
+        if (record.numEntries != ((record.domainType == DomainType::PER_NODE) ? numVertices() : numElements()))
+            throw runtime_error("Illegal number of field values");
+        FieldKind kind = m_fieldKind(record);
+        if (!lazy) m_decodeField(kind, a.name, record);
+        m_fieldIndex[size_t(kind)].emplace(a.name, std::move(record));
+    }
+}
+
+template<size_t N>
+void MSHFieldParser<N>::m_storeField(FieldKind kind, const string &name, DomainType domainType,
+                                     const Eigen::Ref<const Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic>> &fieldData) const {
+    const bool upscaleLinearInterp = (meshDegree() == 1);
+    size_t npe = nodesPerElement();
+    size_t numEntries = fieldData.cols();
+    if (kind == FieldKind::Scalar) {
+        ScalarField<Real> field(numEntries);
+        for (size_t i = 0; i < numEntries; ++i)
+            field[i] = fieldData(0, i);
+        m_scalarFields.emplace(make_pair(name,
+                    make_pair(domainType, std::move(field))));
+    }
+    else if (kind == FieldKind::Vector) {
+        VectorField<Real, N> field(numEntries);
+        for (size_t i = 0; i < numEntries; ++i)
+            field(i) = truncateFromND<VectorND<N> >(fieldData.col(i));
+        m_vectorFields.emplace(make_pair(name,
+                    make_pair(domainType, std::move(field))));
+    }
+    else if (kind == FieldKind::SymmetricMatrix) {
+        SymmetricMatrixField<Real, N> field(numEntries);
+        for (size_t i = 0; i < numEntries; ++i) {
+            auto mref = field(i);
+            extractSymmetricMatrix<N>(mref, fieldData.col(i));
         }
-        else if (isElementNodeData && (size_t(fieldData.rows()) == npe)) {
-            ISField field(numEntries);
-            for (size_t i = 0; i < numEntries; ++i) {
-                auto &interp = field[i];
-                if (!upscaleLinearInterp) {
-                    assert(interp.size() == npe);
-                    for (size_t j = 0; j <   npe; ++j) interp[j] = fieldData(j, i);
-                }
-                else {
-                    Interpolant<Real, N, 1> linear;
-                    assert(linear.size() == N + 1);
-                    for (size_t j = 0; j < N + 1; ++j) linear[j] = fieldData(j, i);
-                    interp = linear; // upscale
-                }
+        m_symmetricMatrixFields.emplace(make_pair(name,
+                    make_pair(domainType, std::move(field))));
+    }
+    else if (kind == FieldKind::ScalarInterpolant) {
+        ISField field(numEntries);
+        for (size_t i = 0; i < numEntries; ++i) {
+            auto &interp = field[i];
+            if (!upscaleLinearInterp) {
+                assert(interp.size() == npe);
+                for (size_t j = 0; j <   npe; ++j) interp[j] = fieldData(j, i);
+            }
+            else {
+                Interpolant<Real, N, 1> linear;
+                assert(linear.size() == N + 1);
+                for (size_t j = 0; j < N + 1; ++j) linear[j] = fieldData(j, i);
+                interp = linear; // upscale
             }
-            m_scalarInterpolantFields.emplace(make_pair(fieldName,
-                        make_pair(ftype, std::move(field))));
         }
-        else if (isElementNodeData && (size_t(fieldData.rows()) == npe * 3)) {
-            IVField field(numEntries);
-            for (size_t i = 0; i < numEntries; ++i) {
-                auto &interp = field[i];
-                if (!upscaleLinearInterp) {
-                    assert(interp.size() == npe);
-                    for (size_t j = 0; j <   npe; ++j) interp[j] = truncateFrom3D<VectorND<N>>(fieldData.block<3, 1>(3 * j, i));
-                }
-                else {
-                    Interpolant<VectorND<N>, N, 1> linear;
-                    assert(linear.size() == N + 1);
-                    for (size_t j = 0; j < N + 1; ++j) linear[j] = truncateFrom3D<VectorND<N>>(fieldData.block<3, 1>(3 * j, i));
-                    interp = linear; // upscale
-                }
+        m_scalarInterpolantFields.emplace(make_pair(name,
+                    make_pair(domainType, std::move(field))));
+    }
+    else if (kind == FieldKind::VectorInterpolant) {
+        IVField field(numEntries);
+        for (size_t i = 0; i < numEntries; ++i) {
+            auto &interp = field[i];
+            if (!upscaleLinearInterp) {
+                assert(interp.size() == npe);
+                for (size_t j = 0; j <   npe; ++j) interp[j] = truncateFrom3D<VectorND<N>>(fieldData.block<3, 1>(3 * j, i));
+            }
+            else {
+                Interpolant<VectorND<N>, N, 1> linear;
+                assert(linear.size() == N + 1);
+                for (size_t j = 0; j < N + 1; ++j) linear[j] = truncateFrom3D<VectorND<N>>(fieldData.block<3, 1>(3 * j, i));
+                interp = linear; // upscale
             }
-            m_vectorInterpolantFields.emplace(make_pair(fieldName,
-                        make_pair(ftype, std::move(field))));
         }
-        else if (isElementNodeData && (size_t(fieldData.rows()) == npe * 9)) {
-            ISMField field(numEntries);
-            for (size_t i = 0; i < numEntries; ++i) {
-                auto &interp = field[i];
-                if (!upscaleLinearInterp) {
-                    assert(interp.size() == npe);
-                    for (size_t j = 0; j <   npe; ++j) {
-                        extractSymmetricMatrix<N>(interp[j], fieldData.block<9, 1>(9 * j, i));
-                    }
+        m_vectorInterpolantFields.emplace(make_pair(name,
+                    make_pair(domainType, std::move(field))));
+    }
+    else if (kind == FieldKind::SymmetricMatrixInterpolant) {
+        ISMField field(numEntries);
+        for (size_t i = 0; i < numEntries; ++i) {
+            auto &interp = field[i];
+            if (!upscaleLinearInterp) {
+                assert(interp.size() == npe);
+                for (size_t j = 0; j <   npe; ++j) {
+                    extractSymmetricMatrix<N>(interp[j], fieldData.block<9, 1>(9 * j, i));
                 }
-                else {
-                    Interpolant<SMatrix, N, 1> linear;
-                    assert(linear.size() == N + 1);
-                    for (size_t j = 0; j < N + 1; ++j) {
-                        extractSymmetricMatrix<N>(linear[j], fieldData.block<9, 1>(9 * j, i));
-                    }
-                    interp = linear; // upscale
+            }
+            else {
+                Interpolant<SMatrix, N, 1> linear;
+                assert(linear.size() == N + 1);
+                for (size_t j = 0; j < N + 1; ++j) {
+                    extractSymmetricMatrix<N>(linear[j], fieldData.block<9, 1>(9 * j, i));
                 }
+                interp = linear; // upscale
             }
-            m_symmetricMatrixInterpolantFields.emplace(make_pair(fieldName,
-                        make_pair(ftype, std::move(field))));
         }
-        else throw runtime_error("Bad field dimension");
+        m_symmetricMatrixInterpolantFields.emplace(make_pair(name,
+                    make_pair(domainType, std::move(field))));
+    }
+}
+
+template<size_t N>
+void MSHFieldParser<N>::m_decodeField(FieldKind kind, const string &name, const FieldRecord &record) const {
+    if (record.array) {
+        // The archive stores one row per entry: its transpose is the
+        // dim x numEntries layout expected by m_storeField (viewed in place).
+        m_storeField(kind, name, record.domainType, m_archive->float64Matrix(*record.array).transpose().template cast<Real>());
+        return;
     }
+    if (!lazy()) throw runtime_error("Field " + name + " was not decoded");
+    ifstream is(m_lazyPath);
+    if (!is.is_open()) throw runtime_error("Couldn't open " + m_lazyPath);
+    is.seekg(record.payload);
+    Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic> fieldData;
+    m_parseFieldData(is, record, fieldData, m_binary);
+    m_storeField(kind, name, record.domainType, fieldData);
 }
 
 template<size_t N>
-bool MSHFieldParser<N>::
-m_parseField(istream &is, const string &header, string &name,
-             Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic> &fieldData,
-             DomainType &type, bool binary)
+void MSHFieldParser<N>::m_evictFields() const {
+    if (m_fieldCacheSize == 0) return;
+    while (m_recentlyUsed.size() > m_fieldCacheSize) {
+        const auto &f = m_recentlyUsed.back();
+        switch (f.first) {
+            case FieldKind::Scalar:                     m_scalarFields.erase(f.second);                     break;
+            case FieldKind::Vector:                     m_vectorFields.erase(f.second);                     break;
+            case FieldKind::SymmetricMatrix:            m_symmetricMatrixFields.erase(f.second);            break;
+            case FieldKind::ScalarInterpolant:          m_scalarInterpolantFields.erase(f.second);          break;
+            case FieldKind::VectorInterpolant:          m_vectorInterpolantFields.erase(f.second);          break;
+            case FieldKind::SymmetricMatrixInterpolant: m_symmetricMatrixInterpolantFields.erase(f.second); break;
+        }
+        m_recentlyUsed.pop_back();
+    }
+}
+
+template<size_t N>
+void MSHFieldParser<N>::
+m_parseFieldHeader(istream &is, const string &header, string &name, FieldRecord &record) const
 {
     // enable input stream exceptions for parsing safety; we should be able
     // to parse through a field to completion without any trouble
     is.exceptions(istream::failbit | istream::badbit);
 
     size_t expectedSize;
-    string expectedFooter;
-    bool elementNodeData = false;
-    if   (header == "$ElementData")        { type = DomainType::PER_ELEMENT; expectedSize = numElements(); expectedFooter  =     "$EndElementData"; }
-    else if (header == "$NodeData")        { type = DomainType::PER_NODE   ; expectedSize = numVertices(); expectedFooter  =        "$EndNodeData"; }
-    else if (header == "$ElementNodeData") { type = DomainType::PER_ELEMENT; expectedSize = numElements(); expectedFooter  = "$EndElementNodeData"; elementNodeData = true; }
+    record.header = header;
+    record.elementNodeData = false;
+    if   (header == "$ElementData")        { record.domainType = DomainType::PER_ELEMENT; expectedSize = numElements(); }
+    else if (header == "$NodeData")        { record.domainType = DomainType::PER_NODE   ; expectedSize = numVertices(); }
+    else if (header == "$ElementNodeData") { record.domainType = DomainType::PER_ELEMENT; expectedSize = numElements(); record.elementNodeData = true; }
     else throw runtime_error("Unrecognized MSH section: " + header);
 
     // 1         (one string tag)
@@ -194,7 +289,6 @@ m_parseField(istream &is, const string &header, string &name,
     // d         dimension
     // numValues
     runtime_error badFMT("Bad MSH field format");
-    runtime_error unsFMT("Unsupported MSH field format");
     if (readIntLine(is) != 1) throw badFMT;
     getline(is >> ws, name);
     if ((name.size() < 3) || (name.front() != '"') || (name.back() != '"'))
@@ -208,18 +302,31 @@ m_parseField(istream &is, const string &header, string &name,
 
     if (readIntLine(is) != 3) throw badFMT;
     readIntLine(is); // ignore timestep
-    size_t dim     = readIntLine(is);
-    size_t numEntries = readIntLine(is);
-    if (numEntries != expectedSize)
+    record.dim        = readIntLine(is);
+    record.numEntries = readIntLine(is);
+    if (record.numEntries != expectedSize)
         throw runtime_error("Illegal number of field values");
 
     // Element data is per-node on ElementNodeData...
-    size_t npe = 1;
-    if (elementNodeData) {
-        npe = nodesPerElement();
-        dim *= npe;
-    }
+    if (record.elementNodeData) record.dim *= nodesPerElement();
+}
+
+// Footer of the field section started by "header"
+string fieldFooter(const string &header) { return "$End" + header.substr(1); }
+
+// Read the field values following the header (and the section footer).
+template<size_t N>
+void MSHFieldParser<N>::
+m_parseFieldData(istream &is, const FieldRecord &record,
+                 Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic> &fieldData,
+                 bool binary) const
+{
+    is.exceptions(istream::failbit | istream::badbit);
 
+    runtime_error badFMT("Bad MSH field format");
+    const size_t dim = record.dim, numEntries = record.numEntries;
+    const bool elementNodeData = record.elementNodeData;
+    const size_t npe = elementNodeData ? nodesPerElement() : 1;
     fieldData.resize(dim, numEntries);
     
     is >> ws;
@@ -242,12 +349,10 @@ m_parseField(istream &is, const string &header, string &name,
             getline(is >> ws, dataLine);
             vector<string> data;
             boost::split(data, dataLine, boost::is_any_of("\t "));
-            int offset = 1; // skip entity index
-            if (elementNodeData) {
-                if (size_t(stoi(data[dim])) != npe) throw invalidNPE;
-                ++offset;
-            }
+            size_t offset = 1; // skip entity index
+            if (elementNodeData) ++offset; // ... and the node count
             if (data.size() != offset + dim) throw badFMT;
+            if (elementNodeData && (size_t(stoi(data[1])) != npe)) throw invalidNPE;
             for (size_t d = 0; d < dim; ++d)
                 fieldData(d, i) = stod(data[d + offset]);
         }
@@ -255,13 +360,36 @@ m_parseField(istream &is, const string &header, string &name,
 
     string footer;
     getline(is >> ws, footer);
-    if (footer != expectedFooter) throw badFMT;
+    if (footer != fieldFooter(record.header)) throw badFMT;
 
     // Disable input stream exceptions--outer loop uses fail bits to detect
     // end of file, so we don't want them to throw exceptions
     is.exceptions(istream::goodbit);
+}
 
-    return elementNodeData;
+// Skip over the field values following the header (and the section footer)
+// without parsing them: binary data is skipped with a single seek.
+template<size_t N>
+void MSHFieldParser<N>::
+m_skipFieldData(istream &is, const FieldRecord &record, bool binary) const
+{
+    is.exceptions(istream::failbit | istream::badbit);
+
+    is >> ws;
+    if (binary) {
+        const size_t entrySize = (record.elementNodeData ? 2 : 1) * sizeof(int) + record.dim * sizeof(double);
+        is.seekg(std::streamoff(record.numEntries * entrySize), ios::cur);
+    }
+    else {
+        for (size_t i = 0; i < record.numEntries; ++i)
+            (is >> ws).ignore(numeric_limits<streamsize>::max(), '\n');
+    }
+
+    string footer;
+    getline(is >> ws, footer);
+    if (footer != fieldFooter(record.header)) throw runtime_error("Bad MSH field format");
+
+    is.exceptions(istream::goodbit);
 }
 
 ////////////////////////////////////////////////////////////////////////////////
@@ -5,6 +5,17 @@
 //      Read Scalar/vector/matrix fields in the MSH format.
 //      Fields are identified by name, so all fields (or, at the very least,
 //      all fields of the same type) should have distinct names.
+//
+//      The fields are indexed (name, type and file offset) in a single pass
+//      over the file. By default they are all decoded during this pass, but in
+//      lazy mode each field is only decoded (by seeking to it in the file) the
+//      first time it is accessed. This makes extracting a few fields from a
+//      file with many of them much cheaper. Optionally, only a limited number
+//      of the most recently used lazily decoded fields are kept in memory.
+//
+//      Mesh archives (.mfa, see MeshArchive.hh) are read the same way: the
+//      archive is memory-mapped and each field is converted from the mapped
+//      array (eagerly or on first access).
 */
 //  Author:  Julian Panetta (jpanetta), julian.panetta@gmail.com
 //  Company:  New York University
@@ -14,7 +25,10 @@
 #define MSHFIELDPARSER_HH
 
 #include <boost/algorithm/string.hpp>
+#include <array>
 #include <iosfwd>
+#include <list>
+#include <memory>
 #include <string>
 #include <map>
 #include <vector>
@@ -22,6 +36,7 @@
 #include <Eigen/Dense>
 
 #include <MeshFEM/MeshIO.hh>
+#include <MeshFEM/MeshArchive.hh>
 #include <MeshFEM/Types.hh>
 #include <MeshFEM/Functions.hh>
 #include <MeshFEM/Fields.hh>
@@ -43,17 +58,21 @@ public:
     using ISMField = std::vector<Interpolant<    SMatrix, N, 2>>;
 
     ////////////////////////////////////////////////////////////////////////////
-    // Constructor parses the mesh and fields in the MSH file.
+    // Constructor parses the mesh and fields in the MSH file (or mesh archive).
+    // If lazy, the fields are only indexed and are decoded on first access.
     ////////////////////////////////////////////////////////////////////////////
-    MSHFieldParser(const std::string &mshPath, bool permitDimMismatch = false);
+    MSHFieldParser(const std::string &mshPath, bool permitDimMismatch = false, bool lazy = false);
 
     // Constructor used to avoid re-parsing the mesh part of the file.
     // (Often code parses the input mesh first to determine the dimension, then
     //  constructs that dimension's instantiation of MSHFieldParser)
+    // If lazyPath (the path of the file read by "is") is nonempty, the fields
+    // are only indexed and are decoded from lazyPath on first access.
     MSHFieldParser(std::istream &is, const MeshIO::MeshType type,
                    std::vector<MeshIO::IOElement> &&elements,
                    std::vector<MeshIO::IOVertex>  &&vertices,
-                   const bool binary, bool permitDimMismatch = false);
+                   const bool binary, bool permitDimMismatch = false,
+                   const std::string &lazyPath = std::string());
 
     const std::vector<MeshIO::IOElement> &elements() const { return m_elements; }
     const std::vector<MeshIO::IOVertex > &vertices() const { return m_vertices; }
@@ -83,6 +102,10 @@ public:
                      const std::vector<MeshIO::IOVertex > &vertices) {
         m_elements = elements;
         m_vertices = vertices;
+        for (auto &index : m_fieldIndex) index.clear();
+        m_recentlyUsed.clear();
+        m_lazyPath.clear();
+        m_archive.reset();
                             m_vectorFields.clear();
                             m_scalarFields.clear();
                    m_symmetricMatrixFields.clear();
@@ -96,127 +119,179 @@ public:
     // Take name and optional domain type of field (per-element, per-node).
     // Return matching field or throw exception if it doesn't exist.
     // Also report back the domain type if it isn't specified.
+    // In lazy mode, the field is decoded from the file if it isn't in memory
+    // (so these accessors are not thread-safe), and with a limited field cache
+    // the returned reference is only valid until the next field access.
     ////////////////////////////////////////////////////////////////////////////
     const VField &vectorField(const std::string &name,
                               DomainType reqType = DomainType::ANY) const {
-        return m_getField(m_vectorFields, name, reqType);
+        return m_getField(FieldKind::Vector, m_vectorFields, name, reqType);
     }
     const VField &vectorField(const std::string &name,
                               DomainType reqType, DomainType &actualType) const {
         actualType = reqType;
-        return m_getField(m_vectorFields, name, actualType);
+        return m_getField(FieldKind::Vector, m_vectorFields, name, actualType);
     }
 
     const SField &scalarField(const std::string &name,
                               DomainType reqType = DomainType::ANY) const {
-        return m_getField(m_scalarFields, name, reqType);
+        return m_getField(FieldKind::Scalar, m_scalarFields, name, reqType);
     }
     const SField &scalarField(const std::string &name,
                               DomainType reqType, DomainType &actualType) const {
         actualType = reqType;
-        return m_getField(m_scalarFields, name, actualType);
+        return m_getField(FieldKind::Scalar, m_scalarFields, name, actualType);
     }
 
     const SMField &symmetricMatrixField(const std::string &name,
                               DomainType reqType = DomainType::ANY) const {
-        return m_getField(m_symmetricMatrixFields, name, reqType);
+        return m_getField(FieldKind::SymmetricMatrix, m_symmetricMatrixFields, name, reqType);
     }
     const SMField &symmetricMatrixField(const std::string &name,
                               DomainType reqType, DomainType &actualType) const {
         actualType = reqType;
-        return m_getField(m_symmetricMatrixFields, name, actualType);
+        return m_getField(FieldKind::SymmetricMatrix, m_symmetricMatrixFields, name, actualType);
     }
 
     const IVField &vectorInterpolantField(const std::string &name,
                               DomainType reqType = DomainType::ANY) const {
-        return m_getField(m_vectorInterpolantFields, name, reqType);
+        return m_getField(FieldKind::VectorInterpolant, m_vectorInterpolantFields, name, reqType);
     }
     const IVField &vectorInterpolantField(const std::string &name,
                               DomainType reqType, DomainType &actualType) const {
         actualType = reqType;
-        return m_getField(m_vectorInterpolantFields, name, actualType);
+        return m_getField(FieldKind::VectorInterpolant, m_vectorInterpolantFields, name, actualType);
     }
 
     const ISField &scalarInterpolantField(const std::string &name,
                               DomainType reqType = DomainType::ANY) const {
-        return m_getField(m_scalarInterpolantFields, name, reqType);
+        return m_getField(FieldKind::ScalarInterpolant, m_scalarInterpolantFields, name, reqType);
     }
     const ISField &scalarInterpolantField(const std::string &name,
                               DomainType reqType, DomainType &actualType) const {
         actualType = reqType;
-        return m_getField(m_scalarInterpolantFields, name, actualType);
+        return m_getField(FieldKind::ScalarInterpolant, m_scalarInterpolantFields, name, actualType);
     }
 
     const ISMField &symmetricMatrixInterpolantField(const std::string &name,
                               DomainType reqType = DomainType::ANY) const {
-        return m_getField(m_symmetricMatrixInterpolantFields, name, reqType);
+        return m_getField(FieldKind::SymmetricMatrixInterpolant, m_symmetricMatrixInterpolantFields, name, reqType);
     }
     const ISMField &symmetricMatrixInterpolantField(const std::string &name,
                               DomainType reqType, DomainType &actualType) const {
         actualType = reqType;
-        return m_getField(m_symmetricMatrixInterpolantFields, name, actualType);
+        return m_getField(FieldKind::SymmetricMatrixInterpolant, m_symmetricMatrixInterpolantFields, name, actualType);
     }
 
     ////////////////////////////////////////////////////////////////////////////
     // Get names of all the fields of a particular type.
     ////////////////////////////////////////////////////////////////////////////
-    std::vector<std::string>          vectorFieldNames(DomainType type = DomainType::ANY) const { return m_getKeysOfType(         m_vectorFields, type); }
-    std::vector<std::string>          scalarFieldNames(DomainType type = DomainType::ANY) const { return m_getKeysOfType(         m_scalarFields, type); }
-    std::vector<std::string> symmetricMatrixFieldNames(DomainType type = DomainType::ANY) const { return m_getKeysOfType(m_symmetricMatrixFields, type); }
+    std::vector<std::string>          vectorFieldNames(DomainType type = DomainType::ANY) const { return m_getFieldNames(FieldKind::         Vector, type); }
+    std::vector<std::string>          scalarFieldNames(DomainType type = DomainType::ANY) const { return m_getFieldNames(FieldKind::         Scalar, type); }
+    std::vector<std::string> symmetricMatrixFieldNames(DomainType type = DomainType::ANY) const { return m_getFieldNames(FieldKind::SymmetricMatrix, type); }
 
-    std::vector<std::string>          vectorInterpolantFieldNames(DomainType type = DomainType::ANY) const { return m_getKeysOfType(         m_vectorInterpolantFields, type); }
-    std::vector<std::string>          scalarInterpolantFieldNames(DomainType type = DomainType::ANY) const { return m_getKeysOfType(         m_scalarInterpolantFields, type); }
-    std::vector<std::string> symmetricMatrixInterpolantFieldNames(DomainType type = DomainType::ANY) const { return m_getKeysOfType(m_symmetricMatrixInterpolantFields, type); }
+    std::vector<std::string>          vectorInterpolantFieldNames(DomainType type = DomainType::ANY) const { return m_getFieldNames(FieldKind::         VectorInterpolant, type); }
+    std::vector<std::string>          scalarInterpolantFieldNames(DomainType type = DomainType::ANY) const { return m_getFieldNames(FieldKind::         ScalarInterpolant, type); }
+    std::vector<std::string> symmetricMatrixInterpolantFieldNames(DomainType type = DomainType::ANY) const { return m_getFieldNames(FieldKind::SymmetricMatrixInterpolant, type); }
+
+    ////////////////////////////////////////////////////////////////////////////
+    // Limit the number of lazily decoded fields kept in memory (the least
+    // recently used are evicted and decoded again when needed).
+    // 0 (the default) keeps all decoded fields.
+    ////////////////////////////////////////////////////////////////////////////
+    void setFieldCacheSize(size_t size) { m_fieldCacheSize = size; m_evictFields(); }
+    bool lazy() const { return !m_lazyPath.empty(); }
 
 private:
     std::vector<MeshIO::IOElement> m_elements;
     std::vector<MeshIO::IOVertex > m_vertices;
     MeshIO::MeshType m_type;
 
-    std::map<std::string, std::pair<DomainType,  VField>>          m_vectorFields;
-    std::map<std::string, std::pair<DomainType,  SField>>          m_scalarFields;
-    std::map<std::string, std::pair<DomainType, SMField>> m_symmetricMatrixFields;
+    // Decoded fields (filled on demand in lazy mode)
+    mutable std::map<std::string, std::pair<DomainType,  VField>>          m_vectorFields;
+    mutable std::map<std::string, std::pair<DomainType,  SField>>          m_scalarFields;
+    mutable std::map<std::string, std::pair<DomainType, SMField>> m_symmetricMatrixFields;
+
+    mutable std::map<std::string, std::pair<DomainType,  IVField>>          m_vectorInterpolantFields;
+    mutable std::map<std::string, std::pair<DomainType,  ISField>>          m_scalarInterpolantFields;
+    mutable std::map<std::string, std::pair<DomainType, ISMField>> m_symmetricMatrixInterpolantFields;
+
+    // Range type of a field (determined by its dimension)
+    enum class FieldKind { Scalar, Vector, SymmetricMatrix, ScalarInterpolant, VectorInterpolant, SymmetricMatrixInterpolant };
+    static constexpr size_t NumFieldKinds = 6;
+
+    // Header information and payload location of a field in the file.
+    struct FieldRecord {
+        std::string header;
+        DomainType domainType;
+        size_t dim, numEntries;      // (dim includes the nodes of ElementNodeData)
+        bool elementNodeData;
+        std::streamoff payload = -1; // file offset of the field values
+        const MeshIO::ArchiveArrayInfo *array = nullptr; // field values in a mesh archive
+    };
+
+    // Index of all fields in the file, for each FieldKind.
+    std::array<std::map<std::string, FieldRecord>, NumFieldKinds> m_fieldIndex;
 
-    std::map<std::string, std::pair<DomainType,  IVField>>          m_vectorInterpolantFields;
-    std::map<std::string, std::pair<DomainType,  ISField>>          m_scalarInterpolantFields;
-    std::map<std::string, std::pair<DomainType, ISMField>> m_symmetricMatrixInterpolantFields;
+    std::string m_lazyPath; // file from which fields are decoded (empty unless lazy)
+    std::shared_ptr<const MeshIO::MeshArchive> m_archive; // (when reading a mesh archive)
+    bool m_binary = false;
+    size_t m_fieldCacheSize = 0;
+    mutable std::list<std::pair<FieldKind, std::string>> m_recentlyUsed; // lazily decoded fields, most recent first
 
     // Find a particular "type" of field of a particular name.
     // This "type" comprises both the domain type (i.e. DomainType) and range
     // type (vector, scalar, symmetric matrix...)
     // Throws exception if no matching field is found.
     template<class _Field>
-    static const _Field &m_getField(const std::map<std::string, std::pair<DomainType, _Field> > &fields,
-                                    const std::string &name, DomainType &type) {
+    const _Field &m_getField(FieldKind kind, std::map<std::string, std::pair<DomainType, _Field> > &fields,
+                             const std::string &name, DomainType &type) const {
         std::runtime_error notFound("Field query unmatched.");
-        auto it = fields.find(name);
-        if (it != fields.end()) {
-            if ((type == DomainType::ANY) || it->second.first == type) {
-                type = it->second.first; // Report actual type (for ANY case)
-                return it->second.second;
-            }
+        const auto &index = m_fieldIndex[size_t(kind)];
+        auto rec = index.find(name);
+        if ((rec == index.end()) || ((type != DomainType::ANY) && (rec->second.domainType != type)))
             throw notFound;
+        type = rec->second.domainType; // Report actual type (for ANY case)
+
+        auto it = fields.find(name);
+        if (it == fields.end()) {
+            m_decodeField(kind, name, rec->second);
+            it = fields.find(name);
         }
-        else { throw notFound; }
+        if (lazy()) {
+            m_recentlyUsed.remove(std::make_pair(kind, name));
+            m_recentlyUsed.emplace_front(kind, name);
+            m_evictFields();
+        }
+        return it->second.second;
     }
 
     // Get the names of all fields of a particular "type."
     // This "type" comprises both the domain type (i.e. DomainType) and range
     // type (vector, scalar, symmetric matrix...)
-    template<class CollectionType>
-    static std::vector<std::string> m_getKeysOfType(const CollectionType &fields, DomainType type) {
+    std::vector<std::string> m_getFieldNames(FieldKind kind, DomainType type) const {
         std::vector<std::string> result;
-        for (auto entry : fields) {
-            if ((type == DomainType::ANY) || entry.second.first == type)
+        for (const auto &entry : m_fieldIndex[size_t(kind)]) {
+            if ((type == DomainType::ANY) || entry.second.domainType == type)
                 result.push_back(entry.first);
         }
         return result;
     }
 
+    FieldKind m_fieldKind(const FieldRecord &record) const;
+
     void m_parseFields(std::istream &s, const bool binary);
-    bool m_parseField(std::istream &is, const std::string &header, std::string &name,
-                      Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic> &fieldData,
-                      DomainType &type, bool binary = false);
+    void m_loadArchive(const std::string &path, bool permitDimMismatch, bool lazy);
+    void m_parseFieldHeader(std::istream &is, const std::string &header, std::string &name, FieldRecord &record) const;
+    void m_parseFieldData(std::istream &is, const FieldRecord &record,
+                          Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic> &fieldData, bool binary) const;
+    void m_skipFieldData(std::istream &is, const FieldRecord &record, bool binary) const;
+
+    // Convert parsed field data to the field type corresponding to "kind".
+    void m_storeField(FieldKind kind, const std::string &name, DomainType domainType,
+                      const Eigen::Ref<const Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic>> &fieldData) const;
+    void m_decodeField(FieldKind kind, const std::string &name, const FieldRecord &record) const;
+    void m_evictFields() const;
 };
 
 #endif /* end of include guard: MSHFIELDPARSER_HH */
@@ -18,6 +18,14 @@
 //
 //      Also, to subsample the higher degree fields (case 1), we require the
 //      vertex nodes to be a prefix of the full node list.
+//
+//      Each field section is formatted into memory and reaches the file in
+//      large blocks. In asynchronous mode (setAsynchronous), the blocks are
+//      written by a background thread so that output of large fields overlaps
+//      with the caller's next computation.
+//
+//      If the output path has the .mfa extension, the mesh and fields are
+//      written as a mesh archive (see MeshArchive.hh) instead of an MSH file.
 */
 //  Author:  Julian Panetta (jpanetta), julian.panetta@gmail.com
 //  Company:  New York University
@@ -27,16 +35,27 @@
 #define MSHFIELDWRITER_HH
 #include <iostream>
 #include <fstream>
+#include <sstream>
 #include <stdexcept>
 #include <string>
 #include <vector>
 #include <set>
 #include <type_traits>
+#include <atomic>
+#include <deque>
+#include <mutex>
+#include <condition_variable>
+#include <functional>
+#include <limits>
+#include <memory>
+#include <thread>
 
 #include <MeshFEM/Fields.hh>
 #include <MeshFEM/Flattening.hh>
 #include <MeshFEM/Functions.hh>
 #include <MeshFEM/MeshIO.hh>
+#include <MeshFEM/MeshArchive.hh>
+#include <MeshFEM/MeshReordering.hh>
 
 class MSHFieldWriter {
 protected:
@@ -51,7 +70,7 @@ public:
                    MeshIO::MeshType meshType = MeshIO::MESH_GUESS,
                    bool binary = true)
         : m_linearSubsample(false),
-          m_outStream(mshPath), m_numVertices(nodes.size()),
+          m_outStream(mshPath, std::ios::out | std::ios::binary), m_numVertices(nodes.size()),
           m_numNodes(nodes.size()), m_numElements(elements.size()),
           m_binary(binary)
     {
@@ -62,11 +81,7 @@ public:
             std::cout << "Failed to open output file '"
                       << mshPath << '\'' << std::endl;
         }
-        else {
-            MeshIO::MeshIO_MSH io;
-            io.setBinary(binary);
-            io.save(m_outStream, nodes, elements, meshType);
-        }
+        else m_writeMesh(mshPath, nodes, elements, meshType);
     }
 
     ////////////////////////////////////////////////////////////////////////////
@@ -78,6 +93,9 @@ public:
     //                                degree (this is the default to save space)
     //  @param[in]  meshType          Type of mesh elements
     //  @param[in]  binary            Whether to use the binary MSH format.
+    //  If the mesh was reordered at construction (FEMMesh::permutation()),
+    //  its nodes and elements and the fields' entries are written in the
+    //  numbering of the unreordered mesh.
     *///////////////////////////////////////////////////////////////////////////
     template<typename Mesh>
     MSHFieldWriter(const std::string &mshPath, const Mesh &mesh,
@@ -85,7 +103,7 @@ public:
                    MeshIO::MeshType meshType = MeshIO::MESH_GUESS,
                    bool binary = true)
         : m_linearSubsample(linearSubsample),
-          m_outStream(mshPath), m_numVertices(mesh.numVertices()),
+          m_outStream(mshPath, std::ios::out | std::ios::binary), m_numVertices(mesh.numVertices()),
           m_numNodes(mesh.numNodes()), m_numElements(mesh.numElements()),
           m_binary(binary)
     {
@@ -119,9 +137,11 @@ public:
                 }
             }
 
-            MeshIO::MeshIO_MSH io;
-            io.setBinary(binary);
-            io.save(m_outStream, outNodes, outElements, meshType);
+            const MeshPermutation *perm = getMeshPermutation(mesh);
+            if (perm && !perm->isIdentity())
+                m_restoreOriginalOrder(*perm, outNodes, outElements);
+
+            m_writeMesh(mshPath, outNodes, outElements, meshType);
         }
     }
 
@@ -161,40 +181,26 @@ public:
                 throw std::runtime_error("Invalid field type.");
         }
 
-        m_outStream << '$' << sectionHeader << std::endl
-                    << '1' << std::endl // One string tag: field name
-                    << '"' << name << '"' << std::endl
-                    << '0' << std::endl // No real tags
-                    << '3' << std::endl // 3 Integer tags:
-                    << '0' << std::endl // Time step 0 (ignored)
-                    << paddedDim << std::endl // dimension
-                    << numEntries << std::endl;
+        m_beginSection(sectionHeader, name, paddedDim, numEntries);
+        double values[9];
         for (size_t i = 1; i <= numEntries; ++i) {
-            auto val = f(i - 1);
-            if (m_binary) { int out = int(i); m_outStream.write((char *) &out, sizeof(int)); }
-            else          m_outStream << i;
+            auto val = f(m_meshIndex(type, i - 1));
             if (f.fieldType() == FIELD_MATRIX) {
                 for (size_t k = 0; k < 3; ++k) {
                     for (size_t l = 0; l < 3; ++l) {
                         // Pad to 3x3
-                        double value = (((k < f.N()) && (l < f.N())) ?
-                                        val[flattenIndices(f.N(), k, l)] : 0);
-                        if (m_binary) m_outStream.write((char *) &value, sizeof(double));
-                        else          m_outStream << ' ' << value;
+                        values[3 * k + l] = (((k < f.N()) && (l < f.N())) ?
+                                             val[flattenIndices(f.N(), k, l)] : 0);
                     }
                 }
             }
             else {
-                for (size_t c = 0; c < paddedDim; ++c) {
-                    double value = ((c < dim) ? val[c] : 0);
-                    if (m_binary) m_outStream.write((char *) &value, sizeof(double));
-                    else          m_outStream << ' ' << value;
-                }
+                for (size_t c = 0; c < paddedDim; ++c)
+                    values[c] = ((c < dim) ? val[c] : 0);
             }
-            if (!m_binary)
-                m_outStream << std::endl;
+            m_writeEntry(i, values, paddedDim);
         }
-        m_outStream << "$End" << sectionHeader << std::endl;
+        m_endSection(sectionHeader);
     }
 
     ////////////////////////////////////////////////////////////////////////////
@@ -274,37 +280,26 @@ public:
         InterpolantTypeWrapper<typename _Interpolant::value_type> wrapper(f.at(0)[0]);
         // InterpolantTypeWrapper<decltype(f.at(0)[0])> wrapper(f.at(0));
 
-        m_outStream << "$ElementNodeData" << std::endl
-                    << '1' << std::endl // One string tag: field name
-                    << '"' << name << '"' << std::endl
-                    << '0' << std::endl // No real tags
-                    << '3' << std::endl // 3 Integer tags:
-                    << '0' << std::endl // Time step 0 (ignored)
-                    << wrapper.paddedDim << std::endl // dimension
-                    << numEntries << std::endl;
+        m_beginSection("ElementNodeData", name, wrapper.paddedDim, numEntries);
 
         // Format: elem_idx  nodesPerElem values
         // there are nodesPerElem * dim wrapper.paddedDim values.
+        std::vector<double> values;
         for (size_t i = 1; i <= numEntries; ++i) {
             size_t numNodesPerElem = m_numOutputNodesPerElement.at(i - 1);
-            if (m_binary) { int out[2] = {int(i), int(numNodesPerElem)}; m_outStream.write((char *) out, 2 * sizeof(int)); }
-            else          { m_outStream << i << ' ' << numNodesPerElem; }
-            const auto &val = f.at(i - 1);
+            const auto &val = f.at(m_meshIndex(type, i - 1));
             if (val.size() < numNodesPerElem)  // allow subsampling of higher-degree val
                 throw std::runtime_error("Interpolant has too few nodes");
+            values.resize(numNodesPerElem * wrapper.paddedDim);
             for (size_t n = 0; n < numNodesPerElem; ++n) { // for each node
                 const auto &nval = val[n];
-                for (size_t c = 0; c < wrapper.paddedDim; ++c) {
-                    double value = wrapper.component(nval, c);
-                    if (m_binary) m_outStream.write((char *) &value, sizeof(double));
-                    else          m_outStream << ' ' << value;
-                }
+                for (size_t c = 0; c < wrapper.paddedDim; ++c)
+                    values[n * wrapper.paddedDim + c] = wrapper.component(nval, c);
             }
-            if (!m_binary)
-                m_outStream << std::endl;
+            m_writeEntry(i, values.data(), values.size(), &numNodesPerElem);
         }
 
-        m_outStream << "$EndElementNodeData" << std::endl;
+        m_endSection("ElementNodeData");
     }
 
     size_t numVertices() const { return m_numVertices; }
@@ -315,11 +310,223 @@ public:
         return m_outStream.is_open();
     }
 
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Enable/disable writing on a background thread. In asynchronous mode,
+    //  addField returns once the field is formatted into memory (so the
+    //  field itself can be modified or freed), and at most maxQueuedBlocks
+    //  blocks of BlockSize bytes wait for the writer thread; addField blocks
+    //  while the queue is full. Errors writing the file are reported by the
+    //  next call to addField, flush, or setAsynchronous.
+    //  Disabling asynchronous mode waits for the queued blocks to be written.
+    *///////////////////////////////////////////////////////////////////////////
+    void setAsynchronous(bool async, size_t maxQueuedBlocks = 8) {
+        if (async) {
+            if (maxQueuedBlocks == 0) throw std::runtime_error("maxQueuedBlocks must be positive");
+            {
+                std::lock_guard<std::mutex> lock(m_queueMutex);
+                m_maxQueuedBlocks = maxQueuedBlocks;
+            }
+            m_queueChanged.notify_all();
+            if (asynchronous()) return;
+            // The stream belongs to the writer thread from now on.
+            m_sectionText.copyfmt(m_outStream);
+            m_stopWriter = false;
+            m_writerThread = std::thread(&MSHFieldWriter::m_writerLoop, this);
+            return;
+        }
+        if (!asynchronous()) { m_checkWriteError(); return; }
+        {
+            std::lock_guard<std::mutex> lock(m_queueMutex);
+            m_stopWriter = true;
+        }
+        m_queueChanged.notify_all();
+        m_writerThread.join();
+        m_checkWriteError();
+    }
+
+    bool asynchronous() const { return m_writerThread.joinable(); }
+
+    // Wait until all fields added so far have reached the file.
+    void flush() {
+        if (asynchronous()) {
+            std::unique_lock<std::mutex> lock(m_queueMutex);
+            m_queueChanged.wait(lock, [this]() { return m_queue.empty() && !m_writing; });
+        }
+        else m_outStream.flush();
+        m_checkWriteError();
+    }
+
+    // Size of the blocks in which field data is handed to the file.
+    static constexpr size_t BlockSize = size_t(1) << 22;
+
+    // Whether the fields passed to addField for a reordered mesh are already
+    // in the output (original) numbering rather than the mesh's numbering.
+    void setFieldsInOriginalOrder(bool original) { m_fieldsInOriginalOrder = original; }
+    bool fieldsInOriginalOrder() const { return m_fieldsInOriginalOrder; }
+
+    // Whether the output is a mesh archive rather than an MSH file.
+    bool archive() const { return bool(m_archive); }
+
+    // Compress the subsequently added fields of a mesh archive.
+    void setArchiveCompression(bool compress) {
+        if (!m_archive) throw std::runtime_error("Compression is only supported for mesh archive output");
+        if (compress && !MeshIO::MeshArchive::compressionSupported())
+            throw std::runtime_error("Mesh archive compression requires zlib");
+        m_submit([this, compress]() { m_archive->setCompression(compress); });
+    }
+
     ~MSHFieldWriter() {
+        try {
+            setAsynchronous(false);
+            if (m_archive) m_archive->close();
+        }
+        catch (const std::exception &e) {
+            std::cerr << "MSHFieldWriter: " << e.what() << std::endl;
+        }
+        m_archive.reset();
         m_outStream.close();
     }
 
 private:
+    ////////////////////////////////////////////////////////////////////////////
+    // Buffered output.
+    // A section's text (header, ASCII entries, footer) is formatted with
+    // m_sectionText, which shares the file stream's formatting (precision),
+    // and collected with the packed binary entries in m_block. Full blocks are
+    // written to the file directly or handed to the writer thread.
+    // For archives, m_block collects the field's values, which are added to
+    // the archive as a single array when the section ends.
+    ////////////////////////////////////////////////////////////////////////////
+    void m_beginSection(const std::string &sectionHeader, const std::string &name,
+                        size_t paddedDim, size_t numEntries) {
+        m_checkWriteError();
+        if (m_archive) {
+            m_section = ArchiveSection{name, MeshIO::ArchiveArrayRole::ElementNodeField, numEntries, paddedDim};
+            if (sectionHeader == "NodeData")    m_section.role = MeshIO::ArchiveArrayRole::NodeField;
+            if (sectionHeader == "ElementData") m_section.role = MeshIO::ArchiveArrayRole::ElementField;
+            m_block.clear();
+            return;
+        }
+        m_sectionText.str("");
+        m_sectionText.clear();
+        // In asynchronous mode the format was captured when the writer
+        // thread took over the stream.
+        if (!asynchronous()) m_sectionText.copyfmt(m_outStream);
+        m_sectionText << '$' << sectionHeader << '\n'
+                      << '1' << '\n' // One string tag: field name
+                      << '"' << name << '"' << '\n'
+                      << '0' << '\n' // No real tags
+                      << '3' << '\n' // 3 Integer tags:
+                      << '0' << '\n' // Time step 0 (ignored)
+                      << paddedDim << '\n' // dimension
+                      << numEntries << '\n';
+        m_appendSectionText();
+    }
+
+    // Entry i (1-based) holding n values, preceded by the entry's node count
+    // for ElementNodeData.
+    void m_writeEntry(size_t i, const double *values, size_t n, const size_t *numNodes = nullptr) {
+        if (m_archive) {
+            if (i == 1) m_section.cols = n;
+            if (n != m_section.cols) throw std::runtime_error("Mesh archive fields need the same number of values for each entry");
+            m_block.append(reinterpret_cast<const char *>(values), n * sizeof(double));
+            return;
+        }
+        if (m_binary) {
+            int idx[2] = { int(i), numNodes ? int(*numNodes) : 0 };
+            m_block.append(reinterpret_cast<const char *>(idx), (numNodes ? 2 : 1) * sizeof(int));
+            m_block.append(reinterpret_cast<const char *>(values), n * sizeof(double));
+        }
+        else {
+            m_sectionText << i;
+            if (numNodes) m_sectionText << ' ' << *numNodes;
+            for (size_t c = 0; c < n; ++c)
+                m_sectionText << ' ' << values[c];
+            m_sectionText << '\n';
+            if (size_t(m_sectionText.tellp()) < BlockSize) return;
+            m_appendSectionText();
+        }
+        if (m_block.size() >= BlockSize) m_emitBlock();
+    }
+
+    void m_endSection(const std::string &sectionHeader) {
+        if (m_archive) {
+            std::string values;
+            values.swap(m_block);
+            m_submit([this, section = m_section, values = std::move(values)]() {
+                m_archive->addArray(section.name, section.role, MeshIO::ArchiveDType::Float64,
+                                    section.rows, section.cols, values.data());
+            });
+            return;
+        }
+        m_sectionText << "$End" << sectionHeader << '\n';
+        m_appendSectionText();
+        m_emitBlock();
+        // Completed sections are visible in the file (e.g., while an
+        // optimization is still running).
+        if (!asynchronous()) m_outStream.flush();
+    }
+
+    void m_appendSectionText() {
+        m_block += m_sectionText.str();
+        m_sectionText.str("");
+    }
+
+    void m_emitBlock() {
+        if (m_block.empty()) return;
+        if (!asynchronous()) {
+            m_writeBlock(m_block);
+            m_block.clear();
+            m_checkWriteError();
+            return;
+        }
+        std::string block;
+        block.swap(m_block);
+        m_block.reserve(BlockSize);
+        m_submit([this, block = std::move(block)]() { m_writeBlock(block); });
+    }
+
+    // Run a write operation now, or queue it for the writer thread.
+    void m_submit(std::function<void()> &&job) {
+        if (!asynchronous()) { job(); return; }
+        {
+            std::unique_lock<std::mutex> lock(m_queueMutex);
+            m_queueChanged.wait(lock, [this]() { return m_queue.size() < m_maxQueuedBlocks; });
+            m_queue.push_back(std::move(job));
+        }
+        m_queueChanged.notify_all();
+    }
+
+    // Write a block to the file (a stream that failed to open is ignored).
+    void m_writeBlock(const std::string &block) {
+        if (!m_outStream.is_open()) return;
+        if (!m_outStream.write(block.data(), block.size())) m_writeFailed = true;
+    }
+
+    void m_checkWriteError() const {
+        if (m_writeFailed) throw std::runtime_error("Failed to write MSH field data");
+    }
+
+    void m_writerLoop() {
+        std::unique_lock<std::mutex> lock(m_queueMutex);
+        while (true) {
+            m_queueChanged.wait(lock, [this]() { return !m_queue.empty() || m_stopWriter; });
+            if (m_queue.empty()) break;
+            std::function<void()> job = std::move(m_queue.front());
+            m_queue.pop_front();
+            m_writing = true;
+            const bool drained = m_queue.empty();
+            lock.unlock();
+            m_queueChanged.notify_all();
+            try { job(); }
+            catch (...) { m_writeFailed = true; }
+            if (drained && m_outStream.is_open() && !m_outStream.flush()) m_writeFailed = true;
+            lock.lock();
+            m_writing = false;
+            m_queueChanged.notify_all();
+        }
+    }
+
     ////////////////////////////////////////////////////////////////////////////
     /*! Validate/guess domain's type based on its size.
     //  @param[in]    domainSize  used for guessing domain type.
@@ -353,13 +560,102 @@ private:
         return type;
     }
 
+    // Index of the mesh entity written as output entry i.
+    size_t m_meshIndex(DomainType type, size_t i) const {
+        if (m_fieldsInOriginalOrder) return i;
+        const auto &order = (type == DomainType::PER_ELEMENT) ? m_meshElementForOutput : m_meshNodeForOutput;
+        return order.empty() ? i : order.at(i);
+    }
+
+    // Permute the nodes and elements of a reordered mesh's output back into
+    // the numbering the unreordered mesh would have: vertices and elements in
+    // the original input order, and edge nodes (which FEMMesh numbers by
+    // first use when visiting the elements in order) by first use in the
+    // original element order.
+    void m_restoreOriginalOrder(const MeshPermutation &perm,
+                                std::vector<MeshIO::IOVertex>  &outNodes,
+                                std::vector<MeshIO::IOElement> &outElements) {
+        if ((perm.vertex.size() != m_numVertices) || (perm.element.size() != m_numElements))
+            throw std::runtime_error("Mesh permutation size mismatch");
+
+        const size_t numOutNodes = outNodes.size();
+        std::vector<size_t> outputForMeshNode(numOutNodes, std::numeric_limits<size_t>::max());
+        m_meshNodeForOutput.assign(numOutNodes, 0);
+        for (size_t i = 0; i < m_numVertices; ++i) {
+            outputForMeshNode[perm.vertex[i]] = i;
+            m_meshNodeForOutput[i] = perm.vertex[i];
+        }
+        m_meshElementForOutput = perm.element;
+
+        std::vector<MeshIO::IOElement> elements;
+        std::vector<size_t> numNodesPerElement;
+        elements.reserve(m_numElements);
+        numNodesPerElement.reserve(m_numElements);
+        size_t numNumbered = m_numVertices;
+        for (size_t i = 0; i < m_numElements; ++i) {
+            elements.push_back(outElements[perm.element[i]]);
+            numNodesPerElement.push_back(m_numOutputNodesPerElement[perm.element[i]]);
+            for (size_t &n : elements.back()) {
+                size_t &out = outputForMeshNode.at(n);
+                if (out == std::numeric_limits<size_t>::max()) {
+                    out = numNumbered++;
+                    m_meshNodeForOutput[out] = n;
+                }
+                n = out;
+            }
+        }
+        if (numNumbered != numOutNodes) throw std::runtime_error("Unreferenced output nodes");
+
+        std::vector<MeshIO::IOVertex> nodes(numOutNodes);
+        for (size_t i = 0; i < numOutNodes; ++i)
+            nodes[i] = outNodes[m_meshNodeForOutput[i]];
+        outNodes.swap(nodes);
+        outElements.swap(elements);
+        m_numOutputNodesPerElement.swap(numNodesPerElement);
+    }
+
 protected:
+    // Write the mesh: as an MSH file, or as a mesh archive for .mfa paths.
+    void m_writeMesh(const std::string &mshPath, const std::vector<MeshIO::IOVertex> &nodes,
+                     const std::vector<MeshIO::IOElement> &elements, MeshIO::MeshType meshType) {
+        if (MeshIO::guessFormat(mshPath) == MeshIO::FMT_MFA) {
+            m_archive.reset(new MeshIO::MeshArchiveWriter(m_outStream));
+            m_archive->writeMesh(nodes, elements, meshType);
+            return;
+        }
+        MeshIO::MeshIO_MSH io;
+        io.setBinary(m_binary);
+        io.save(m_outStream, nodes, elements, meshType);
+    }
+
     bool m_linearSubsample;
     std::ofstream m_outStream;
     size_t m_numVertices, m_numNodes, m_numElements;
     // needed for validation/output of ElementNodeData fields
     std::vector<size_t> m_numOutputNodesPerElement;
+    // Mesh index of each output node/element (empty if not reordered)
+    std::vector<size_t> m_meshNodeForOutput, m_meshElementForOutput;
+    bool m_fieldsInOriginalOrder = false;
     bool m_binary;
+
+    // Buffered output state (see m_beginSection)
+    std::ostringstream m_sectionText;
+    std::string m_block;
+    std::unique_ptr<MeshIO::MeshArchiveWriter> m_archive; // (archive output only)
+    struct ArchiveSection {
+        std::string name;
+        MeshIO::ArchiveArrayRole role;
+        size_t rows, cols;
+    } m_section;
+    std::atomic<bool> m_writeFailed{false};
+
+    // Asynchronous writer state (queue guarded by m_queueMutex)
+    std::thread m_writerThread;
+    std::mutex m_queueMutex;
+    std::condition_variable m_queueChanged;
+    std::deque<std::function<void()>> m_queue;
+    size_t m_maxQueuedBlocks = 8;
+    bool m_writing = false, m_stopWriter = false;
 };
 
 class MSHBoundaryFieldWriter : public MSHFieldWriter {
@@ -381,7 +677,7 @@ public:
                    bool binary = true)
     {
         // Manually construct MSHFieldWriter's members.
-        this->m_outStream.open(mshPath);
+        this->m_outStream.open(mshPath, std::ios::out | std::ios::binary);
         this->m_linearSubsample = linearSubsample;
         this->m_numVertices     = mesh.numBoundaryVertices();
         this->m_numNodes        = mesh.numBoundaryNodes();
@@ -419,9 +715,7 @@ public:
                 }
             }
 
-            MeshIO::MeshIO_MSH io;
-            io.setBinary(binary);
-            io.save(m_outStream, outNodes, outElements, meshType);
+            m_writeMesh(mshPath, outNodes, outElements, meshType);
         }
     }
 };
@@ -60,6 +60,9 @@ public:
                 std::shared_ptr<const MField> mfield)
         : Base(elems, vertices) {
         attachMaterialField(mfield);
+        // The stiffness matrix is reassembled on the same topology after
+        // every material field update.
+        Base::setCacheStiffnessPattern(true);
     }
 
     // Configures each mesh element to its material from mfield.
@@ -138,7 +141,7 @@ public:
         catch (...) {
             throw std::runtime_error("Target and dirichlet conditions conflict");
         }
-        Base::m_system.clear();
+        Base::m_clearSystem();
     }
 
     void removeTargetsFromDirichlet() {
@@ -147,7 +150,7 @@ public:
             bn->dirichletComponents   = bn->userDirichletComponents;
             bn->dirichletDisplacement = bn->userDirichletDisplacement;
         }
-        Base::m_system.clear();
+        Base::m_clearSystem();
     }
 
     void dumpDirichlet() {
@@ -199,9 +202,9 @@ public:
     }
 
     void materialFieldUpdated() {
-        // In the future, we can avoid symbolic refactorization by simply
-        // changing the nonzero values and re-calling numeric factorization.
-        Base::m_system.clear();
+        // The stiffness pattern is cached, so the next solve only recomputes
+        // the numeric factorization.
+        Base::m_stiffnessValuesChanged();
     }
 
 private:
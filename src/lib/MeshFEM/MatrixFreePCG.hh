@@ -0,0 +1,275 @@
+////////////////////////////////////////////////////////////////////////////////
+// MatrixFreePCG.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Matrix-free preconditioned conjugate gradient solver for symmetric
+//      positive semidefinite systems
+//          K x = f  s.t.  x[fixedVars] = fixedVarValues,  C x = r,
+//      where K is only accessed through a user-supplied matrix-vector product
+//      and C holds a handful of general linear constraints (e.g., no rigid
+//      motion rows). Fixed variables are eliminated, and the general
+//      constraints are enforced by projecting onto the null space of C
+//      (projected CG); K must be positive definite on that null space.
+//
+//      This is an alternative to SPSDSystem's sparse Cholesky factorization
+//      for problems whose factors don't fit in memory.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef MATRIXFREEPCG_HH
+#define MATRIXFREEPCG_HH
+
+#include <vector>
+#include <iostream>
+#include <stdexcept>
+#include <string>
+#include <cmath>
+
+#include <Eigen/Dense>
+
+#include <MeshFEM/Types.hh>
+#include <MeshFEM/SparseMatrices.hh>
+#include <MeshFEM/GlobalBenchmark.hh>
+
+enum class PCGPreconditioner { NONE, JACOBI, BLOCK_JACOBI };
+
+inline PCGPreconditioner pcgPreconditionerFromString(const std::string &name) {
+    if (name == "none")         return PCGPreconditioner::NONE;
+    if (name == "jacobi")       return PCGPreconditioner::JACOBI;
+    if (name == "block_jacobi") return PCGPreconditioner::BLOCK_JACOBI;
+    throw std::runtime_error("Unknown PCG preconditioner: " + name);
+}
+
+struct PCGOptions {
+    PCGPreconditioner preconditioner = PCGPreconditioner::BLOCK_JACOBI;
+    // Stop when ||P (f - K x)|| <= tolerance * ||P f||
+    Real tolerance = 1e-10;
+    // 0 means "number of free variables"
+    size_t maxIterations = 0;
+    // Store every element's stiffness matrix instead of recomputing it in each
+    // matvec (trades memory for speed).
+    bool cacheElementStiffness = false;
+    bool verbose = false;
+};
+
+// BlockSize: size of the diagonal blocks used by the block-Jacobi
+// preconditioner (e.g., the number of displacement components per node).
+template<size_t BlockSize, typename Real_ = Real>
+class ConstrainedPCG {
+public:
+    using VXd   = Eigen::Matrix<Real_, Eigen::Dynamic, 1>;
+    using Block = Eigen::Matrix<Real_, BlockSize, BlockSize>;
+    using TMatrix = TripletMatrix<Triplet<Real_>>;
+
+    bool isSet() const { return m_isSet; }
+    void clear() {
+        m_isSet = false;
+        m_freeMask.resize(0);
+        m_fixedValues.resize(0);
+        m_C.init();
+        m_invBlocks.clear();
+        m_invBlocks.shrink_to_fit();
+    }
+
+    size_t numVars() const { return m_freeMask.size(); }
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Configure the constraints.
+    //  @param[in] nvars            number of variables
+    //  @param[in] fixedVars        indices of variables fixed to prescribed values
+    //  @param[in] fixedVarValues   the values they are fixed to
+    //  @param[in] C                general linear constraint rows (C.n == nvars)
+    //  @param[in] constraintRHS    right-hand side of C x = r
+    *///////////////////////////////////////////////////////////////////////////
+    void setConstraints(size_t nvars,
+                        const std::vector<size_t> &fixedVars,
+                        const std::vector<Real_>  &fixedVarValues,
+                        TMatrix C, const std::vector<Real_> &constraintRHS) {
+        if (fixedVars.size() != fixedVarValues.size()) throw std::runtime_error("Fixed variable size mismatch");
+        if (C.m != constraintRHS.size())              throw std::runtime_error("Constraint RHS size mismatch");
+        if ((C.m > 0) && (C.n != nvars))              throw std::runtime_error("Constraint matrix size mismatch");
+        if (nvars % BlockSize != 0)                    throw std::runtime_error("Variable count must be a multiple of the block size");
+
+        m_freeMask.setOnes(nvars);
+        m_fixedValues.setZero(nvars);
+        for (size_t i = 0; i < fixedVars.size(); ++i) {
+            const size_t v = fixedVars[i];
+            if (v >= nvars) throw std::runtime_error("Fixed variable index out of bounds");
+            m_freeMask[v] = 0.0;
+            m_fixedValues[v] = fixedVarValues[i];
+        }
+
+        // The free variables must satisfy C_free x_free = r - C_fixed x_fixed.
+        m_constraintRHS = Eigen::Map<const VXd>(constraintRHS.data(), constraintRHS.size());
+        TMatrix Cfree(C.m, nvars);
+        Cfree.reserve(C.nnz());
+        for (const auto &t : C.nz) {
+            if (m_freeMask[t.j] == 0.0) m_constraintRHS[t.i] -= t.v * m_fixedValues[t.j];
+            else                        Cfree.nz.push_back(t);
+        }
+        if (Cfree.nnz() > 0) Cfree.sumRepeated(); // sorts the entries by column
+        m_C = std::move(Cfree);
+
+        // Gram matrix C C^T (tiny: one row/col per constraint). Accumulate
+        // the outer products of each column's entries.
+        const size_t m = m_C.m;
+        Eigen::Matrix<Real_, Eigen::Dynamic, Eigen::Dynamic> G;
+        G.setZero(m, m);
+        for (size_t b = 0; b < m_C.nnz(); ) {
+            size_t e = b;
+            while ((e < m_C.nnz()) && (m_C.nz[e].j == m_C.nz[b].j)) ++e;
+            for (size_t k = b; k < e; ++k)
+                for (size_t l = b; l < e; ++l)
+                    G(m_C.nz[k].i, m_C.nz[l].i) += m_C.nz[k].v * m_C.nz[l].v;
+            b = e;
+        }
+
+        // Pseudo-inverse of G so that redundant constraints are tolerated.
+        m_Gpinv.setZero(m, m);
+        if (m > 0) {
+            Eigen::SelfAdjointEigenSolver<decltype(G)> es(G);
+            const Real_ cutoff = 1e-12 * std::max<Real_>(es.eigenvalues().cwiseAbs().maxCoeff(), 1e-300);
+            for (size_t k = 0; k < m; ++k) {
+                Real_ lambda = es.eigenvalues()[k];
+                if (lambda <= cutoff) continue;
+                m_Gpinv += (1.0 / lambda) * es.eigenvectors().col(k) * es.eigenvectors().col(k).transpose();
+            }
+        }
+
+        m_invBlocks.clear();
+        m_isSet = true;
+    }
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Build the preconditioner from the system's diagonal blocks (one
+    //  BlockSize x BlockSize block per group of BlockSize consecutive
+    //  variables). Must be called after setConstraints.
+    *///////////////////////////////////////////////////////////////////////////
+    void setPreconditioner(PCGPreconditioner type, const aligned_std_vector<Block> &diagBlocks) {
+        if (!m_isSet) throw std::runtime_error("Constraints must be set before the preconditioner");
+        m_invBlocks.clear();
+        if (type == PCGPreconditioner::NONE) return;
+        const size_t nblocks = numVars() / BlockSize;
+        if (diagBlocks.size() != nblocks) throw std::runtime_error("Diagonal block count mismatch");
+
+        m_invBlocks.resize(nblocks);
+        for (size_t bi = 0; bi < nblocks; ++bi) {
+            Block B = diagBlocks[bi];
+            if (type == PCGPreconditioner::JACOBI) B = Block(B.diagonal().asDiagonal());
+            // Decouple fixed variables so the block stays invertible.
+            for (size_t c = 0; c < BlockSize; ++c) {
+                if (m_freeMask[BlockSize * bi + c] != 0.0) continue;
+                B.row(c).setZero();
+                B.col(c).setZero();
+                B(c, c) = 1.0;
+            }
+            Block Binv = B.inverse();
+            if (!Binv.allFinite()) throw std::runtime_error("Singular preconditioner block " + std::to_string(bi));
+            for (size_t c = 0; c < BlockSize; ++c) {
+                if (m_freeMask[BlockSize * bi + c] != 0.0) continue;
+                Binv.row(c).setZero();
+                Binv.col(c).setZero();
+            }
+            m_invBlocks[bi] = Binv;
+        }
+    }
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Solve the constrained system.
+    //  @param[in]  applyK  applyK(x, y) computes y = K x for full-length vectors
+    //  @param[in]  f       right-hand side (entries for fixed variables ignored)
+    //  @param[out] x       solution
+    //  @return     number of iterations taken
+    *///////////////////////////////////////////////////////////////////////////
+    template<class MatVec>
+    size_t solve(const MatVec &applyK, const VXd &f, VXd &x, const PCGOptions &opts = PCGOptions()) const {
+        if (!m_isSet) throw std::runtime_error("PCG constraints unset");
+        const size_t n = numVars();
+        if (size_t(f.size()) != n) throw std::runtime_error("RHS size mismatch");
+        BENCHMARK_SCOPED_TIMER_SECTION timer("PCG Solve");
+
+        // Start from a particular solution of the constraints.
+        x = m_fixedValues;
+        if (m_C.m > 0) {
+            VXd lambda = m_Gpinv * m_constraintRHS;
+            for (const auto &t : m_C.nz) x[t.j] += t.v * lambda[t.i];
+        }
+
+        VXd r, z, p, q;
+        applyK(x, q);
+        r = f - q;
+        m_project(r);
+
+        VXd Pf = f;
+        m_project(Pf);
+        const Real_ fnorm = Pf.norm();
+        const size_t maxIters = (opts.maxIterations > 0) ? opts.maxIterations : size_t(m_freeMask.sum());
+        const Real_ stopNorm = opts.tolerance * ((fnorm > 0) ? fnorm : Real_(1.0));
+
+        Real_ rnorm = r.norm();
+        if (rnorm <= stopNorm) return 0;
+
+        m_applyPreconditioner(r, z);
+        p = z;
+        Real_ rz = r.dot(z);
+
+        size_t it;
+        for (it = 1; it <= maxIters; ++it) {
+            applyK(p, q);
+            m_project(q);
+            const Real_ pq = p.dot(q);
+            if (pq <= 0) throw std::runtime_error("PCG breakdown: system is not positive definite on the constraint null space");
+            const Real_ alpha = rz / pq;
+            x += alpha * p;
+            r -= alpha * q;
+
+            rnorm = r.norm();
+            if (opts.verbose && (it % 100 == 0))
+                std::cout << "PCG iteration " << it << " relative residual " << rnorm / stopNorm * opts.tolerance << std::endl;
+            if (rnorm <= stopNorm) break;
+
+            m_applyPreconditioner(r, z);
+            const Real_ rz_new = r.dot(z);
+            p = z + (rz_new / rz) * p;
+            rz = rz_new;
+        }
+
+        if (rnorm > stopNorm) {
+            std::cerr << "WARNING: PCG did not converge in " << maxIters << " iterations (relative residual "
+                      << rnorm / stopNorm * opts.tolerance << ")" << std::endl;
+            return maxIters;
+        }
+        if (opts.verbose)
+            std::cout << "PCG converged in " << it << " iterations" << std::endl;
+        return it;
+    }
+
+private:
+    // Zero the fixed variables and project onto the null space of C:
+    // v <- v - C^T G^+ C v
+    void m_project(VXd &v) const {
+        v = v.cwiseProduct(m_freeMask);
+        if (m_C.m == 0) return;
+        VXd Cv = VXd::Zero(m_C.m);
+        for (const auto &t : m_C.nz) Cv[t.i] += t.v * v[t.j];
+        VXd lambda = m_Gpinv * Cv;
+        for (const auto &t : m_C.nz) v[t.j] -= t.v * lambda[t.i];
+    }
+
+    void m_applyPreconditioner(const VXd &r, VXd &z) const {
+        if (m_invBlocks.empty()) { z = r; }
+        else {
+            z.resize(r.size());
+            for (size_t bi = 0; bi < m_invBlocks.size(); ++bi)
+                z.template segment<BlockSize>(BlockSize * bi) = m_invBlocks[bi] * r.template segment<BlockSize>(BlockSize * bi);
+        }
+        m_project(z);
+    }
+
+    bool m_isSet = false;
+    VXd m_freeMask, m_fixedValues, m_constraintRHS;
+    TMatrix m_C;
+    Eigen::Matrix<Real_, Eigen::Dynamic, Eigen::Dynamic> m_Gpinv;
+    aligned_std_vector<Block> m_invBlocks;
+};
+
+#endif /* end of include guard: MATRIXFREEPCG_HH */
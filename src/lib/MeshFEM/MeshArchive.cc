@@ -0,0 +1,406 @@
+#include <MeshFEM/MeshArchive.hh>
+#include <MeshFEM/Parallelism.hh>
+#include <MeshFEM/Utilities/AsciiParsing.hh>
+
+#include <atomic>
+#include <cstring>
+#include <iostream>
+#include <limits>
+
+#if MESHFEM_WITH_ZLIB
+#include <zlib.h>
+#endif
+
+#if !defined(_WIN32)
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+using namespace std;
+
+namespace MeshIO {
+
+namespace {
+
+constexpr char     HeaderMagic[8]  = { 'M', 'F', 'E', 'M', 'A', 'R', 'C', 'H' };
+constexpr char     TrailerMagic[8] = { 'M', 'F', 'E', 'M', 'I', 'N', 'D', 'X' };
+constexpr uint32_t ArchiveVersion  = 1;
+constexpr size_t   HeaderSize      = 64;
+constexpr size_t   TrailerSize     = 16;
+constexpr size_t   ChunkAlignment  = 64;
+// Compressed arrays are split into blocks compressed independently (and in
+// parallel).
+constexpr size_t   CompressionBlockSize = size_t(1) << 22;
+
+runtime_error corruptArchive() { return runtime_error("Corrupt mesh archive"); }
+
+// Read a value of type T at p, advancing p (bounds checked against end).
+template<typename T>
+T readValue(const char *&p, const char *end) {
+    if (size_t(end - p) < sizeof(T)) throw corruptArchive();
+    T val;
+    memcpy(&val, p, sizeof(T));
+    p += sizeof(T);
+    return val;
+}
+
+// Run f(b) for each block b in [0, numBlocks).
+template<class F>
+void forEachBlock(size_t numBlocks, const F &f) {
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, numBlocks), [&](const tbb::blocked_range<size_t> &r) {
+        for (size_t b = r.begin(); b < r.end(); ++b) f(b);
+    });
+#else
+    for (size_t b = 0; b < numBlocks; ++b) f(b);
+#endif
+}
+
+#if MESHFEM_WITH_ZLIB
+// Group the k-th bytes of the items together: the high-order bytes of
+// floating point values compress much better than the interleaved data.
+void shuffleBytes(const char *in, char *out, size_t numItems, size_t itemSize) {
+    for (size_t i = 0; i < numItems; ++i)
+        for (size_t k = 0; k < itemSize; ++k)
+            out[k * numItems + i] = in[i * itemSize + k];
+}
+
+void unshuffleBytes(const char *in, char *out, size_t numItems, size_t itemSize) {
+    for (size_t k = 0; k < itemSize; ++k)
+        for (size_t i = 0; i < numItems; ++i)
+            out[i * itemSize + k] = in[k * numItems + i];
+}
+#endif
+
+} // anonymous namespace
+
+////////////////////////////////////////////////////////////////////////////////
+// Writer
+////////////////////////////////////////////////////////////////////////////////
+MeshArchiveWriter::MeshArchiveWriter(ostream &os, bool compress)
+    : m_os(os)
+{
+    setCompression(compress);
+}
+
+MeshArchiveWriter::MeshArchiveWriter(const string &path, bool compress)
+    : m_file(new ofstream(path, ios::out | ios::binary)), m_os(*m_file)
+{
+    if (!m_file->is_open()) throw runtime_error("Couldn't open " + path);
+    setCompression(compress);
+}
+
+void MeshArchiveWriter::m_writeHeader(MeshType type) {
+    m_write(HeaderMagic, sizeof(HeaderMagic));
+    const uint32_t header[2] = { ArchiveVersion, uint32_t(type) };
+    m_write(header, sizeof(header));
+    m_pad(HeaderSize);
+}
+
+void MeshArchiveWriter::setCompression(bool compress) {
+    if (compress && !MeshArchive::compressionSupported())
+        throw runtime_error("Mesh archive compression requires zlib");
+    m_compress = compress;
+}
+
+void MeshArchiveWriter::writeMesh(const vector<IOVertex> &nodes, const vector<IOElement> &elements, MeshType type) {
+    if (m_wroteMesh) throw runtime_error("Mesh archive already has a mesh");
+    if (type == MESH_GUESS) {
+        if (elements.empty()) type = MESH_TRI; // type doesn't matter, and we can't guess...
+        else type = MeshIO_MSH::elementInfoForNodeCount(elements.back().size()).meshType;
+    }
+    m_writeHeader(type);
+    m_wroteMesh = true;
+
+    const size_t nv = nodes.size(), ne = elements.size();
+    vector<double> V(3 * nv);
+    for (size_t i = 0; i < nv; ++i)
+        for (size_t c = 0; c < 3; ++c) V[3 * i + c] = nodes[i][c];
+    addArray("vertices", ArchiveArrayRole::Vertices, ArchiveDType::Float64, nv, 3, V.data());
+
+    const size_t npe = (ne > 0) ? elements[0].size() : 0;
+    vector<int64_t> E(ne * npe);
+    for (size_t i = 0; i < ne; ++i) {
+        if (elements[i].size() != npe) throw runtime_error("Mesh archives require all elements to have the same number of nodes");
+        for (size_t c = 0; c < npe; ++c) E[npe * i + c] = elements[i][c];
+    }
+    addArray("elements", ArchiveArrayRole::Elements, ArchiveDType::Int64, ne, npe, E.data());
+}
+
+void MeshArchiveWriter::addArray(const string &name, ArchiveArrayRole role, ArchiveDType dtype,
+                                 size_t rows, size_t cols, const void *data) {
+    if (m_closed) throw runtime_error("Mesh archive is already closed");
+    if (!m_wroteMesh) throw runtime_error("The mesh must be written to the archive first");
+    ArchiveArrayInfo info{name, role, dtype, false, rows, cols, 0, 0};
+    const size_t bytes = info.byteSize(), itemSize = info.itemSize();
+    const char *raw = static_cast<const char *>(data);
+
+    m_pad(ChunkAlignment);
+    info.offset = m_pos;
+
+#if MESHFEM_WITH_ZLIB
+    if (m_compress && (bytes > 0)) {
+        const size_t numBlocks = (bytes + CompressionBlockSize - 1) / CompressionBlockSize;
+        vector<vector<Bytef>> blocks(numBlocks);
+        atomic<bool> failed(false);
+        forEachBlock(numBlocks, [&](size_t b) {
+            const size_t begin = b * CompressionBlockSize, size = min(CompressionBlockSize, bytes - begin);
+            vector<char> shuffled(size);
+            shuffleBytes(raw + begin, shuffled.data(), size / itemSize, itemSize);
+            uLongf compressedSize = compressBound(size);
+            blocks[b].resize(compressedSize);
+            if (compress2(blocks[b].data(), &compressedSize, reinterpret_cast<const Bytef *>(shuffled.data()), size, Z_BEST_SPEED) != Z_OK)
+                failed = true;
+            blocks[b].resize(compressedSize);
+        });
+        if (failed) throw runtime_error("Failed to compress array " + name);
+
+        vector<uint64_t> chunkHeader = { CompressionBlockSize, numBlocks };
+        size_t compressedBytes = 0;
+        for (const auto &block : blocks) {
+            chunkHeader.push_back(block.size());
+            compressedBytes += block.size();
+        }
+        // Incompressible arrays are stored raw.
+        if (compressedBytes + chunkHeader.size() * sizeof(uint64_t) < bytes) {
+            info.compressed = true;
+            m_write(chunkHeader.data(), chunkHeader.size() * sizeof(uint64_t));
+            for (const auto &block : blocks) m_write(block.data(), block.size());
+        }
+    }
+#endif
+    if (!info.compressed) m_write(raw, bytes);
+
+    info.storedSize = m_pos - info.offset;
+    m_arrays.push_back(std::move(info));
+}
+
+void MeshArchiveWriter::close() {
+    if (m_closed) return;
+    m_closed = true;
+    if (!m_wroteMesh) throw runtime_error("Mesh archive closed without a mesh");
+    m_pad(sizeof(uint64_t));
+    const uint64_t indexOffset = m_pos;
+    const uint64_t numArrays = m_arrays.size();
+    m_write(&numArrays, sizeof(numArrays));
+    for (const auto &a : m_arrays) {
+        const uint32_t fields[4] = { uint32_t(a.role), uint32_t(a.dtype), uint32_t(a.compressed), uint32_t(a.name.size()) };
+        const uint64_t layout[4] = { a.rows, a.cols, a.offset, a.storedSize };
+        m_write(fields, sizeof(fields));
+        m_write(layout, sizeof(layout));
+        m_write(a.name.data(), a.name.size());
+    }
+    m_write(&indexOffset, sizeof(indexOffset));
+    m_write(TrailerMagic, sizeof(TrailerMagic));
+    m_os.flush();
+    if (m_file) m_file->close();
+    if (!m_os) throw runtime_error("Error writing mesh archive");
+}
+
+MeshArchiveWriter::~MeshArchiveWriter() {
+    try { close(); }
+    catch (const exception &e) { cerr << "MeshArchiveWriter: " << e.what() << endl; }
+}
+
+void MeshArchiveWriter::m_write(const void *data, size_t size) {
+    if (size == 0) return;
+    if (!m_os.write(static_cast<const char *>(data), size))
+        throw runtime_error("Error writing mesh archive");
+    m_pos += size;
+}
+
+void MeshArchiveWriter::m_pad(size_t alignment) {
+    static const char zeros[HeaderSize] = { 0 };
+    m_write(zeros, (alignment - m_pos % alignment) % alignment);
+}
+
+////////////////////////////////////////////////////////////////////////////////
+// Reader
+////////////////////////////////////////////////////////////////////////////////
+MeshArchive::MeshArchive(const string &path) {
+#if defined(_WIN32)
+    ifstream is(path, ios::in | ios::binary);
+    if (!is.is_open()) throw runtime_error("Couldn't open " + path);
+    auto buf = make_shared<string>(MeshFEM::readRemainingStream(is));
+    m_data = buf->data();
+    m_size = buf->size();
+    m_storage = buf;
+#else
+    int fd = ::open(path.c_str(), O_RDONLY);
+    if (fd < 0) throw runtime_error("Couldn't open " + path);
+    struct stat st;
+    if (fstat(fd, &st) != 0) { ::close(fd); throw runtime_error("Couldn't stat " + path); }
+    m_size = st.st_size;
+    if (m_size < HeaderSize + TrailerSize) { ::close(fd); throw corruptArchive(); }
+    void *addr = mmap(nullptr, m_size, PROT_READ, MAP_PRIVATE, fd, 0);
+    ::close(fd);
+    if (addr == MAP_FAILED) throw runtime_error("Couldn't map " + path);
+    const size_t size = m_size;
+    m_storage = shared_ptr<const void>(addr, [size](const void *p) { munmap(const_cast<void *>(p), size); });
+    m_data = static_cast<const char *>(addr);
+#endif
+    m_readIndex();
+}
+
+MeshArchive::MeshArchive(istream &is) {
+    auto buf = make_shared<string>(MeshFEM::readRemainingStream(is));
+    m_data = buf->data();
+    m_size = buf->size();
+    m_storage = buf;
+    m_readIndex();
+}
+
+void MeshArchive::m_readIndex() {
+    if (m_size < HeaderSize + TrailerSize) throw corruptArchive();
+    if (memcmp(m_data, HeaderMagic, sizeof(HeaderMagic)) != 0) throw runtime_error("Not a mesh archive");
+    const char *p = m_data + sizeof(HeaderMagic), *end = m_data + m_size;
+    if (readValue<uint32_t>(p, end) != ArchiveVersion) throw runtime_error("Unsupported mesh archive version");
+    m_meshType = MeshType(readValue<uint32_t>(p, end));
+
+    p = end - TrailerSize;
+    const uint64_t indexOffset = readValue<uint64_t>(p, end);
+    if (memcmp(p, TrailerMagic, sizeof(TrailerMagic)) != 0) throw corruptArchive();
+    if ((indexOffset < HeaderSize) || (indexOffset > m_size - TrailerSize)) throw corruptArchive();
+
+    p = m_data + indexOffset;
+    end = m_data + m_size - TrailerSize;
+    const uint64_t numArrays = readValue<uint64_t>(p, end);
+    if (numArrays > m_size) throw corruptArchive();
+    m_arrays.reserve(numArrays);
+    for (size_t i = 0; i < numArrays; ++i) {
+        ArchiveArrayInfo a;
+        uint32_t role = readValue<uint32_t>(p, end), dtype = readValue<uint32_t>(p, end),
+                 compressed = readValue<uint32_t>(p, end), nameLength = readValue<uint32_t>(p, end);
+        a.rows       = readValue<uint64_t>(p, end);
+        a.cols       = readValue<uint64_t>(p, end);
+        a.offset     = readValue<uint64_t>(p, end);
+        a.storedSize = readValue<uint64_t>(p, end);
+        if ((role > uint32_t(ArchiveArrayRole::ElementNodeField)) || (dtype > uint32_t(ArchiveDType::Int64)) || (compressed > 1))
+            throw corruptArchive();
+        a.role = ArchiveArrayRole(role);
+        a.dtype = ArchiveDType(dtype);
+        a.compressed = compressed;
+        if (size_t(end - p) < nameLength) throw corruptArchive();
+        a.name.assign(p, nameLength);
+        p += nameLength;
+
+        // The chunk must lie between the header and the index (checked
+        // without overflow).
+        if ((a.offset < HeaderSize) || (a.offset > indexOffset) || (a.storedSize > indexOffset - a.offset))
+            throw corruptArchive();
+        if ((a.cols != 0) && (a.rows > numeric_limits<uint64_t>::max() / a.itemSize() / a.cols)) throw corruptArchive();
+        if (!a.compressed && (a.storedSize != a.byteSize())) throw corruptArchive();
+        m_arrays.push_back(std::move(a));
+    }
+}
+
+const ArchiveArrayInfo *MeshArchive::find(ArchiveArrayRole role, const string &name) const {
+    for (const auto &a : m_arrays)
+        if ((a.role == role) && (a.name == name)) return &a;
+    return nullptr;
+}
+
+const ArchiveArrayInfo &MeshArchive::get(ArchiveArrayRole role, const string &name) const {
+    const ArchiveArrayInfo *a = find(role, name);
+    if (a == nullptr) throw runtime_error("Mesh archive has no array " + name);
+    return *a;
+}
+
+const void *MeshArchive::data(const ArchiveArrayInfo &a) const {
+    if (!a.compressed) return m_data + a.offset;
+
+    lock_guard<mutex> lock(m_decompressedMutex);
+    auto it = m_decompressed.find(&a);
+    if (it != m_decompressed.end()) return it->second.data();
+
+#if MESHFEM_WITH_ZLIB
+    const size_t bytes = a.byteSize(), itemSize = a.itemSize();
+    const char *p = m_data + a.offset, *end = p + a.storedSize;
+    const uint64_t blockSize = readValue<uint64_t>(p, end), numBlocks = readValue<uint64_t>(p, end);
+    if ((blockSize == 0) || (blockSize % itemSize != 0) || (numBlocks != (bytes + blockSize - 1) / blockSize)) throw corruptArchive();
+    vector<const char *> blockData(numBlocks);
+    vector<uint64_t> blockSizes(numBlocks);
+    for (size_t b = 0; b < numBlocks; ++b) blockSizes[b] = readValue<uint64_t>(p, end);
+    for (size_t b = 0; b < numBlocks; ++b) {
+        if (blockSizes[b] > size_t(end - p)) throw corruptArchive();
+        blockData[b] = p;
+        p += blockSizes[b];
+    }
+
+    vector<uint64_t> result((bytes + sizeof(uint64_t) - 1) / sizeof(uint64_t));
+    char *out = reinterpret_cast<char *>(result.data());
+    atomic<bool> failed(false);
+    forEachBlock(numBlocks, [&](size_t b) {
+        const size_t begin = b * blockSize, size = min<size_t>(blockSize, bytes - begin);
+        vector<char> shuffled(size);
+        uLongf outSize = size;
+        if ((uncompress(reinterpret_cast<Bytef *>(shuffled.data()), &outSize, reinterpret_cast<const Bytef *>(blockData[b]), blockSizes[b]) != Z_OK)
+                || (outSize != size)) {
+            failed = true;
+            return;
+        }
+        unshuffleBytes(shuffled.data(), out + begin, size / itemSize, itemSize);
+    });
+    if (failed) throw corruptArchive();
+    return m_decompressed.emplace(&a, std::move(result)).first->second.data();
+#else
+    throw runtime_error("Reading compressed mesh archives requires zlib");
+#endif
+}
+
+MeshType MeshArchive::loadMesh(vector<IOVertex> &nodes, vector<IOElement> &elements) const {
+    const auto V = vertices();
+    const auto E = this->elements();
+    if (V.cols() != 3) throw corruptArchive();
+    const size_t nv = V.rows(), ne = E.rows(), npe = E.cols();
+
+    nodes.resize(nv);
+    elements.assign(ne, IOElement(npe));
+    atomic<bool> badIndex(false);
+    auto copyRange = [&](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; ++i) {
+            if (i < nv) nodes[i] = IOVertex(V(i, 0), V(i, 1), V(i, 2));
+            if (i < ne) {
+                for (size_t c = 0; c < npe; ++c) {
+                    const int64_t idx = E(i, c);
+                    if ((idx < 0) || (size_t(idx) >= nv)) badIndex = true;
+                    elements[i][c] = idx;
+                }
+            }
+        }
+    };
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, max(nv, ne)), [&](const tbb::blocked_range<size_t> &r) { copyRange(r.begin(), r.end()); });
+#else
+    copyRange(0, max(nv, ne));
+#endif
+    if (badIndex) throw runtime_error("Element vertex index out of bounds in mesh archive");
+    return m_meshType;
+}
+
+bool MeshArchive::compressionSupported() {
+#if MESHFEM_WITH_ZLIB
+    return true;
+#else
+    return false;
+#endif
+}
+
+////////////////////////////////////////////////////////////////////////////////
+// MeshIO interface
+////////////////////////////////////////////////////////////////////////////////
+void MeshIO_MFA::save(ostream &os, const vector<Vertex> &nodes,
+                      const vector<Element> &elements, MeshType type) {
+    MeshArchiveWriter writer(os, m_compressed);
+    writer.writeMesh(nodes, elements, type);
+    writer.close();
+}
+
+MeshType MeshIO_MFA::load(istream &is, vector<Vertex> &nodes,
+                          vector<Element> &elements, MeshType /* type */) {
+    return MeshArchive(is).loadMesh(nodes, elements);
+}
+
+} // namespace MeshIO
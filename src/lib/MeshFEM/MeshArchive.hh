@@ -0,0 +1,163 @@
+////////////////////////////////////////////////////////////////////////////////
+// MeshArchive.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Binary container (.mfa) for a mesh and named fields, designed to be
+//      loaded without parsing. Every array (vertex coordinates, element
+//      corner indices, field values) is stored as a dense row-major chunk
+//      starting on a 64-byte boundary, and an index at the end of the file
+//      records each chunk's name, role, type, shape and location. Arrays
+//      stored uncompressed are accessed directly in the memory-mapped file
+//      (e.g., wrapped as Eigen or NumPy views); compressed arrays are
+//      decompressed on first access.
+//
+//      Layout (little-endian):
+//          header   "MFEMARCH", uint32 version, uint32 MeshType, zero padding
+//                   to 64 bytes
+//          chunks   raw array data, or for compressed arrays: uint64 block
+//                   size, uint64 block count, uint64 compressed size of each
+//                   block, then the blocks. Each block holds up to
+//                   "block size" bytes of the array, byte-shuffled by item
+//                   size and zlib-compressed.
+//          index    uint64 array count, then per array: uint32 role, dtype,
+//                   compression and name length, uint64 rows, cols, chunk
+//                   offset and chunk size, and the name.
+//          trailer  uint64 index offset, "MFEMINDX"
+//      Fields are stored as MSHFieldWriter outputs them: vectors are padded
+//      to 3 components, symmetric matrices to 3x3 (scanline order), and
+//      per-element-node fields hold all of an element's node values in a row.
+//
+//      Compression requires zlib (MESHFEM_WITH_ZLIB).
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef MESHARCHIVE_HH
+#define MESHARCHIVE_HH
+
+#include <MeshFEM/MeshIO.hh>
+#include <Eigen/Dense>
+
+#include <cstdint>
+#include <fstream>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <vector>
+
+namespace MeshIO {
+
+enum class ArchiveArrayRole : uint32_t { Vertices = 0, Elements = 1, NodeField = 2, ElementField = 3, ElementNodeField = 4 };
+enum class ArchiveDType     : uint32_t { Float64 = 0, Int64 = 1 };
+
+struct ArchiveArrayInfo {
+    std::string name;
+    ArchiveArrayRole role;
+    ArchiveDType dtype;
+    bool compressed;
+    uint64_t rows, cols;
+    uint64_t offset, storedSize; // location of the chunk in the file
+
+    size_t itemSize() const { return 8; }
+    size_t byteSize() const { return rows * cols * itemSize(); }
+    bool isField() const { return (role != ArchiveArrayRole::Vertices) && (role != ArchiveArrayRole::Elements); }
+};
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Writes an archive to a stream sequentially (no seeking is needed, so any
+//  output stream works). The index is written by close(), which is called
+//  by the destructor if needed.
+*///////////////////////////////////////////////////////////////////////////////
+class MeshArchiveWriter {
+public:
+    MeshArchiveWriter(std::ostream &os, bool compress = false);
+    MeshArchiveWriter(const std::string &path, bool compress = false);
+
+    // Write the header and the vertex and element arrays (elements must all
+    // have the same number of nodes). This must precede any other array.
+    void writeMesh(const std::vector<IOVertex> &nodes, const std::vector<IOElement> &elements,
+                   MeshType type = MESH_GUESS);
+
+    // Write a rows x cols row-major array.
+    void addArray(const std::string &name, ArchiveArrayRole role, ArchiveDType dtype,
+                  size_t rows, size_t cols, const void *data);
+    void addField(const std::string &name, ArchiveArrayRole role,
+                  size_t rows, size_t cols, const double *data) {
+        addArray(name, role, ArchiveDType::Float64, rows, cols, data);
+    }
+
+    // Whether subsequently added arrays are compressed.
+    void setCompression(bool compress);
+    bool compression() const { return m_compress; }
+
+    void close();
+    ~MeshArchiveWriter();
+
+private:
+    std::unique_ptr<std::ofstream> m_file; // (if we opened the output file)
+    std::ostream &m_os;
+    uint64_t m_pos = 0;
+    bool m_compress, m_wroteMesh = false, m_closed = false;
+    std::vector<ArchiveArrayInfo> m_arrays;
+
+    void m_writeHeader(MeshType type);
+    void m_write(const void *data, size_t size);
+    void m_pad(size_t alignment);
+};
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Read-only access to an archive, memory-mapped from a file or held in
+//  memory. Array data pointers stay valid for the lifetime of the archive.
+*///////////////////////////////////////////////////////////////////////////////
+class MeshArchive {
+public:
+    explicit MeshArchive(const std::string &path);
+    // Archive read from a stream (e.g., by MeshIO::load(std::istream &...)).
+    explicit MeshArchive(std::istream &is);
+
+    MeshType meshType() const { return m_meshType; }
+    const std::vector<ArchiveArrayInfo> &arrays() const { return m_arrays; }
+
+    // Find an array by role and name (nullptr if it doesn't exist).
+    const ArchiveArrayInfo *find(ArchiveArrayRole role, const std::string &name) const;
+    const ArchiveArrayInfo &get(ArchiveArrayRole role, const std::string &name) const;
+
+    // The array's values: a pointer into the mapped file for uncompressed
+    // arrays, or to a decompressed copy kept by the archive.
+    const void *data(const ArchiveArrayInfo &a) const;
+
+    template<typename T>
+    using MatrixView = Eigen::Map<const Eigen::Matrix<T, Eigen::Dynamic, Eigen::Dynamic, Eigen::RowMajor>>;
+
+    MatrixView<double> float64Matrix(const ArchiveArrayInfo &a) const {
+        if (a.dtype != ArchiveDType::Float64) throw std::runtime_error("Archive array " + a.name + " is not float64");
+        return MatrixView<double>(static_cast<const double *>(data(a)), a.rows, a.cols);
+    }
+    MatrixView<int64_t> int64Matrix(const ArchiveArrayInfo &a) const {
+        if (a.dtype != ArchiveDType::Int64) throw std::runtime_error("Archive array " + a.name + " is not int64");
+        return MatrixView<int64_t>(static_cast<const int64_t *>(data(a)), a.rows, a.cols);
+    }
+
+    MatrixView<double>  vertices() const { return float64Matrix(get(ArchiveArrayRole::Vertices, "vertices")); }
+    MatrixView<int64_t> elements() const { return   int64Matrix(get(ArchiveArrayRole::Elements, "elements")); }
+
+    // Copy out the mesh in MeshIO's representation.
+    MeshType loadMesh(std::vector<IOVertex> &nodes, std::vector<IOElement> &elements) const;
+
+    static bool compressionSupported();
+
+private:
+    std::shared_ptr<const void> m_storage; // keeps the mapping/buffer alive
+    const char *m_data = nullptr;
+    size_t m_size = 0;
+    MeshType m_meshType = MESH_INVALID;
+    std::vector<ArchiveArrayInfo> m_arrays;
+
+    mutable std::mutex m_decompressedMutex;
+    mutable std::map<const ArchiveArrayInfo *, std::vector<uint64_t>> m_decompressed;
+
+    void m_readIndex();
+};
+
+} // namespace MeshIO
+
+#endif /* end of include guard: MESHARCHIVE_HH */
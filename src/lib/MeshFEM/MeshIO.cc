@@ -1,6 +1,10 @@
 #include <MeshFEM/MeshIO.hh>
+#include <MeshFEM/MeshArchive.hh>
 #include <MeshFEM/StringUtils.hh>
+#include <MeshFEM/Parallelism.hh>
+#include <MeshFEM/Utilities/AsciiParsing.hh>
 #include <iostream>
+#include <cerrno>
 #include <deque>
 #include <limits>
 #include <MeshFEM/util.h>
@@ -94,6 +98,7 @@ Format guessFormat(const std::string &path) {
     if (ext == ".node") return FMT_NODE_ELE;
     if (ext == ".ele")  return FMT_NODE_ELE;
     if (ext == ".mesh") return FMT_MEDIT;
+    if (ext == ".mfa")  return FMT_MFA;
 
     return FMT_INVALID;
 }
@@ -111,12 +116,16 @@ MeshIO *getMeshIO(const Format &format) {
     static MeshIO_POLY  s_polyIO;
     static MeshIO_Medit s_meditIO;
     static MeshIO_STL   s_stlIO;
+    static MeshIO_MFA   s_mfaIO;
+    static MeshIO_MFA   s_mfaCompressedIO;
 
     s_mshASCIIIO.setBinary(false);
+    s_mfaCompressedIO.setCompressed(true);
 
     // Indexed using Format enum (order must match enum)
     static std::vector<MeshIO *> IOs = { &s_offIO, &s_objIO, &s_mshIO, &s_mshASCIIIO,
-        &s_polyIO, NULL /* NodeEle must be handled specially */, &s_meditIO, &s_stlIO };
+        &s_polyIO, NULL /* NodeEle must be handled specially */, &s_meditIO, &s_stlIO,
+        &s_mfaIO, &s_mfaCompressedIO };
 
     if (format == FMT_NODE_ELE)
         throw std::runtime_error("getMeshIO method doesn't support Node/Ele");
@@ -170,7 +179,8 @@ void save(const std::string &path, const std::vector<IOVertex> &nodes,
     if (format == FMT_GUESS)
         format = guessFormat(path);
 
-    std::ofstream os(path);
+    const bool archive = (format == FMT_MFA) || (format == FMT_MFA_COMPRESSED);
+    std::ofstream os(path, archive ? (std::ios::out | std::ios::binary) : std::ios::out);
     if (!os.is_open()) throw std::runtime_error("Couldn't open out file");
 
     save(os, nodes, elements, format, type);
@@ -194,14 +204,8 @@ MeshType load(std::istream &is, std::vector<IOVertex> &nodes,
 
     type = io->load(is, ioVertices, ioElements, type);
 
-    nodes.resize(ioVertices.size());
-    for (unsigned int i = 0; i < nodes.size(); ++i)
-        for (int j = 0; j < 3; ++j)
-            nodes[i].point[j] = ioVertices[i][j];
-
-    elements.resize(ioElements.size());
-    for (unsigned int i = 0; i < elements.size(); ++i)
-        elements[i] = ioElements[i];
+    nodes    = std::move(ioVertices);
+    elements = std::move(ioElements);
 
     return type;
 }
@@ -228,6 +232,10 @@ MeshType load(const std::string &path, std::vector<IOVertex> &nodes,
         return reader.load(basePath + ".node", basePath + ".ele", nodes,
                            elements);
     }
+    // Archives are memory-mapped rather than read through a stream.
+    else if ((format == FMT_MFA) || (format == FMT_MFA_COMPRESSED)) {
+        return MeshArchive(path).loadMesh(nodes, elements);
+    }
     else {
         std::ifstream is(path, std::ifstream::in | std::ifstream::binary);
         if (!is.is_open()) throw std::runtime_error("Couldn't open input file");
@@ -238,6 +246,57 @@ MeshType load(const std::string &path, std::vector<IOVertex> &nodes,
 ////////////////////////////////////////////////////////////////////////////////
 // Format-specific writers and parsers
 ////////////////////////////////////////////////////////////////////////////////
+using MeshFEM::AsciiLine;
+using MeshFEM::AsciiScanner;
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Parse the next `count` data lines of a buffer. The lines are split into
+//  chunks by a cheap serial scan, and the chunks are parsed in parallel.
+//  @param[inout] scanner   buffer position (advanced past the lines)
+//  @param[in]    count     number of lines to parse
+//  @param[in]    parseLine parseLine(i, line) parses line i, returning the
+//                          error to report (nullptr on success); it receives
+//                          an empty line if the buffer runs out.
+//  @return       error of the first bad line (nullptr if all succeeded)
+*///////////////////////////////////////////////////////////////////////////////
+template<class F>
+const std::runtime_error *parseDataLines(AsciiScanner &scanner, size_t count, const F &parseLine) {
+    constexpr size_t chunkSize = 1 << 15;
+    std::vector<const char *> chunkStart;
+    chunkStart.reserve(count / chunkSize + 1);
+    for (size_t i = 0; i < count; i += chunkSize) {
+        chunkStart.push_back(scanner.position());
+        scanner.skipDataLines(std::min(chunkSize, count - i));
+    }
+
+    std::vector<const std::runtime_error *> chunkError(chunkStart.size(), nullptr);
+    auto processChunk = [&](size_t c) {
+        AsciiScanner chunkScanner(chunkStart[c], scanner.end());
+        AsciiLine line;
+        const size_t end = std::min(count, (c + 1) * chunkSize);
+        for (size_t i = c * chunkSize; i < end; ++i) {
+            if (!chunkScanner.nextDataLine(line)) line = AsciiLine();
+            if ((chunkError[c] = parseLine(i, line))) return;
+        }
+    };
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, chunkStart.size(), 1),
+        [&](const tbb::blocked_range<size_t> &r) { for (size_t c = r.begin(); c < r.end(); ++c) processChunk(c); });
+#else
+    for (size_t c = 0; c < chunkStart.size(); ++c) processChunk(c);
+#endif
+    for (const auto *err : chunkError)
+        if (err) return err;
+    return nullptr;
+}
+
+// Read the whole stream into memory (for formats that are read to the end).
+std::string readStream(std::istream &is) {
+    std::string buf = MeshFEM::readRemainingStream(is);
+    if (is.bad()) throw std::runtime_error("Error in load: bad i/o");
+    return buf;
+}
+
 void MeshIO_OFF::save(ostream &os, const vector<Vertex> &nodes,
                       const vector<Element> &elements, MeshType /* t */) {
     os << "OFF\n"
@@ -253,26 +312,43 @@ void MeshIO_OFF::save(ostream &os, const vector<Vertex> &nodes,
 
 MeshType MeshIO_OFF::load(istream &is, vector<Vertex> &nodes,
                           vector<Element> &elements, MeshType /* t */) {
+    const std::string buf = readStream(is);
+    AsciiScanner scanner(buf);
+
     std::string line;
-    getDataLine(is, line);
+    scanner.nextDataLine(line);
     MeshFEM::trim(line);
     if (line != "OFF")
         throw std::runtime_error("Didn't read file magic; got line '" + line + "'");
 
-    getDataLine(is, line);
-    std::istringstream iss(line);
-    size_t vSize, eSize, edgeSize;
-    iss >> vSize >> eSize >> edgeSize;
-    assert((bool) iss);
+    AsciiLine header;
+    scanner.nextDataLine(header);
+    size_t vSize = 0, eSize = 0, edgeSize = 0;
+    bool headerValid = header.read(vSize) && header.read(eSize) && header.read(edgeSize);
+    assert(headerValid);
+    (void) headerValid;
 
+    // Same line formats as operator>>(istream, IOVertex/IOElement)
+    const std::runtime_error badIO("Error in load: bad i/o");
     nodes.resize(vSize);
-    for (size_t i = 0; is && (i < vSize); ++i)
-        is >> nodes[i];
+    const std::runtime_error *err = parseDataLines(scanner, vSize, [&](size_t i, AsciiLine &l) -> const std::runtime_error * {
+        IOVertex v;
+        if (!(l.read(v[0]) && l.read(v[1]) && l.read(v[2]))) return &badIO;
+        nodes[i] = v;
+        return nullptr;
+    });
+    if (err) throw *err;
 
     elements.resize(eSize);
-    for (size_t i = 0; is && (i < eSize); ++i)
-        is >> elements[i];
-    if (!is) throw std::runtime_error("Error in load: bad i/o");
+    err = parseDataLines(scanner, eSize, [&](size_t i, AsciiLine &l) -> const std::runtime_error * {
+        size_t size, idx;
+        if (!l.read(size)) return &badIO;
+        IOElement &e = elements[i];
+        e.reserve(std::min<size_t>(size, 64));
+        while (l.read(idx)) e.push_back(idx);
+        return (e.size() == size) ? nullptr : &badIO;
+    });
+    if (err) throw *err;
 
     // Validate polygon sizes--detect mixed tri/quad
     size_t polyVertices = elements.at(0).size();
@@ -313,45 +389,58 @@ void MeshIO_OBJ::save(ostream &os, const vector<Vertex> &nodes,
 MeshType MeshIO_OBJ::load(istream &is, vector<Vertex> &nodes,
                           vector<Element> &elements, MeshType /* t */) {
     nodes.clear(), elements.clear();
-    string line;
+    const std::string buf = readStream(is);
+    AsciiScanner scanner(buf);
+
+    // Numeric fields are converted with std::stod/stoi semantics (leading
+    // number of the token, e.g. the vertex index of "v/vt/vn" face corners).
+    auto toReal = [](const char *token) {
+        char *end;
+        errno = 0;
+        double val = std::strtod(token, &end);
+        if (end == token)    throw std::invalid_argument("stod");
+        if (errno == ERANGE) throw std::out_of_range("stod");
+        return val;
+    };
+    auto toIndex = [](const char *token) -> size_t {
+        char *end;
+        errno = 0;
+        long val = std::strtol(token, &end, 10);
+        if (end == token) throw std::invalid_argument("stoi");
+        if ((errno == ERANGE) || (val < std::numeric_limits<int>::min()) || (val > std::numeric_limits<int>::max()))
+            throw std::out_of_range("stoi");
+        return int(val) - 1; // OBJ is 1-indexed
+    };
 
     runtime_error badFMT("Bad OBJ face format.");
-    while (getDataLine(is, line)) {
-        MeshFEM::trim(line);
-        auto tmp = MeshFEM::split(line, "\t ");
-        string first = tmp.at(0);
-        vector<string> lineComponents(tmp.begin() + 1, tmp.end());
-        if (first == "v") {
+    AsciiLine line;
+    std::vector<const char *> lineComponents;
+    while (scanner.nextDataLine(line)) {
+        const char *first = nullptr, *firstEnd = nullptr, *tokEnd;
+        line.token(first, firstEnd);
+        lineComponents.clear();
+        for (const char *tok; line.token(tok, tokEnd); ) lineComponents.push_back(tok);
+        const size_t firstLen = firstEnd - first;
+        if ((firstLen != 1) || ((*first != 'v') && (*first != 'f') && (*first != 'l'))) continue; // Ignore everything else...
+
+        size_t ncomps = lineComponents.size();
+        if (*first == 'v') {
             IOVertex v;
-            size_t ncomps = lineComponents.size();
             if (ncomps < 2 || ncomps > 3) throw badFMT;
             // Implicitly zero pad 2-vectors to 3-vectors
-            for (size_t i = 0; i < ncomps; ++i) {
-                v[i] = stod(lineComponents[i]);
-            }
+            for (size_t i = 0; i < ncomps; ++i)
+                v[i] = toReal(lineComponents[i]);
             nodes.push_back(v);
         }
-        else if (first == "f") {
-            size_t ncorners = lineComponents.size();
-            if (ncorners == 0) throw badFMT;
-            IOElement e(ncorners);
-            for (size_t i = 0; i < ncorners; ++i) {
-                e[i] = stoi(lineComponents[i]) - 1; // OBJ is 1-indexed
-                if (e[i] >= nodes.size()) throw runtime_error("Bad node index.");
-            }
-            elements.push_back(e);
-        }
-        else if (first == "l") {
-            size_t ncorners = lineComponents.size();
-            if (ncorners != 2) throw badFMT;
-            IOElement e(ncorners);
-            for (size_t i = 0; i < ncorners; ++i) {
-                e[i] = stoi(lineComponents[i]) - 1; // OBJ is 1-indexed
+        else {
+            if ((*first == 'f') ? (ncomps == 0) : (ncomps != 2)) throw badFMT;
+            IOElement e(ncomps);
+            for (size_t i = 0; i < ncomps; ++i) {
+                e[i] = toIndex(lineComponents[i]);
                 if (e[i] >= nodes.size()) throw runtime_error("Bad node index.");
             }
-            elements.push_back(e);
+            elements.push_back(std::move(e));
         }
-        else { /* Ignore everything else... */ }
     }
 
     // Validate polygon sizes
@@ -460,13 +549,18 @@ void MeshIO_POLY::save(ostream &os, const vector<Vertex> &nodes,
 MeshType MeshIO_NodeEle::load(const string &nodePath, const string &elePath,
                              vector<Vertex> &nodes, vector<Element>
                              &elements) {
-    std::ifstream nodeIs(nodePath), eleIs(elePath);
+    std::ifstream nodeIs(nodePath, std::ifstream::in | std::ifstream::binary),
+                   eleIs(elePath,  std::ifstream::in | std::ifstream::binary);
     if (!nodeIs) throw std::runtime_error("Couldn't open " + nodePath);
     if (!eleIs)  throw std::runtime_error("Couldn't open " + elePath);
-    std::string line; getDataLine(nodeIs, line);
-    std::istringstream iss(line);
-    size_t numNodes, dim, dummy;
-    iss >> numNodes >> dim >> dummy >> dummy; // numNodes dim #attributes #boundaryMarkers
+    const std::string nodeBuf = readStream(nodeIs), eleBuf = readStream(eleIs);
+    AsciiScanner nodeScanner(nodeBuf), eleScanner(eleBuf);
+
+    AsciiLine line;
+    nodeScanner.nextDataLine(line);
+    size_t numNodes = 0, dim = 0, dummy;
+    // numNodes dim #attributes #boundaryMarkers
+    bool headerValid = line.read(numNodes) && line.read(dim) && line.read(dummy) && line.read(dummy);
 
     MeshType type = MESH_INVALID;
     if (dim == 2) type = MESH_TRI;
@@ -474,42 +568,35 @@ MeshType MeshIO_NodeEle::load(const string &nodePath, const string &elePath,
 
     std::runtime_error badFmt("Bad Node/Ele file format");
     std::runtime_error unsFmt("Unsupported Node/Ele file format");
-    if (!iss || (type == MESH_INVALID)) throw badFmt;
+    if (!headerValid || (type == MESH_INVALID)) throw badFmt;
 
     nodes.resize(numNodes);
-    for (size_t i = 0; i < numNodes; ++i) {
-        getDataLine(nodeIs, line);
-        if (!nodeIs) throw badFmt;
-        iss.str(line), iss.clear();
+    const std::runtime_error *err = parseDataLines(nodeScanner, numNodes, [&](size_t i, AsciiLine &l) -> const std::runtime_error * {
         size_t idx;
-        iss >> idx >> nodes[i][0] >> nodes[i][1];
-        if (dim == 3) iss >> nodes[i][2];
-        if (!iss || (idx != i)) throw badFmt;
-    }
-
-    getDataLine(eleIs, line);
-    iss.str(line), iss.clear();
-    size_t numElems, nodesPerElem, numAttributes;
-    iss >> numElems >> nodesPerElem >> numAttributes;
+        if (!(l.read(idx) && l.read(nodes[i][0]) && l.read(nodes[i][1]))) return &badFmt;
+        if ((dim == 3) && !l.read(nodes[i][2])) return &badFmt;
+        return (idx != i) ? &badFmt : nullptr;
+    });
+    if (err) throw *err;
+
+    eleScanner.nextDataLine(line);
+    size_t numElems = 0, nodesPerElem = 0, numAttributes;
+    headerValid = line.read(numElems) && line.read(nodesPerElem) && line.read(numAttributes);
     if (nodesPerElem <  dim + 1) throw badFmt;
     if (nodesPerElem != dim + 1) throw unsFmt;
-    if (!iss) throw badFmt;
+    if (!headerValid) throw badFmt;
 
     elements.resize(numElems);
-    for (size_t i = 0; i < numElems; ++i) {
-        getDataLine(eleIs, line);
-        if (!eleIs) throw badFmt;
-        iss.str(line), iss.clear();
+    err = parseDataLines(eleScanner, numElems, [&](size_t i, AsciiLine &l) -> const std::runtime_error * {
         size_t idx;
-        iss >> idx;
-        // if (!iss || (idx != i)) throw badFmt; (don't care)
+        if (!l.read(idx)) return &badFmt; // (index itself is ignored)
         elements[i].resize(nodesPerElem);
         for (size_t c = 0; c < nodesPerElem; ++c) {
-            iss >> elements[i][c];
-            if (elements[i][c] >= numNodes) throw badFmt;
+            if (!l.read(elements[i][c]) || (elements[i][c] >= numNodes)) return &badFmt;
         }
-        if (!eleIs) throw badFmt;
-    }
+        return nullptr;
+    });
+    if (err) throw *err;
 
     return type;
 }
@@ -621,6 +708,101 @@ void skipNewline(istream &is) {
     if (c != '\n') throw std::runtime_error("Newline expected, got ascii " + std::to_string(int(c)) + " instead");
 }
 
+////////////////////////////////////////////////////////////////////////////////
+/*! Parse the ASCII MSH node and element blocks following the node count
+//  (the nodes have already been allocated). The blocks are parsed from
+//  memory: seekable streams are read in large blocks and then repositioned
+//  just after $EndElements (so that callers like MSHFieldParser can continue
+//  reading), while other streams are read line by line up to $EndElements.
+*///////////////////////////////////////////////////////////////////////////////
+MeshType loadASCIINodesAndElements(istream &is, vector<IOVertex> &nodes,
+                                   vector<IOElement> &elements, MeshIO_MSH::ElementInfo ei) {
+    std::runtime_error badFmt("Bad MSH file format");
+    std::runtime_error unsFmt("Unsupported MSH file format");
+
+    static const std::string endTag("$EndElements");
+    const auto start = is.tellg();
+    const bool seekable = (start != std::istream::pos_type(-1));
+    std::string buf;
+    if (seekable) {
+        std::vector<char> block(1 << 20);
+        while (is.read(block.data(), block.size()) || (is.gcount() > 0)) {
+            size_t searchStart = buf.size() - std::min(buf.size(), endTag.size());
+            buf.append(block.data(), is.gcount());
+            if (buf.find(endTag, searchStart) != std::string::npos) break;
+        }
+    }
+    else {
+        std::string line;
+        while (std::getline(is, line)) {
+            buf.append(line).push_back('\n');
+            if (!line.empty() && (line.back() == '\r')) line.pop_back();
+            if (line == endTag) break;
+        }
+    }
+    if (is.bad()) throw std::runtime_error("Error in load: bad i/o");
+
+    AsciiScanner scanner(buf);
+    const size_t numNodes = nodes.size();
+    const std::runtime_error *err = parseDataLines(scanner, numNodes, [&](size_t i, AsciiLine &l) -> const std::runtime_error * {
+        int newIdx;
+        if (!l.read(newIdx) || (size_t(newIdx) != i + 1)) return &unsFmt;
+        if (!(l.read(nodes[i][0]) && l.read(nodes[i][1]) && l.read(nodes[i][2]))) return &badFmt;
+        return nullptr;
+    });
+    if (err) throw *err;
+
+    std::string line;
+    scanner.nextDataLine(line);
+    if (line != "$EndNodes") throw badFmt;
+
+    scanner.nextDataLine(line);
+    if (line != "$Elements") throw badFmt;
+
+    AsciiLine countLine;
+    size_t numElements = 0;
+    if (!(scanner.nextDataLine(countLine) && countLine.read(numElements))) throw badFmt;
+    elements.resize(numElements);
+
+    // Elements: idx elm-type num-tags tag1 ... node1 node2 ...
+    // (the element type is guessed from the first element if unspecified)
+    auto parseElementHeader = [&](AsciiLine &l, int &etype) {
+        int idx, dummy;
+        size_t numTags;
+        if (!(l.read(idx) && l.read(etype) && l.read(numTags))) return false;
+        while (numTags-- > 0) { if (!l.read(dummy)) return false; }
+        return true;
+    };
+    if ((ei.elementType == -1) && (numElements > 0)) {
+        AsciiScanner peek(scanner);
+        AsciiLine first;
+        int etype;
+        if (!(peek.nextDataLine(first) && parseElementHeader(first, etype))) throw badFmt;
+        ei = MeshIO_MSH::elementInfoForElementType(etype);
+    }
+    err = parseDataLines(scanner, numElements, [&](size_t i, AsciiLine &l) -> const std::runtime_error * {
+        int etype, idx;
+        if (!parseElementHeader(l, etype) || (etype != ei.elementType)) return &badFmt;
+        elements[i].resize(ei.nodesPerElem);
+        for (size_t c = 0; c < ei.nodesPerElem; ++c) {
+            if (!l.read(idx)) return &badFmt;
+            elements[i][c] = idx - 1;
+        }
+        return nullptr;
+    });
+    if (err) throw *err;
+
+    scanner.nextDataLine(line);
+    if (line != endTag) throw badFmt;
+
+    if (seekable) {
+        is.clear();
+        is.seekg(start + std::streamoff(scanner.position() - buf.data()));
+    }
+
+    return ei.meshType;
+}
+
 MeshType MeshIO_MSH::load(istream &is, vector<Vertex> &nodes,
                           vector<Element> &elements, MeshType type) {
     ElementInfo ei;
@@ -658,29 +840,19 @@ MeshType MeshIO_MSH::load(istream &is, vector<Vertex> &nodes,
 
     // We only support the case where nodes are consecutively numbered
     // and 1-indexed (this is the default for gmsh).
-    if (m_binary) {
-        skipNewline(is);
-        int idx = 0;
-        for (size_t i = 0; i < numNodes; ++i) {
-            int newIdx;
-            is.read((char *) &newIdx, sizeof(int));
-            if (newIdx != ++idx) throw unsFmt;
-            double vdata[3];
-            is.read((char *) &vdata[0], sizeof(vdata));
-            if (is.fail()) throw badFmt;
-            nodes[i].set(vdata[0], vdata[1], vdata[2]);
-        }
-    }
-    else {
-        int idx = 0;
-        for (size_t i = 0; i < numNodes; ++i) {
-            getDataLine(is, line);
-            std::istringstream iss(line);
-            int newIdx; iss >> newIdx;
-            if (newIdx != ++idx) throw unsFmt;
-            iss >> nodes[i][0] >> nodes[i][1] >> nodes[i][2];
-            if (iss.fail()) throw badFmt;
-        }
+    if (!m_binary) return loadASCIINodesAndElements(is, nodes, elements, ei);
+
+    // Binary format
+    skipNewline(is);
+    int idx = 0;
+    for (size_t i = 0; i < numNodes; ++i) {
+        int newIdx;
+        is.read((char *) &newIdx, sizeof(int));
+        if (newIdx != ++idx) throw unsFmt;
+        double vdata[3];
+        is.read((char *) &vdata[0], sizeof(vdata));
+        if (is.fail()) throw badFmt;
+        nodes[i].set(vdata[0], vdata[1], vdata[2]);
     }
 
     getDataLine(is, line);
@@ -694,56 +866,32 @@ MeshType MeshIO_MSH::load(istream &is, vector<Vertex> &nodes,
 
     elements.resize(numElements);
 
-    if (m_binary) {
-        skipNewline(is);
-        size_t readElements = 0;
-        std::vector<int> data;
-        while (readElements < numElements) {
-            // [elm_type, num_elm_follow, num_tags]
-            int header[3];
-            is.read((char *) header, 3 * sizeof(int));
-
-            if (ei.elementType == -1) { ei = elementInfoForElementType(header[0]); }
-            if (header[0] != ei.elementType) throw badFmt;
-
-            size_t newSize = readElements + header[1];
-            if (newSize > numElements) throw badFmt;
-            int intCount = 1 + header[2] + ei.nodesPerElem;
-            data.resize(intCount);
-            for (size_t e = readElements; e < newSize; ++e) {
-                is.read((char *) &data[0], intCount * sizeof(int));
-                elements[e].resize(ei.nodesPerElem);
-                for (size_t c = 0; c < ei.nodesPerElem; ++c)
-                    elements[e][c] = data[1 + header[2] + c] - 1;
-            }
-
-            readElements += newSize;
-
-            if (!is) throw badFmt;
+    skipNewline(is);
+    size_t readElements = 0;
+    std::vector<int> data;
+    while (readElements < numElements) {
+        // [elm_type, num_elm_follow, num_tags]
+        int header[3];
+        is.read((char *) header, 3 * sizeof(int));
+
+        if (ei.elementType == -1) { ei = elementInfoForElementType(header[0]); }
+        if (header[0] != ei.elementType) throw badFmt;
+
+        size_t newSize = readElements + header[1];
+        if (newSize > numElements) throw badFmt;
+        int intCount = 1 + header[2] + ei.nodesPerElem;
+        data.resize(intCount);
+        for (size_t e = readElements; e < newSize; ++e) {
+            is.read((char *) &data[0], intCount * sizeof(int));
+            elements[e].resize(ei.nodesPerElem);
+            for (size_t c = 0; c < ei.nodesPerElem; ++c)
+                elements[e][c] = data[1 + header[2] + c] - 1;
         }
-    }
-    else {
-        for (size_t i = 0; i < numElements; ++i) {
-            getDataLine(is, line);
-            std::istringstream iss(line);
-            int idx; iss >> idx;
-            int etype;
-            size_t numTags;
-            iss >> etype >> numTags;
-            while (numTags-- > 0) { int dummy; iss >> dummy; }
 
-            if (ei.elementType == -1) { ei = elementInfoForElementType(etype); }
-            if (etype != ei.elementType) throw badFmt;
+        readElements += newSize;
 
-            elements[i].resize(ei.nodesPerElem);
-            for (size_t c = 0; c < ei.nodesPerElem; ++c) {
-                iss >> idx;
-                elements[i][c] = idx - 1;
-            }
-            if (iss.fail()) throw badFmt;
-        }
+        if (!is) throw badFmt;
     }
-
     getDataLine(is, line);
     if (line != "$EndElements") throw badFmt;
 
@@ -29,6 +29,7 @@
 namespace MeshIO {
     /** Supported file formats */
     typedef enum { FMT_OFF = 0, FMT_OBJ = 1, FMT_MSH = 2, FMT_MSH_ASCII = 3, FMT_POLY = 4, FMT_NODE_ELE = 5, FMT_MEDIT = 6, FMT_STL = 7,
+                   FMT_MFA = 8, FMT_MFA_COMPRESSED = 9,
                    FMT_GUESS = -1, FMT_INVALID = -1 } Format;
 
     typedef enum { MESH_TRI = 0, MESH_TET = 1, MESH_QUAD = 2, MESH_TRI_QUAD = 3, MESH_HEX = 4,
@@ -281,6 +282,24 @@ namespace MeshIO {
     };
 
 
+    // Mesh archive (see MeshArchive.hh); implemented in MeshArchive.cc
+    class MeshIO_MFA : public MeshIO {
+    public:
+        typedef IOVertex  Vertex;
+        typedef IOElement Element;
+
+        void save(std::ostream &os, const std::vector<Vertex> &nodes,
+                  const std::vector<Element> &elements, MeshType type);
+
+        MeshType load(std::istream &is, std::vector<Vertex> &nodes,
+                      std::vector<Element> &elements, MeshType type);
+
+        bool compressed() const { return m_compressed; }
+        void setCompressed(bool compressed) { m_compressed = compressed; }
+    private:
+        bool m_compressed = false;
+    };
+
     ////////////////////////////////////////////////////////////////////////////
     // Functions to query attributes of the different mesh types.
     ////////////////////////////////////////////////////////////////////////////
@@ -0,0 +1,311 @@
+#include "MeshReordering.hh"
+#include "StringUtils.hh"
+
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <limits>
+
+namespace {
+
+// Transform the coordinates X[0..n) of a point on a 2^b grid into the
+// "transposed" Hilbert index (whose bits, interleaved, give the distance
+// along the Hilbert curve).
+// J. Skilling, "Programming the Hilbert curve", AIP Conf. Proc. 707, 2004.
+void hilbertAxesToTranspose(uint32_t *X, int b, int n) {
+    const uint32_t M = uint32_t(1) << (b - 1);
+    // Inverse undo
+    for (uint32_t Q = M; Q > 1; Q >>= 1) {
+        const uint32_t P = Q - 1;
+        for (int i = 0; i < n; ++i) {
+            if (X[i] & Q) X[0] ^= P;
+            else {
+                const uint32_t t = (X[0] ^ X[i]) & P;
+                X[0] ^= t;
+                X[i] ^= t;
+            }
+        }
+    }
+    // Gray encode
+    for (int i = 1; i < n; ++i) X[i] ^= X[i - 1];
+    uint32_t t = 0;
+    for (uint32_t Q = M; Q > 1; Q >>= 1)
+        if (X[n - 1] & Q) t ^= Q - 1;
+    for (int i = 0; i < n; ++i) X[i] ^= t;
+}
+
+// Interleave the b low bits of X[0..n), most significant first.
+uint64_t interleaveBits(const uint32_t *X, int b, int n) {
+    uint64_t key = 0;
+    for (int bit = b - 1; bit >= 0; --bit)
+        for (int i = 0; i < n; ++i)
+            key = (key << 1) | ((X[i] >> bit) & 1);
+    return key;
+}
+
+// Space-filling curve keys of the element barycenters.
+std::vector<uint64_t> elementCurveKeys(const std::vector<MeshIO::IOVertex > &vertices,
+                                       const std::vector<MeshIO::IOElement> &elements,
+                                       bool hilbert) {
+    Point3D minCorner, maxCorner;
+    minCorner.setConstant( std::numeric_limits<Real>::max());
+    maxCorner.setConstant(-std::numeric_limits<Real>::max());
+    for (const auto &v : vertices) {
+        minCorner = minCorner.cwiseMin(v.point);
+        maxCorner = maxCorner.cwiseMax(v.point);
+    }
+
+    // Use a 2D curve for planar meshes to get the full key resolution.
+    const int n = (maxCorner[2] > minCorner[2]) ? 3 : 2;
+    const int b = (n == 3) ? 21 : 31;
+    const Real maxCoord = Real((uint64_t(1) << b) - 1);
+
+    std::vector<uint64_t> keys(elements.size());
+    for (size_t ei = 0; ei < elements.size(); ++ei) {
+        const auto &e = elements[ei];
+        Point3D c(Point3D::Zero());
+        for (size_t vi : e) c += vertices[vi].point;
+        if (!e.empty()) c /= Real(e.size());
+
+        uint32_t X[3];
+        for (int d = 0; d < n; ++d) {
+            const Real extent = maxCorner[d] - minCorner[d];
+            const Real t = (extent > 0) ? (c[d] - minCorner[d]) / extent : 0.0;
+            X[d] = uint32_t(std::round(std::min<Real>(std::max<Real>(t, 0.0), 1.0) * maxCoord));
+        }
+        if (hilbert) hilbertAxesToTranspose(X, b, n);
+        keys[ei] = interleaveBits(X, b, n);
+    }
+    return keys;
+}
+
+// Vertex adjacency graph in compressed sparse row form.
+void vertexAdjacency(size_t numVertices, const std::vector<MeshIO::IOElement> &elements,
+                     std::vector<size_t> &rowStart, std::vector<size_t> &adj) {
+    rowStart.assign(numVertices + 1, 0);
+    for (const auto &e : elements)
+        for (size_t vi : e) rowStart[vi + 1] += e.size() - 1;
+    for (size_t i = 0; i < numVertices; ++i) rowStart[i + 1] += rowStart[i];
+
+    adj.resize(rowStart.back());
+    std::vector<size_t> fill(rowStart.begin(), rowStart.end() - 1);
+    for (const auto &e : elements) {
+        for (size_t a : e)
+            for (size_t b : e)
+                if (a != b) adj[fill[a]++] = b;
+    }
+
+    // Remove duplicate neighbors (edges shared by several elements)
+    size_t out = 0;
+    for (size_t i = 0; i < numVertices; ++i) {
+        const size_t begin = rowStart[i], end = rowStart[i + 1];
+        std::sort(adj.begin() + begin, adj.begin() + end);
+        rowStart[i] = out;
+        for (size_t j = begin; j < end; ++j)
+            if ((j == begin) || (adj[j] != adj[j - 1])) adj[out++] = adj[j];
+    }
+    rowStart[numVertices] = out;
+    adj.resize(out);
+}
+
+// Reverse Cuthill-McKee ordering of the vertex adjacency graph: the
+// original index of each vertex of the reordered mesh.
+std::vector<size_t> reverseCuthillMcKee(size_t numVertices, const std::vector<MeshIO::IOElement> &elements) {
+    std::vector<size_t> rowStart, adj;
+    vertexAdjacency(numVertices, elements, rowStart, adj);
+    auto degree = [&](size_t v) { return rowStart[v + 1] - rowStart[v]; };
+    auto byDegree = [&](size_t a, size_t b) {
+        return (degree(a) != degree(b)) ? (degree(a) < degree(b)) : (a < b);
+    };
+
+    // Breadth first search from "start" over the vertices not yet numbered,
+    // returning the visited vertices (in BFS order) and their levels.
+    std::vector<bool> numbered(numVertices, false);
+    std::vector<int> level(numVertices, -1);
+    auto levelStructure = [&](size_t start, std::vector<size_t> &visited) {
+        visited.assign(1, start);
+        level[start] = 0;
+        for (size_t i = 0; i < visited.size(); ++i) {
+            const size_t u = visited[i];
+            for (size_t j = rowStart[u]; j < rowStart[u + 1]; ++j) {
+                const size_t w = adj[j];
+                if (numbered[w] || (level[w] >= 0)) continue;
+                level[w] = level[u] + 1;
+                visited.push_back(w);
+            }
+        }
+    };
+
+    std::vector<size_t> candidates(numVertices);
+    for (size_t i = 0; i < numVertices; ++i) candidates[i] = i;
+    std::sort(candidates.begin(), candidates.end(), byDegree);
+
+    std::vector<size_t> order, visited, neighbors;
+    order.reserve(numVertices);
+    for (size_t candidate : candidates) {
+        if (numbered[candidate]) continue;
+
+        // Find a pseudo-peripheral start vertex for this component
+        // (George-Liu): repeatedly restart from a minimum degree vertex in
+        // the last level while the eccentricity increases.
+        size_t start = candidate;
+        levelStructure(start, visited);
+        int eccentricity = level[visited.back()];
+        while (true) {
+            size_t next = visited.back();
+            for (auto it = visited.rbegin(); (it != visited.rend()) && (level[*it] == eccentricity); ++it)
+                if (byDegree(*it, next)) next = *it;
+            for (size_t v : visited) level[v] = -1;
+            levelStructure(next, visited);
+            const int nextEccentricity = level[visited.back()];
+            if (nextEccentricity <= eccentricity) {
+                for (size_t v : visited) level[v] = -1;
+                break;
+            }
+            start = next;
+            eccentricity = nextEccentricity;
+        }
+
+        // Cuthill-McKee: number the vertices in BFS order, visiting each
+        // vertex's unnumbered neighbors by increasing degree.
+        const size_t componentStart = order.size();
+        numbered[start] = true;
+        order.push_back(start);
+        for (size_t i = componentStart; i < order.size(); ++i) {
+            const size_t u = order[i];
+            neighbors.clear();
+            for (size_t j = rowStart[u]; j < rowStart[u + 1]; ++j) {
+                if (numbered[adj[j]]) continue;
+                numbered[adj[j]] = true;
+                neighbors.push_back(adj[j]);
+            }
+            std::sort(neighbors.begin(), neighbors.end(), byDegree);
+            order.insert(order.end(), neighbors.begin(), neighbors.end());
+        }
+    }
+
+    std::reverse(order.begin(), order.end());
+    return order;
+}
+
+std::vector<size_t> inversePermutation(const std::vector<size_t> &p) {
+    std::vector<size_t> inv(p.size());
+    for (size_t i = 0; i < p.size(); ++i) inv[p[i]] = i;
+    return inv;
+}
+
+}
+
+MeshOrdering parseMeshOrdering(const std::string &name) {
+    const std::string n = MeshFEM::lowercase(name);
+    if ((n == "none") || n.empty()) return MeshOrdering::None;
+    if (n == "morton")              return MeshOrdering::Morton;
+    if (n == "hilbert")             return MeshOrdering::Hilbert;
+    if (n == "rcm")                 return MeshOrdering::RCM;
+    throw std::runtime_error("Unknown mesh ordering '" + name + "' (expected none, morton, hilbert or rcm)");
+}
+
+std::string meshOrderingName(MeshOrdering ordering) {
+    switch (ordering) {
+        case MeshOrdering::None:    return "none";
+        case MeshOrdering::Morton:  return "morton";
+        case MeshOrdering::Hilbert: return "hilbert";
+        case MeshOrdering::RCM:     return "rcm";
+    }
+    throw std::runtime_error("Invalid mesh ordering");
+}
+
+MeshPermutation computeMeshOrdering(const std::vector<MeshIO::IOVertex > &vertices,
+                                    const std::vector<MeshIO::IOElement> &elements,
+                                    MeshOrdering ordering) {
+    MeshPermutation perm;
+    if (ordering == MeshOrdering::None) return perm;
+
+    const size_t nv = vertices.size(), ne = elements.size();
+    for (const auto &e : elements) {
+        for (size_t vi : e)
+            if (vi >= nv) throw std::runtime_error("Bad vertex index encountered.");
+    }
+
+    if ((ordering == MeshOrdering::Morton) || (ordering == MeshOrdering::Hilbert)) {
+        const std::vector<uint64_t> keys = elementCurveKeys(vertices, elements, ordering == MeshOrdering::Hilbert);
+        perm.originalElement.resize(ne);
+        for (size_t i = 0; i < ne; ++i) perm.originalElement[i] = i;
+        std::stable_sort(perm.originalElement.begin(), perm.originalElement.end(),
+                         [&](size_t a, size_t b) { return keys[a] < keys[b]; });
+
+        // Number the vertices in order of first reference by the sorted
+        // elements; unreferenced vertices keep their relative order at the end.
+        const size_t unassigned = std::numeric_limits<size_t>::max();
+        perm.vertex.assign(nv, unassigned);
+        perm.originalVertex.reserve(nv);
+        for (size_t ei : perm.originalElement) {
+            for (size_t vi : elements[ei]) {
+                if (perm.vertex[vi] != unassigned) continue;
+                perm.vertex[vi] = perm.originalVertex.size();
+                perm.originalVertex.push_back(vi);
+            }
+        }
+        for (size_t vi = 0; vi < nv; ++vi) {
+            if (perm.vertex[vi] != unassigned) continue;
+            perm.vertex[vi] = perm.originalVertex.size();
+            perm.originalVertex.push_back(vi);
+        }
+    }
+    else if (ordering == MeshOrdering::RCM) {
+        perm.originalVertex = reverseCuthillMcKee(nv, elements);
+        perm.vertex = inversePermutation(perm.originalVertex);
+
+        std::vector<size_t> minVertex(ne, std::numeric_limits<size_t>::max());
+        for (size_t ei = 0; ei < ne; ++ei)
+            for (size_t vi : elements[ei]) minVertex[ei] = std::min(minVertex[ei], perm.vertex[vi]);
+        perm.originalElement.resize(ne);
+        for (size_t i = 0; i < ne; ++i) perm.originalElement[i] = i;
+        std::stable_sort(perm.originalElement.begin(), perm.originalElement.end(),
+                         [&](size_t a, size_t b) { return minVertex[a] < minVertex[b]; });
+    }
+    else throw std::runtime_error("Invalid mesh ordering");
+
+    perm.element = inversePermutation(perm.originalElement);
+    return perm;
+}
+
+MeshPermutation meshPermutationFromOriginalIndices(std::vector<size_t> originalVertex,
+                                                   std::vector<size_t> originalElement) {
+    MeshPermutation perm;
+    if (originalVertex.empty() && originalElement.empty()) return perm;
+    auto checkPermutation = [](const std::vector<size_t> &p) {
+        std::vector<bool> seen(p.size(), false);
+        for (size_t i : p) {
+            if ((i >= p.size()) || seen[i]) throw std::runtime_error("Invalid permutation");
+            seen[i] = true;
+        }
+    };
+    checkPermutation(originalVertex);
+    checkPermutation(originalElement);
+    perm.originalVertex  = std::move(originalVertex);
+    perm.originalElement = std::move(originalElement);
+    perm.vertex  = inversePermutation(perm.originalVertex);
+    perm.element = inversePermutation(perm.originalElement);
+    return perm;
+}
+
+void applyMeshPermutation(const MeshPermutation &perm,
+                          std::vector<MeshIO::IOVertex > &vertices,
+                          std::vector<MeshIO::IOElement> &elements) {
+    if (perm.isIdentity()) return;
+    if ((perm.originalVertex.size() != vertices.size()) || (perm.originalElement.size() != elements.size()))
+        throw std::runtime_error("Permutation size mismatch");
+
+    std::vector<MeshIO::IOVertex > newVertices;
+    std::vector<MeshIO::IOElement> newElements;
+    newVertices.reserve(vertices.size());
+    newElements.reserve(elements.size());
+    for (size_t vi : perm.originalVertex) newVertices.push_back(vertices[vi]);
+    for (size_t ei : perm.originalElement) {
+        newElements.push_back(elements[ei]);
+        for (size_t &vi : newElements.back()) vi = perm.vertex.at(vi);
+    }
+    vertices.swap(newVertices);
+    elements.swap(newElements);
+}
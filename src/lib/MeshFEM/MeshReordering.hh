@@ -0,0 +1,132 @@
+////////////////////////////////////////////////////////////////////////////////
+// MeshReordering.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Optional renumbering of a mesh's vertices and elements at construction
+//      time to improve the memory locality of element loops (assembly, stress
+//      evaluation) and the bandwidth/fill of the assembled sparse matrices.
+//
+//      Supported orderings:
+//          Morton, Hilbert: elements are sorted along a space-filling curve
+//              through their barycenters; vertices are then numbered in the
+//              order the sorted elements first reference them, so each
+//              element's vertices are close in memory.
+//          RCM: vertices are numbered by reverse Cuthill-McKee on the
+//              vertex adjacency graph (minimizing the matrix bandwidth);
+//              elements are then sorted by their smallest vertex index.
+//
+//      A MeshPermutation records the mapping between the reordered mesh and
+//      the caller's original numbering so that output (e.g., MSHFieldWriter)
+//      and user-facing vertex/element arrays can be presented in the
+//      original order.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef MESHREORDERING_HH
+#define MESHREORDERING_HH
+
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include <MeshFEM/MeshIO.hh>
+#include <MeshFEM/Utilities/ElementArrayAdaptor.hh>
+#include <MeshFEM/Utilities/VertexArrayAdaptor.hh>
+
+enum class MeshOrdering { None, Morton, Hilbert, RCM };
+
+// Parse "none", "morton", "hilbert" or "rcm" (case insensitive).
+MeshOrdering parseMeshOrdering(const std::string &name);
+std::string meshOrderingName(MeshOrdering ordering);
+
+struct MeshPermutation {
+    // Original index of each vertex/element of the reordered mesh.
+    std::vector<size_t> originalVertex, originalElement;
+    // Index in the reordered mesh of each original vertex/element.
+    std::vector<size_t> vertex, element;
+
+    // The default-constructed (empty) permutation is the identity.
+    bool isIdentity() const { return originalVertex.empty() && originalElement.empty(); }
+};
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Compute the renumbering of a mesh's vertices and elements for a given
+//  ordering (the identity permutation for MeshOrdering::None).
+*///////////////////////////////////////////////////////////////////////////////
+MeshPermutation computeMeshOrdering(const std::vector<MeshIO::IOVertex > &vertices,
+                                    const std::vector<MeshIO::IOElement> &elements,
+                                    MeshOrdering ordering);
+
+// Rebuild a permutation from its "originalVertex" and "originalElement"
+// arrays (e.g., when restoring a serialized mesh); empty arrays denote the
+// identity.
+MeshPermutation meshPermutationFromOriginalIndices(std::vector<size_t> originalVertex,
+                                                   std::vector<size_t> originalElement);
+
+// Renumber vertices and elements (in place) according to perm.
+void applyMeshPermutation(const MeshPermutation &perm,
+                          std::vector<MeshIO::IOVertex > &vertices,
+                          std::vector<MeshIO::IOElement> &elements);
+
+// Vertex/element arrays of a mesh in reordered numbering.
+struct ReorderedMesh {
+    std::vector<MeshIO::IOVertex > vertices;
+    std::vector<MeshIO::IOElement> elements;
+    MeshPermutation permutation;
+};
+
+// Convert any element/vertex array supported by ElementArrayAdaptor and
+// VertexArrayAdaptor and reorder it.
+template<class Elements, class Vertices>
+ReorderedMesh reorderMesh(const Elements &elems, const Vertices &vertices, MeshOrdering ordering) {
+    using EAA = ElementArrayAdaptor<Elements>;
+    using VAA = VertexArrayAdaptor<Vertices>;
+    ReorderedMesh result;
+    const size_t nv = VAA::numVertices(vertices);
+    result.vertices.reserve(nv);
+    for (size_t i = 0; i < nv; ++i)
+        result.vertices.emplace_back(padTo3D(VAA::get(vertices, i)));
+
+    const size_t ne = EAA::numElements(elems);
+    result.elements.reserve(ne);
+    for (size_t ei = 0; ei < ne; ++ei) {
+        const size_t es = EAA::elementSize(elems, ei);
+        result.elements.emplace_back(es);
+        for (size_t c = 0; c < es; ++c)
+            result.elements.back()[c] = EAA::get(elems, ei, c);
+    }
+
+    result.permutation = computeMeshOrdering(result.vertices, result.elements, ordering);
+    applyMeshPermutation(result.permutation, result.vertices, result.elements);
+    return result;
+}
+
+// The permutation of a mesh data structure, or nullptr for mesh types that
+// don't support reordering.
+namespace detail {
+    template<class Mesh>
+    auto meshPermutation(const Mesh &mesh, int) -> decltype(&mesh.permutation()) { return &mesh.permutation(); }
+    template<class Mesh>
+    const MeshPermutation *meshPermutation(const Mesh &, long) { return nullptr; }
+}
+template<class Mesh>
+const MeshPermutation *getMeshPermutation(const Mesh &mesh) { return detail::meshPermutation(mesh, 0); }
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Copy of a per-entity field (anything with domainSize() and operator()(i),
+//  e.g., ScalarField/VectorField) with entries i < index.size() replaced by
+//  f(index[i]); the remaining entries (e.g., edge nodes, which are never
+//  renumbered) are copied unchanged.
+//  Use the permutation's "originalVertex"/"originalElement" to bring a field
+//  given in original order into mesh order and "vertex"/"element" for the
+//  reverse.
+*///////////////////////////////////////////////////////////////////////////////
+template<class Field>
+Field permuteFieldEntries(const Field &f, const std::vector<size_t> &index) {
+    Field result(f);
+    if (index.size() > f.domainSize()) throw std::runtime_error("Field too small for permutation");
+    for (size_t i = 0; i < index.size(); ++i)
+        result(i) = f(index[i]);
+    return result;
+}
+
+#endif /* end of include guard: MESHREORDERING_HH */
@@ -27,6 +27,40 @@
 namespace PeriodicHomogenization {
 namespace Orthotropic {
 
+////////////////////////////////////////////////////////////////////////////
+/*! Configure sim for the orthotropic base cell problems: remove the periodic
+//  and pin constraints, and mark the boundary elements on the base cell's
+//  faces (the reflection planes) as internal. solveCellProblems calls this;
+//  it's also needed to evaluate loads on sim without solving.
+//  @return     Cell face membership of each boundary node.
+*///////////////////////////////////////////////////////////////////////////
+template<class _Sim>
+std::vector<PeriodicBoundaryMatcher::FaceMembership<_Sim::N>>
+prepareSimulator(_Sim &sim, Real cellEpsilon = 1e-7) {
+    // Orthotropic homogenization doesn't need periodicity/NRM constraints
+    // (Instead particular vars on the symmetry planes will be fixed at zero)
+    sim.removePeriodicConditions();
+    sim.removeNoRigidMotionConstraint();
+
+    const auto &mesh = sim.mesh();
+    const auto &cell = mesh.boundingBox();
+
+    using FM = PeriodicBoundaryMatcher::FaceMembership<_Sim::N>;
+    std::vector<FM> nodeFaceMemberships;
+    nodeFaceMemberships.reserve(mesh.numBoundaryNodes());
+    for (auto bn : mesh.boundaryNodes())
+        nodeFaceMemberships.emplace_back(bn.volumeNode()->p, cell, cellEpsilon);
+
+    // Manually determine the internal faces (those on the orthotropic base cell faces).
+    // These are analogous to the periodic boundary elements in the triply
+    // periodic base cell case.
+    auto isInternalBE = PeriodicBoundaryMatcher::determineCellFaceBoundaryElements(mesh, nodeFaceMemberships);
+    for (auto be : sim.mesh().boundaryElements())
+        be->isInternal = isInternalBE.at(be.index());
+
+    return nodeFaceMemberships;
+}
+
 ////////////////////////////////////////////////////////////////////////////
 /*! Solve the linear elasticity periodic homogenization cell problems for
 //  each constant strain e^ij:
@@ -46,10 +80,7 @@ solveCellProblems(std::vector<typename _Sim::VField> &w_ij, _Sim &sim,
                   Real cellEpsilon = 1e-7) {
     constexpr size_t N = _Sim::N;
 
-    // Orthotropic homogenization doesn't need periodicity/NRM constraints
-    // (Instead particular vars on the symmetry planes will be fixed at zero)
-    sim.removePeriodicConditions();
-    sim.removeNoRigidMotionConstraint();
+    const auto nodeFaceMemberships = prepareSimulator(sim, cellEpsilon);
 
     typename _Sim::TMatrix K, C;
     std::vector<Real> constraintRHS, fixedVarValues;
@@ -65,20 +96,6 @@ solveCellProblems(std::vector<typename _Sim::VField> &w_ij, _Sim &sim,
     std::vector<std::unique_ptr<SPSDSystem<Real>>> probeSystems;
 
     const auto &mesh = sim.mesh();
-    const auto &cell = mesh.boundingBox();
-
-    using FM = PeriodicBoundaryMatcher::FaceMembership<_Sim::N>;
-    std::vector<FM> nodeFaceMemberships;
-    nodeFaceMemberships.reserve(mesh.numBoundaryNodes());
-    for (auto bn : mesh.boundaryNodes())
-        nodeFaceMemberships.emplace_back(bn.volumeNode()->p, cell, cellEpsilon);
-
-    // Manually determine the internal faces (those on the orthotropic base cell faces).
-    // These are analogous to the periodic boundary elements in the triply
-    // periodic base cell case.
-    auto isInternalBE = PeriodicBoundaryMatcher::determineCellFaceBoundaryElements(mesh, nodeFaceMemberships);
-    for (auto be : sim.mesh().boundaryElements())
-        be->isInternal = isInternalBE.at(be.index());
 
     // Stretching probe:
     // w^ii(x)_c = 0 on reflection plane c (plane with normal e_c)
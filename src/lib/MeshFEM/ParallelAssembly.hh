@@ -130,6 +130,12 @@ void assemble_parallel(const PerElemAssembler &assembler, CSCMatrix<SuiteSparse_
 #else
 
 // Fallback to serial assembly.
+template<typename PerElemAssembler, class Derived>
+void assemble_parallel(const PerElemAssembler &assembler, Eigen::MatrixBase<Derived> &A, const size_t numElems) {
+    for (size_t ei = 0; ei < numElems; ++ei)
+        assembler(ei, A.derived());
+}
+
 template<typename PerElemAssembler, typename Real_>
 void assemble_parallel(const PerElemAssembler &assembler, CSCMatrix<SuiteSparse_long, Real_> &H, const size_t numElems) {
     for (size_t ei = 0; ei < numElems; ++ei)
@@ -13,15 +13,21 @@
 #define PERIODICBOUNDARYMATCHER_HH
 
 #include <vector>
+#include <array>
 #include <bitset>
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
 #include <limits>
 #include <stdexcept>
 #include <iostream>
+#include <map>
 #include <sstream>
 #include <queue>
 
 #include <MeshFEM/CollisionGrid.hh>
 #include <MeshFEM/Geometry.hh>
+#include <MeshFEM/Parallelism.hh>
 
 namespace PeriodicBoundaryMatcher {
 
@@ -145,9 +151,16 @@ determineCellFaceBoundaryElements(const _FEMMesh &mesh, const std::vector<FaceMe
     return isOnCellFace;
 }
 
+////////////////////////////////////////////////////////////////////////////////
+// Reference matchers based on CollisionGrid
+////////////////////////////////////////////////////////////////////////////////
+// These were the original implementations of match/matchPermittingMismatch.
+// They are kept to validate and benchmark the sort-based matchers below
+// (see tools/benchmark_periodic_matching).
+
 // Determine the periodic cell nodes that are identified with each other.
 template<size_t N, class PointCollection>
-void match(const PointCollection &bdryPoints,
+void matchCollisionGrid(const PointCollection &bdryPoints,
         const BBox<VectorND<int(N)>> &cell,
         const std::vector<FaceMembership<N>> &faceMembership,
         std::vector<std::vector<size_t>>     &nodeSets,
@@ -266,7 +279,7 @@ void match(const PointCollection &bdryPoints,
 // over minimal face nodes and identify them with every matched node as this
 // will miss possible pairings not involving the minimal face nodes.
 template<size_t N, class PointCollection>
-void matchPermittingMismatch(const PointCollection &bdryPoints,
+void matchPermittingMismatchCollisionGrid(const PointCollection &bdryPoints,
         const BBox<VectorND<int(N)>> &cell,
         const std::vector<FaceMembership<N>> &faceMembership,
         std::vector<std::vector<size_t>>     &nodeSets,
@@ -372,6 +385,274 @@ void matchPermittingMismatch(const PointCollection &bdryPoints,
         std::cerr << "WARNING: detected " << numMismatches << " mismatches in periodic node identification" << std::endl;
 }
 
+
+////////////////////////////////////////////////////////////////////////////////
+// Sort-based matching of opposite cell faces
+////////////////////////////////////////////////////////////////////////////////
+// The nodes on the min face for direction d are keyed by their coordinates
+// tangent to that face, quantized to a grid of spacing epsilon, and sorted
+// lexicographically. Each max face node is projected onto the min face and
+// matched with the closest min face node within epsilon by binary searching
+// the (at most 3^(N - 1)) quantized cells overlapping the query ball. This
+// costs O(n log n) per face pair instead of the tree lookups per query cell
+// done by CollisionGrid, and the face pairs/queries are processed in parallel.
+
+// For each node on the max face for direction d, the min face node it is
+// identified with (NONE for nodes not on the max face and unmatched nodes).
+template<size_t N>
+std::vector<size_t> matchOppositeFaces(const std::vector<VectorND<N>> &pts,
+        const BBox<VectorND<int(N)>> &cell,
+        const std::vector<FaceMembership<N>> &faceMembership,
+        size_t d, Real epsilon = 1e-7)
+{
+    using Key = std::array<int64_t, N>;
+    // Quantize with 64-bit integers so that the cell size can be as small as
+    // epsilon without overflowing for any reasonable cell size.
+    const Real h = std::max<Real>(epsilon, 1e-12);
+    auto quantize = [h](Real x) { return int64_t(std::floor(x / h)); };
+
+    std::vector<std::pair<Key, size_t>> minFace;
+    std::vector<size_t> maxFace;
+    for (size_t i = 0; i < pts.size(); ++i) {
+        if (faceMembership[i].onMinFace(d)) {
+            Key k;
+            for (size_t c = 0; c < N; ++c) k[c] = (c == d) ? 0 : quantize(pts[i][c]);
+            minFace.emplace_back(k, i);
+        }
+        if (faceMembership[i].onMaxFace(d)) maxFace.push_back(i);
+    }
+    std::sort(minFace.begin(), minFace.end());
+
+    auto keyLess = [](const std::pair<Key, size_t> &a, const std::pair<Key, size_t> &b) { return a.first < b.first; };
+
+    std::vector<size_t> result(pts.size(), NONE);
+    auto matchNode = [&](size_t i) {
+        VectorND<N> query(pts[i]);
+        query[d] = cell.minCorner[d];
+        Key lo, hi;
+        for (size_t c = 0; c < N; ++c) {
+            lo[c] = (c == d) ? 0 : quantize(query[c] - epsilon);
+            hi[c] = (c == d) ? 0 : quantize(query[c] + epsilon);
+        }
+
+        Real closestDist = epsilon;
+        size_t closest = NONE;
+        std::pair<Key, size_t> k(lo, 0);
+        while (true) {
+            auto range = std::equal_range(minFace.begin(), minFace.end(), k, keyLess);
+            for (auto it = range.first; it != range.second; ++it) {
+                Real dist = (query - pts[it->second]).norm();
+                if (dist <= closestDist) {
+                    closestDist = dist;
+                    closest = it->second;
+                }
+            }
+            // Advance to the next quantized cell in the query's range.
+            size_t c = 0;
+            for (; c < N; ++c) {
+                if (k.first[c] < hi[c]) { ++k.first[c]; break; }
+                k.first[c] = lo[c];
+            }
+            if (c == N) break;
+        }
+        result[i] = closest;
+    };
+
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, maxFace.size()),
+        [&](const tbb::blocked_range<size_t> &r) {
+            for (size_t j = r.begin(); j < r.end(); ++j) matchNode(maxFace[j]);
+        });
+#else
+    for (size_t i : maxFace) matchNode(i);
+#endif
+
+    return result;
+}
+
+// Pair the nodes on opposite faces for every direction: pair[i][d] is the node
+// identified with node i across direction d, or NONE if i is not on a face
+// for direction d or has no match.
+template<size_t N>
+std::vector<std::array<size_t, N>> pairOppositeFaceNodes(const std::vector<VectorND<N>> &pts,
+        const BBox<VectorND<int(N)>> &cell,
+        const std::vector<FaceMembership<N>> &faceMembership,
+        Real epsilon = 1e-7)
+{
+    assert(faceMembership.size() == pts.size());
+    std::array<std::vector<size_t>, N> maxToMin;
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(size_t(0), N, [&](size_t d) { maxToMin[d] = matchOppositeFaces<N>(pts, cell, faceMembership, d, epsilon); });
+#else
+    for (size_t d = 0; d < N; ++d) maxToMin[d] = matchOppositeFaces<N>(pts, cell, faceMembership, d, epsilon);
+#endif
+
+    std::array<size_t, N> unpaired;
+    unpaired.fill(NONE);
+    std::vector<std::array<size_t, N>> pair(pts.size(), unpaired);
+    for (size_t d = 0; d < N; ++d) {
+        for (size_t i = 0; i < pts.size(); ++i) {
+            const size_t pi = maxToMin[d][i];
+            if (pi == NONE) continue;
+            size_t &ip = pair[ i][d],
+                   &pp = pair[pi][d];
+            if ((ip != NONE) || (pp != NONE))
+                throw std::runtime_error("Non-bijective boundary matching");
+            ip = pi;
+            pp =  i;
+        }
+    }
+    return pair;
+}
+
+template<size_t N, class PointCollection>
+std::vector<VectorND<N>> gatherPoints(const PointCollection &points) {
+    std::vector<VectorND<N>> result;
+    result.reserve(points.size());
+    for (const auto &p : points) result.emplace_back(p);
+    return result;
+}
+
+// Determine the periodic cell nodes that are identified with each other.
+// For each "minimal" node (in only min faces), a node set is created holding
+// the 2^d nodes identified with it, where d is the number of periodic faces
+// it lies on: entry n of the set is reached by crossing the cell in the
+// directions of the set bits of n (ordered like the node's min faces).
+template<size_t N, class PointCollection>
+void match(const PointCollection &bdryPoints,
+        const BBox<VectorND<int(N)>> &cell,
+        const std::vector<FaceMembership<N>> &faceMembership,
+        std::vector<std::vector<size_t>>     &nodeSets,
+        std::vector<size_t>                  &nodeSetForNode,
+        Real epsilon = 1e-7)
+{
+    assert(faceMembership.size() == bdryPoints.size());
+    const auto pts = gatherPoints<N>(bdryPoints);
+    const auto pair = pairOppositeFaceNodes<N>(pts, cell, faceMembership, epsilon);
+
+    nodeSetForNode.assign(pts.size(), NONE);
+
+    size_t numNodesets = 0;
+    for (size_t i = 0; i < pts.size(); ++i)
+        numNodesets += faceMembership[i].isMinimalNode();
+    nodeSets.clear(), nodeSets.reserve(numNodesets);
+
+    for (size_t i = 0; i < pts.size(); ++i) {
+        const auto &fm = faceMembership[i];
+        if (!fm.isMinimalNode()) continue;
+        assert(nodeSetForNode[i] == NONE);
+        nodeSetForNode[i] = nodeSets.size();
+
+        std::array<size_t, N> periodicDims;
+        size_t numPeriodicFaces = 0;
+        for (size_t d = 0; d < N; ++d)
+            if (fm.onMinFace(d)) periodicDims[numPeriodicFaces++] = d;
+        size_t numIdentifiedNodes = 1 << numPeriodicFaces;
+        nodeSets.push_back(std::vector<size_t>(numIdentifiedNodes, NONE));
+
+        auto &ns = nodeSets.back();
+        ns[0] = i;
+
+        for (size_t n = 1; n < numIdentifiedNodes; ++n) {
+            // Node n differs from node n - (lowest set bit) by one crossing.
+            size_t idx = 0;
+            while (!(n & (1 << idx))) ++idx;
+            const size_t prev = ns[n & (n - 1)];
+            const size_t pair_n = pair[prev][periodicDims[idx]];
+            if (pair_n == NONE) {
+                VectorND<N> query(pts[i]);
+                for (size_t b = 0; b < numPeriodicFaces; ++b)
+                    if (n & (1 << b)) query[periodicDims[b]] = cell.maxCorner[periodicDims[b]];
+
+                std::stringstream ss;
+                ss << "Couldn't find " << n << "th periodic-identified node "
+                   << "for minimal boundary node " << i << " at " << pts[i].transpose()
+                   << "; looking for " << query.transpose() << std::endl;
+
+                double closestDist = std::numeric_limits<double>::max();
+                VectorND<N> closestPt = pts.front();
+                for (const auto &pp : pts) {
+                    double dist = (query - pp).norm();
+                    if (dist < closestDist) {
+                        closestPt = pp;
+                        closestDist = dist;
+                    }
+                }
+
+                ss << "Closest candidate at distance " << closestDist << ":\t";
+                ss << closestPt.transpose() << std::endl;
+
+                throw std::runtime_error(ss.str());
+            }
+            assert(faceMembership[pair_n].count() == numPeriodicFaces);
+            if (nodeSetForNode[pair_n] != NONE)
+                throw std::runtime_error("Non bijective node set assignment.");
+            nodeSetForNode[pair_n] = nodeSetForNode[i];
+            ns[n] = pair_n;
+        }
+    }
+
+    // Make sure every node is in a set.
+    for (size_t i = 0; i < pts.size(); ++i) {
+        if (nodeSetForNode[i] == NONE) {
+            std::stringstream ss;
+            ss << "Unmatched non-minimal boundary node " << i
+               << " at " << pts[i].transpose() << std::endl;
+            throw std::runtime_error(ss.str());
+        }
+    }
+}
+
+// Determine the periodic cell nodes that are identified with each other. This
+// version permits mismatches, which can make sense for regular voxel grid
+// meshes: nodes are paired across each face pair independently, and each
+// connected component of the resulting pairing graph forms a node set.
+template<size_t N, class PointCollection>
+void matchPermittingMismatch(const PointCollection &bdryPoints,
+        const BBox<VectorND<int(N)>> &cell,
+        const std::vector<FaceMembership<N>> &faceMembership,
+        std::vector<std::vector<size_t>>     &nodeSets,
+        std::vector<size_t>                  &nodeSetForNode,
+        Real epsilon = 1e-7)
+{
+    assert(bdryPoints.size() == faceMembership.size());
+    const auto pts = gatherPoints<N>(bdryPoints);
+    const size_t numBdryPts = pts.size();
+    const auto pair = pairOppositeFaceNodes<N>(pts, cell, faceMembership, epsilon);
+
+    std::queue<size_t> bfsQueue;
+    nodeSetForNode.assign(numBdryPts, NONE);
+    nodeSets.clear();
+    size_t numMismatches = 0;
+    for (size_t i = 0; i < numBdryPts; ++i) {
+        if (nodeSetForNode[i] != NONE) continue; // visited?
+        const size_t nsi = nodeSets.size();
+        nodeSetForNode[i] = nsi;
+        nodeSets.emplace_back(1, i);
+        auto &ns = nodeSets.back();
+
+        bfsQueue.push(i);
+        while (!bfsQueue.empty()) {
+            size_t u = bfsQueue.front();
+            bfsQueue.pop();
+
+            for (size_t d = 0; d < N; ++d) {
+                if (!faceMembership[u].onMinOrMaxFace(d)) continue;
+                size_t v = pair[u][d];
+                if (v == NONE) { ++numMismatches; continue; }
+                size_t &nsv = nodeSetForNode[v];
+                if (nsv != NONE) { assert(nsv == nsi); continue; }
+                nsv = nsi;
+                ns.push_back(v);
+                bfsQueue.push(v);
+            }
+        }
+    }
+
+    if (numMismatches > 0)
+        std::cerr << "WARNING: detected " << numMismatches << " mismatches in periodic node identification" << std::endl;
+}
+
 }
 
 #endif /* end of include guard: PERIODICBOUNDARYMATCHER_HH */
@@ -11,6 +11,7 @@
 
 #include <MeshFEM/ElasticityTensor.hh>
 #include <MeshFEM/Parallelism.hh>
+#include <MeshFEM/ParallelAssembly.hh>
 
 // #define FD_SD_DEBUG
 #ifdef FD_SD_DEBUG
@@ -19,6 +20,32 @@
 
 namespace PeriodicHomogenization {
 
+////////////////////////////////////////////////////////////////////////////
+/*! Re-solve the cell problems on a simulator already set up by
+//  solveCellProblems (e.g., after its node positions or materials changed
+//  without changing the periodic cell). The periodic and pin constraints are
+//  kept, so with a cached stiffness pattern
+//  (sim.setCacheStiffnessPattern(true)) only the numeric factorization is
+//  redone.
+//  @param[out]   w_ij   Fluctuation displacements (cell problem solutions)
+//  @param[inout] sim    Linear elasticity simulator for omega.
+*///////////////////////////////////////////////////////////////////////////
+template<class _Sim>
+void resolveCellProblems(std::vector<typename _Sim::VField> &w_ij, _Sim &sim) {
+    typedef typename _Sim::VField  VField;
+    typedef typename _Sim::SMatrix SMatrix;
+    constexpr size_t numStrains = SMatrix::flatSize();
+
+    // Solve all cell problems with a single block backsubstitution.
+    std::vector<VField> rhs;
+    rhs.reserve(numStrains);
+    BENCHMARK_START_TIMER("Constant Strain Load");
+    for (size_t i = 0; i < numStrains; ++i)
+        rhs.emplace_back(sim.constantStrainLoad(-SMatrix::CanonicalBasis(i)));
+    BENCHMARK_STOP_TIMER("Constant Strain Load");
+    w_ij = sim.solve(rhs);
+}
+
 ////////////////////////////////////////////////////////////////////////////
 /*! Solve the linear elasticity periodic homogenization cell problems for
 //  each constant strain e^ij:
@@ -36,21 +63,10 @@ void solveCellProblems(std::vector<typename _Sim::VField> &w_ij, _Sim &sim,
                        Real cellEpsilon = 1e-7,
                        bool ignorePeriodicMismatch = false,
                        std::unique_ptr<PeriodicCondition<_Sim::N>> pc = nullptr) {
-    typedef typename _Sim::VField  VField;
-    typedef typename _Sim::SMatrix SMatrix;
-    constexpr size_t numStrains = SMatrix::flatSize();
-
     sim.applyPeriodicConditions(cellEpsilon, ignorePeriodicMismatch, std::move(pc));
     sim.applyNoRigidMotionConstraint();
     sim.setUsePinNoRigidTranslationConstraint(true);
-
-    w_ij.reserve(numStrains), w_ij.clear();
-    for (size_t i = 0; i < numStrains; ++i) {
-        BENCHMARK_START_TIMER("Constant Strain Load");
-        VField rhs(sim.constantStrainLoad(-SMatrix::CanonicalBasis(i)));
-        BENCHMARK_STOP_TIMER("Constant Strain Load");
-        w_ij.push_back(sim.solve(rhs));
-    }
+    resolveCellProblems(w_ij, sim);
 }
 
 template<class _Sim>
@@ -81,20 +97,27 @@ typename _Sim::ETensor homogenizedElasticityTensor(
     (void) (numStrains);
     assert(w_ij.size() == numStrains);
 
+    BENCHMARK_SCOPED_TIMER_SECTION timer("Homogenized Tensor");
+    using DType = typename _Sim::ETensor::DType;
+    DType EhD(DType::Zero());
+    assemble_parallel([&](size_t ei, DType &A) {
+            auto e = mesh.element(ei);
+            typename _Sim::ETensor Econtrib;
+            typename _Sim::Strain  strain_ij;
+            for (size_t i = 0; i < w_ij.size(); ++i) {
+                sim.elementStrain(ei, w_ij[i], strain_ij);
+                Econtrib.DRowAsSymMatrix(i) =
+                    e->E().doubleContract(strain_ij.average());
+            }
+            // Elasticity tensor is always constant on each element.
+            Econtrib += e->E();
+            Econtrib *= e->volume();
+            for (size_t i = 0; i < w_ij.size(); ++i)
+                A.row(i) += Econtrib.DRow(i);
+        }, EhD, mesh.numElements());
+
     typename _Sim::ETensor Eh;
-    typename _Sim::Strain  strain_ij;
-    for (auto e : mesh.elements()) {
-        typename _Sim::ETensor Econtrib;
-        for (size_t i = 0; i < w_ij.size(); ++i) {
-            sim.elementStrain(e.index(), w_ij[i], strain_ij);
-            Econtrib.DRowAsSymMatrix(i) =
-                e->E().doubleContract(strain_ij.average());
-        }
-        // Elasticity tensor is always constant on each element.
-        Econtrib += e->E();
-        Econtrib *= e->volume();
-        Eh += Econtrib;
-    }
+    for (size_t i = 0; i < numStrains; ++i) Eh.DRow(i) = EhD.row(i);
     Eh /= baseCellVolume;
 
     return Eh;
@@ -157,28 +180,33 @@ typename _Sim::ETensor homogenizedElasticityTensorDisplacementForm(
     // Assume elasticity tensor is constant over the entire base cell
     const typename _Sim::ETensor &EBase = mesh.element(0)->E();
 
-    typename _Sim::ETensor Eh;
-    SMatrix nw_pq;
-
-    // Displacement restricted to a boundary element
-    Interpolant<VectorND<_Sim::N>, _Sim::K - 1, _Sim::Degree> w_be;
-    for (auto be : mesh.boundaryElements()) {
-        typename _Sim::ETensor Econtrib;
-        const auto &n = be->normal();
-        for (size_t i = 0; i < w_ij.size(); ++i) {
-            const auto &w = w_ij[i];
-            // Copy the boundary node displacements into interpolant
-            for (size_t ni = 0; ni < w_be.size(); ++ni)
-                w_be[ni] = w(be.node(ni).volumeNode().index());
-            auto w_be_int = w_be.integrate(be->volume());
-
-            for (size_t p = 0; p < _Sim::N; ++p)
-                for (size_t q = p; q < _Sim::N; ++q)
-                    nw_pq(p, q) = 0.5 * (w_be_int[p] * n[q] + w_be_int[q] * n[p]);
-            Eh.DRowAsSymMatrix(i) += EBase.doubleContract(nw_pq);
-        }
-    }
+    BENCHMARK_SCOPED_TIMER_SECTION timer("Homogenized Tensor");
+    using DType = typename _Sim::ETensor::DType;
+    DType EhD(DType::Zero());
+    assemble_parallel([&](size_t bei, DType &A) {
+            auto be = mesh.boundaryElement(bei);
+            const auto &n = be->normal();
+            SMatrix nw_pq;
+            // Displacement restricted to a boundary element
+            Interpolant<VectorND<_Sim::N>, _Sim::K - 1, _Sim::Degree> w_be;
+            typename _Sim::ETensor Econtrib;
+            for (size_t i = 0; i < w_ij.size(); ++i) {
+                const auto &w = w_ij[i];
+                // Copy the boundary node displacements into interpolant
+                for (size_t ni = 0; ni < w_be.size(); ++ni)
+                    w_be[ni] = w(be.node(ni).volumeNode().index());
+                auto w_be_int = w_be.integrate(be->volume());
+
+                for (size_t p = 0; p < _Sim::N; ++p)
+                    for (size_t q = p; q < _Sim::N; ++q)
+                        nw_pq(p, q) = 0.5 * (w_be_int[p] * n[q] + w_be_int[q] * n[p]);
+                Econtrib.DRowAsSymMatrix(i) = EBase.doubleContract(nw_pq);
+                A.row(i) += Econtrib.DRow(i);
+            }
+        }, EhD, mesh.numBoundaryElements());
 
+    typename _Sim::ETensor Eh;
+    for (size_t i = 0; i < numStrains; ++i) Eh.DRow(i) = EhD.row(i);
     Eh += EBase * mesh.volume();
     Eh /= baseCellVolume;
 
@@ -197,14 +225,22 @@ std::vector<ElasticityTensor<Real, _Sim::N, false>>
 macroStrainToMicroStrainTensors(const std::vector<typename _Sim::VField> &w, const _Sim &sim) {
     size_t numElems = sim.mesh().numElements();
     std::vector<ElasticityTensor<Real, _Sim::N, false>> G(numElems);
-    typename _Sim::Strain  strain_ij;
-    for (size_t e = 0; e < numElems; ++e) {
+    auto elementTensor = [&](size_t e) {
+        typename _Sim::Strain  strain_ij;
         for (size_t ij = 0; ij < w.size(); ++ij) {
             sim.elementStrain(e, w[ij], strain_ij);
             G[e].DColAsSymMatrix(ij) = strain_ij.average();
             G[e].DColAsSymMatrix(ij) += _Sim::SMatrix::CanonicalBasis(ij);
         }
-    }
+    };
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, numElems),
+        [&](const tbb::blocked_range<size_t> &r) {
+            for (size_t e = r.begin(); e < r.end(); ++e) elementTensor(e);
+        });
+#else
+    for (size_t e = 0; e < numElems; ++e) elementTensor(e);
+#endif
     return G;
 }
 
@@ -534,14 +570,13 @@ deltaFluctuationDisplacements(const _Sim &sim,
     typedef typename _Sim::VField  VField;
     using SMatrix = typename _Sim::SMatrix;
 
-    std::vector<VField> delta_w;
-    delta_w.reserve(w.size());
+    std::vector<VField> rhs;
+    rhs.reserve(w.size());
     for (size_t ij = 0; ij < w.size(); ++ij) {
-        auto rhs = sim.deltaConstantStrainLoad(-SMatrix::CanonicalBasis(ij), delta_p);
-        rhs     -= sim.applyDeltaStiffnessMatrix(w[ij], delta_p);
-        delta_w.push_back(sim.solve(rhs));
+        rhs.push_back(sim.deltaConstantStrainLoad(-SMatrix::CanonicalBasis(ij), delta_p));
+        rhs.back() -= sim.applyDeltaStiffnessMatrix(w[ij], delta_p);
     }
-    return delta_w;
+    return sim.solve(rhs);
 }
 
 // Change in macro-to-micro strain tensors due to mesh vertex perturbations delta_p:
@@ -0,0 +1,309 @@
+////////////////////////////////////////////////////////////////////////////////
+// ShiftInvertEigensolver.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Computes the eigenpairs of the generalized symmetric eigenvalue problem
+//          H x = lambda M x
+//      closest to a shift sigma (e.g., the lowest vibrational modes of an
+//      elastic object). H - sigma M is factorized once with CHOLMOD and a
+//      Krylov-Schur (thick-restart Lanczos) iteration with full
+//      reorthogonalization is run on the shift-inverted operator
+//          OP = (H - sigma M)^{-1} M,
+//      which is self-adjoint in the M inner product and whose
+//      largest-magnitude eigenvalues theta = 1 / (lambda - sigma) correspond
+//      to the eigenvalues lambda closest to sigma.
+//
+//      The metric M can be the identity, a lumped (diagonal) mass matrix, or a
+//      full sparse mass matrix; fixed variables are removed from the problem
+//      (their entries of the computed modes are zero).
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef SHIFTINVERTEIGENSOLVER_HH
+#define SHIFTINVERTEIGENSOLVER_HH
+
+#include <vector>
+#include <random>
+#include <algorithm>
+#include <numeric>
+#include <limits>
+#include <stdexcept>
+#include <cmath>
+
+#include <Eigen/Dense>
+
+#include <MeshFEM/Types.hh>
+#include <MeshFEM/SparseMatrices.hh>
+#include <MeshFEM/GlobalBenchmark.hh>
+
+struct EigensolverOptions {
+    // Krylov subspace dimension (0: max(2 * nev + 1, 20))
+    size_t krylovDim = 0;
+    // Stop when every requested Ritz pair's residual is below tol * |theta|
+    Real tol = 1e-10;
+    size_t maxRestarts = 1000;
+};
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Krylov-Schur iteration for the nev largest-magnitude eigenpairs of an
+//  operator that is self-adjoint with respect to the inner product induced by
+//  the SPD matrix M.
+//  @param[in]  applyOP     applyOP(x, y) computes y = OP x
+//  @param[in]  applyM      applyM(x, y) computes y = M x
+//  @param[in]  n           problem size
+//  @param[in]  nev         number of eigenpairs to compute
+//  @param[out] theta       eigenvalues, sorted by decreasing magnitude
+//  @param[out] vecs        corresponding M-orthonormal eigenvectors
+//  @return     number of restarts performed
+*///////////////////////////////////////////////////////////////////////////////
+template<class OPApply, class MApply>
+size_t krylovSchurLargestMagnitude(const OPApply &applyOP, const MApply &applyM, size_t n, size_t nev,
+                                   Eigen::VectorXd &theta, Eigen::MatrixXd &vecs,
+                                   const EigensolverOptions &opts = EigensolverOptions()) {
+    using VXd = Eigen::VectorXd;
+    using MXd = Eigen::MatrixXd;
+    if ((nev == 0) || (nev > n)) throw std::runtime_error("Invalid number of eigenpairs requested");
+    const size_t p = std::min(n, (opts.krylovDim > 0) ? opts.krylovDim : std::max<size_t>(2 * nev + 1, 20));
+    if (p < nev) throw std::runtime_error("Krylov subspace dimension must be at least the number of eigenpairs requested");
+
+    MXd V(n, p + 1);               // M-orthonormal basis
+    MXd T = MXd::Zero(p + 1, p);   // OP V_m = V_{m + 1} T
+    VXd w, Mw, h;
+    std::mt19937 gen(0);
+    std::uniform_real_distribution<Real> dist(-1.0, 1.0);
+
+    // M-orthogonalize w against the first k basis vectors (twice, for
+    // stability), returning the coefficients removed, and M-normalize it.
+    // Returns the norm of the orthogonalized vector.
+    auto orthogonalize = [&](size_t k, VXd &coeffs) {
+        coeffs.setZero(k);
+        for (size_t pass = 0; pass < 2; ++pass) {
+            applyM(w, Mw);
+            VXd c = V.leftCols(k).transpose() * Mw;
+            w -= V.leftCols(k) * c;
+            coeffs += c;
+        }
+        applyM(w, Mw);
+        Real norm = std::sqrt(std::max<Real>(w.dot(Mw), 0.0));
+        if (norm > 0) w /= norm;
+        return norm;
+    };
+
+    // Random vector M-orthonormal to the first k basis vectors.
+    auto randomStart = [&](size_t k) {
+        VXd c;
+        for (size_t attempt = 0; attempt < 10; ++attempt) {
+            w = VXd::NullaryExpr(n, [&]() { return dist(gen); });
+            if (orthogonalize(k, c) > 1e-8) return;
+        }
+        throw std::runtime_error("Failed to generate a start vector");
+    };
+
+    // Start vector: a random vector filtered through OP to damp components
+    // outside its range.
+    {
+        VXd c, x = VXd::NullaryExpr(n, [&]() { return dist(gen); });
+        applyOP(x, w);
+        if (orthogonalize(0, c) <= 0) randomStart(0);
+        V.col(0) = w;
+    }
+
+    size_t k = 0; // number of vectors kept from the previous restart
+    Eigen::SelfAdjointEigenSolver<MXd> es;
+    std::vector<size_t> order;
+    for (size_t restart = 0; ; ++restart) {
+        // Expand the Krylov decomposition to dimension p.
+        for (size_t j = k; j < p; ++j) {
+            applyOP(V.col(j), w);
+            Real beta = orthogonalize(j + 1, h);
+            T.col(j).head(j + 1) = h;
+            if (beta <= 1e-12 * h.norm()) {
+                // Invariant subspace found; continue with a fresh direction.
+                if (j + 1 < n) randomStart(j + 1);
+                else           w.setZero();
+                beta = 0;
+            }
+            T(j + 1, j) = beta;
+            V.col(j + 1) = w;
+        }
+
+        // Rayleigh-Ritz
+        MXd S = T.topRows(p);
+        S = 0.5 * (S + S.transpose()).eval();
+        es.compute(S);
+        const VXd &ritzVals = es.eigenvalues();
+        order.resize(p);
+        std::iota(order.begin(), order.end(), 0);
+        std::sort(order.begin(), order.end(), [&](size_t a, size_t b) { return std::abs(ritzVals[a]) > std::abs(ritzVals[b]); });
+
+        MXd Y(p, p);
+        VXd sortedVals(p);
+        for (size_t i = 0; i < p; ++i) {
+            Y.col(i) = es.eigenvectors().col(order[i]);
+            sortedVals[i] = ritzVals[order[i]];
+        }
+
+        // Residual norm of Ritz pair i is |b^T y_i|, where b^T is the last row of T.
+        VXd residuals = (T.row(p) * Y).transpose().cwiseAbs();
+        size_t nconv = 0;
+        while ((nconv < nev) && (residuals[nconv] <= opts.tol * std::abs(sortedVals[nconv]))) ++nconv;
+
+        if ((nconv == nev) || (restart == opts.maxRestarts) || (p == n)) {
+            if (nconv < nev && p < n)
+                std::cerr << "WARNING: eigensolver did not converge in " << opts.maxRestarts << " restarts" << std::endl;
+            theta = sortedVals.head(nev);
+            vecs  = V.leftCols(p) * Y.leftCols(nev);
+            return restart;
+        }
+
+        // Thick restart: keep the most promising Ritz vectors.
+        k = std::min(p - 1, nev + std::max<size_t>(nconv, (p - nev) / 2));
+        VXd b = (T.row(p) * Y.leftCols(k)).transpose();
+        V.leftCols(k) = V.leftCols(p) * Y.leftCols(k);
+        V.col(k) = V.col(p);
+        T.setZero();
+        T.topLeftCorner(k, k).diagonal() = sortedVals.head(k);
+        T.row(k).head(k) = b.transpose();
+    }
+}
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Shift-invert eigensolver for H x = lambda M x using CHOLMOD.
+//  H and M are symmetric; only the entries in their upper triangles are read
+//  (so they may be stored either in full or as an upper triangle).
+*///////////////////////////////////////////////////////////////////////////////
+class ShiftInvertEigensolver {
+public:
+    using TMatrix = TripletMatrix<Triplet<Real>>;
+    enum class MetricType { IDENTITY, LUMPED, FULL };
+
+    ShiftInvertEigensolver(const TMatrix &H, const std::vector<size_t> &fixedVars = std::vector<size_t>())
+        : m_H(H)
+    {
+        if (H.m != H.n) throw std::runtime_error("H must be square");
+        m_reducedIdx.assign(H.n, 0);
+        for (size_t v : fixedVars) {
+            if (v >= H.n) throw std::runtime_error("Fixed variable index out of bounds");
+            m_reducedIdx[v] = NONE;
+        }
+        m_numReduced = 0;
+        for (size_t &ri : m_reducedIdx)
+            if (ri != NONE) ri = m_numReduced++;
+    }
+
+    ShiftInvertEigensolver(const SuiteSparseMatrix &H, const std::vector<size_t> &fixedVars = std::vector<size_t>())
+        : ShiftInvertEigensolver(H.getTripletMatrix(), fixedVars) { }
+
+    void setIdentityMassMatrix() { m_metric = MetricType::IDENTITY; }
+
+    // m: per-variable lumped masses (including the fixed variables)
+    void setLumpedMassMatrix(const Eigen::VectorXd &m) {
+        if (size_t(m.size()) != m_H.n) throw std::runtime_error("Lumped mass matrix size mismatch");
+        m_lumpedMass = m;
+        m_metric = MetricType::LUMPED;
+    }
+
+    void setMassMatrix(const TMatrix &M) {
+        if ((M.m != m_H.m) || (M.n != m_H.n)) throw std::runtime_error("Mass matrix size mismatch");
+        m_M = M;
+        m_metric = MetricType::FULL;
+    }
+    void setMassMatrix(const SuiteSparseMatrix &M) { setMassMatrix(M.getTripletMatrix()); }
+
+    MetricType metricType() const { return m_metric; }
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Compute the nev eigenpairs closest to sigma. H - sigma M must be
+    //  positive definite or at least factorizable by CHOLMOD's LDL^T (pick
+    //  sigma slightly below the lowest eigenvalue of interest).
+    //  @param[out] lambdas     eigenvalues in ascending order
+    //  @param[out] modes       corresponding M-orthonormal eigenvectors
+    //                          (full size; zero on the fixed variables)
+    *///////////////////////////////////////////////////////////////////////////
+    void compute(size_t nev, Real sigma, Eigen::VectorXd &lambdas, Eigen::MatrixXd &modes,
+                 const EigensolverOptions &opts = EigensolverOptions()) const {
+        BENCHMARK_SCOPED_TIMER_SECTION timer("Shift-Invert Eigensolve");
+        const size_t nr = m_numReduced;
+
+        // Reduced metric
+        SuiteSparseMatrix Mr;
+        TMatrix Mtrip;
+        Eigen::VectorXd mr;
+        if (m_metric == MetricType::FULL) {
+            Mtrip = m_reducedUpper(m_M);
+            Mtrip.symmetry_mode = TMatrix::SymmetryMode::UPPER_TRIANGLE;
+            Mr.setFromTMatrix(Mtrip);
+        }
+        else {
+            mr = Eigen::VectorXd::Ones(nr);
+            if (m_metric == MetricType::LUMPED) {
+                for (size_t i = 0; i < m_H.n; ++i)
+                    if (m_reducedIdx[i] != NONE) mr[m_reducedIdx[i]] = m_lumpedMass[i];
+            }
+        }
+
+        // Factorize H - sigma M
+        TMatrix A = m_reducedUpper(m_H);
+        if (m_metric == MetricType::FULL) {
+            A.reserve(A.nnz() + Mr.nnz());
+            for (const auto &t : Mtrip.nz) A.addNZ(t.i, t.j, -sigma * t.v);
+            Mtrip = TMatrix(); // Mr holds the metric from here on
+        }
+        else {
+            for (size_t i = 0; i < nr; ++i) A.addNZ(i, i, -sigma * mr[i]);
+        }
+        A.symmetry_mode = TMatrix::SymmetryMode::UPPER_TRIANGLE;
+        CholmodFactorizer factorizer(A);
+        factorizer.factorize();
+
+        auto applyM = [&](const Eigen::VectorXd &x, Eigen::VectorXd &y) {
+            if (m_metric == MetricType::FULL) { y.resize(nr); Mr.applyRaw(x.data(), y.data()); }
+            else y = mr.cwiseProduct(x);
+        };
+        Eigen::VectorXd Mx;
+        auto applyOP = [&](const Eigen::VectorXd &x, Eigen::VectorXd &y) {
+            applyM(x, Mx);
+            y.resize(nr);
+            factorizer.solveRawExistingFactorization(Mx.data(), y.data());
+        };
+
+        Eigen::VectorXd theta;
+        Eigen::MatrixXd vecs;
+        krylovSchurLargestMagnitude(applyOP, applyM, nr, nev, theta, vecs, opts);
+
+        // Recover lambda = sigma + 1 / theta, sorting in ascending order.
+        std::vector<size_t> order(nev);
+        std::iota(order.begin(), order.end(), 0);
+        std::sort(order.begin(), order.end(), [&](size_t a, size_t b) { return 1.0 / theta[a] < 1.0 / theta[b]; });
+        lambdas.resize(nev);
+        modes.setZero(m_H.n, nev);
+        for (size_t k = 0; k < nev; ++k) {
+            lambdas[k] = sigma + 1.0 / theta[order[k]];
+            for (size_t i = 0; i < m_H.n; ++i)
+                if (m_reducedIdx[i] != NONE) modes(i, k) = vecs(m_reducedIdx[i], order[k]);
+        }
+    }
+
+private:
+    static constexpr size_t NONE = std::numeric_limits<size_t>::max();
+
+    // Upper triangle of a symmetric matrix with the fixed variables removed.
+    TMatrix m_reducedUpper(const TMatrix &A) const {
+        TMatrix result(m_numReduced, m_numReduced);
+        result.reserve(A.nnz());
+        for (const auto &t : A.nz) {
+            if (t.i > t.j) continue;
+            const size_t i = m_reducedIdx[t.i], j = m_reducedIdx[t.j];
+            if ((i == NONE) || (j == NONE)) continue;
+            result.addNZ(i, j, t.v);
+        }
+        return result;
+    }
+
+    TMatrix m_H, m_M;
+    Eigen::VectorXd m_lumpedMass;
+    MetricType m_metric = MetricType::IDENTITY;
+    std::vector<size_t> m_reducedIdx;
+    size_t m_numReduced;
+};
+
+#endif /* end of include guard: SHIFTINVERTEIGENSOLVER_HH */
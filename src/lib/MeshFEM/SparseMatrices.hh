@@ -31,6 +31,7 @@
 
 #include <MeshFEM/Types.hh>
 #include <MeshFEM/GlobalBenchmark.hh>
+#include <MeshFEM/SymbolicFactorizationCache.hh>
 
 extern "C" {
 #include <umfpack.h>
@@ -120,6 +121,23 @@ struct TripletMatrix {
         nz.push_back(Triplet(i, j, v));
     }
 
+    // Append "count" triplets (I[k], J[k], V[k]) with the same semantics as
+    // calling addNZ on each. All indices are validated before the matrix is
+    // modified.
+    template<typename _Index>
+    void addNZBatch(const _Index *I, const _Index *J, const Real *V, size_t count) {
+        for (size_t k = 0; k < count; ++k) {
+            // (negative signed indices wrap around to huge values)
+            if ((size_t(I[k]) >= m) || (size_t(J[k]) >= n))
+                throw std::runtime_error("Triplet (" + std::to_string(I[k]) + ", " + std::to_string(J[k]) + ") out of bounds");
+        }
+        nz.reserve(nz.size() + count);
+        for (size_t k = 0; k < count; ++k) {
+            if (V[k] == Real(0.0)) continue;
+            nz.emplace_back(I[k], J[k], V[k]);
+        }
+    }
+
     // Sort and sum of repeated entries
     bool needsSumRepated() const { return needs_sum_repeated; }
     void sumRepeated() {
@@ -783,6 +801,28 @@ struct CSCMatrix {
         return csc_add_nz(nz, Ai.data(), Ap.data(), Ax.data(), i, j, v);
     }
 
+    // Accumulate "count" values V[k] to entries (I[k], J[k]), which must all
+    // exist in the sparsity pattern. The entries are located (in parallel)
+    // and validated before the matrix is modified.
+    void addNZBatch(const _Index *I, const _Index *J, const _Real *V, size_t count) {
+        std::vector<_Index> idx(count);
+        auto locate = [&](size_t k) {
+            if ((I[k] < 0) || (I[k] >= m) || (J[k] < 0) || (J[k] >= n)) { idx[k] = INDEX_NONE; return; }
+            idx[k] = findEntry<true>(I[k], J[k]);
+        };
+#if MESHFEM_WITH_TBB
+        tbb::parallel_for(tbb::blocked_range<size_t>(0, count),
+            [&](const tbb::blocked_range<size_t> &r) { for (size_t k = r.begin(); k < r.end(); ++k) locate(k); });
+#else
+        for (size_t k = 0; k < count; ++k) locate(k);
+#endif
+        for (size_t k = 0; k < count; ++k) {
+            if (idx[k] == INDEX_NONE)
+                throw std::runtime_error("Entry (" + std::to_string(I[k]) + ", " + std::to_string(J[k]) + ") out of bounds or absent from sparsity pattern");
+        }
+        for (size_t k = 0; k < count; ++k) Ax[idx[k]] += V[k];
+    }
+
     // Insert (i, j, v), with a guess that it should go at location "hint"
     size_t addNZ(const _Index i, const _Index j, const _Real v, _Index hint) {
         if ((hint < Ap[j + 1]) && (Ai[hint] == i) && (hint >= Ap[j])) {
@@ -1202,6 +1242,25 @@ public:
         }
     }
 
+    // Solve for each column of the column-major matrix B. UMFPACK has no
+    // multiple right-hand side interface, so the columns are processed one at
+    // a time.
+    template<class _Mat1, class _Mat2>
+    void solveBlock(const _Mat1 &B, _Mat2 &X) {
+        if (numeric == NULL) factorize();
+
+        assert(size_t(B.rows()) == (size_t) m_mat.m);
+        X.resize(m_mat.n, B.cols());
+        for (size_t k = 0; k < size_t(B.cols()); ++k) {
+            int status = umfpack_dl_solve(UMFPACK_A, Ap(), Ai(), Ax(), X.data() + k * m_mat.n, B.data() + k * m_mat.m,
+                                          numeric, Control, Info);
+            if (status != UMFPACK_OK) {
+                throw std::runtime_error("Umfpack solve failed: "
+                        + std::to_string(status));
+            }
+        }
+    }
+
     double peakMemoryMB() const {
         return m_factorizationMemoryBytes / (1 << 20);
     }
@@ -1233,12 +1292,13 @@ private:
     double m_factorizationMemoryBytes;
 };
 
-inline cholmod_dense cholmod_dense_wrap_vector_ptr(const size_t n, double *data) {
+// Wrap a column-major m x ncols array (leading dimension m) in a cholmod_dense struct.
+inline cholmod_dense cholmod_dense_wrap_matrix_ptr(const size_t m, const size_t ncols, double *data) {
     cholmod_dense result;
-    result.nrow = n;
-    result.ncol = 1;
-    result.nzmax = n;
-    result.d = n; // leading dimension
+    result.nrow = m;
+    result.ncol = ncols;
+    result.nzmax = m * ncols;
+    result.d = m; // leading dimension
     result.x = (void *) (data);
     result.z = NULL;
     result.xtype = CHOLMOD_REAL;
@@ -1246,6 +1306,10 @@ inline cholmod_dense cholmod_dense_wrap_vector_ptr(const size_t n, double *data)
     return result;
 }
 
+inline cholmod_dense cholmod_dense_wrap_vector_ptr(const size_t n, double *data) {
+    return cholmod_dense_wrap_matrix_ptr(n, 1, data);
+}
+
 // Wrapper for a cholmod_sparse object allocated generated by Cholmod.
 // Provides RAII resource management and supports matvecs.
 struct CholmodSparseWrapper {
@@ -1332,7 +1396,9 @@ public:
         BENCHMARK_START_TIMER("CHOLMOD Symbolic Factorize");
         m_c->nmethods = nmethods;
         clearFactors();
-        m_L = cholmod_l_analyze(&m_A, m_c.get());
+        // Reuses the fill-reducing ordering/analysis of previously seen
+        // sparsity patterns (see SymbolicFactorizationCache.hh).
+        m_L = SymbolicFactorizationCache::instance().analyze(&m_A, m_c.get());
         BENCHMARK_STOP_TIMER("CHOLMOD Symbolic Factorize");
     }
 
@@ -1428,6 +1494,52 @@ public:
         solveRawExistingFactorization(b, x, sys);
     }
 
+    // Solve for all columns of the (column-major) right-hand side matrix B
+    // at once. A single cholmod_l_solve2 call processes the whole block, so the
+    // supernodal triangular solves use BLAS-3 instead of one BLAS-2 pass per
+    // column.
+    template<class _Mat1, class _Mat2>
+    void solveBlock(const _Mat1 &B, _Mat2 &X, int sys = CHOLMOD_A) {
+        assert(size_t(B.rows()) == size_t(m_A.nrow));
+        X.resize(m_A.ncol, B.cols());
+        solveBlockRaw(B.data(), X.data(), B.cols(), sys);
+    }
+
+    template<class _Mat1, class _Mat2>
+    void solveBlockExistingFactorization(const _Mat1 &B, _Mat2 &X, int sys = CHOLMOD_A) const {
+        assert(size_t(B.rows()) == size_t(m_A.nrow));
+        X.resize(m_A.ncol, B.cols());
+        solveBlockRawExistingFactorization(B.data(), X.data(), B.cols(), sys);
+    }
+
+    // Raw pointer version: B and X are column-major arrays of size
+    // m() x nrhs and n() x nrhs, respectively (allocated/owned by the caller).
+    void solveBlockRawExistingFactorization(const Real *B, Real *X, size_t nrhs, int sys = CHOLMOD_A) const {
+        if (!hasFactorization()) throw std::runtime_error("Factorization doesn't exist");
+        static_assert(std::is_same<Real, double>::value, "Right-hand side must be an array of doubles");
+        if (nrhs == 0) return;
+
+        const size_t m = m_A.nrow, n = m_A.ncol;
+
+        auto cholB = cholmod_dense_wrap_matrix_ptr(m, nrhs, const_cast<Real *>(B)); // Suitesparse won't actually modify the RHS data, so this const_cast should be safe.
+        auto cholX = cholmod_dense_wrap_matrix_ptr(n, nrhs, X);
+        auto cholX_ptr = &cholX;
+
+        BENCHMARK_START_TIMER("CHOLMOD Block Backsub");
+        // Block solves get their own workspace so that interleaving them with
+        // single-vector solves doesn't reallocate m_Y and m_E each time.
+        cholmod_l_solve2(sys, m_L, &cholB, NULL, &cholX_ptr, NULL, &m_Yblock, &m_Eblock, m_c.get());
+
+        if (cholX_ptr != &cholX) throw std::runtime_error("Cholmod reallocated X matrix.");
+
+        BENCHMARK_STOP_TIMER("CHOLMOD Block Backsub");
+    }
+
+    void solveBlockRaw(const Real *B, Real *X, size_t nrhs, int sys = CHOLMOD_A) {
+        if (!hasFactorization()) factorize();
+        solveBlockRawExistingFactorization(B, X, nrhs, sys);
+    }
+
     bool hasFactorization() const { return m_L != nullptr; }
 
     // Store a copy of the current factorization so that it can be applied again
@@ -1470,6 +1582,8 @@ public:
 
         if (m_Y) cholmod_l_free_dense(&m_Y, m_c.get());
         if (m_E) cholmod_l_free_dense(&m_E, m_c.get());
+        if (m_Yblock) cholmod_l_free_dense(&m_Yblock, m_c.get());
+        if (m_Eblock) cholmod_l_free_dense(&m_Eblock, m_c.get());
 
         cholmod_l_finish(m_c.get());
     }
@@ -1518,6 +1632,7 @@ private:
     cholmod_factor *m_L = nullptr, *m_L_stashed = nullptr;
 
     mutable cholmod_dense *m_Y = nullptr, *m_E = nullptr; // result/workspace for cholmod_l_solve2
+    mutable cholmod_dense *m_Yblock = nullptr, *m_Eblock = nullptr; // workspace for multiple right-hand side solves
 
     SuiteSparseMatrix m_AStorage;
 
@@ -1781,6 +1896,85 @@ public:
         assert(m_fixedVarRHSContribution.size() == m_AUpper.m);
     }
 
+    // Set an SPD system from the upper triangle of K (in compressed column
+    // form) with the variables in fixedVars eliminated. This is equivalent to
+    // set(K) followed by fixVariables(fixedVars, fixedVarValues), but the
+    // reduced matrix is extracted directly from K's columns and handed to the
+    // factorizer without forming (and sorting) triplets.
+    // Only use `keepFactorization = true` if K has the sparsity pattern of
+    // the matrix passed to the previous call--then only the numeric
+    // factorization is recomputed. The factorization is rebuilt from scratch
+    // regardless if the fixed variables changed.
+    void setWithFixedVariables(const SuiteSparseMatrix &K,
+                               const std::vector<size_t> &fixedVars,
+                               const std::vector<_Real>  &fixedVarValues = std::vector<_Real>(), // variables fixed to zero if unspecified
+                               bool keepFactorization = false) {
+        BENCHMARK_SCOPED_TIMER_SECTION timer("setWithFixedVariables");
+        if (K.m != K.n) throw std::runtime_error("System matrix must be square");
+        if ((fixedVarValues.size() != 0) && (fixedVarValues.size() != fixedVars.size())) throw std::runtime_error("Incorrect number of fixedVarValues");
+        keepFactorization = keepFactorization && m_LLT && m_setFromCSC && (m_cscFixedVars == fixedVars);
+
+        clear(keepFactorization);
+        m_constraintRHS.clear();
+        m_isSPD = true;
+        m_numVars = K.n;
+        m_AUpper.init(m_numVars, m_numVars);
+        m_initReducedVariables();
+
+        const bool fixToZero = fixedVarValues.size() == 0;
+        std::vector<_Real> fixedValue;
+        if (!fixToZero) fixedValue.assign(m_numVars, 0.0);
+        m_fixedVarValues.assign(fixedVars.size(), 0.0);
+        for (size_t i = 0; i < fixedVars.size(); ++i) {
+            const size_t v = fixedVars[i];
+            if (v >= m_numVars) throw std::runtime_error("Fixed variable index out of bounds");
+            if (m_reducedVarForVar[v] < 0) throw std::runtime_error("Variable already fixed.");
+            m_reducedVarForVar[v] = -1 - int(i);
+            if (!fixToZero) m_fixedVarValues[i] = fixedValue[v] = fixedVarValues[i];
+        }
+        size_t numReduced = 0;
+        for (int &r : m_reducedVarForVar)
+            if (r >= 0) r = numReduced++;
+        m_fixedVarRHSContribution.assign(numReduced, 0.0);
+
+        // The reindexing preserves the variables' order, so the surviving
+        // entries of each column stay sorted and in the upper triangle.
+        SuiteSparseMatrix A(numReduced, numReduced);
+        A.symmetry_mode = SuiteSparseMatrix::SymmetryMode::UPPER_TRIANGLE;
+        A.Ap.reserve(numReduced + 1);
+        A.Ai.reserve(K.nnz());
+        A.Ax.reserve(K.nnz());
+        A.Ap.push_back(0);
+        for (SuiteSparse_long j = 0; j < K.n; ++j) {
+            const int rj = m_reducedVarForVar[j];
+            for (SuiteSparse_long idx = K.Ap[j]; idx < K.Ap[j + 1]; ++idx) {
+                const SuiteSparse_long i = K.Ai[idx];
+                const int ri = m_reducedVarForVar[i];
+                const _Real val = K.Ax[idx];
+                // Move the fixed variables' terms to the RHS: the upper
+                // triangle term K_ij x_j and the strict lower term K_ji x_i.
+                if (rj < 0) { if ((ri >= 0) && !fixToZero) m_fixedVarRHSContribution[ri] -= val * fixedValue[j]; continue; }
+                if (ri < 0) { if ((i != j)  && !fixToZero) m_fixedVarRHSContribution[rj] -= val * fixedValue[i]; continue; }
+                A.Ai.push_back(ri);
+                A.Ax.push_back(val);
+            }
+            if (rj >= 0) A.Ap.push_back(A.Ai.size());
+        }
+        A.nz = A.Ai.size();
+
+        m_AUpper.init(numReduced, numReduced);
+        if (keepFactorization) {
+            m_LLT->updateFactorization(std::move(A));
+        }
+        else {
+            BENCHMARK_SCOPED_TIMER_SECTION ctimer("Construct Factorizer");
+            m_LLT = std::unique_ptr<_LLTFactorizer>(new _LLTFactorizer(std::move(A), m_forceSupernodal));
+        }
+        m_needsNumericFactorization = false;
+        m_setFromCSC = true;
+        m_cscFixedVars = fixedVars;
+    }
+
     void factorizeSymbolic(int nmethods = 0 /* Cholmod's default */) {
         if (m_isSPD) {
             BENCHMARK_START_TIMER_SECTION("Construct Factorizer");
@@ -1830,41 +2024,9 @@ public:
         //     // exit(-1);
         // }
 
-        if (m_isSPD) {
-            if (!m_LLT) {
-                BENCHMARK_START_TIMER_SECTION("Construct Factorizer");
-                m_LLT = std::unique_ptr<_LLTFactorizer>(new _LLTFactorizer(m_AUpper, m_forceSupernodal));
-                m_needsNumericFactorization = false;
-                if (m_economyMode) m_clearAUpperTriplets();
-                BENCHMARK_STOP_TIMER_SECTION("Construct Factorizer");
-            }
-
-            if (m_needsNumericFactorization) {
-                m_LLT->updateFactorization(m_AUpper);
-                m_needsNumericFactorization = false;
-            }
-
-            m_LLT->solve(bReduced, uReduced);
-        }
-        else {
-            // Expand m_AUpper into a full matrix.
-            if (!m_LU) {
-                BENCHMARK_START_TIMER_SECTION("Construct Factorizer");
-                TMatrix A;
-                A.reserve(m_AUpper.nnz() + m_AUpper.strictUpperTriangleNNZ());
-                A = m_AUpper;
-                if (m_economyMode) m_clearAUpperTriplets();
-                A.reflectUpperTriangle();
-                m_LU = std::unique_ptr<_LUFactorizer>(new _LUFactorizer(A));
-                m_needsNumericFactorization = false;
-                BENCHMARK_STOP_TIMER_SECTION("Construct Factorizer");
-            }
-            if (m_needsNumericFactorization) {
-                m_LU->updateFactorization(m_AUpper);
-                m_needsNumericFactorization = false;
-            }
-            m_LU->solve(bReduced, uReduced);
-        }
+        m_ensureFactorized();
+        if (m_isSPD) m_LLT->solve(bReduced, uReduced);
+        else         m_LU ->solve(bReduced, uReduced);
 
         // Read off solution (but not the Lagrange multipliers)
         u.resize(nPrimaryVars);
@@ -1889,6 +2051,53 @@ public:
         return u;
     }
 
+    // Solve K U = F for several right-hand sides at once (the columns of the
+    // dense matrix F) under any existing constraints/fixed variables.
+    // All columns share a single backsubstitution call on the factorization.
+    using MXd = Eigen::Matrix<_Real, Eigen::Dynamic, Eigen::Dynamic>;
+    void solveBlock(const MXd &F, MXd &U) {
+        const size_t nPrimaryVars = F.rows();
+        const size_t nrhs = F.cols();
+
+        if (!isSet()) throw std::runtime_error("No system to solve");
+        if (nPrimaryVars + m_constraintRHS.size() != m_numVars) throw std::runtime_error("Bad RHS");
+
+        MXd BReduced(m_AUpper.m, nrhs);
+        for (size_t v = 0; v < m_reducedVarForVar.size(); ++v) {
+            int r = m_reducedVarForVar[v];
+            if (r < 0) continue;
+            assert(size_t(r) < size_t(BReduced.rows()));
+            if (v < nPrimaryVars) BReduced.row(r) = F.row(v);
+            else                  BReduced.row(r).setConstant(m_constraintRHS[v - nPrimaryVars]);
+            BReduced.row(r).array() += m_fixedVarRHSContribution[r];
+        }
+
+        MXd UReduced;
+        m_ensureFactorized();
+        if (m_isSPD) m_LLT->solveBlock(BReduced, UReduced);
+        else         m_LU ->solveBlock(BReduced, UReduced);
+
+        U.resize(nPrimaryVars, nrhs);
+        for (size_t v = 0; v < nPrimaryVars; ++v) {
+            int r = m_reducedVarForVar[v];
+            if (r < 0) {
+                size_t fixedVar = -1 - r;
+                assert(fixedVar < m_fixedVarValues.size());
+                U.row(v).setConstant(m_fixedVarValues[fixedVar]);
+            }
+            else {
+                assert(size_t(r) < size_t(UReduced.rows()));
+                U.row(v) = UReduced.row(r);
+            }
+        }
+    }
+
+    MXd solveBlock(const MXd &F) {
+        MXd U;
+        solveBlock(F, U);
+        return U;
+    }
+
     bool checkPosDef() const {
         if (!m_LLT) throw std::runtime_error("Matrix wasn't factorized as LL or LDL.");
         return m_LLT->checkPosDef();
@@ -1906,6 +2115,7 @@ public:
     void clear(bool keepFactorization = false) {
         if (!keepFactorization) clearFactorization();
         m_needsNumericFactorization = true;
+        m_setFromCSC = false;
         m_AUpper.init(0, 0);
         m_numVars = 0;
         m_initReducedVariables();
@@ -1933,6 +2143,43 @@ public:
 
     ~SPSDSystem() { clear(); }
 private:
+    // Build the factorizer for the current (reduced) system if it doesn't
+    // exist yet, and bring its numeric factorization up to date.
+    void m_ensureFactorized() {
+        if (m_isSPD) {
+            if (!m_LLT) {
+                BENCHMARK_START_TIMER_SECTION("Construct Factorizer");
+                m_LLT = std::unique_ptr<_LLTFactorizer>(new _LLTFactorizer(m_AUpper, m_forceSupernodal));
+                m_needsNumericFactorization = false;
+                if (m_economyMode) m_clearAUpperTriplets();
+                BENCHMARK_STOP_TIMER_SECTION("Construct Factorizer");
+            }
+
+            if (m_needsNumericFactorization) {
+                m_LLT->updateFactorization(m_AUpper);
+                m_needsNumericFactorization = false;
+            }
+        }
+        else {
+            // Expand m_AUpper into a full matrix.
+            if (!m_LU) {
+                BENCHMARK_START_TIMER_SECTION("Construct Factorizer");
+                TMatrix A;
+                A.reserve(m_AUpper.nnz() + m_AUpper.strictUpperTriangleNNZ());
+                A = m_AUpper;
+                if (m_economyMode) m_clearAUpperTriplets();
+                A.reflectUpperTriangle();
+                m_LU = std::unique_ptr<_LUFactorizer>(new _LUFactorizer(A));
+                m_needsNumericFactorization = false;
+                BENCHMARK_STOP_TIMER_SECTION("Construct Factorizer");
+            }
+            if (m_needsNumericFactorization) {
+                m_LU->updateFactorization(m_AUpper);
+                m_needsNumericFactorization = false;
+            }
+        }
+    }
+
     // Initialize the reduced variables arrays, clearing any fixed variables.
     // Must be called every time the system changes!
     void m_initReducedVariables() {
@@ -1990,6 +2237,11 @@ private:
     // the factorization object already exists but must be updated before
     // solving.
     bool m_needsNumericFactorization = false;
+
+    // Whether the system was set by setWithFixedVariables (and with which
+    // fixed variables); needed to decide if its factorization can be reused.
+    bool m_setFromCSC = false;
+    std::vector<size_t> m_cscFixedVars;
 };
 
 #endif /* end of include guard: SPARSEMATRICES_HH */
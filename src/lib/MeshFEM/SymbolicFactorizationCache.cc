@@ -0,0 +1,226 @@
+#include "SymbolicFactorizationCache.hh"
+#include <MeshFEM/GlobalBenchmark.hh>
+#include <MeshFEM/Utilities/ContentHash.hh>
+
+#include <cstdlib>
+#include <cstdio>
+#include <fstream>
+#include <iostream>
+#include <boost/filesystem.hpp>
+
+namespace {
+
+const uint64_t PERMUTATION_FILE_MAGIC = 0x4d46455045524d31ull; // "MFEPERM1"
+
+}
+
+std::string SymbolicFactorizationCache::Key::str() const { return ContentHasher::str(hash1, hash2); }
+
+SymbolicFactorizationCache::Key SymbolicFactorizationCache::key(const cholmod_sparse &A, const cholmod_common &c) {
+    Key k;
+    k.n          = A.ncol;
+    k.stype      = A.stype;
+    k.supernodal = c.supernodal;
+    k.nmethods   = c.nmethods;
+    k.nesdis     = c.default_nesdis;
+    k.postorder  = c.postorder;
+
+    const SuiteSparse_long *Ap = static_cast<const SuiteSparse_long *>(A.p);
+    const SuiteSparse_long *Ai = static_cast<const SuiteSparse_long *>(A.i);
+    k.nnz = Ap[A.ncol];
+
+    // The settings are folded into the hashes so that the digest (the file
+    // name of a persisted permutation) identifies the analysis uniquely.
+    ContentHasher h;
+    h.add(A.nrow); h.add(k.n); h.add(k.nnz);
+    h.add(uint64_t(k.stype)); h.add(uint64_t(k.supernodal)); h.add(uint64_t(k.nmethods));
+    h.add(uint64_t(k.nesdis)); h.add(uint64_t(k.postorder));
+    h.add(Ap, A.ncol + 1);
+    h.add(Ai, k.nnz);
+    k.hash1 = h.h1;
+    k.hash2 = h.h2;
+    return k;
+}
+
+SymbolicFactorizationCache &SymbolicFactorizationCache::instance() {
+    static SymbolicFactorizationCache cache;
+    return cache;
+}
+
+SymbolicFactorizationCache::SymbolicFactorizationCache() {
+    cholmod_l_start(&m_c);
+    const char *dir = std::getenv("MESHFEM_SYMBOLIC_CACHE_DIR");
+    if (dir != nullptr) m_directory = dir;
+    const char *capacity = std::getenv("MESHFEM_SYMBOLIC_CACHE_CAPACITY");
+    if (capacity != nullptr) m_capacity = std::strtoul(capacity, nullptr, 10);
+}
+
+SymbolicFactorizationCache::~SymbolicFactorizationCache() {
+    m_evict(0);
+    cholmod_l_finish(&m_c);
+}
+
+cholmod_factor *SymbolicFactorizationCache::analyze(cholmod_sparse *A, cholmod_common *c) {
+    size_t capacity;
+    std::string dir;
+    {
+        std::lock_guard<std::mutex> lock(m_mutex);
+        capacity = m_capacity;
+        dir = m_directory;
+    }
+    if ((capacity == 0) && dir.empty()) return cholmod_l_analyze(A, c);
+
+    const Key k = key(*A, *c);
+
+    // In-memory hit: copy the cached symbolic factor.
+    {
+        std::lock_guard<std::mutex> lock(m_mutex);
+        auto it = m_lookup.find(k);
+        if (it != m_lookup.end()) {
+            m_entries.splice(m_entries.begin(), m_entries, it->second);
+            ++m_hits;
+            return cholmod_l_copy_factor(it->second->L, c);
+        }
+    }
+
+    // Persisted permutation: analyze with the given ordering, skipping the
+    // fill-reducing ordering computation.
+    cholmod_factor *L = nullptr;
+    std::vector<SuiteSparse_long> perm;
+    if (!dir.empty() && m_loadPermutation(dir, k, perm)) {
+        BENCHMARK_SCOPED_TIMER_SECTION timer("Analyze With Cached Ordering");
+        const int nmethods = c->nmethods;
+        const auto method0 = c->method[0];
+        c->nmethods = 1;
+        c->method[0].ordering = CHOLMOD_GIVEN;
+        L = cholmod_l_analyze_p(A, perm.data(), nullptr, 0, c);
+        c->nmethods = nmethods;
+        c->method[0] = method0;
+        if (L != nullptr) {
+            std::lock_guard<std::mutex> lock(m_mutex);
+            ++m_diskHits;
+        }
+    }
+
+    if (L == nullptr) {
+        L = cholmod_l_analyze(A, c);
+        if (L == nullptr) return nullptr;
+        {
+            std::lock_guard<std::mutex> lock(m_mutex);
+            ++m_misses;
+        }
+        if (!dir.empty()) {
+            const SuiteSparse_long *P = static_cast<const SuiteSparse_long *>(L->Perm);
+            perm.assign(P, P + L->n);
+            m_storePermutation(dir, k, perm);
+        }
+    }
+
+    if (capacity > 0) m_insert(k, L);
+    return L;
+}
+
+void SymbolicFactorizationCache::m_insert(const Key &k, const cholmod_factor *L) {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    if ((m_capacity == 0) || (m_lookup.count(k) > 0)) return;
+    cholmod_factor *Lcopy = cholmod_l_copy_factor(const_cast<cholmod_factor *>(L), &m_c);
+    if (Lcopy == nullptr) return;
+    m_entries.push_front(Entry{k, Lcopy});
+    m_lookup.emplace(k, m_entries.begin());
+    m_evict(m_capacity);
+}
+
+void SymbolicFactorizationCache::m_evict(size_t capacity) {
+    while (m_entries.size() > capacity) {
+        Entry &e = m_entries.back();
+        m_lookup.erase(e.key);
+        cholmod_l_free_factor(&e.L, &m_c);
+        m_entries.pop_back();
+    }
+}
+
+void SymbolicFactorizationCache::setCapacity(size_t capacity) {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_capacity = capacity;
+    m_evict(capacity);
+}
+
+size_t SymbolicFactorizationCache::capacity() const { std::lock_guard<std::mutex> lock(m_mutex); return m_capacity; }
+size_t SymbolicFactorizationCache::size()     const { std::lock_guard<std::mutex> lock(m_mutex); return m_entries.size(); }
+size_t SymbolicFactorizationCache::hits()     const { std::lock_guard<std::mutex> lock(m_mutex); return m_hits; }
+size_t SymbolicFactorizationCache::diskHits() const { std::lock_guard<std::mutex> lock(m_mutex); return m_diskHits; }
+size_t SymbolicFactorizationCache::misses()   const { std::lock_guard<std::mutex> lock(m_mutex); return m_misses; }
+
+void SymbolicFactorizationCache::setDirectory(const std::string &dir) {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_directory = dir;
+}
+
+std::string SymbolicFactorizationCache::directory() const {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    return m_directory;
+}
+
+void SymbolicFactorizationCache::clear() {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_evict(0);
+    m_hits = m_diskHits = m_misses = 0;
+}
+
+bool SymbolicFactorizationCache::loadPermutation(const Key &k, std::vector<SuiteSparse_long> &perm) const {
+    const std::string dir = directory();
+    return !dir.empty() && m_loadPermutation(dir, k, perm);
+}
+
+void SymbolicFactorizationCache::storePermutation(const Key &k, const std::vector<SuiteSparse_long> &perm) const {
+    const std::string dir = directory();
+    if (!dir.empty()) m_storePermutation(dir, k, perm);
+}
+
+// File layout: magic, hash1, hash2, n, nnz, perm[0..n) (all 64-bit).
+bool SymbolicFactorizationCache::m_loadPermutation(const std::string &dir, const Key &k, std::vector<SuiteSparse_long> &perm) {
+    std::ifstream is((boost::filesystem::path(dir) / (k.str() + ".perm")).string(), std::ios::binary);
+    if (!is) return false;
+
+    uint64_t header[5];
+    if (!is.read(reinterpret_cast<char *>(header), sizeof(header))) return false;
+    if ((header[0] != PERMUTATION_FILE_MAGIC) || (header[1] != k.hash1) || (header[2] != k.hash2) ||
+        (header[3] != k.n) || (header[4] != k.nnz)) return false;
+
+    std::vector<int64_t> data(k.n);
+    if (!is.read(reinterpret_cast<char *>(data.data()), k.n * sizeof(int64_t))) return false;
+
+    // Reject corrupted files: the data must be a permutation of 0..n-1.
+    std::vector<bool> seen(k.n, false);
+    for (int64_t p : data) {
+        if ((p < 0) || (uint64_t(p) >= k.n) || seen[p]) return false;
+        seen[p] = true;
+    }
+    perm.assign(data.begin(), data.end());
+    return true;
+}
+
+void SymbolicFactorizationCache::m_storePermutation(const std::string &dir, const Key &k, const std::vector<SuiteSparse_long> &perm) {
+    namespace fs = boost::filesystem;
+    if (perm.size() != k.n) throw std::runtime_error("Permutation size mismatch");
+    try {
+        fs::create_directories(dir);
+        const fs::path path = fs::path(dir) / (k.str() + ".perm");
+        // Write to a temporary file and rename it so that concurrent
+        // processes never read a partially written permutation.
+        const fs::path tmpPath = fs::unique_path(path.string() + ".%%%%-%%%%-%%%%.tmp");
+        {
+            std::ofstream os(tmpPath.string(), std::ios::binary);
+            const uint64_t header[5] = { PERMUTATION_FILE_MAGIC, k.hash1, k.hash2, uint64_t(k.n), uint64_t(k.nnz) };
+            std::vector<int64_t> data(perm.begin(), perm.end());
+            os.write(reinterpret_cast<const char *>(header), sizeof(header));
+            os.write(reinterpret_cast<const char *>(data.data()), data.size() * sizeof(int64_t));
+            if (!os) throw std::runtime_error("write failed");
+        }
+        fs::rename(tmpPath, path);
+    }
+    catch (const std::exception &e) {
+        // Persistence is only an optimization; don't fail the solve.
+        std::cerr << "WARNING: couldn't persist symbolic factorization to " << dir << ": " << e.what() << std::endl;
+    }
+}
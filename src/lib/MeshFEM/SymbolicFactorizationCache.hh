@@ -0,0 +1,122 @@
+////////////////////////////////////////////////////////////////////////////////
+// SymbolicFactorizationCache.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Process-wide cache of CHOLMOD symbolic factorizations keyed by the
+//      sparsity pattern (Ap/Ai) of the matrix being analyzed.
+//
+//      The fill-reducing ordering (AMD/METIS) computed by cholmod_l_analyze
+//      dominates the symbolic factorization cost and only depends on the
+//      pattern, which is identical across the many systems assembled on the
+//      same mesh. The cache keeps the most recently used symbolic factors in
+//      memory (LRU eviction) and, if a directory is configured, persists
+//      their fill-reducing permutations to disk so that later processes can
+//      skip the ordering step too (cholmod_l_analyze_p with the stored
+//      permutation).
+//
+//      The cache is disabled by default, since the cached factors stay in
+//      memory for the life of the process. Enable the in-memory cache with
+//      setCapacity (or the MESHFEM_SYMBOLIC_CACHE_CAPACITY environment
+//      variable) and persistence with setDirectory (or the
+//      MESHFEM_SYMBOLIC_CACHE_DIR environment variable). From Python, use
+//      sparse_matrices.configure_symbolic_factorization_cache and
+//      sparse_matrices.clear_symbolic_factorization_cache.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef SYMBOLICFACTORIZATIONCACHE_HH
+#define SYMBOLICFACTORIZATIONCACHE_HH
+
+#include <cstdint>
+#include <cstddef>
+#include <list>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+extern "C" {
+#include <cholmod.h>
+}
+
+class SymbolicFactorizationCache {
+public:
+    // Identifies a sparsity pattern (and the CHOLMOD settings influencing the
+    // analysis) by two independent 64-bit hashes of Ap/Ai.
+    struct Key {
+        uint64_t hash1 = 0, hash2 = 0;
+        size_t n = 0, nnz = 0;
+        int stype = 0, supernodal = 0, nmethods = 0, nesdis = 0, postorder = 0;
+
+        bool operator==(const Key &b) const {
+            return (hash1 == b.hash1) && (hash2 == b.hash2) && (n == b.n) && (nnz == b.nnz) &&
+                   (stype == b.stype) && (supernodal == b.supernodal) && (nmethods == b.nmethods) &&
+                   (nesdis == b.nesdis) && (postorder == b.postorder);
+        }
+
+        // Hexadecimal digest used as the on-disk file name.
+        std::string str() const;
+    };
+
+    struct KeyHash { size_t operator()(const Key &k) const { return size_t(k.hash1 ^ (k.hash2 * 0x9E3779B97F4A7C15ull)); } };
+
+    static Key key(const cholmod_sparse &A, const cholmod_common &c);
+
+    static SymbolicFactorizationCache &instance();
+
+    ////////////////////////////////////////////////////////////////////////////
+    /*! Symbolic factorization of A using the settings in c, served from the
+    //  cache when the pattern has been analyzed before. Drop-in replacement
+    //  for cholmod_l_analyze; the returned factor is owned by the caller.
+    *///////////////////////////////////////////////////////////////////////////
+    cholmod_factor *analyze(cholmod_sparse *A, cholmod_common *c);
+
+    // Maximum number of symbolic factors kept in memory (0, the default,
+    // disables caching).
+    void   setCapacity(size_t capacity);
+    size_t capacity() const;
+    size_t size() const;
+
+    // Directory in which permutations are persisted ("" disables persistence).
+    void setDirectory(const std::string &dir);
+    std::string directory() const;
+
+    // Free the cached factors and reset the statistics.
+    void clear();
+
+    // Statistics: analyses served from memory, from a persisted permutation,
+    // and computed from scratch.
+    size_t hits()     const;
+    size_t diskHits() const;
+    size_t misses()   const;
+
+    // Fill-reducing permutation stored on disk for key (false if none exists).
+    bool loadPermutation(const Key &k, std::vector<SuiteSparse_long> &perm) const;
+    void storePermutation(const Key &k, const std::vector<SuiteSparse_long> &perm) const;
+
+    ~SymbolicFactorizationCache();
+
+private:
+    SymbolicFactorizationCache();
+    SymbolicFactorizationCache(const SymbolicFactorizationCache &) = delete;
+    SymbolicFactorizationCache &operator=(const SymbolicFactorizationCache &) = delete;
+
+    struct Entry {
+        Key key;
+        cholmod_factor *L;
+    };
+
+    void m_insert(const Key &k, const cholmod_factor *L);
+    void m_evict(size_t capacity); // assumes m_mutex is held
+    static bool m_loadPermutation(const std::string &dir, const Key &k, std::vector<SuiteSparse_long> &perm);
+    static void m_storePermutation(const std::string &dir, const Key &k, const std::vector<SuiteSparse_long> &perm);
+
+    mutable std::mutex m_mutex;
+    cholmod_common m_c; // owns the cached factors' memory
+    std::list<Entry> m_entries; // most recently used first
+    std::unordered_map<Key, std::list<Entry>::iterator, KeyHash> m_lookup;
+    size_t m_capacity = 0;
+    std::string m_directory;
+    size_t m_hits = 0, m_diskHits = 0, m_misses = 0;
+};
+
+#endif /* end of include guard: SYMBOLICFACTORIZATIONCACHE_HH */
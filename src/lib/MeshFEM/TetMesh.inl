@@ -4,8 +4,10 @@
 // Constructor
 // Build index tables from tetrahedron soup
 ////////////////////////////////////////////////////////////////////////////////
-#include <map>
+#include <algorithm>
+#include <MeshFEM/Parallelism.hh>
 #include <MeshFEM/Utilities/ElementArrayAdaptor.hh>
+#include <MeshFEM/Utilities/BucketSort.hh>
 
 template<class VertexData, class HalfFaceData, class HalfEdgeData, class TetData,
          class BoundaryVertexData, class BoundaryHalfEdgeData, class BoundaryFaceData>
@@ -32,46 +34,62 @@ TetMesh(const Tets &tets, const size_t nVertices) {
     }
 
     // Half-face Adjacency
-    typedef std::map<UnorderedTriplet, int> FaceMap;
-    FaceMap halfFaceForFace;
-    std::runtime_error nonManifold("Non-manifold input detected.");
+    // Sort the half-faces by their vertices (in increasing order), bucketed
+    // by the smallest one, to bring the half-faces of each face together.
+    // Ties are broken by index, so the half-faces sharing a face are paired
+    // in index order (a third half-face on the same face starts a new pair).
+    // Unpaired half-faces are boundary faces, which end up ordered
+    // lexicographically by their vertices.
+    struct HalfFaceKey { int v[3]; int hf; };
     O.assign(4 * nt, -1);
     const size_t nHalfFaces = O.size();
-    for (size_t hf = 0; hf < 4 * nt; ++hf) {
-        UnorderedTriplet face(m_vertexOfHalfFace(0, hf),
-                              m_vertexOfHalfFace(1, hf),
-                              m_vertexOfHalfFace(2, hf));
-        // attempt to insert half-face
-        auto res = halfFaceForFace.emplace(face, hf);
-        if (!res.second) { // already exists
-            auto it = res.first;
-            int hfO = it->second;
-            assert(size_t(hfO) < O.size());
-            if (O[hfO] == -1) {
-                O[hfO] = hf;
-                O[hf] = hfO;
-            }
-            // Note: the following can't actually detect non-manifold geometry
-            // because of the halfEdgeForEdge.erase(it) call...
-            else throw nonManifold;
-            halfFaceForFace.erase(it);
+    std::vector<HalfFaceKey> sortedHalfFaces(nHalfFaces);
+    auto makeKey = [&](size_t hf) {
+        HalfFaceKey &k = sortedHalfFaces[hf];
+        for (int c = 0; c < 3; ++c) k.v[c] = m_vertexOfHalfFace(c, hf);
+        std::sort(k.v, k.v + 3);
+        k.hf = hf;
+    };
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, nHalfFaces),
+        [&](const tbb::blocked_range<size_t> &r) { for (size_t hf = r.begin(); hf < r.end(); ++hf) makeKey(hf); });
+#else
+    for (size_t hf = 0; hf < nHalfFaces; ++hf) makeKey(hf);
+#endif
+    bucketSort(sortedHalfFaces, nVertices, [](const HalfFaceKey &k) { return size_t(k.v[0]); },
+               [](const HalfFaceKey &a, const HalfFaceKey &b) {
+                   if (a.v[1] != b.v[1]) return a.v[1] < b.v[1];
+                   if (a.v[2] != b.v[2]) return a.v[2] < b.v[2];
+                   return a.hf < b.hf;
+               });
+
+    std::vector<int> boundaryHalfFaces;
+    auto sameFace = [](const HalfFaceKey &a, const HalfFaceKey &b) { return (a.v[0] == b.v[0]) && (a.v[1] == b.v[1]) && (a.v[2] == b.v[2]); };
+    for (size_t i = 0; i < nHalfFaces; ) {
+        size_t end = i + 1;
+        while ((end < nHalfFaces) && sameFace(sortedHalfFaces[i], sortedHalfFaces[end])) ++end;
+        for (; i + 1 < end; i += 2) {
+            int hf = sortedHalfFaces[i].hf, hfO = sortedHalfFaces[i + 1].hf;
+            O[hfO] = hf;
+            O[hf] = hfO;
         }
+        if (i < end) boundaryHalfFaces.push_back(sortedHalfFaces[i++].hf);
     }
+    std::vector<HalfFaceKey>().swap(sortedHalfFaces);
 
     // Boundary Extraction
-    // Boundary faces are those with no opposites--the ones left in
-    // halfFaceForFace. Create explicit entries for these in the bO array
+    // Boundary faces are those with no opposites. Create explicit entries for
+    // these in the bO array
     // Each vertex of a boundary face is a boundary vertex--create explicit
     // entries for these in the bV array and fill out Vb mapping vertex indices
     // to associated boundary vertex index.
     // Also start filling out half-face incidence table VH since VH[v] is
     // required to be a boundary face if v is a boundary vertex
-    bO.reserve(halfFaceForFace.size()), bO.clear();
+    bO.reserve(boundaryHalfFaces.size()), bO.clear();
     Vb.assign(nVertices, -1);
     bV.clear();
     VH.assign(nVertices, -1);
-    for (auto it = halfFaceForFace.begin(); it != halfFaceForFace.end(); ++it) {
-        int bhf = it->second;
+    for (int bhf : boundaryHalfFaces) {
         assert(O[bhf] == -1);
         bO.push_back(bhf);
         O[bhf] = m_bdryFaceIdxToFaceIdx(bO.size() - 1);
@@ -89,7 +107,6 @@ TetMesh(const Tets &tets, const size_t nVertices) {
     }
     const size_t nBoundaryFaces    = bO.size();
     const size_t nBoundaryVertices = bV.size();
-    halfFaceForFace.clear();
 
     // Finish filling out VH by completing the interior vertex portion
     for (size_t hf = 0; hf < nHalfFaces; ++hf) {
@@ -1,14 +1,14 @@
-#include <map>
 #include <stdexcept>
 #include <iostream>
 #include <MeshFEM/Geometry.hh>
+#include <MeshFEM/Parallelism.hh>
 #include <MeshFEM/Utilities/ElementArrayAdaptor.hh>
+#include <MeshFEM/Utilities/BucketSort.hh>
 
 ////////////////////////////////////////////////////////////////////////////////
 // Constructor
 // Build index tables from triangle soup
 ////////////////////////////////////////////////////////////////////////////////
-#include <map>
 template<class VertexData, class HalfEdgeData, class TriData,
          class BoundaryVertexData, class BoundaryEdgeData>
 template<typename Tris>
@@ -35,53 +35,55 @@ TriMesh(const Tris &tris, size_t nVertices) {
     // TriMesh::numVertices() is used below and needs VH.size()
     VH.assign(nVertices, -1);
 
-    using EdgeMap = std::map<UnorderedPair, int>;
     // Half-edge Adjacency
-    EdgeMap halfEdgeForEdge;
-    // std::runtime_error nonManifold("Non-manifold input detected.");
+    // Sort the half-edges by their (sorted) endpoints, bucketed by the
+    // smaller one, to bring the half-edges of each edge together. Boundary
+    // edges end up ordered lexicographically by their endpoints.
+    struct HalfEdgeKey { int v[2]; int he; };
     O.assign(3 * nt, -1);
     const size_t nHalfEdges = O.size();
-    {
-        EdgeMap incidentTris;
-        for (size_t he = 0; he < nHalfEdges; ++he) {
-            UnorderedPair edge(m_vertexOfHE<HEVertex::TIP >(he),
-                               m_vertexOfHE<HEVertex::TAIL>(he));
-            incidentTris[edge]++;
-        }
-        for (const auto &p : incidentTris)
-            if (p.second > 2) throw std::runtime_error("Non-manifold edge detected");
-    }
-
-
-    for (size_t he = 0; he < nHalfEdges; ++he) {
+    std::vector<HalfEdgeKey> sortedHalfEdges(nHalfEdges);
+    auto makeKey = [&](size_t he) {
         UnorderedPair edge(m_vertexOfHE<HEVertex::TIP >(he),
                            m_vertexOfHE<HEVertex::TAIL>(he));
-        // Attempt to insert half-edge
-        auto res = halfEdgeForEdge.emplace(edge, he);
-        if (!res.second) { // already exists
-            auto it = res.first;
-            int heO = it->second;
-            assert(size_t(heO) < O.size());
-            if (O[heO] == -1) {
-                O[heO] = he;
-                O[he] = heO;
-            }
-            // Note: the following can't actually detect non-manifold geometry
-            // because of the halfEdgeForEdge.erase(it) call...
-            // else throw nonManifold;
-            else assert(false);
-            halfEdgeForEdge.erase(it);
+        sortedHalfEdges[he] = HalfEdgeKey{{edge[0], edge[1]}, int(he)};
+    };
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, nHalfEdges),
+        [&](const tbb::blocked_range<size_t> &r) { for (size_t he = r.begin(); he < r.end(); ++he) makeKey(he); });
+#else
+    for (size_t he = 0; he < nHalfEdges; ++he) makeKey(he);
+#endif
+    bucketSort(sortedHalfEdges, nVertices, [](const HalfEdgeKey &k) { return size_t(k.v[0]); },
+               [](const HalfEdgeKey &a, const HalfEdgeKey &b) {
+                   if (a.v[1] != b.v[1]) return a.v[1] < b.v[1];
+                   return a.he < b.he;
+               });
+
+    std::vector<int> boundaryHalfEdges;
+    for (size_t i = 0; i < nHalfEdges; ) {
+        size_t end = i + 1;
+        while ((end < nHalfEdges) && (sortedHalfEdges[end].v[0] == sortedHalfEdges[i].v[0])
+                                  && (sortedHalfEdges[end].v[1] == sortedHalfEdges[i].v[1])) ++end;
+        if (end - i > 2) throw std::runtime_error("Non-manifold edge detected");
+        if (end - i == 2) {
+            int he = sortedHalfEdges[i].he, heO = sortedHalfEdges[i + 1].he;
+            O[heO] = he;
+            O[he] = heO;
         }
+        else boundaryHalfEdges.push_back(sortedHalfEdges[i].he);
+        i = end;
     }
+    std::vector<HalfEdgeKey>().swap(sortedHalfEdges);
 
     // Boundary Extraction
-    // Boundary edges are those with no opposites--the ones left in
-    // halfEdgeForEdge. Create explicit entries for these in the bTipTail array.
+    // Boundary edges are those with no opposites. Create explicit entries for
+    // these in the bTipTail array.
     // Each vertex of a boundary edge is a boundary vertex--create explicit
     // entries for these in the bV array. Also fill out bTipTail and start
     // filling out the half-edge incidence table VH since VH[v] is required to
     // be a boundary edge if v is a boundary vertex.
-    const size_t nBoundaryEdges = halfEdgeForEdge.size();
+    const size_t nBoundaryEdges = boundaryHalfEdges.size();
     bTipTail.reserve(2 * nBoundaryEdges), bTipTail.clear();
     // Provided the boundary is manifold, there are as many boundary vertices
     // as boundary edges (boundary is closed)
@@ -91,8 +93,7 @@ TriMesh(const Tris &tris, size_t nVertices) {
     // needed to create bV and link boundary edges to vertices.
     std::vector<int> Vb(nVertices, -1);
 
-    for (auto it = halfEdgeForEdge.begin(); it != halfEdgeForEdge.end(); ++it) {
-        int vhe = it->second;
+    for (int vhe : boundaryHalfEdges) {
         assert(O[vhe] == -1);
         O[vhe] = m_bdryEIdxConvUnguarded(numBoundaryEdges());
         assert(O[vhe] < 0);
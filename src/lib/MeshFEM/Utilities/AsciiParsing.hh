@@ -0,0 +1,172 @@
+////////////////////////////////////////////////////////////////////////////////
+// AsciiParsing.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Fast parsing of ASCII data held in memory, replacing the per-line
+//      std::istringstream construction and formatted extraction of our
+//      stream-based readers. Lines follow getDataLine's conventions: leading
+//      whitespace and blank lines are skipped, lines starting with '#' are
+//      comments, and a trailing '\r' is ignored. Numbers are parsed with the
+//      same results as operator>> (strtod for reals).
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef ASCIIPARSING_HH
+#define ASCIIPARSING_HH
+
+#include <cmath>
+#include <cstdlib>
+#include <cstring>
+#include <istream>
+#include <limits>
+#include <string>
+#include <type_traits>
+
+namespace MeshFEM {
+
+inline bool isAsciiSpace(char c) { return (c == ' ') || (c == '\t') || (c == '\n') || (c == '\r') || (c == '\v') || (c == '\f'); }
+
+// Read the remainder of a stream into a string (in large blocks, sized from
+// the stream length when the stream is seekable).
+inline std::string readRemainingStream(std::istream &is) {
+    std::string result;
+    const auto start = is.tellg();
+    if (start != std::istream::pos_type(-1)) {
+        is.seekg(0, std::ios::end);
+        const auto end = is.tellg();
+        is.seekg(start);
+        if (end != std::istream::pos_type(-1)) result.reserve(size_t(end - start));
+    }
+    char block[1 << 16];
+    while (is.read(block, sizeof(block)) || (is.gcount() > 0))
+        result.append(block, is.gcount());
+    return result;
+}
+
+////////////////////////////////////////////////////////////////////////////////
+/*! A line of text [pos, end) from which whitespace-separated values are
+//  extracted in order. Each read returns false (leaving the value untouched)
+//  if the next token is missing or malformed.
+*///////////////////////////////////////////////////////////////////////////////
+struct AsciiLine {
+    const char *pos = nullptr, *end = nullptr;
+
+    void skipSpace() { while ((pos < end) && isAsciiSpace(*pos)) ++pos; }
+    bool empty() { skipSpace(); return pos == end; }
+
+    // Next token as [tokBegin, tokEnd)
+    bool token(const char *&tokBegin, const char *&tokEnd) {
+        skipSpace();
+        if (pos == end) return false;
+        tokBegin = pos;
+        while ((pos < end) && !isAsciiSpace(*pos)) ++pos;
+        tokEnd = pos;
+        return true;
+    }
+
+    std::string token() {
+        const char *b, *e;
+        if (!token(b, e)) return std::string();
+        return std::string(b, e);
+    }
+
+    template<typename T>
+    typename std::enable_if<std::is_integral<T>::value, bool>::type
+    read(T &val) {
+        skipSpace();
+        const char *p = pos;
+        bool negative = false;
+        if ((p < end) && ((*p == '-') || (*p == '+'))) negative = (*p++ == '-');
+        if ((p == end) || (*p < '0') || (*p > '9')) return false;
+        unsigned long long mag = 0;
+        constexpr unsigned long long maxMag = std::numeric_limits<unsigned long long>::max();
+        for (; (p < end) && (*p >= '0') && (*p <= '9'); ++p) {
+            const unsigned digit = *p - '0';
+            if (mag > (maxMag - digit) / 10) return false;
+            mag = 10 * mag + digit;
+        }
+        if (std::is_signed<T>::value) {
+            const unsigned long long limit = negative ? (unsigned long long)(std::numeric_limits<T>::max()) + 1
+                                                      : (unsigned long long)(std::numeric_limits<T>::max());
+            if (mag > limit) return false;
+            val = negative ? T(-(long long)(mag - 1) - 1) : T(mag);
+        }
+        else {
+            if (mag > (unsigned long long)(std::numeric_limits<T>::max())) return false;
+            val = negative ? T(-T(mag)) : T(mag); // wraps like strtoul/operator>>
+        }
+        pos = p;
+        return true;
+    }
+
+    template<typename T>
+    typename std::enable_if<std::is_floating_point<T>::value, bool>::type
+    read(T &val) {
+        skipSpace();
+        // Only accept what operator>> accepts: [sign] digits/point [exponent]
+        // (strtod would also parse hex floats, "inf" and "nan").
+        const char *p = pos;
+        if ((p < end) && ((*p == '-') || (*p == '+'))) ++p;
+        if ((p == end) || !(((*p >= '0') && (*p <= '9')) || (*p == '.'))) return false;
+        if ((*p == '0') && (p + 1 < end) && ((p[1] == 'x') || (p[1] == 'X'))) return false;
+        // The buffer is terminated by a newline or NUL, so strtod cannot run
+        // past the end of the line.
+        char *next;
+        const double v = std::strtod(pos, &next);
+        if ((next == pos) || std::isinf(v)) return false; // overflow fails, as for operator>>
+        val = T(v);
+        pos = next;
+        return true;
+    }
+};
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Cursor over an in-memory buffer yielding data lines. The buffer must be
+//  NUL-terminated (e.g., a std::string's data()).
+*///////////////////////////////////////////////////////////////////////////////
+class AsciiScanner {
+public:
+    AsciiScanner(const char *begin, const char *end) : m_pos(begin), m_end(end) { }
+    explicit AsciiScanner(const std::string &buf) : AsciiScanner(buf.data(), buf.data() + buf.size()) { }
+
+    // Extract the next data line (skipping blank and comment lines).
+    bool nextDataLine(AsciiLine &line) {
+        while (true) {
+            while ((m_pos < m_end) && isAsciiSpace(*m_pos)) ++m_pos;
+            if (m_pos == m_end) return false;
+            const char *lineEnd = static_cast<const char *>(std::memchr(m_pos, '\n', m_end - m_pos));
+            if (lineEnd == nullptr) lineEnd = m_end;
+            const bool comment = (*m_pos == '#');
+            line.pos = m_pos;
+            line.end = lineEnd;
+            m_pos = (lineEnd == m_end) ? m_end : lineEnd + 1;
+            if (comment) continue;
+            if ((line.end > line.pos) && (line.end[-1] == '\r')) --line.end;
+            return true;
+        }
+    }
+
+    // The next data line as a string (like getDataLine); empty at the end.
+    bool nextDataLine(std::string &str) {
+        AsciiLine line;
+        if (!nextDataLine(line)) { str.clear(); return false; }
+        str.assign(line.pos, line.end);
+        return true;
+    }
+
+    // Skip n data lines; returns the number actually skipped.
+    size_t skipDataLines(size_t n) {
+        AsciiLine line;
+        size_t i = 0;
+        for (; (i < n) && nextDataLine(line); ++i) { }
+        return i;
+    }
+
+    const char *position() const { return m_pos; }
+    const char *end() const { return m_end; }
+private:
+    const char *m_pos, *m_end;
+};
+
+} // namespace MeshFEM
+
+#endif /* end of include guard: ASCIIPARSING_HH */
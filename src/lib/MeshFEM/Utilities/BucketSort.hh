@@ -0,0 +1,54 @@
+////////////////////////////////////////////////////////////////////////////////
+// BucketSort.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      Sort records by a small integer bucket index (e.g., a vertex index)
+//      with a stable counting sort, then order the records within each bucket
+//      with a comparison sort. For mesh entities keyed on their vertices, the
+//      buckets are tiny, so this is much cheaper than sorting (or inserting
+//      into a search tree) by the full key. The per-bucket sorts run in
+//      parallel.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef BUCKETSORT_HH
+#define BUCKETSORT_HH
+
+#include <algorithm>
+#include <cstddef>
+#include <vector>
+
+#include <MeshFEM/Parallelism.hh>
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Sort a by (bucket(a[i]), less).
+//  @param[in]  a           records to sort (in place)
+//  @param[in]  numBuckets  bucket(a[i]) must lie in [0, numBuckets)
+//  @param[in]  bucket      functor mapping a record to its bucket index
+//  @param[in]  less        strict weak ordering of records within a bucket
+*///////////////////////////////////////////////////////////////////////////////
+template<class T, class BucketFunc, class Less>
+void bucketSort(std::vector<T> &a, size_t numBuckets, const BucketFunc &bucket, const Less &less) {
+    std::vector<size_t> bucketStart(numBuckets + 1, 0);
+    for (const T &x : a) ++bucketStart[bucket(x) + 1];
+    for (size_t b = 0; b < numBuckets; ++b) bucketStart[b + 1] += bucketStart[b];
+
+    std::vector<T> sorted(a.size());
+    {
+        std::vector<size_t> out(bucketStart.begin(), bucketStart.end() - 1);
+        for (const T &x : a) sorted[out[bucket(x)]++] = x;
+    }
+
+    auto sortBucket = [&](size_t b) {
+        std::sort(sorted.begin() + bucketStart[b], sorted.begin() + bucketStart[b + 1], less);
+    };
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, numBuckets),
+        [&](const tbb::blocked_range<size_t> &r) { for (size_t b = r.begin(); b < r.end(); ++b) sortBucket(b); });
+#else
+    for (size_t b = 0; b < numBuckets; ++b) sortBucket(b);
+#endif
+
+    a.swap(sorted);
+}
+
+#endif /* end of include guard: BUCKETSORT_HH */
@@ -0,0 +1,56 @@
+////////////////////////////////////////////////////////////////////////////////
+// ContentHash.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//      128-bit content hash (two independent 64-bit streams) used to build
+//      the keys of the on-disk caches. Not cryptographic: it only needs to
+//      make accidental collisions between different inputs negligible.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef CONTENTHASH_HH
+#define CONTENTHASH_HH
+
+#include <cstdint>
+#include <cstdio>
+#include <cstring>
+#include <string>
+
+struct ContentHasher {
+    // Two independent hash streams: FNV-1a style over 64-bit words, and a
+    // multiply-rotate mix.
+    uint64_t h1 = 0xcbf29ce484222325ull, h2 = 0x9E3779B97F4A7C15ull;
+
+    void add(uint64_t w) {
+        h1 = (h1 ^ w) * 0x100000001b3ull;
+        h2 = m_rotl(h2 + w * 0xC2B2AE3D27D4EB4Full, 31) * 0x9E3779B185EBCA87ull;
+    }
+
+    // Hash the bit pattern of a floating point value (with -0.0 == 0.0).
+    void addReal(double x) {
+        if (x == 0.0) x = 0.0;
+        uint64_t w;
+        std::memcpy(&w, &x, sizeof(w));
+        add(w);
+    }
+
+    template<typename T>
+    void add(const T *data, size_t n) { for (size_t i = 0; i < n; ++i) add(uint64_t(data[i])); }
+
+    void add(const std::string &s) {
+        add(uint64_t(s.size()));
+        for (unsigned char c : s) add(uint64_t(c));
+    }
+
+    // Hexadecimal digest (e.g., for use as a file name).
+    static std::string str(uint64_t hash1, uint64_t hash2) {
+        char buf[33];
+        std::snprintf(buf, sizeof(buf), "%016llx%016llx", (unsigned long long) hash1, (unsigned long long) hash2);
+        return buf;
+    }
+    std::string str() const { return str(h1, h2); }
+
+private:
+    static uint64_t m_rotl(uint64_t x, int r) { return (x << r) | (x >> (64 - r)); }
+};
+
+#endif /* end of include guard: CONTENTHASH_HH */
@@ -0,0 +1,178 @@
+////////////////////////////////////////////////////////////////////////////////
+// mesh_adjacency.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//  Vertex-vertex, vertex-element and element-element adjacency of a
+//  simplicial mesh in compressed sparse row (CSR) form: the entities adjacent
+//  to entity i are indices[indptr[i]...indptr[i + 1]-1]. This is the layout
+//  expected by graph routines like scipy.sparse.csgraph, and it is much
+//  cheaper to traverse than the per-entity circulators.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef MESH_ADJACENCY_HH
+#define MESH_ADJACENCY_HH
+
+#include <algorithm>
+#include <atomic>
+#include <memory>
+#include <vector>
+#include <MeshFEM/Parallelism.hh>
+
+struct CSRAdjacency {
+    std::vector<int> indptr, indices;
+
+    size_t size() const { return indptr.empty() ? 0 : indptr.size() - 1; }
+    size_t degree(size_t i) const { return indptr[i + 1] - indptr[i]; }
+};
+
+namespace detail {
+    // Call f(begin, end) on subranges of [0, n), in parallel if possible.
+    template<class F>
+    void parallelForRange(size_t n, const F &f) {
+#if MESHFEM_WITH_TBB
+        tbb::parallel_for(tbb::blocked_range<size_t>(0, n), [&](const tbb::blocked_range<size_t> &r) { f(r.begin(), r.end()); });
+#else
+        f(0, n);
+#endif
+    }
+
+    // Fill a CSR structure with n rows in two parallel passes: count(i)
+    // gives the number of entries of row i, and fill(i, out) writes them.
+    template<class Count, class Fill>
+    CSRAdjacency buildCSR(size_t n, const Count &count, const Fill &fill) {
+        CSRAdjacency result;
+        result.indptr.assign(n + 1, 0);
+        parallelForRange(n, [&](size_t begin, size_t end) { for (size_t i = begin; i < end; ++i) result.indptr[i + 1] = count(i); });
+        for (size_t i = 0; i < n; ++i) result.indptr[i + 1] += result.indptr[i];
+        result.indices.resize(result.indptr[n]);
+        parallelForRange(n, [&](size_t begin, size_t end) { for (size_t i = begin; i < end; ++i) fill(i, result.indices.data() + result.indptr[i]); });
+        return result;
+    }
+
+    // Fill a CSR structure with n rows in a single parallel pass for rows
+    // whose size is not known in advance: append(i, out) appends row i to
+    // out. Rows are appended to per-chunk buffers that are then
+    // concatenated.
+    template<class Append>
+    CSRAdjacency buildCSRAppending(size_t n, const Append &append) {
+        static constexpr size_t chunkSize = 4096;
+        const size_t numChunks = (n + chunkSize - 1) / chunkSize;
+        CSRAdjacency result;
+        result.indptr.assign(n + 1, 0);
+        std::vector<std::vector<int>> chunkIndices(numChunks);
+        parallelForRange(numChunks, [&](size_t cbegin, size_t cend) {
+            for (size_t c = cbegin; c < cend; ++c) {
+                auto &out = chunkIndices[c];
+                for (size_t i = c * chunkSize; i < std::min(n, (c + 1) * chunkSize); ++i) {
+                    const size_t rowStart = out.size();
+                    append(i, out);
+                    result.indptr[i + 1] = out.size() - rowStart;
+                }
+            }
+        });
+        for (size_t i = 0; i < n; ++i) result.indptr[i + 1] += result.indptr[i];
+        result.indices.resize(result.indptr[n]);
+        parallelForRange(numChunks, [&](size_t cbegin, size_t cend) {
+            for (size_t c = cbegin; c < cend; ++c)
+                std::copy(chunkIndices[c].begin(), chunkIndices[c].end(), result.indices.begin() + result.indptr[c * chunkSize]);
+        });
+        return result;
+    }
+}
+
+// Elements incident to each vertex (in increasing order). The incidences are
+// binned in parallel, so the order within each bin depends on scheduling
+// until the bins are sorted.
+template<class Mesh>
+CSRAdjacency vertex_element_adjacency(const Mesh &m) {
+    const size_t nv = m.numVertices(), ne = m.numSimplices();
+    auto binEnd = std::unique_ptr<std::atomic<int>[]>(new std::atomic<int>[nv + 1]);
+    for (size_t v = 0; v <= nv; ++v) binEnd[v] = 0;
+    detail::parallelForRange(ne, [&](size_t begin, size_t end) {
+        for (size_t e = begin; e < end; ++e) {
+            const auto s = m.simplex(e);
+            for (size_t c = 0; c < s.numVertices(); ++c) ++binEnd[s.vertex(c).index() + 1];
+        }
+    });
+
+    CSRAdjacency result;
+    result.indptr.assign(nv + 1, 0);
+    for (size_t v = 0; v < nv; ++v) result.indptr[v + 1] = result.indptr[v] + binEnd[v + 1];
+    for (size_t v = 0; v < nv; ++v) binEnd[v] = result.indptr[v];
+
+    result.indices.resize(result.indptr[nv]);
+    detail::parallelForRange(ne, [&](size_t begin, size_t end) {
+        for (size_t e = begin; e < end; ++e) {
+            const auto s = m.simplex(e);
+            for (size_t c = 0; c < s.numVertices(); ++c) result.indices[binEnd[s.vertex(c).index()]++] = e;
+        }
+    });
+    detail::parallelForRange(nv, [&](size_t begin, size_t end) {
+        for (size_t v = begin; v < end; ++v)
+            std::sort(result.indices.begin() + result.indptr[v], result.indices.begin() + result.indptr[v + 1]);
+    });
+    return result;
+}
+
+namespace detail {
+    // Vertices sharing an element with each of the nv vertices (in increasing
+    // order), from the vertex-element adjacency's CSR arrays;
+    // visitCorners(e, f) calls f on each corner vertex of element e.
+    template<class VisitCorners>
+    CSRAdjacency vertexVertexFromVertexElements(size_t nv, const int *veIndptr, const int *veIndices,
+                                                const VisitCorners &visitCorners) {
+        return buildCSRAppending(nv, [&](size_t v, std::vector<int> &out) {
+            const size_t rowStart = out.size();
+            for (int k = veIndptr[v]; k < veIndptr[v + 1]; ++k) {
+                visitCorners(veIndices[k], [&](int u) { if (size_t(u) != v) out.push_back(u); });
+            }
+            std::sort(out.begin() + rowStart, out.end());
+            out.erase(std::unique(out.begin() + rowStart, out.end()), out.end());
+        });
+    }
+}
+
+// Vertices sharing an element with each vertex (in increasing order).
+// vertexElements: the mesh's vertex_element_adjacency (computed if omitted).
+template<class Mesh>
+CSRAdjacency vertex_vertex_adjacency(const Mesh &m, const CSRAdjacency &vertexElements) {
+    return detail::vertexVertexFromVertexElements(m.numVertices(), vertexElements.indptr.data(), vertexElements.indices.data(),
+            [&](size_t e, const auto &f) {
+                const auto s = m.simplex(e);
+                for (size_t c = 0; c < s.numVertices(); ++c) f(int(s.vertex(c).index()));
+            });
+}
+
+template<class Mesh>
+CSRAdjacency vertex_vertex_adjacency(const Mesh &m) {
+    return vertex_vertex_adjacency(m, vertex_element_adjacency(m));
+}
+
+// Variant for meshes given as arrays: the vertex-element adjacency of nv
+// vertices in CSR form (veIndptr, veIndices) and the elements' corners,
+// elementCorners[e * cornersPerElement + c] being corner c of element e.
+inline CSRAdjacency vertex_vertex_adjacency(size_t nv, const int *veIndptr, const int *veIndices,
+                                            const int *elementCorners, size_t cornersPerElement) {
+    return detail::vertexVertexFromVertexElements(nv, veIndptr, veIndices,
+            [&](size_t e, const auto &f) {
+                for (size_t c = 0; c < cornersPerElement; ++c) f(elementCorners[e * cornersPerElement + c]);
+            });
+}
+
+// Elements sharing a face (tets) or an edge (triangles) with each element,
+// listed in the order of the opposite corners.
+template<class Mesh>
+CSRAdjacency element_element_adjacency(const Mesh &m) {
+    return detail::buildCSR(m.numSimplices(),
+            [&](size_t e) {
+                size_t count = 0;
+                for (const auto &en : m.simplex(e).neighbors()) count += bool(en);
+                return count;
+            },
+            [&](size_t e, int *out) {
+                for (const auto &en : m.simplex(e).neighbors())
+                    if (en) *out++ = en.index();
+            });
+}
+
+#endif /* end of include guard: MESH_ADJACENCY_HH */
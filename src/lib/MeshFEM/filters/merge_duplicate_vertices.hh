@@ -3,14 +3,128 @@
 ////////////////////////////////////////////////////////////////////////////////
 /*! @file
 //      Merge vertices closer than a given threshold to each other.
+//
+//      The vertices are processed in order: each vertex is merged into the
+//      closest previously kept vertex within the threshold (picked as by
+//      CollisionGrid::getClosestPoint) or kept if there is none. The neighbor
+//      searches run in parallel on a CollisionGrid with cells sized to the
+//      threshold; only the final (cheap) greedy pass is serial, so the output
+//      does not depend on the number of threads.
 */
 //  Author:  Julian Panetta (jpanetta), julian.panetta@gmail.com
 //  Created:  12/04/2017 21:55:12
 ////////////////////////////////////////////////////////////////////////////////
 #ifndef MERGE_DUPLICATE_VERTICES_HH
 #define MERGE_DUPLICATE_VERTICES_HH
+#include <algorithm>
 #include <limits>
+#include <vector>
 #include <MeshFEM/CollisionGrid.hh>
+#include <MeshFEM/MeshIO.hh>
+#include <MeshFEM/Parallelism.hh>
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Determine the merged vertex for each input point.
+//  @param[in]  points      input points
+//  @param[in]  threshold   points within this distance of a kept point are
+//                          merged into it
+//  @param[out] renumber    index of the merged vertex for each input point
+//  @return     number of merged vertices (the kept points, in input order)
+*///////////////////////////////////////////////////////////////////////////////
+inline size_t merge_duplicate_vertices_renumbering(const std::vector<Point3D> &points,
+                                                   Real threshold,
+                                                   std::vector<size_t> &renumber) {
+    static constexpr size_t NONE = std::numeric_limits<size_t>::max();
+    const size_t nv = points.size();
+    renumber.assign(nv, NONE);
+    if (nv == 0) return 0;
+
+    // Tie the cell size to the threshold: cells a few times larger than the
+    // search radius keep each query to a handful of (mostly one) cells.
+    // Exact duplicate merging (threshold 0) still needs a positive cell size.
+    Real maxCoord = 0;
+    for (const auto &p : points) maxCoord = std::max(maxCoord, p.cwiseAbs().maxCoeff());
+    Real cellSize = std::max<Real>(4 * threshold, 1e-12 * maxCoord);
+    if (cellSize <= 0) cellSize = 1.0;
+
+    CollisionGrid<Real, Point3D> cgrid(cellSize);
+    cgrid.addPoints(points);
+
+    // Whether a point is kept is only known once all earlier points are
+    // processed, so the points are swept in blocks. Points of earlier blocks
+    // have their final status: each point's best kept match among them is
+    // found directly by the parallel neighbor search, and only its neighbors
+    // within the current block are stored for the serial greedy pass.
+    // Chunks of each block store their candidates contiguously: those of
+    // point i are chunkCandidates[c][chunkOffsets[c][local]...], with c and
+    // local the chunk and index within the chunk of i - blockStart.
+    //
+    // Like getClosestPoint, ties between equally close kept points go to the
+    // one visited last by visitPointsWithin (lexicographic cell order, then
+    // index order within a cell).
+    auto visitedBefore = [&](size_t a, size_t b) {
+        const auto ca = cgrid.cellIndex(points[a]), cb = cgrid.cellIndex(points[b]);
+        return (ca < cb) || ((ca == cb) && (a < b));
+    };
+
+    static constexpr size_t chunkSize = 4096, chunksPerBlock = 16, blockSize = chunksPerBlock * chunkSize;
+    std::vector<bool> kept(nv, false);
+    std::vector<size_t> earlierMatch(std::min(nv, blockSize));
+    std::vector<Real>   earlierMatchDist(earlierMatch.size());
+    std::vector<std::vector<size_t>> chunkCandidates(chunksPerBlock), chunkOffsets(chunksPerBlock);
+    size_t numMerged = 0;
+    for (size_t blockStart = 0; blockStart < nv; blockStart += blockSize) {
+        const size_t blockEnd = std::min(nv, blockStart + blockSize);
+        const size_t numChunks = (blockEnd - blockStart + chunkSize - 1) / chunkSize;
+        auto processChunk = [&](size_t c) {
+            auto &cand = chunkCandidates[c];
+            auto &offsets = chunkOffsets[c];
+            cand.clear();
+            offsets.assign(1, 0);
+            const size_t begin = blockStart + c * chunkSize,
+                         end   = std::min(blockEnd, begin + chunkSize);
+            for (size_t i = begin; i < end; ++i) {
+                size_t &match = earlierMatch[i - blockStart];
+                Real &matchDist = earlierMatchDist[i - blockStart];
+                match = NONE;
+                matchDist = threshold;
+                cgrid.visitPointsWithin(points[i], threshold, [&](const Point3D &, size_t j, Real dist) {
+                    if (j >= i) return;
+                    if (j >= blockStart) cand.push_back(j);
+                    else if (kept[j] && (dist <= matchDist)) { match = j; matchDist = dist; }
+                });
+                offsets.push_back(cand.size());
+            }
+        };
+#if MESHFEM_WITH_TBB
+        tbb::parallel_for(tbb::blocked_range<size_t>(0, numChunks, 1),
+            [&](const tbb::blocked_range<size_t> &r) { for (size_t c = r.begin(); c < r.end(); ++c) processChunk(c); });
+#else
+        for (size_t c = 0; c < numChunks; ++c) processChunk(c);
+#endif
+
+        for (size_t i = blockStart; i < blockEnd; ++i) {
+            size_t closest = earlierMatch[i - blockStart];
+            Real closestDist = earlierMatchDist[i - blockStart];
+            const auto &cand = chunkCandidates[(i - blockStart) / chunkSize];
+            const auto &offsets = chunkOffsets[(i - blockStart) / chunkSize];
+            const size_t local = (i - blockStart) % chunkSize;
+            for (size_t k = offsets[local]; k < offsets[local + 1]; ++k) {
+                const size_t j = cand[k];
+                if (!kept[j]) continue;
+                Real dist = (points[i] - points[j]).norm();
+                if ((dist < closestDist) || ((dist == closestDist) && ((closest == NONE) || visitedBefore(closest, j)))) {
+                    closest = j;
+                    closestDist = dist;
+                }
+            }
+            kept[i] = (closest == NONE);
+            renumber[i] = kept[i] ? numMerged++ : renumber[closest];
+        }
+    }
+
+    return numMerged;
+}
 
 inline void merge_duplicate_vertices(
     const std::vector<MeshIO::IOVertex > &inVertices,
@@ -19,23 +133,16 @@ inline void merge_duplicate_vertices(
           std::vector<MeshIO::IOElement> &outElements,
     Real threshold)
 {
-    CollisionGrid<Real, Point3D> cgrid(1e-4);
-
-    static constexpr size_t NONE = std::numeric_limits<size_t>::max();
     const size_t nv = inVertices.size();
-    std::vector<size_t> renumber(nv, NONE);
+    std::vector<Point3D> points(nv);
+    for (size_t i = 0; i < nv; ++i) points[i] = inVertices[i].point;
+
+    std::vector<size_t> renumber;
     std::vector<MeshIO::IOVertex > newVertices;
+    newVertices.reserve(merge_duplicate_vertices_renumbering(points, threshold, renumber));
     for (size_t i = 0; i < nv; ++i) {
-        const auto &pt = inVertices[i].point;
-        auto cp = cgrid.getClosestPoint(pt, threshold);
-        size_t vtxIdx = NONE;
-        if (cp.first >= 0) vtxIdx = size_t(cp.first);
-        else {
-            vtxIdx = newVertices.size();
-            newVertices.emplace_back(pt);
-            cgrid.addPoint(pt, vtxIdx);
-        }
-        renumber[i] = vtxIdx;
+        // Kept vertices are numbered in input order.
+        if (renumber[i] == newVertices.size()) newVertices.push_back(inVertices[i]);
     }
     outVertices = std::move(newVertices);
     outElements = inElements;
@@ -1,6 +1,8 @@
 #include "MSHFieldWriter_bindings.hh"
 #include <MeshFEM/Utilities/MeshConversion.hh>
 #include <MeshFEM/MSHFieldParser.hh>
+#include <MeshFEM/MeshArchive.hh>
+#include <pybind11/numpy.h>
 #include <MeshFEM/Future.hh>
 
 template<size_t N>
@@ -8,13 +10,15 @@ void bindMSHFieldParserDimSpecific(py::module &m) {
     using MFP = MSHFieldParser<N>;
 
     py::class_<MFP>(m, ("MSHFieldParser" + std::to_string(N)).c_str())
-        .def(py::init<const std::string &, bool>(), py::arg("mshPath"), py::arg("permitDimMismatch") = true)
+        .def(py::init<const std::string &, bool, bool>(), py::arg("mshPath"), py::arg("permitDimMismatch") = true, py::arg("lazy") = false)
         .def("vertices", [](const MFP &mfp) { return getV(mfp.vertices()); })
         .def("elements", [](const MFP &mfp) { return getF(mfp.elements()); })
         .def("meshDegree",    &MFP::meshDegree)
         .def("meshDimension", &MFP::meshDimension)
         .def("numElements",   &MFP::numElements)
         .def("numVertices",   &MFP::numVertices)
+        .def("lazy",          &MFP::lazy)
+        .def("setFieldCacheSize", &MFP::setFieldCacheSize, py::arg("size"))
 
         .def(         "vectorField", [](const MFP &mfp, const std::string &name, DomainType dtype = DomainType::ANY) { auto  vf = mfp.         vectorField(name, dtype); return  vf.data().transpose().eval(); }, py::arg("name"), py::arg("domainType") = DomainType::ANY)
         .def(         "scalarField", [](const MFP &mfp, const std::string &name, DomainType dtype = DomainType::ANY) { auto  sf = mfp.         scalarField(name, dtype); return  sf.values();                  }, py::arg("name"), py::arg("domainType") = DomainType::ANY)
@@ -31,7 +35,14 @@ void bindMSHFieldParserDimSpecific(py::module &m) {
 
 }
 
-py::object mshFieldParserFactory(const std::string &path, bool permitDimMismatch) {
+py::object mshFieldParserFactory(const std::string &path, bool permitDimMismatch, bool lazy) {
+    if (MeshIO::guessFormat(path) == MeshIO::FMT_MFA) {
+        auto mtype = MeshIO::MeshArchive(path).meshType();
+        if (mtype == MeshIO::MESH_TRI) return py::cast(new MSHFieldParser<2>(path, permitDimMismatch, lazy), py::return_value_policy::take_ownership);
+        if (mtype == MeshIO::MESH_TET) return py::cast(new MSHFieldParser<3>(path, permitDimMismatch, lazy), py::return_value_policy::take_ownership);
+        throw std::runtime_error("Unexpected mesh type in archive " + path);
+    }
+
     std::vector<MeshIO::IOVertex > vertices;
     std::vector<MeshIO::IOElement> elements;
     std::ifstream mshFile(path);
@@ -41,19 +52,57 @@ py::object mshFieldParserFactory(const std::string &path, bool permitDimMismatch
     auto mtype = mio->load(mshFile, vertices, elements, MeshIO::MESH_GUESS);
     const size_t elem_size = elements.at(0).size();
     if (mtype == MeshIO::MESH_TRI) {
-        return py::cast(new MSHFieldParser<2>(mshFile, mtype, std::move(elements), std::move(vertices), mio->binary(), permitDimMismatch),
+        return py::cast(new MSHFieldParser<2>(mshFile, mtype, std::move(elements), std::move(vertices), mio->binary(), permitDimMismatch, lazy ? path : std::string()),
                         py::return_value_policy::take_ownership);
     }
     if (mtype == MeshIO::MESH_TET) {
-        return py::cast(new MSHFieldParser<3>(mshFile, mtype, std::move(elements), std::move(vertices), mio->binary(), permitDimMismatch),
+        return py::cast(new MSHFieldParser<3>(mshFile, mtype, std::move(elements), std::move(vertices), mio->binary(), permitDimMismatch, lazy ? path : std::string()),
                         py::return_value_policy::take_ownership);
     }
     throw std::runtime_error("Unexpected element size " + std::to_string(elem_size));
 }
 
+// NumPy view of an archive array; the array keeps the archive alive.
+py::array archiveArray(const py::object &archive, const MeshIO::ArchiveArrayInfo &a) {
+    const auto &ar = archive.cast<const MeshIO::MeshArchive &>();
+    std::vector<py::ssize_t> shape{py::ssize_t(a.rows), py::ssize_t(a.cols)};
+    py::array result = (a.dtype == MeshIO::ArchiveDType::Float64)
+        ? py::array(py::dtype::of<double >(), shape, {}, ar.data(a), archive)
+        : py::array(py::dtype::of<int64_t>(), shape, {}, ar.data(a), archive);
+    // The data is owned by the archive (possibly a read-only mapping).
+    py::detail::array_proxy(result.ptr())->flags &= ~py::detail::npy_api::NPY_ARRAY_WRITEABLE_;
+    return result;
+}
+
 void bindMSHFieldParser(py::module &m) {
+    using MA = MeshIO::MeshArchive;
+    py::enum_<MeshIO::ArchiveArrayRole>(m, "ArchiveArrayRole")
+        .value("Vertices",         MeshIO::ArchiveArrayRole::Vertices)
+        .value("Elements",         MeshIO::ArchiveArrayRole::Elements)
+        .value("NodeField",        MeshIO::ArchiveArrayRole::NodeField)
+        .value("ElementField",     MeshIO::ArchiveArrayRole::ElementField)
+        .value("ElementNodeField", MeshIO::ArchiveArrayRole::ElementNodeField)
+        ;
+
+    py::class_<MA, std::shared_ptr<MA>>(m, "MeshArchive", "Memory-mapped mesh archive (.mfa); arrays are returned as read-only views")
+        .def(py::init<const std::string &>(), py::arg("path"))
+        .def("meshType", [](const MA &ma) { return int(ma.meshType()); })
+        .def("arrayNames", [](const MA &ma, MeshIO::ArchiveArrayRole role) {
+                std::vector<std::string> result;
+                for (const auto &a : ma.arrays()) if (a.role == role) result.push_back(a.name);
+                return result;
+            }, py::arg("role"))
+        .def("vertices", [](const py::object &self) { const auto &ma = self.cast<const MA &>(); return archiveArray(self, ma.get(MeshIO::ArchiveArrayRole::Vertices, "vertices")); })
+        .def("elements", [](const py::object &self) { const auto &ma = self.cast<const MA &>(); return archiveArray(self, ma.get(MeshIO::ArchiveArrayRole::Elements, "elements")); })
+        .def("array", [](const py::object &self, MeshIO::ArchiveArrayRole role, const std::string &name) {
+                const auto &ma = self.cast<const MA &>();
+                return archiveArray(self, ma.get(role, name));
+            }, py::arg("role"), py::arg("name"))
+        .def_static("compressionSupported", &MA::compressionSupported)
+        ;
+
     bindMSHFieldParserDimSpecific<2>(m);
     bindMSHFieldParserDimSpecific<3>(m);
 
-    m.def("MSHFieldParser", &mshFieldParserFactory, py::arg("path"), py::arg("permitDimMismatch") = true);
+    m.def("MSHFieldParser", &mshFieldParserFactory, py::arg("path"), py::arg("permitDimMismatch") = true, py::arg("lazy") = false);
 }
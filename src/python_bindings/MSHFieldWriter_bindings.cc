@@ -16,10 +16,12 @@ void bindMSHFieldWriter(py::module &m) {
 
     field_writer
         .def(py::init([](const std::string &path,
-                    const Eigen::MatrixXd &V, const Eigen::MatrixXi &F, bool binary) {
+                    const Eigen::MatrixXd &V, const Eigen::MatrixXi &F, bool binary, bool asynchronous) {
                     auto mio = getMeshIO(V, F);
-                    return Future::make_unique<MSHFieldWriter>(path, mio.first, mio.second, MeshIO::MESH_GUESS, binary);
-                }), py::arg("path"), py::arg("V"), py::arg("F"), py::arg("binary") = true)
+                    auto writer = Future::make_unique<MSHFieldWriter>(path, mio.first, mio.second, MeshIO::MESH_GUESS, binary);
+                    writer->setAsynchronous(asynchronous);
+                    return writer;
+                }), py::arg("path"), py::arg("V"), py::arg("F"), py::arg("binary") = true, py::arg("asynchronous") = false)
         .def("addField", [](MSHFieldWriter &writer, const std::string &name, const Eigen::MatrixXd &field, DomainType dtype) {
                     if (field.cols() == 1) {
                         ScalarField<double> sf(field);
@@ -42,5 +44,12 @@ void bindMSHFieldWriter(py::module &m) {
                         writer.addField(name, vf, dtype);
                     }
                 }, py::arg("name"), py::arg("field"), py::arg("dtype") = DomainType::GUESS)
+        .def("setAsynchronous", &MSHFieldWriter::setAsynchronous, py::arg("asynchronous"), py::arg("maxQueuedBlocks") = 8,
+             "Write fields on a background thread (addField returns once the field is copied)")
+        .def("asynchronous", &MSHFieldWriter::asynchronous)
+        .def("flush", &MSHFieldWriter::flush, py::call_guard<py::gil_scoped_release>(), "Wait until all added fields are written")
+        .def("archive", &MSHFieldWriter::archive, "Whether the output is a mesh archive (.mfa)")
+        .def("setArchiveCompression", &MSHFieldWriter::setArchiveCompression, py::arg("compress"),
+             "Compress subsequently added fields (mesh archive output only)")
         ;
 }
@@ -0,0 +1,120 @@
+////////////////////////////////////////////////////////////////////////////////
+// MeshNumbering.hh
+////////////////////////////////////////////////////////////////////////////////
+/*! @file
+//  The Python bindings exchange all per-entity data of a mesh reordered at
+//  construction (FEMMesh::permutation()) in the numbering of the unreordered
+//  mesh, the "input numbering": vertices and elements in the order they were
+//  passed in, and edge nodes numbered by first use in the input's element
+//  order (as FEMMesh numbers them, and as MSHFieldWriter writes them). These
+//  helpers translate arrays between the input and the mesh numbering.
+*/
+////////////////////////////////////////////////////////////////////////////////
+#ifndef MESHNUMBERING_HH
+#define MESHNUMBERING_HH
+#include <algorithm>
+#include <limits>
+#include <stdexcept>
+#include <vector>
+#include <MeshFEM/MeshReordering.hh>
+#include <MeshFEM/algorithms/mesh_adjacency.hh>
+
+// The maps between a mesh's numbering and the input numbering. Input vertex
+// i is input node i, and mesh vertex v is mesh node v, so the node maps also
+// relate the vertices. All maps are empty if the mesh wasn't reordered.
+struct InputNumbering {
+    // Mesh index of each input node/element.
+    std::vector<size_t> meshNode, meshElement;
+    // Input index of each mesh node/element.
+    std::vector<size_t> inputNode, inputElement;
+
+    bool isIdentity() const { return meshElement.empty(); }
+};
+
+template<class Mesh>
+InputNumbering inputNumbering(const Mesh &m) {
+    InputNumbering result;
+    if (!m.isReordered()) return result;
+    const auto &perm = m.permutation();
+    const size_t nv = m.numVertices(), nn = m.numNodes();
+    result.meshElement  = perm.element;
+    result.inputElement = perm.originalElement;
+    result.meshNode  = perm.vertex;
+    result.inputNode = perm.originalVertex;
+    result.meshNode.resize(nn);
+    result.inputNode.resize(nn, std::numeric_limits<size_t>::max());
+    size_t numNumbered = nv;
+    for (size_t ei : perm.element) {
+        const auto e = m.element(ei);
+        for (size_t c = 0; c < e.numNodes(); ++c) {
+            const size_t n = e.node(c).index();
+            if ((n < nv) || (result.inputNode[n] != std::numeric_limits<size_t>::max())) continue;
+            result.inputNode[n] = numNumbered;
+            result.meshNode[numNumbered++] = n;
+        }
+    }
+    if (numNumbered != nn) throw std::runtime_error("Unreferenced mesh nodes");
+    return result;
+}
+
+// Entry i of an index map (the identity if the map is empty).
+inline size_t mappedIndex(const std::vector<size_t> &map, size_t i) { return map.empty() ? i : map[i]; }
+
+// Row i of the result is row meshIndex[i] of A (A's rows are indexed by the
+// mesh's numbering, the result's by the input numbering).
+template<class Matrix>
+Matrix rowsInInputOrder(const Matrix &A, const std::vector<size_t> &meshIndex) {
+    if (meshIndex.empty()) return A;
+    if (size_t(A.rows()) > meshIndex.size()) throw std::runtime_error("Unexpected row count");
+    Matrix result(A.rows(), A.cols());
+    for (size_t i = 0; i < size_t(A.rows()); ++i)
+        result.row(i) = A.row(meshIndex[i]);
+    return result;
+}
+
+// Inverse of rowsInInputOrder: row meshIndex[i] of the result is row i of A.
+template<class Matrix>
+Matrix rowsInMeshOrder(const Matrix &A, const std::vector<size_t> &meshIndex) {
+    if (meshIndex.empty()) return A;
+    if (size_t(A.rows()) > meshIndex.size()) throw std::runtime_error("Unexpected row count");
+    Matrix result(A.rows(), A.cols());
+    for (size_t i = 0; i < size_t(A.rows()); ++i)
+        result.row(meshIndex[i]) = A.row(i);
+    return result;
+}
+
+// Replace each entry of A (a mesh index) by the corresponding input index.
+template<class Matrix>
+Matrix indicesInInputNumbering(const Matrix &A, const std::vector<size_t> &inputIndex) {
+    if (inputIndex.empty()) return A;
+    Matrix result(A.rows(), A.cols());
+    for (size_t i = 0; i < size_t(A.rows()); ++i)
+        for (size_t j = 0; j < size_t(A.cols()); ++j)
+            result(i, j) = inputIndex.at(A(i, j));
+    return result;
+}
+
+// Relabel an adjacency between mesh entities: row i of the result is row
+// rowMeshIndex[i] of adj, with its entries mapped through inputIndex (and
+// re-sorted if sortRows).
+inline CSRAdjacency adjacencyInInputNumbering(const CSRAdjacency &adj, const std::vector<size_t> &rowMeshIndex,
+                                              const std::vector<size_t> &inputIndex, bool sortRows) {
+    if (rowMeshIndex.empty()) return adj;
+    const size_t n = adj.size();
+    CSRAdjacency result;
+    result.indptr.assign(n + 1, 0);
+    for (size_t i = 0; i < n; ++i) result.indptr[i + 1] = result.indptr[i] + adj.degree(rowMeshIndex[i]);
+    result.indices.resize(result.indptr[n]);
+    detail::parallelForRange(n, [&](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; ++i) {
+            const auto out = result.indices.begin() + result.indptr[i];
+            std::transform(adj.indices.begin() + adj.indptr[rowMeshIndex[i]],
+                           adj.indices.begin() + adj.indptr[rowMeshIndex[i] + 1], out,
+                           [&](int j) { return int(inputIndex[j]); });
+            if (sortRows) std::sort(out, result.indices.begin() + result.indptr[i + 1]);
+        }
+    });
+    return result;
+}
+
+#endif /* end of include guard: MESHNUMBERING_HH */
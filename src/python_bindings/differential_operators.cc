@@ -6,11 +6,24 @@
 #include <MeshFEM/FEMMesh.hh>
 #include <MeshFEM/Laplacian.hh>
 #include <MeshFEM/MassMatrix.hh>
+#include "MeshNumbering.hh"
 
 #include <tuple>
 
 namespace py = pybind11;
 
+// Renumber a node-indexed matrix into the input node numbering (see
+// MeshNumbering.hh), keeping an upper triangle stored as the upper triangle.
+template<class TMatrix>
+void renumberToInputNodes(TMatrix &A, const InputNumbering &num) {
+    if (num.isIdentity()) return;
+    for (auto &t : A.nz) {
+        t.i = num.inputNode.at(t.i);
+        t.j = num.inputNode.at(t.j);
+        if (A.symmetry_mode == TMatrix::SymmetryMode::UPPER_TRIANGLE && t.i > t.j) std::swap(t.i, t.j);
+    }
+}
+
 template<size_t _K, size_t _Degree, class _EmbeddingSpace>
 struct DiffOpBindings {
     using Mesh = FEMMesh<_K, _Degree, _EmbeddingSpace>;
@@ -23,6 +36,7 @@ struct DiffOpBindings {
             TripletMatrix<> L;
             if (forceP1) L = Laplacian::construct<1>(mesh);
             else         L = Laplacian::construct   (mesh);
+            renumberToInputNodes(L, inputNumbering(mesh));
             if (!upperTriOnly) L.reflectUpperTriangle();
             return L;
         }, py::arg("mesh"), py::arg("forceP1") = false, py::arg("upperTriOnly") = false);
@@ -31,6 +45,7 @@ struct DiffOpBindings {
             TripletMatrix<> M;
             if (forceP1) M = MassMatrix::construct<1>(mesh, lumped);
             else         M = MassMatrix::construct   (mesh, lumped);
+            renumberToInputNodes(M, inputNumbering(mesh));
             if (!upperTriOnly) M.reflectUpperTriangle();
             return M;
         }, py::arg("mesh"), py::arg("lumped") = false, py::arg("forceP1") = false, py::arg("upperTriOnly") = false);
@@ -48,6 +63,9 @@ struct DiffOpBindings {
                     Ltrip = Laplacian ::construct(mesh);
                     Mdiag = MassMatrix::construct(mesh, true).diag();
                 }
+                const InputNumbering num = inputNumbering(mesh);
+                renumberToInputNodes(Ltrip, num);
+                Mdiag = rowsInInputOrder(Mdiag, num.meshNode);
 
                 Eigen::SparseMatrix<Real, Eigen::ColMajor> Lupper(Ltrip.m, Ltrip.n);
                 Lupper.setFromTriplets(Ltrip.nz.begin(), Ltrip.nz.end());
@@ -62,9 +80,10 @@ struct DiffOpBindings {
                 if (scalarField.size() != mesh.numNodes()) throw std::runtime_error("Incorrect scalar field size");
                 MXNd g(mesh.numElements(), int(N)); // the cast to int prevents an ODR-use-induced linking error.
                 g.setZero();
+                const InputNumbering num = inputNumbering(mesh);
                 for (const auto &e : mesh.elements())
                     for (const auto &n : e.nodes())
-                        g.row(e.index()) += scalarField[n.index()] * e->gradPhi(n.localIndex()).average();
+                        g.row(mappedIndex(num.inputElement, e.index())) += scalarField[mappedIndex(num.inputNode, n.index())] * e->gradPhi(n.localIndex()).average();
                 return g;
           }, py::arg("mesh"), py::arg("scalarField").noconvert());
 
@@ -73,9 +92,10 @@ struct DiffOpBindings {
                 if (size_t(vectorField.rows()) != mesh.numElements()) throw std::runtime_error("Incorrect vector field size");
                 Eigen::VectorXd result(mesh.numNodes());
                 result.setZero();
+                const InputNumbering num = inputNumbering(mesh);
                 for (const auto &e : mesh.elements())
                     for (const auto &n : e.nodes())
-                        result[n.index()] += vectorField.row(e.index()).dot(e->gradPhi(n.localIndex()).integrate(e->volume()));
+                        result[mappedIndex(num.inputNode, n.index())] += vectorField.row(mappedIndex(num.inputElement, e.index())).dot(e->gradPhi(n.localIndex()).integrate(e->volume()));
                 return result;
           }, py::arg("mesh"), py::arg("vectorField").noconvert());
     }
@@ -3,6 +3,10 @@
 #include <pybind11/stl.h>
 namespace py = pybind11;
 
+#include <map>
+#include <string>
+#include <unordered_map>
+
 #include <Eigen/Dense>
 #include <MeshFEM/BoundaryConditions.hh>
 #include <MeshFEM/FEMMesh.hh>
@@ -12,7 +16,10 @@ namespace py = pybind11;
 
 #include <MeshFEM/Utilities/NameMangling.hh>
 #include <MeshFEM/Utilities/MeshConversion.hh>
+#include <MeshFEM/algorithms/mesh_adjacency.hh>
+#include <MeshFEM/filters/merge_duplicate_vertices.hh>
 #include "MeshFactory.hh"
+#include "MeshNumbering.hh"
 
 #include "MSHFieldWriter_bindings.hh"
 #include "MSHFieldParser_bindings.hh"
@@ -47,6 +54,20 @@ getVertices(const HandleRange<_Mesh, _HType> &vrange) {
     return V;
 }
 
+// Element (or boundary element) corner array in the input numbering.
+template<class Matrix>
+Matrix elementsInInputOrder(const InputNumbering &num, const Matrix &F) {
+    return indicesInInputNumbering(rowsInInputOrder(F, num.meshElement), num.inputNode);
+}
+
+// Original index of each of the mesh's entities.
+inline Eigen::VectorXi originalIndices(const std::vector<size_t> &originalIndex, size_t n) {
+    Eigen::VectorXi result(n);
+    for (size_t i = 0; i < n; ++i)
+        result[i] = originalIndex.empty() ? i : originalIndex[i];
+    return result;
+}
+
 template<class _Mesh, template<class> class _HType>
 Eigen::Matrix<typename _Mesh::Real, Eigen::Dynamic, _Mesh::EmbeddingDimension>
 getNodes(const HandleRange<_Mesh, _HType> &nrange) {
@@ -90,7 +111,7 @@ getAreaWeightedNormals(const HandleRange<_Mesh, _HType> &vrange) {
 // Normals for tri meshes
 template<class _Mesh>
 typename std::enable_if<_Mesh::K == 2, Eigen::Matrix<typename _Mesh::Real, Eigen::Dynamic, 3>>::type
-getAreaWeightedNormals(const _Mesh &m) { return getAreaWeightedNormals(m.vertices()); }
+getAreaWeightedNormals(const _Mesh &m) { return rowsInInputOrder(getAreaWeightedNormals(m.vertices()), inputNumbering(m).meshNode); }
 
 // Surface normals for tet meshes
 template<class _Mesh>
@@ -107,14 +128,14 @@ using VisualizationGeometry = std::tuple<Eigen::Matrix<float,    Eigen::Dynamic,
                                          Eigen::Matrix<uint32_t, Eigen::Dynamic, 3>,  // Tris
                                          Eigen::Matrix<float,    Eigen::Dynamic, 3>>; // Normals
 
-template<class Mesh> typename std::enable_if<Mesh::K == 2, Eigen::Matrix<int, Eigen::Dynamic, 3>>::type getVisualizationTriangles(const Mesh &m) { return getElementCorners(m.elements()); }
+template<class Mesh> typename std::enable_if<Mesh::K == 2, Eigen::Matrix<int, Eigen::Dynamic, 3>>::type getVisualizationTriangles(const Mesh &m) { return elementsInInputOrder(inputNumbering(m), getElementCorners(m.elements())); }
 template<class Mesh> typename std::enable_if<Mesh::K == 3, Eigen::Matrix<int, Eigen::Dynamic, 3>>::type getVisualizationTriangles(const Mesh &m) { return getElementCorners(m.boundaryElements(), false); }
 
 template<class Mesh>
 Eigen::Matrix<typename Mesh::Real, Eigen::Dynamic, 3> getVisualizationVertices(const Mesh &m) {
     Eigen::Matrix<typename Mesh::Real, Eigen::Dynamic, Eigen::Dynamic> dynamicResult;
     if (Mesh::K == 3) dynamicResult = getVertices(m.boundaryVertices());
-    else              dynamicResult = getVertices(m.vertices());
+    else              dynamicResult = rowsInInputOrder(getVertices(m.vertices()), inputNumbering(m).meshNode);
     Eigen::Matrix<typename Mesh::Real, Eigen::Dynamic, 3> result(dynamicResult.rows(), 3);
     result. leftCols(    dynamicResult.cols()) = dynamicResult;
     result.rightCols(3 - dynamicResult.cols()).setZero();
@@ -128,8 +149,9 @@ VisualizationGeometry getVisualizationGeometry(const Mesh &m) {
                                  getAreaWeightedNormals   (m).template cast<float>()};
 }
 
-// Convert the field data to per-visualization-tri or per-visualization-vtx
-// (NOP for triangle meshes, extract boundary data for tet meshes).
+// Convert the field data (in the input numbering) to per-visualization-tri
+// or per-visualization-vtx (NOP for triangle meshes, extract boundary data for
+// tet meshes).
 template<class Mesh, class FieldType>
 Eigen::Matrix<typename FieldType::Scalar, Eigen::Dynamic, Eigen::Dynamic>
 getVisualizationField(const Mesh &m, const FieldType &field) {
@@ -149,17 +171,19 @@ getVisualizationField(const Mesh &m, const FieldType &field) {
         return result;
     }
     if (Mesh::K == 3) {
+        const auto num = inputNumbering(m);
         if (size_t(field.rows()) == m.numVertices() || (size_t(field.rows()) == m.numNodes())) {
             result.resize(m.numBoundaryVertices(), field.cols());
             for (const auto &bv : m.boundaryVertices())
-                result.row(bv.index()) = field.row(bv.volumeVertex().index());
+                result.row(bv.index()) = field.row(mappedIndex(num.inputNode, bv.volumeVertex().index()));
         }
         else if (size_t(field.rows()) == m.numElements()) {
             result.resize(m.numBoundaryElements(), field.cols());
             for (const auto &be : m.boundaryElements()) {
-                if (size_t(be.opposite().simplex().index()) >= size_t(field.rows())) throw std::runtime_error("out of bounds field");
-                if (size_t(be.                     index()) >= size_t(result.rows())) throw std::runtime_error("out of bounds result");
-                result.row(be.index()) = field.row(be.opposite().simplex().index());
+                const size_t e = mappedIndex(num.inputElement, be.opposite().simplex().index());
+                if (e >= size_t(field.rows())) throw std::runtime_error("out of bounds field");
+                if (size_t(be.index()) >= size_t(result.rows())) throw std::runtime_error("out of bounds result");
+                result.row(be.index()) = field.row(e);
             }
         }
         else throw std::runtime_error("Unexpected field size " + std::to_string(field.rows()));
@@ -168,6 +192,82 @@ getVisualizationField(const Mesh &m, const FieldType &field) {
     throw std::runtime_error("Unimplemented");
 }
 
+////////////////////////////////////////////////////////////////////////////////
+// Cached read-only arrays
+////////////////////////////////////////////////////////////////////////////////
+// Mesh data that Python code requests repeatedly (e.g., viewers in widget
+// callbacks) is converted once per mesh and handed out as read-only, C-ordered
+// NumPy arrays. Entries depending on the node positions are tagged with the
+// mesh's geometryVersion() and rebuilt once it changes. Cached arrays are
+// never modified in place, so arrays obtained earlier remain valid snapshots.
+struct MeshArrayCache {
+    struct Entry {
+        size_t geometryVersion;
+        py::object value;
+    };
+    std::map<std::string, Entry> entries;
+};
+
+// The cache of a mesh's Python object, dropped when that object is destroyed.
+inline MeshArrayCache &meshArrayCache(py::handle pyMesh) {
+    // Intentionally leaked: the cached arrays must not be released after the
+    // interpreter shuts down.
+    static auto &caches = *new std::unordered_map<PyObject *, MeshArrayCache>();
+    PyObject *key = pyMesh.ptr();
+    auto it = caches.find(key);
+    if (it != caches.end()) return it->second;
+    py::cpp_function cleanup([key](py::handle weakref) { caches.erase(key); weakref.dec_ref(); });
+    py::weakref(pyMesh, cleanup).release();
+    return caches[key];
+}
+
+inline py::object readOnly(py::object value) {
+    if (py::isinstance<py::tuple>(value)) {
+        for (auto entry : value) readOnly(py::reinterpret_borrow<py::object>(entry));
+    }
+    else value.attr("setflags")(py::arg("write") = false);
+    return value;
+}
+
+template<class Derived>
+Eigen::Matrix<typename Derived::Scalar, Derived::RowsAtCompileTime, Derived::ColsAtCompileTime,
+              (Derived::ColsAtCompileTime == 1) ? Eigen::ColMajor : Eigen::RowMajor>
+rowMajor(const Eigen::MatrixBase<Derived> &A) { return A; }
+
+template<class T, typename std::enable_if<!std::is_base_of<py::handle, T>::value, int>::type = 0>
+py::object toPython(T &&value) { return py::cast(std::forward<T>(value)); }
+inline py::object toPython(py::object value) { return value; }
+
+// Look up (or compute and cache) the array `name` of mesh m.
+template<class Mesh, class F>
+py::object cachedArray(const Mesh &m, const std::string &name, bool dependsOnGeometry, const F &compute) {
+    py::object pyMesh = py::cast(&m, py::return_value_policy::reference);
+    auto &entries = meshArrayCache(pyMesh).entries;
+    const size_t version = dependsOnGeometry ? m.geometryVersion() : 0;
+    auto it = entries.find(name);
+    if ((it != entries.end()) && (it->second.geometryVersion == version)) return it->second.value;
+    py::object value = readOnly(toPython(compute()));
+    entries[name] = MeshArrayCache::Entry{version, value};
+    return value;
+}
+
+// NumPy array taking ownership of a vector's storage (no copy).
+template<typename T>
+py::array_t<T> toNumPy(std::vector<T> &&v) {
+    auto data = new std::vector<T>(std::move(v));
+    py::capsule owner(data, [](void *p) { delete static_cast<std::vector<T> *>(p); });
+    return py::array_t<T>(data->size(), data->data(), owner);
+}
+
+using IndexArray = py::array_t<int64_t, py::array::c_style | py::array::forcecast>;
+
+inline IndexArray toIndexArray(const std::vector<size_t> &v) { return toNumPy(std::vector<int64_t>(v.begin(), v.end())); }
+inline std::vector<size_t> fromIndexArray(const IndexArray &a) { return std::vector<size_t>(a.data(), a.data() + a.size()); }
+
+inline py::tuple toNumPy(CSRAdjacency &&adj) {
+    return py::make_tuple(toNumPy(std::move(adj.indptr)), toNumPy(std::move(adj.indices)));
+}
+
 template<size_t _K, size_t _Degree, class _EmbeddingSpace>
 struct MeshBindingsBase {
     using Mesh = FEMMesh<_K, _Degree, _EmbeddingSpace>;
@@ -176,41 +276,89 @@ struct MeshBindingsBase {
     using MXNd   = Eigen::Matrix<Real, Eigen::Dynamic, EmbeddingDimension>;
     using MX3d   = Eigen::Matrix<Real, Eigen::Dynamic,                  3>;
     using MXKp1i = Eigen::Matrix< int, Eigen::Dynamic, _K + 1>;
+    using IntArray = py::array_t<int, py::array::c_style>;
+
+    static py::object elements(const Mesh &m) {
+        return cachedArray(m, "elements", false, [&]() { return rowMajor(elementsInInputOrder(inputNumbering(m), getElementCorners(m.elements()))); });
+    }
+
+    static py::object vertexElementAdjacency(const Mesh &m) {
+        return cachedArray(m, "vertexElementAdjacency", false, [&]() {
+              const auto num = inputNumbering(m);
+              return toNumPy(adjacencyInInputNumbering(vertex_element_adjacency(m), num.meshNode, num.inputElement, true));
+        });
+    }
+
+    // Built from the cached vertex-element adjacency and element arrays
+    // (which are already in the input numbering).
+    static py::object vertexVertexAdjacency(const Mesh &m) {
+        return cachedArray(m, "vertexVertexAdjacency", false, [&]() {
+              const py::tuple ve = vertexElementAdjacency(m);
+              const auto indptr = ve[0].cast<IntArray>(), indices = ve[1].cast<IntArray>();
+              const auto F = elements(m).template cast<IntArray>();
+              return toNumPy(vertex_vertex_adjacency(m.numVertices(), indptr.data(), indices.data(), F.data(), _K + 1));
+        });
+    }
 
     static MeshBindingsType<Mesh> bind(py::module& module) {
         MeshBindingsType<Mesh> mb(module, getMeshName<Mesh>().c_str());
         // WARNING: Mesh's holder type is a shared_ptr; returning a unique_ptr will lead to a dangling pointer in the current version of Pybind11
-        mb.def(py::init([](       const std::string &path) { return std::shared_ptr<Mesh>(Mesh::load(path)); }), py::arg("path"))
-          .def(py::init([](const MXNd &V, const MXKp1i &F) { return std::make_shared<Mesh>(F, V);  }), py::arg("V"), py::arg("F"));
+        // The optional "ordering" ("none", "morton", "hilbert" or "rcm") renumbers the mesh
+        // internally for locality. All arrays and per-entity data exchanged with the mesh
+        // (vertices(), elements(), nodes(), setVertices(), boundary arrays, adjacencies,
+        // visualization and output fields, ...) still use the input's numbering (see
+        // MeshNumbering.hh); originalVertexIndices()/originalElementIndices() expose the
+        // internal numbering.
+        mb.def(py::init([](       const std::string &path, const std::string &ordering) { return std::shared_ptr<Mesh>(Mesh::load(path, parseMeshOrdering(ordering))); }), py::arg("path"), py::arg("ordering") = "none")
+          .def(py::init([](const MXNd &V, const MXKp1i &F, const std::string &ordering) { return std::make_shared<Mesh>(F, V, parseMeshOrdering(ordering));  }), py::arg("V"), py::arg("F"), py::arg("ordering") = "none");
         if (EmbeddingDimension != 3) {
             // Also add a truncating constructor for 3D vertex arrays (if the mesh isn't embedded in 3D)
-           mb.def(py::init([](const MX3d &V, const MXKp1i &F) { return std::make_shared<Mesh>(F, V);  }), py::arg("V"), py::arg("F"));
+           mb.def(py::init([](const MX3d &V, const MXKp1i &F, const std::string &ordering) { return std::make_shared<Mesh>(F, V, parseMeshOrdering(ordering));  }), py::arg("V"), py::arg("F"), py::arg("ordering") = "none");
         }
-        mb.def("vertices", [](const Mesh& m) { return getVertices(m.vertices()); })
-          .def("nodes",    [](const Mesh& m) { return    getNodes(m.nodes()); })
-          .def("setVertices", [](Mesh &m, MXNd &V) {
+        // Vertex, element and boundary arrays (and the visualization geometry) are cached
+        // and returned as read-only arrays; copy them before modifying.
+        mb.def("vertices", [](const Mesh& m) { return cachedArray(m, "vertices", true, [&]() { return rowMajor(rowsInInputOrder(getVertices(m.vertices()), inputNumbering(m).meshNode)); }); })
+          .def("nodes",    [](const Mesh& m) { return cachedArray(m, "nodes",    true, [&]() { return rowMajor(rowsInInputOrder(getNodes(m.nodes()),       inputNumbering(m).meshNode)); }); })
+          .def("setVertices", [](Mesh &m, const MXNd &V) {
                   const size_t nv = V.rows();
                   if ((nv != m.numVertices()) && (nv != m.numNodes())) throw std::runtime_error("Incorrect vertex count");
-                  m.setNodePositions(V);
+                  m.setNodePositions(rowsInMeshOrder(V, inputNumbering(m).meshNode));
                })
-          .def("elements",         [](const Mesh &m) { return getElementCorners(m.elements()); })
-          .def("boundaryElements", [](const Mesh &m) { return getElementCorners(m.boundaryElements()); })
+          .def("elements",         &elements)
+          .def("boundaryElements", [](const Mesh &m) { return cachedArray(m, "boundaryElements", false, [&]() { return rowMajor(indicesInInputNumbering(getElementCorners(m.boundaryElements()), inputNumbering(m).inputNode)); }); })
           .def("boundaryVertices", [](const Mesh &m) {
-                    Eigen::VectorXi result(m.numBoundaryVertices());
-                    for (const auto &bv : m.boundaryVertices())
-                        result(bv.index()) = bv.volumeVertex().index();
-                    return result;
+                  return cachedArray(m, "boundaryVertices", false, [&]() {
+                        const auto num = inputNumbering(m);
+                        Eigen::VectorXi result(m.numBoundaryVertices());
+                        for (const auto &bv : m.boundaryVertices())
+                            result(bv.index()) = mappedIndex(num.inputNode, bv.volumeVertex().index());
+                        return result;
+                  });
                })
+          .def("vertexVertexAdjacency",   &vertexVertexAdjacency, "Vertices sharing an element with each vertex as a CSR (indptr, indices) pair of read-only arrays: the neighbors of vertex i are indices[indptr[i]:indptr[i + 1]]")
+          .def("vertexElementAdjacency",  &vertexElementAdjacency, "Elements incident to each vertex as a CSR (indptr, indices) pair of read-only arrays")
+          .def("elementElementAdjacency", [](const Mesh &m) {
+                  return cachedArray(m, "elementElementAdjacency", false, [&]() {
+                        const auto num = inputNumbering(m);
+                        return toNumPy(adjacencyInInputNumbering(element_element_adjacency(m), num.meshElement, num.inputElement, false));
+                  });
+               }, "Elements sharing a face (or edge, for triangle meshes) with each element as a CSR (indptr, indices) pair of read-only arrays")
           .def("elementsAdjacentBoundary", [](const Mesh &m) {
+                  const auto num = inputNumbering(m);
                   Eigen::VectorXi result(m.numBoundaryElements());
                   for (const auto &be : m.boundaryElements())
-                      result[be.index()] = be.opposite().simplex().index();
+                      result[be.index()] = mappedIndex(num.inputElement, be.opposite().simplex().index());
                   return result;
               })
 
           .def("visualizationTriangles", &getVisualizationTriangles<Mesh>)
           .def("visualizationVertices",  &getVisualizationVertices <Mesh>)
-          .def("visualizationGeometry",  &getVisualizationGeometry <Mesh>)
+          .def("visualizationGeometry",  [](const Mesh &m) {
+                  return cachedArray(m, "visualizationGeometry", true, [&]() {
+                        VisualizationGeometry g = getVisualizationGeometry(m);
+                        return std::make_tuple(rowMajor(std::get<0>(g)), rowMajor(std::get<1>(g)), rowMajor(std::get<2>(g)));
+                  });
+               })
           .def("visualizationField", [](const Mesh &m, const Eigen::VectorXd &f) { return getVisualizationField(m, f); }, "Convert a per-vertex or per-element field into a per-visualization-geometry field (called internally by MeshFEM visualization)", py::arg("perEntityField"))
           .def("visualizationField", [](const Mesh &m, const MXNd            &f) { return getVisualizationField(m, f); }, "Convert a per-vertex or per-element field into a per-visualization-geometry field (called internally by MeshFEM visualization)", py::arg("perEntityField"))
           .def("vertexNormals", &getAreaWeightedNormals<Mesh>, (_K == 2) ? "Vertex normals (triangle area weighted)"
@@ -219,8 +367,22 @@ struct MeshBindingsBase {
           .def("numVertices", &Mesh::numVertices)
           .def("numElements", &Mesh::numElements)
           .def("numNodes",    &Mesh::numNodes)
-          .def("save", [&](const Mesh &m, const std::string& path) { return MeshIO::save(path, m); })
-          .def("field_writer", [](const Mesh &m, const std::string &path) { return Future::make_unique<MSHFieldWriter>(path, m); }, py::arg("path"))
+          .def("save", [&](const Mesh &m, const std::string& path) {
+                  if (!m.isReordered()) return MeshIO::save(path, m);
+                  const auto num = inputNumbering(m);
+                  const auto io = getMeshIO(rowsInInputOrder(getVertices(m.vertices()), num.meshNode),
+                                            elementsInInputOrder(num, getElementCorners(m.elements())));
+                  MeshIO::save(path, io.first, io.second);
+              })
+          .def("isReordered", &Mesh::isReordered)
+          .def("originalVertexIndices",  [](const Mesh &m) { return originalIndices(m.permutation().originalVertex,  m.numVertices()); }, "Input index of each vertex in the mesh's internal numbering")
+          .def("originalElementIndices", [](const Mesh &m) { return originalIndices(m.permutation().originalElement, m.numElements()); }, "Input index of each element in the mesh's internal numbering")
+          .def("field_writer", [](const Mesh &m, const std::string &path, bool asynchronous) {
+                    auto writer = Future::make_unique<MSHFieldWriter>(path, m);
+                    writer->setFieldsInOriginalOrder(true);
+                    writer->setAsynchronous(asynchronous);
+                    return writer;
+                }, py::arg("path"), py::arg("asynchronous") = false)
           .def("is_tet_mesh",  [](const Mesh &) { return _K == 3; })
           .def_property_readonly("bbox_volume", [](const Mesh& m) { return m.boundingBox().volume(); }, "bounding box volume")
           .def_property_readonly(     "volume", [](const Mesh& m) { return m.volume(); }, "mesh volume")
@@ -229,6 +391,39 @@ struct MeshBindingsBase {
           .def_property_readonly_static("embeddingDimension", [](py::object) { return EmbeddingDimension; })
 
           .def("copy", [](const Mesh &m) { return std::make_shared<Mesh>(m); })
+          // Pickle the vertex and element arrays in the mesh's numbering (and the
+          // reordering relating them to the input's), plus the positions of the
+          // edge nodes (which needn't be the edge midpoints); the topology is
+          // rebuilt on load.
+          .def(py::pickle([](const Mesh &m) {
+                    const MXNd nodes = getNodes(m.nodes());
+                    const size_t nv = m.numVertices();
+                    return py::make_tuple(MXNd(nodes.topRows(nv)), getElementCorners(m.elements()),
+                                          toIndexArray(m.permutation().originalVertex),
+                                          toIndexArray(m.permutation().originalElement),
+                                          MXNd(nodes.bottomRows(nodes.rows() - nv)));
+                },
+                [](const py::tuple &t) {
+                    if (t.size() != 5) throw std::runtime_error("Invalid state!");
+                    const MXNd vertices = t[0].cast<MXNd>();
+                    ReorderedMesh rm = reorderMesh(t[1].cast<MXKp1i>(), vertices, MeshOrdering::None);
+                    auto originalVertex  = fromIndexArray(t[2].cast<IndexArray>()),
+                         originalElement = fromIndexArray(t[3].cast<IndexArray>());
+                    // Both index arrays are empty for a mesh that wasn't reordered.
+                    const bool identity = originalVertex.empty() && originalElement.empty();
+                    if (!identity && ((originalVertex.size() != rm.vertices.size()) || (originalElement.size() != rm.elements.size())))
+                        throw std::runtime_error("Invalid state: permutation size mismatch");
+                    rm.permutation = meshPermutationFromOriginalIndices(std::move(originalVertex), std::move(originalElement));
+                    auto m = std::make_shared<Mesh>(std::move(rm));
+                    const MXNd edgeNodes = t[4].cast<MXNd>();
+                    if (size_t(vertices.rows() + edgeNodes.rows()) != m->numNodes()) throw std::runtime_error("Invalid state: node count mismatch");
+                    if (edgeNodes.rows() > 0) {
+                        MXNd nodes(m->numNodes(), vertices.cols());
+                        nodes << vertices, edgeNodes;
+                        m->setNodePositions(nodes);
+                    }
+                    return m;
+                }))
           ;
       return mb;
     }
@@ -242,28 +437,31 @@ struct TriMeshSpecificBindings : public MeshBindingsBase<2, _Degree, _EmbeddingS
         auto mesh_bindings = Base::bind(module);
         mesh_bindings
             .def("numTris",     &Mesh::numTris)
-            .def("triangles",  [](const Mesh &m) { return getElementCorners(m.elements()); })
+            .def("triangles",  [](const Mesh &m) { return elementsInInputOrder(inputNumbering(m), getElementCorners(m.elements())); })
             .def("trisAdjTri", [](const Mesh &m, size_t ti) {
                     std::vector<int> result;
                     if (ti >= m.numTris()) throw std::runtime_error("Triangle index out of bounds");
-                    for (const auto &tri_j : m.tri(ti).neighbors()) {
+                    const auto &perm = m.permutation();
+                    for (const auto &tri_j : m.tri(mappedIndex(perm.element, ti)).neighbors()) {
                         if (!tri_j) continue;
-                        result.push_back(tri_j.index());
+                        result.push_back(mappedIndex(perm.originalElement, tri_j.index()));
                     }
                     return result;
                 })
             .def("vtsAdjVtx", [](const Mesh &m, size_t vi) {
                     std::vector<int> result;
                     if (vi >= m.numVertices()) throw std::runtime_error("Vertex index out of bounds");
-                    for (const auto &he : m.vertex(vi).incidentHalfEdges())
-                        result.push_back(he.tail().index());
+                    const auto &perm = m.permutation();
+                    for (const auto &he : m.vertex(mappedIndex(perm.vertex, vi)).incidentHalfEdges())
+                        result.push_back(mappedIndex(perm.originalVertex, he.tail().index()));
                     return result;
                 })
             .def("valences", [](const Mesh &m) {
+                    const auto &perm = m.permutation();
                     std::vector<int> result(m.numVertices());
                     for (const auto &tri : m.elements()) {
                         for (const auto &v : tri.vertices())
-                            ++result[v.index()];
+                            ++result[mappedIndex(perm.originalVertex, v.index())];
                     }
                     return result;
                 })
@@ -281,7 +479,7 @@ struct TetMeshSpecificBindings : public MeshBindingsBase<3, _Degree, _EmbeddingS
         auto mesh_bindings = Base::bind(module);
         mesh_bindings
             .def("numTets",     &Mesh::numTets)
-            .def("tets", [](const Mesh &m) { return getElementCorners(m.elements()); })
+            .def("tets", [](const Mesh &m) { return elementsInInputOrder(inputNumbering(m), getElementCorners(m.elements())); })
             .def("boundaryMesh", [](const Mesh &m) {
                         return std::make_shared<BoundaryMesh>(getElementCorners(m.boundaryElements(), false), getVertices(m.boundaryVertices()));
                 }, "Get a triangle mesh of the boundary (copy)")
@@ -299,10 +497,28 @@ struct MeshBindings<2, _Degree, _EmbeddingSpace> : public TriMeshSpecificBinding
 template<size_t _Degree, class _EmbeddingSpace>
 struct MeshBindings<3, _Degree, _EmbeddingSpace> : public TetMeshSpecificBindings<_Degree, _EmbeddingSpace> { };
 
+// PeriodicCondition as exposed to Python: periodicDoFsForNodes() is indexed by
+// the mesh's input node numbering (see MeshNumbering.hh).
+template<size_t _Dimension>
+struct PyPeriodicCondition : public PeriodicCondition<_Dimension> {
+    template<class Mesh, typename... Args>
+    PyPeriodicCondition(const Mesh &m, Args&&... args)
+        : PeriodicCondition<_Dimension>(m, std::forward<Args>(args)...), meshNode(inputNumbering(m).meshNode) { }
+
+    std::vector<size_t> periodicDoFsForInputNodes() const {
+        const auto &dofForNode = this->periodicDoFsForNodes();
+        std::vector<size_t> result(dofForNode.size());
+        for (size_t i = 0; i < result.size(); ++i) result[i] = dofForNode[mappedIndex(meshNode, i)];
+        return result;
+    }
+
+    std::vector<size_t> meshNode;
+};
+
 template<size_t _Dimension>
 void bindPeriodicCondition(py::module& module)
 {
-    using PC = PeriodicCondition<_Dimension>;
+    using PC = PyPeriodicCondition<_Dimension>;
     using LinearMesh    = FEMMesh<_Dimension, 1, Eigen::Matrix<double, _Dimension, 1>>;
     using QuadraticMesh = FEMMesh<_Dimension, 2, Eigen::Matrix<double, _Dimension, 1>>;
 
@@ -314,9 +530,9 @@ void bindPeriodicCondition(py::module& module)
 
     // We use a shared_ptr holder to support using PeriodicCondition instances
     // as optionally "None" arguments
-    py::class_<PeriodicCondition<_Dimension>, std::shared_ptr<PeriodicCondition<_Dimension>>>(
+    py::class_<PC, std::shared_ptr<PC>>(
       module, ("PeriodicCondition" + std::to_string(_Dimension) + "D").c_str())
-      .def("periodicDoFsForNodes", &PeriodicCondition<_Dimension>::periodicDoFsForNodes);
+      .def("periodicDoFsForNodes", &PC::periodicDoFsForInputNodes);
 }
 
 template<typename _Real>
@@ -349,7 +565,7 @@ PYBIND11_MODULE(mesh, m)
     bindPeriodicCondition<3>(m);
 
     // Mesh "Factory" function for dynamically creating an instance of the appropriate FEMMesh instantiation.
-    m.def("Mesh", [](const std::string &path, size_t degree, size_t embeddingDimension) {
+    m.def("Mesh", [](const std::string &path, size_t degree, size_t embeddingDimension, const std::string &ordering) {
             std::vector<MeshIO::IOVertex > vertices;
             std::vector<MeshIO::IOElement> elements;
             auto type = MeshIO::load(path, vertices, elements, MeshIO::FMT_GUESS, MeshIO::MESH_GUESS);
@@ -367,9 +583,9 @@ PYBIND11_MODULE(mesh, m)
                 for (const auto &v : vertices)
                     if (std::abs(v[2]) > 1e-10) embeddingDimension = 3;
             }
-            return MeshFactory<double>(elements, vertices, K, degree, embeddingDimension);
-        }, py::arg("path"), py::arg("degree") = 1, py::arg("embeddingDimension") = 0);
-    m.def("Mesh", [](const Eigen::MatrixXd &V, const Eigen::MatrixXi &F, size_t degree, size_t embeddingDimension) {
+            return MeshFactory<double>(elements, vertices, K, degree, embeddingDimension, parseMeshOrdering(ordering));
+        }, py::arg("path"), py::arg("degree") = 1, py::arg("embeddingDimension") = 0, py::arg("ordering") = "none");
+    m.def("Mesh", [](const Eigen::MatrixXd &V, const Eigen::MatrixXi &F, size_t degree, size_t embeddingDimension, const std::string &ordering) {
             size_t K = F.cols() - 1;
             if ((K < 2) || (K > 3)) throw std::runtime_error("Mesh must be triangle or tet.");
 
@@ -380,8 +596,22 @@ PYBIND11_MODULE(mesh, m)
             std::vector<MeshIO::IOElement> elements;
             std::tie(vertices, elements) = getMeshIO(V, F);
 
-            return MeshFactory<double>(elements, vertices, K, degree, embeddingDimension);
-        }, py::arg("V"), py::arg("F"), py::arg("degree") = 1, py::arg("embeddingDimension") = 0);
+            return MeshFactory<double>(elements, vertices, K, degree, embeddingDimension, parseMeshOrdering(ordering));
+        }, py::arg("V"), py::arg("F"), py::arg("degree") = 1, py::arg("embeddingDimension") = 0, py::arg("ordering") = "none");
+
+    m.def("merge_duplicate_vertices", [](const Eigen::MatrixXd &V, const Eigen::MatrixXi &F, double threshold) {
+            if ((V.cols() != 2) && (V.cols() != 3)) throw std::runtime_error("V must be a |V|x2 or |V|x3 array");
+            std::vector<MeshIO::IOVertex > vertices;
+            std::vector<MeshIO::IOElement> elements;
+            std::tie(vertices, elements) = getMeshIO(V, F);
+            merge_duplicate_vertices(vertices, elements, vertices, elements, threshold);
+            Eigen::MatrixXd mergedV = getV(vertices).leftCols(V.cols());
+            Eigen::MatrixXi mergedF(F.rows(), F.cols());
+            for (size_t i = 0; i < elements.size(); ++i)
+                for (size_t c = 0; c < elements[i].size(); ++c) mergedF(i, c) = elements[i][c];
+            return std::make_pair(mergedV, mergedF);
+        }, py::arg("V"), py::arg("F"), py::arg("threshold") = 0.0,
+        "Merge vertices closer than threshold to each other (processed in order: each vertex is merged into the closest earlier kept vertex), returning the new (V, F)");
 
     using PSetTriangulation = PolygonSetTriangulation<
         double, Eigen::Vector2d, std::pair<size_t, size_t>>;
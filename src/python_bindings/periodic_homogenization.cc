@@ -2,6 +2,7 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/iostream.h>
+#include <pybind11/numpy.h>
 namespace py = pybind11;
 
 #include <Eigen/Dense>
@@ -14,10 +15,15 @@ namespace py = pybind11;
 #include <MeshFEM/LinearElasticity.hh>
 #include <MeshFEM/Utilities/MeshConversion.hh>
 #include <MeshFEM/GlobalBenchmark.hh>
+#include <MeshFEM/HomogenizationCache.hh>
+#include <MeshFEM/Parallelism.hh>
+#include "MeshNumbering.hh"
 
 template<typename Mesh>
 using ETensor = ElasticityTensor<typename Mesh::Real, Mesh::EmbeddingDimension>;
 
+// The fluctuation fields are stored in the mesh's input numbering (see
+// MeshNumbering.hh), like all other per-node/per-element arrays in Python.
 template<typename Mesh>
 struct HomogenizationResult {
     static constexpr size_t Dim = Mesh::EmbeddingDimension;
@@ -30,37 +36,64 @@ struct HomogenizationResult {
     std::vector<SMField> strain_w_ij;
 };
 
-template<size_t _N>
-using HMG = LinearElasticity::HomogenousMaterialGetter<Materials::Constant>::template Getter<_N>;
-
+////////////////////////////////////////////////////////////////////////////////
+/*! Homogenize a single cell. The base material is stored on the simulator's
+//  elements (not in a global), so concurrent calls are safe.
+//  If computeFluctuationFields is false, only Ch is computed.
+*///////////////////////////////////////////////////////////////////////////////
 template<typename _Mesh>
-HomogenizationResult<_Mesh> runHomogenization(
+HomogenizationResult<_Mesh> homogenizeCell(
         const _Mesh &mesh, const ETensor<_Mesh> &Cbase, bool orthotropicCell,
         const std::string &manualPeriodicVerticesFile, bool centerFluctuationDisplacements,
-        bool ignorePeriodicMismatch) {
+        bool ignorePeriodicMismatch, bool computeFluctuationFields = true) {
     using Real = typename _Mesh::Real;
     static constexpr size_t N = _Mesh::EmbeddingDimension;
-    using LEMesh = LinearElasticity::Mesh<N, _Mesh::Deg, HMG>;
-    HMG<N>::material.setTensor(Cbase);
+    using LEMesh = LinearElasticity::Mesh<N, _Mesh::Deg>;
     LinearElasticity::Simulator<LEMesh> sim(getF(mesh), getV(mesh));
+    LinearElasticity::ETensorStoreGetter<N> store(Cbase);
+    for (size_t i = 0; i < sim.mesh().numElements(); ++i)
+        sim.mesh().element(i)->configure(store);
 
     HomogenizationResult<_Mesh> result;
     std::vector<VectorField<Real, N>> w_ij;
 
-    // Compute fluctuation displacements and homogenized elasticity tensor
-    std::unique_ptr<PeriodicCondition<N>> pc;
-    if (!manualPeriodicVerticesFile.empty())
-        pc = Future::make_unique<PeriodicCondition<N>>(sim.mesh(), manualPeriodicVerticesFile);
-    if (orthotropicCell) {
-        auto systems = PeriodicHomogenization::Orthotropic::solveCellProblems(w_ij, sim);
-        result.Ch = PeriodicHomogenization::Orthotropic::homogenizedElasticityTensorDisplacementForm(w_ij, sim);
+    // Reuse a previously computed result if the cache is enabled.
+    auto &cache = HomogenizationCache::instance();
+    HomogenizationCache::Key cacheKey;
+    HomogenizationCache::Entry cached;
+    const bool useCache = cache.enabled();
+    if (useCache) cacheKey = homogenizationCacheKey(mesh, Cbase, orthotropicCell, ignorePeriodicMismatch, manualPeriodicVerticesFile);
+    if (useCache && cache.load(cacheKey, cached, computeFluctuationFields)) {
+        extractHomogenizationCacheEntry(cached, sim.mesh().numNodes(), result.Ch, w_ij);
+        if (!computeFluctuationFields) return result;
     }
     else {
-        PeriodicHomogenization::solveCellProblems(w_ij, sim, 1e-7, ignorePeriodicMismatch, std::move(pc));
-        result.Ch = PeriodicHomogenization::homogenizedElasticityTensorDisplacementForm(w_ij, sim);
+        // Compute fluctuation displacements and homogenized elasticity tensor
+        std::unique_ptr<PeriodicCondition<N>> pc;
+        if (!manualPeriodicVerticesFile.empty())
+            pc = Future::make_unique<PeriodicCondition<N>>(sim.mesh(), manualPeriodicVerticesFile);
+        if (orthotropicCell) {
+            {
+                BENCHMARK_SCOPED_TIMER_SECTION timer("Cell Problems");
+                auto systems = PeriodicHomogenization::Orthotropic::solveCellProblems(w_ij, sim);
+            }
+            BENCHMARK_SCOPED_TIMER_SECTION timer("Compute Tensor");
+            result.Ch = PeriodicHomogenization::Orthotropic::homogenizedElasticityTensorDisplacementForm(w_ij, sim);
+        }
+        else {
+            {
+                BENCHMARK_SCOPED_TIMER_SECTION timer("Cell Problems");
+                PeriodicHomogenization::solveCellProblems(w_ij, sim, 1e-7, ignorePeriodicMismatch, std::move(pc));
+            }
+            BENCHMARK_SCOPED_TIMER_SECTION timer("Compute Tensor");
+            result.Ch = PeriodicHomogenization::homogenizedElasticityTensorDisplacementForm(w_ij, sim);
+        }
+
+        if (useCache) cache.store(cacheKey, homogenizationCacheEntry(result.Ch, w_ij));
     }
 
     const size_t numCellProblems = w_ij.size();
+    if (!computeFluctuationFields) return result;
 
     if (centerFluctuationDisplacements) {
         for (size_t i = 0; i < numCellProblems; ++i) {
@@ -72,30 +105,147 @@ HomogenizationResult<_Mesh> runHomogenization(
         }
     }
 
-    // Convert to numpy-compatible output
+    // Convert to numpy-compatible output (in the input numbering; the
+    // simulator numbers the nodes and elements like the mesh).
+    const InputNumbering num = inputNumbering(mesh);
     result.w_ij.resize(numCellProblems);
     for (size_t i = 0; i < numCellProblems; ++i) {
         const auto &w = w_ij[i];
         result.w_ij[i].resize(w.domainSize(), N);
         for (size_t ii = 0; ii < w.domainSize(); ++ii)
-            result.w_ij[i].row(ii) = w(ii).transpose();
+            result.w_ij[i].row(ii) = w(mappedIndex(num.meshNode, ii)).transpose();
     }
 
     // Compute fluctuation strains
+    BENCHMARK_SCOPED_TIMER_SECTION timer("Fluctuation Strains");
     result.strain_w_ij.resize(numCellProblems);
-    for (size_t i = 0; i < numCellProblems; ++i)
-        result.strain_w_ij[i] = sim.averageStrainField(w_ij[i]);
+    for (size_t i = 0; i < numCellProblems; ++i) {
+        const auto strain = sim.averageStrainField(w_ij[i]);
+        auto &s = result.strain_w_ij[i];
+        s.resizeDomain(strain.domainSize());
+        for (size_t ei = 0; ei < strain.domainSize(); ++ei)
+            s.data().col(ei) = strain.data().col(mappedIndex(num.meshElement, ei));
+    }
 
     return result;
 }
 
+template<typename _Mesh>
+HomogenizationResult<_Mesh> runHomogenization(
+        const _Mesh &mesh, const ETensor<_Mesh> &Cbase, bool orthotropicCell,
+        const std::string &manualPeriodicVerticesFile, bool centerFluctuationDisplacements,
+        bool ignorePeriodicMismatch) {
+    py::gil_scoped_release release;
+    return homogenizeCell(mesh, Cbase, orthotropicCell, manualPeriodicVerticesFile,
+                          centerFluctuationDisplacements, ignorePeriodicMismatch);
+}
+
+////////////////////////////////////////////////////////////////////////////////
+/*! Homogenize many cells concurrently (without holding the GIL).
+//  @param[in] meshes       sequence of meshes
+//  @param[in] Cbases       a single base material tensor or one per mesh
+//  @param[in] numThreads   maximum number of concurrent jobs (0: TBB default)
+//  @return    stacked homogenized tensors' D matrices (numMeshes x F x F) and,
+//             if returnFluctuations is set, the list of HomogenizationResults
+*///////////////////////////////////////////////////////////////////////////////
+template<typename _Mesh>
+py::object runHomogenizationBatch(const std::vector<const _Mesh *> &meshPtrs, const py::object &Cbases, bool orthotropicCell,
+                                  bool centerFluctuationDisplacements, bool ignorePeriodicMismatch,
+                                  bool returnFluctuations, size_t numThreads) {
+    using Real = typename _Mesh::Real;
+    using ET   = ETensor<_Mesh>;
+    using HR   = HomogenizationResult<_Mesh>;
+
+    // (Taking the meshes as a typed list lets pybind11 dispatch to the
+    // overload matching their type.)
+    const size_t numJobs = meshPtrs.size();
+    for (const _Mesh *m : meshPtrs)
+        if (m == nullptr) throw std::runtime_error("Mesh list contains None");
+
+    std::vector<ET> C;
+    if (py::isinstance<ET>(Cbases)) C.assign(numJobs, Cbases.cast<const ET &>());
+    else {
+        C = Cbases.cast<std::vector<ET>>();
+        if (C.size() != numJobs) throw std::runtime_error("Number of base tensors doesn't match the number of meshes");
+    }
+
+    std::vector<HR> results(numJobs);
+    std::vector<std::string> errors(numJobs);
+    std::vector<char> failed(numJobs, false);
+    {
+        py::gil_scoped_release release;
+        auto job = [&](size_t i) {
+            // Nested timer sections of concurrent jobs would interleave in
+            // the global benchmark timer.
+            BENCHMARK_SCOPED_SUPPRESS suppressBenchmark;
+            try {
+                results[i] = homogenizeCell(*meshPtrs[i], C[i], orthotropicCell, std::string(),
+                                            centerFluctuationDisplacements, ignorePeriodicMismatch,
+                                            returnFluctuations);
+            }
+            catch (const std::exception &e) { failed[i] = true; errors[i] = e.what(); }
+            catch (...)                     { failed[i] = true; errors[i] = "unknown error"; }
+        };
+#if MESHFEM_WITH_TBB
+        tbb::task_arena arena((numThreads > 0) ? int(numThreads) : int(tbb::task_arena::automatic));
+        arena.execute([&]() { tbb::parallel_for(size_t(0), numJobs, job); });
+#else
+        for (size_t i = 0; i < numJobs; ++i) job(i);
+#endif
+    }
+    for (size_t i = 0; i < numJobs; ++i)
+        if (failed[i]) throw std::runtime_error("Homogenization of cell " + std::to_string(i) + " failed: " + errors[i]);
+
+    constexpr size_t F = flatLen(_Mesh::EmbeddingDimension);
+    py::array_t<Real> Ch(std::vector<size_t>{numJobs, F, F});
+    auto Ch_out = Ch.template mutable_unchecked<3>();
+    for (size_t i = 0; i < numJobs; ++i) {
+        for (size_t r = 0; r < F; ++r)
+            for (size_t c = 0; c < F; ++c)
+                Ch_out(i, r, c) = results[i].Ch.D(r, c);
+    }
+
+    if (!returnFluctuations) return std::move(Ch);
+    return py::make_tuple(Ch, results);
+}
+
+// Remove rigid translation of fluctuation displacement relative to the
+// base cell (i.e. try to keep the fluctuation-displaced microstructure
+// "within" the base cell):
+// We need to ensure vertices on periodic boundary do not move off the
+// boundary. We enforce this in an average sense for each cell face by
+// translating so that the corresponding displacement component's average
+// over all vertices on the face is zero. (Note: this is different from
+// preventing the center of mass from moving.)
+// This returns the translation to subtract from displacement field w (whose
+// rows are indexed by the input node numbering).
+template<class _Mesh, class VField>
+VectorND<_Mesh::EmbeddingDimension> periodicFaceTranslation(const _Mesh &mesh, const InputNumbering &num, const VField &w) {
+    constexpr size_t N = _Mesh::EmbeddingDimension;
+    using Vec = VectorND<N>;
+    auto bbox = mesh.boundingBox();
+    Vec translation(Vec::Zero());
+    Vec numAveraged(Vec::Zero());
+
+    for (auto bn : mesh.boundaryNodes()) {
+        auto n = bn.volumeNode();
+        for (size_t d = 0; d < N; ++d) {
+            if (std::abs(n->p[d] - bbox.minCorner[d]) < 1e-9) {
+                translation[d] += w(mappedIndex(num.inputNode, n.index()), d);
+                numAveraged[d] += 1.0;
+            }
+        }
+    }
+    translation.array() /= numAveraged.array();
+    return translation;
+}
+
 template<class _Mesh, class HR, class SMValue>
 std::tuple<typename HR::VField, typename HR::SMField>
 getProbeResult(const _Mesh &mesh, const HR &homogenizationResult, const SMValue &macroStrain) {
     const HR &hr = homogenizationResult;
     const size_t numCellProblems = hr.w_ij.size();
     constexpr size_t N = SMValue::N;
-    using Vec = VectorND<N>;
 
     typename HR::VField         w = macroStrain[0] * hr.w_ij[0];
     typename HR::SMField strain_w = macroStrain[0] * hr.strain_w_ij[0];
@@ -106,43 +256,97 @@ getProbeResult(const _Mesh &mesh, const HR &homogenizationResult, const SMValue
         strain_w += shearDoubler * macroStrain[i] * hr.strain_w_ij[i];
     }
 
-    // Remove rigid translation of fluctuation displacement relative to the
-    // base cell (i.e. try to keep the fluctuation-displaced microstructure
-    // "within" the base cell):
-    // We need to ensure vertices on periodic boundary do not move off the
-    // boundary. We enforce this in an average sense for each cell face by
-    // translating so that the corresponding displacement component's average
-    // over all vertices on the face is zero. (Note: this is different from
-    // preventing the center of mass from moving.)
-    {
-        auto bbox = mesh.boundingBox();
-        Vec translation(Vec::Zero());
-        Vec numAveraged(Vec::Zero());
-
-        for (auto bn : mesh.boundaryNodes()) {
-            auto n = bn.volumeNode();
-            for (size_t d = 0; d < N; ++d) {
-                if (std::abs(n->p[d] - bbox.minCorner[d]) < 1e-9) {
-                    translation[d] += w(n.index(), d);
-                    numAveraged[d] += 1.0;
-                }
-            }
-        }
-        translation.array() /= numAveraged.array();
-        w.rowwise() -= translation.transpose();
-    }
+    const InputNumbering num = inputNumbering(mesh);
+    w.rowwise() -= periodicFaceTranslation(mesh, num, w).transpose();
 
     // Add in the linear term
     auto        u = w;
     auto strain_u = strain_w;
     for (auto n : mesh.nodes())
-        u.row(n.index()) += macroStrain.contract(n->p);
+        u.row(mappedIndex(num.inputNode, n.index())) += macroStrain.contract(n->p);
     for (size_t i = 0; i < strain_u.domainSize(); ++i)
         strain_u(i) += macroStrain;
 
     return std::make_tuple(u, strain_u);
 }
 
+////////////////////////////////////////////////////////////////////////////////
+/*! Batched version of getProbeResult: probe the homogenization result with
+//  k macroscopic strains at once. Both the fluctuation and linear terms are
+//  linear in the macro strain, so we assemble a basis holding each flattened
+//  strain component's (translation-corrected) contribution and apply it to all
+//  strains with a single matrix product.
+//  @param[in] macroStrains     k x flatLen(N) flattened macroscopic strains
+//  @return    (u, strain_u) as dense (k x numNodes x N) and
+//             (k x numElements x flatLen(N)) arrays
+*///////////////////////////////////////////////////////////////////////////////
+template<class _Mesh, class HR>
+std::tuple<py::array_t<typename HR::Real>, py::array_t<typename HR::Real>>
+getProbeResultBatch(const _Mesh &mesh, const HR &hr,
+                    const Eigen::Matrix<typename HR::Real, Eigen::Dynamic, Eigen::Dynamic> &macroStrains) {
+    using Real = typename HR::Real;
+    constexpr size_t N = _Mesh::EmbeddingDimension;
+    constexpr size_t F = flatLen(N);
+    using SMValue = SymmetricMatrixValue<Real, N>;
+    using MXd   = Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic>;
+    using RMXd  = Eigen::Matrix<Real, Eigen::Dynamic, Eigen::Dynamic, Eigen::RowMajor>;
+
+    const size_t numCellProblems = hr.w_ij.size();
+    if (numCellProblems == 0) throw std::runtime_error("Homogenization result has no fluctuation fields");
+    if (size_t(macroStrains.cols()) != F) throw std::runtime_error("macroStrains must have flatLen(N) = " + std::to_string(F) + " columns");
+    if (numCellProblems > F) throw std::runtime_error("Unexpected number of cell problems");
+
+    const size_t k          = macroStrains.rows();
+    const size_t numNodes   = hr.w_ij[0].rows();
+    const size_t numStrains = hr.strain_w_ij[0].domainSize();
+    if (numNodes != mesh.numNodes()) throw std::runtime_error("Mesh doesn't match the homogenization result");
+
+    py::array_t<Real> u(std::vector<size_t>{k, numNodes, N});
+    py::array_t<Real> strain_u(std::vector<size_t>{k, numStrains, F});
+    Real *u_data = u.mutable_data(), *strain_data = strain_u.mutable_data();
+
+    {
+        py::gil_scoped_release release;
+
+        // Column i of the displacement basis holds the contribution of flattened
+        // strain component i to u (flattened row-major as node * N + d); column i
+        // of the strain basis holds its contribution to the fluctuation strain.
+        const InputNumbering num = inputNumbering(mesh);
+        MXd uBasis(numNodes * N, F), strainBasis(numStrains * F, F);
+        uBasis.setZero();
+        strainBasis.setZero();
+        for (size_t i = 0; i < numCellProblems; ++i) {
+            const Real shearDoubler = (i < N) ? 1.0 : 2.0;
+            const auto &w = hr.w_ij[i];
+            const VectorND<N> t = periodicFaceTranslation(mesh, num, w);
+            for (size_t ni = 0; ni < numNodes; ++ni)
+                uBasis.col(i).template segment<N>(N * ni) = shearDoubler * (w.row(ni).transpose() - t);
+            strainBasis.col(i) = shearDoubler * Eigen::Map<const Eigen::Matrix<Real, Eigen::Dynamic, 1>>(hr.strain_w_ij[i].data().data(), numStrains * F);
+        }
+
+        // Linear term
+        for (size_t i = 0; i < F; ++i) {
+            SMValue e;
+            e.clear();
+            e[i] = 1.0;
+            for (auto n : mesh.nodes())
+                uBasis.col(i).template segment<N>(N * mappedIndex(num.inputNode, n.index())) += e.contract(n->p);
+        }
+
+        Eigen::Map<RMXd> U(u_data, k, numNodes * N);
+        Eigen::Map<RMXd> S(strain_data, k, numStrains * F);
+        {
+            BENCHMARK_SCOPED_TIMER_SECTION timer("Probe Batch");
+            U.noalias() = macroStrains * uBasis.transpose();
+            S.noalias() = macroStrains * strainBasis.transpose();
+            for (size_t e = 0; e < numStrains; ++e)
+                S.middleCols(F * e, F) += macroStrains;
+        }
+    }
+
+    return std::make_tuple(u, strain_u);
+}
+
 template<typename _Mesh>
 void bindHomogenization(py::module &m, py::module &detail_module) {
     using Real = typename _Mesh::Real;
@@ -154,12 +358,44 @@ void bindHomogenization(py::module &m, py::module &detail_module) {
         .def_readonly("Ch",          &HR::Ch)
         .def_readonly("w_ij",        &HR::w_ij)
         .def_readonly("strain_w_ij", &HR::strain_w_ij)
+        // State: Ch's D matrix and the raw fluctuation displacement/strain arrays.
+        .def(py::pickle([](const HR &hr) {
+                    using DType = typename ETensor<_Mesh>::DType;
+                    DType D;
+                    for (int i = 0; i < D.rows(); ++i)
+                        for (int j = 0; j < D.cols(); ++j) D(i, j) = hr.Ch.D(i, j);
+                    py::list w, strain_w;
+                    for (const auto &w_ij : hr.w_ij) w.append(w_ij);
+                    for (const auto &s_ij : hr.strain_w_ij) strain_w.append(s_ij.data());
+                    return py::make_tuple(D, w, strain_w);
+                },
+                [](const py::tuple &t) {
+                    using DType = typename ETensor<_Mesh>::DType;
+                    using SMArray = typename HR::SMField::ArrayType;
+                    if (t.size() != 3) throw std::runtime_error("Invalid state!");
+                    HR hr;
+                    const DType D = t[0].cast<DType>();
+                    for (int i = 0; i < D.rows(); ++i)
+                        for (int j = 0; j < D.cols(); ++j) hr.Ch.D(i, j) = D(i, j);
+                    for (const auto &w_ij : t[1].cast<py::list>()) hr.w_ij.push_back(w_ij.cast<typename HR::VField>());
+                    for (const auto &s_ij : t[2].cast<py::list>()) hr.strain_w_ij.emplace_back(s_ij.cast<SMArray>());
+                    return hr;
+                }))
         ;
 
     m.def("homogenize", runHomogenization<_Mesh>,
           py::arg("mesh"), py::arg("Cbase"), py::arg("orthotropicCell") = false, py::arg("manualPeriodicVerticesFile") = std::string(),
           py::arg("centerFluctuationDisplacements") = true, py::arg("ignorePeriodicMismatch") = false)
+     .def("homogenize_batch", runHomogenizationBatch<_Mesh>,
+          py::arg("meshes"), py::arg("Cbases"), py::arg("orthotropicCell") = false,
+          py::arg("centerFluctuationDisplacements") = true, py::arg("ignorePeriodicMismatch") = false,
+          py::arg("returnFluctuations") = false, py::arg("numThreads") = 0,
+          "Homogenize a list of meshes concurrently. Cbases is one base elasticity tensor or one per mesh.\n"
+          "Returns the stacked homogenized tensors' D matrices (numMeshes x F x F), or (Ch, results) if returnFluctuations is set.")
      .def("probe", getProbeResult<_Mesh, HR, SMValue>, py::arg("mesh"), py::arg("homogenizationResult"), py::arg("macroStrain"))
+     .def("probe_batch", getProbeResultBatch<_Mesh, HR>, py::arg("mesh"), py::arg("homogenizationResult"), py::arg("macroStrains"),
+          "Probe with many flattened macroscopic strains (k x flatLen array) at once.\n"
+          "Returns the displacements (k x numNodes x N) and strains (k x numElements x flatLen).")
      .def("probe", [](const _Mesh &mesh, const ETensor<_Mesh> &Cbase, const SMValue &macroStrain,
                       bool orthotropicCell, const std::string &manualPeriodicVerticesFile,
                       bool ignorePeriodicMismatch) {
@@ -195,6 +431,29 @@ PYBIND11_MODULE(periodic_homogenization, m) {
 //     addBindings<long double>(m, detail_module);
 // #endif
 
+    ////////////////////////////////////////////////////////////////////////////////
+    // Result cache
+    ////////////////////////////////////////////////////////////////////////////////
+    m.def("configure_homogenization_cache", [](py::object directory, py::object maxBytes, py::object storeFluctuations) {
+            auto &cache = HomogenizationCache::instance();
+            if (!directory.is_none())         cache.setDirectory(directory.cast<std::string>());
+            if (!maxBytes.is_none())          cache.setMaxBytes(maxBytes.cast<size_t>());
+            if (!storeFluctuations.is_none()) cache.setStoreFluctuations(storeFluctuations.cast<bool>());
+        }, py::arg("directory") = py::none(), py::arg("max_bytes") = py::none(), py::arg("store_fluctuations") = py::none(),
+        "Configure the on-disk homogenization result cache shared with the command line tools: its directory (\"\" disables it), "
+        "its size limit in bytes (0: unlimited) and whether the fluctuation displacements are stored along with Ch.");
+    m.def("clear_homogenization_cache", []() { HomogenizationCache::instance().clear(); });
+    m.def("homogenization_cache_stats", []() {
+            const auto &cache = HomogenizationCache::instance();
+            py::dict stats;
+            stats["directory"]         = cache.directory();
+            stats["maxBytes"]          = cache.maxBytes();
+            stats["storeFluctuations"] = cache.storeFluctuations();
+            stats["hits"]              = cache.hits();
+            stats["misses"]            = cache.misses();
+            return stats;
+        });
+
     ////////////////////////////////////////////////////////////////////////////////
     // Benchmarking
     ////////////////////////////////////////////////////////////////////////////////
@@ -6,6 +6,69 @@ namespace py = pybind11;
 
 #include <MeshFEM/Types.hh>
 #include <MeshFEM/SparseMatrices.hh>
+#include <MeshFEM/ShiftInvertEigensolver.hh>
+
+// Read-only NumPy array viewing `size` entries of type T starting at `data`
+// and spaced `stride` bytes apart. No data is copied: `owner` (the Python
+// object owning the memory) is kept alive for as long as the array is.
+// Note: the view is invalidated if the owner reallocates its storage (e.g.,
+// when nonzeros are added to a matrix).
+template<typename T>
+py::array readOnlyView(const T *data, size_t size, size_t stride, py::handle owner) {
+    py::array result(py::dtype::of<T>(), {size}, {stride}, data, owner);
+    py::detail::array_proxy(result.ptr())->flags &= ~py::detail::npy_api::NPY_ARRAY_WRITEABLE_;
+    return result;
+}
+
+template<typename T>
+py::array readOnlyView(const std::vector<T> &v, py::handle owner) {
+    return readOnlyView(v.data(), v.size(), sizeof(T), owner);
+}
+
+using IndexArray = py::array_t<int64_t, py::array::c_style | py::array::forcecast>;
+
+// Set the index arrays of a scipy.sparse.coo_matrix without conversion (the
+// row/col attributes became properties of a `coords` tuple in scipy 1.13).
+inline void setCOOIndices(py::object coo, py::object row, py::object col) {
+    if (py::hasattr(coo, "coords")) coo.attr("coords") = py::make_tuple(row, col);
+    else {
+        coo.attr("row") = row;
+        coo.attr("col") = col;
+    }
+}
+using ValueArray = py::array_t<double,  py::array::c_style | py::array::forcecast>;
+
+static size_t checkTripletArrays(const IndexArray &I, const IndexArray &J, const ValueArray &V) {
+    if ((I.ndim() != 1) || (J.ndim() != 1) || (V.ndim() != 1)) throw std::runtime_error("I, J, V must be 1D arrays");
+    if ((I.size() != J.size()) || (I.size() != V.size()))      throw std::runtime_error("I, J, V sizes differ");
+    return I.size();
+}
+
+// Solve H x = lambda M x for the n eigenvalues closest to sigma. M is either
+// None (identity metric), a vector of lumped masses, or a sparse matrix.
+template<class HMatrix>
+std::pair<Eigen::VectorXd, Eigen::MatrixXd>
+shiftInvertEigs(const HMatrix &H, size_t n, Real sigma, py::object M, const std::vector<size_t> &fixedVars,
+                Real tol, size_t krylovDim, size_t maxRestarts) {
+    ShiftInvertEigensolver solver(H, fixedVars);
+    using TMatrix = ShiftInvertEigensolver::TMatrix;
+    if      (M.is_none())                          solver.setIdentityMassMatrix();
+    else if (py::isinstance<TMatrix>(M))           solver.setMassMatrix(M.cast<const TMatrix &>());
+    else if (py::isinstance<SuiteSparseMatrix>(M)) solver.setMassMatrix(M.cast<const SuiteSparseMatrix &>());
+    else                                           solver.setLumpedMassMatrix(M.cast<Eigen::VectorXd>());
+
+    EigensolverOptions opts;
+    opts.tol = tol;
+    opts.krylovDim = krylovDim;
+    opts.maxRestarts = maxRestarts;
+
+    std::pair<Eigen::VectorXd, Eigen::MatrixXd> result;
+    {
+        py::gil_scoped_release release;
+        solver.compute(n, sigma, result.first, result.second, opts);
+    }
+    return result;
+}
 
 PYBIND11_MODULE(sparse_matrices, m) {
     m.doc() = "Sparse Representations and Solvers";
@@ -26,7 +89,52 @@ PYBIND11_MODULE(sparse_matrices, m) {
         .def_property_readonly("m", [](const TMatrix &A) { return A.m; })
         .def_property_readonly("n", [](const TMatrix &A) { return A.n; })
         .def("entries", [](const TMatrix &A) { return py::make_iterator(A.nz.cbegin(), A.nz.cend()); })
+        // Zero-copy views of the triplet arrays (row indices, column indices, values)
+        .def_property_readonly("I", [](py::object self) {
+                const TMatrix &A = self.cast<const TMatrix &>();
+                static_assert(sizeof(size_t) == sizeof(int64_t), "Index views assume 64-bit size_t");
+                return readOnlyView(reinterpret_cast<const int64_t *>(A.nz.empty() ? nullptr : &A.nz[0].i), A.nnz(), sizeof(Triplet<Real>), self);
+            }, "Row indices of the nonzeros (read-only view)")
+        .def_property_readonly("J", [](py::object self) {
+                const TMatrix &A = self.cast<const TMatrix &>();
+                return readOnlyView(reinterpret_cast<const int64_t *>(A.nz.empty() ? nullptr : &A.nz[0].j), A.nnz(), sizeof(Triplet<Real>), self);
+            }, "Column indices of the nonzeros (read-only view)")
+        .def_property_readonly("V", [](py::object self) {
+                const TMatrix &A = self.cast<const TMatrix &>();
+                return readOnlyView(A.nz.empty() ? nullptr : &A.nz[0].v, A.nnz(), sizeof(Triplet<Real>), self);
+            }, "Values of the nonzeros (read-only view)")
+        .def("to_scipy", [](py::object self) {
+                // scipy's constructors would narrow the int64 indices (copying
+                // them), so the views are attached to an empty matrix instead.
+                py::object result = py::module::import("scipy.sparse").attr("coo_matrix")(
+                        py::make_tuple(self.attr("m"), self.attr("n")));
+                result.attr("data") = self.attr("V");
+                setCOOIndices(result, self.attr("I"), self.attr("J"));
+                // (The empty matrix was flagged as canonical.)
+                result.attr("has_canonical_format") = false;
+                return result;
+            }, "The stored entries as a scipy.sparse.coo_matrix (for symmetric matrices, only the upper triangle is stored). No data is copied: the matrix's "
+               "row, col and data arrays are the read-only views I, J and V, which keep this matrix alive and are invalidated when nonzeros are added to it. "
+               "Repeated entries are summed by scipy upon conversion to other formats.")
         .def("addNZ", &TMatrix::addNZ, "Add a triplet to the matrix")
+        .def("addNZBatch", [](TMatrix &A, const IndexArray &I, const IndexArray &J, const ValueArray &V, bool sumRepeated) {
+                const size_t count = checkTripletArrays(I, J, V);
+                py::gil_scoped_release release;
+                A.addNZBatch(I.data(), J.data(), V.data(), count);
+                if (sumRepeated) A.sumRepeated();
+            }, py::arg("I"), py::arg("J"), py::arg("V"), py::arg("sumRepeated") = false,
+            "Add the triplets (I[k], J[k], V[k]) to the matrix (equivalent to calling addNZ on each), optionally summing repeated entries afterward")
+        .def_static("from_coo", [](const IndexArray &I, const IndexArray &J, const ValueArray &V, size_t m, size_t n, bool sumRepeated) {
+                const size_t count = checkTripletArrays(I, J, V);
+                TMatrix A(m, n);
+                {
+                    py::gil_scoped_release release;
+                    A.addNZBatch(I.data(), J.data(), V.data(), count);
+                    if (sumRepeated) A.sumRepeated();
+                }
+                return A;
+            }, py::arg("I"), py::arg("J"), py::arg("V"), py::arg("m"), py::arg("n"), py::arg("sumRepeated") = false,
+            "Construct an m x n matrix from coordinate-format arrays")
         .def("reflectUpperTriangle", &TMatrix::reflectUpperTriangle, "Replace the (strict) lower triangle with a copy of the upper triangle")
         .def("diag", &TMatrix::diag, "Get the diagonal")
 
@@ -54,6 +162,8 @@ PYBIND11_MODULE(sparse_matrices, m) {
                 Eigen::VectorXd soln;
                 sys.solve(b, soln);
                 return soln;})
+        .def("solveBlock", [](_Sys &sys, const Eigen::MatrixXd &B) { return sys.solveBlock(B); }, py::arg("B"),
+             "Solve for each column of B using a single block backsubstitution")
         ;
 
     auto ss_matrix = py::class_<SuiteSparseMatrix, std::shared_ptr<SuiteSparseMatrix>>(m, "SuiteSparseMatrix", "Sparse matrix in a Suite Sparse-compatible compressed column format")
@@ -63,6 +173,12 @@ PYBIND11_MODULE(sparse_matrices, m) {
         .def("setIdentity", &SuiteSparseMatrix::setIdentity)
         .def("trace",       &SuiteSparseMatrix::trace)
         .def("addNZ", (size_t (SuiteSparseMatrix::*)(SuiteSparse_long, SuiteSparse_long, double))(&SuiteSparseMatrix::addNZ), "Add a triplet to the matrix; entry must already exist in sparsity pattern") // py::overload_cast fails
+        .def("addNZBatch", [](SuiteSparseMatrix &smat, const IndexArray &I, const IndexArray &J, const ValueArray &V) {
+                const size_t count = checkTripletArrays(I, J, V);
+                static_assert(sizeof(SuiteSparse_long) == sizeof(int64_t), "Index arrays assume 64-bit SuiteSparse_long");
+                py::gil_scoped_release release;
+                smat.addNZBatch(reinterpret_cast<const SuiteSparse_long *>(I.data()), reinterpret_cast<const SuiteSparse_long *>(J.data()), V.data(), count);
+            }, py::arg("I"), py::arg("J"), py::arg("V"), "Accumulate V[k] to entries (I[k], J[k]), which must all exist in the sparsity pattern")
         .def("setFromTMatrix", [&](SuiteSparseMatrix &smat, TMatrix &tmat) { smat.setFromTMatrix(tmat); } /* work around pybind11 error */ )
         .def("getTripletMatrix", &SuiteSparseMatrix::getTripletMatrix)
         .def("rowColRemoval", [&](SuiteSparseMatrix &smat, const std::vector<size_t> &indices) {
@@ -70,9 +186,41 @@ PYBIND11_MODULE(sparse_matrices, m) {
                     for (size_t i : indices) shouldRemove[i] = true;
                     smat.rowColRemoval([&shouldRemove](size_t i) { return shouldRemove[i]; });
                 })
-        .def_readwrite("Ap", &SuiteSparseMatrix::Ap)
-        .def_readwrite("Ai", &SuiteSparseMatrix::Ai)
-        .def_readwrite("Ax", &SuiteSparseMatrix::Ax)
+        .def_readonly("m",  &SuiteSparseMatrix::m)
+        .def_readonly("n",  &SuiteSparseMatrix::n)
+        .def_readonly("nz", &SuiteSparseMatrix::nz)
+        // Zero-copy read-only views of the compressed column arrays; assigning
+        // replaces the array's contents.
+        .def_property("Ap", [](py::object self) { return readOnlyView(self.cast<const SuiteSparseMatrix &>().Ap, self); },
+                            [](SuiteSparseMatrix &smat, const std::vector<SuiteSparse_long> &Ap) { smat.Ap = Ap; })
+        .def_property("Ai", [](py::object self) { return readOnlyView(self.cast<const SuiteSparseMatrix &>().Ai, self); },
+                            [](SuiteSparseMatrix &smat, const std::vector<SuiteSparse_long> &Ai) { smat.Ai = Ai; })
+        .def_property("Ax", [](py::object self) { return readOnlyView(self.cast<const SuiteSparseMatrix &>().Ax, self); },
+                            [](SuiteSparseMatrix &smat, const std::vector<double> &Ax) { smat.Ax = Ax; })
+        .def("to_scipy", [](py::object self) {
+                static_assert(sizeof(SuiteSparse_long) == sizeof(int64_t), "Index arrays assume 64-bit SuiteSparse_long");
+                const SuiteSparseMatrix &smat = self.cast<const SuiteSparseMatrix &>();
+                // As for TripletMatrix.to_scipy, the views are attached to an
+                // empty matrix to keep scipy from narrowing (copying) the indices.
+                py::object result = py::module::import("scipy.sparse").attr("csc_matrix")(py::make_tuple(smat.m, smat.n));
+                result.attr("data")    = readOnlyView(smat.Ax.data(), smat.nz, sizeof(double), self);
+                result.attr("indices") = readOnlyView(reinterpret_cast<const int64_t *>(smat.Ai.data()), smat.nz, sizeof(int64_t), self);
+                result.attr("indptr")  = readOnlyView(reinterpret_cast<const int64_t *>(smat.Ap.data()), smat.Ap.size(), sizeof(int64_t), self);
+                // Strictly increasing row indices within each column also rule
+                // out duplicates; flagging them makes scipy's sort_indices and
+                // sum_duplicates no-ops (which would fail on read-only arrays).
+                bool sorted = true;
+                for (SuiteSparse_long j = 0; sorted && (j < smat.n); ++j)
+                    for (SuiteSparse_long k = smat.Ap[j] + 1; sorted && (k < smat.Ap[j + 1]); ++k)
+                        sorted = smat.Ai[k - 1] < smat.Ai[k];
+                // Otherwise, scipy needs writable arrays to sort them.
+                if (!sorted) return result.attr("copy")();
+                result.attr("has_sorted_indices")  = true;
+                result.attr("has_canonical_format") = true;
+                return result;
+            }, "The matrix as a scipy.sparse.csc_matrix (for symmetric matrices, only the upper triangle is stored). Unless the row indices of a column are "
+               "unsorted (then the arrays are copied), no data is copied: the matrix's data, indices and indptr arrays are read-only views of Ax, Ai and Ap, "
+               "which keep this matrix alive and are invalidated when it is modified.")
         .def("apply", [](const SuiteSparseMatrix &mat, const Eigen::VectorXd &vec, bool transpose) {
                     return mat.apply(vec, transpose);
                 }, py::arg("vec"), py::arg("transpose") = false)
@@ -95,4 +243,32 @@ PYBIND11_MODULE(sparse_matrices, m) {
                 return x;
             })
         ;
+
+    m.def("configure_symbolic_factorization_cache", [](py::object capacity, py::object directory) {
+            auto &cache = SymbolicFactorizationCache::instance();
+            if (!capacity.is_none())  cache.setCapacity(capacity.cast<size_t>());
+            if (!directory.is_none()) cache.setDirectory(directory.cast<std::string>());
+        }, py::arg("capacity") = py::none(), py::arg("directory") = py::none(),
+        "Configure the CHOLMOD symbolic factorization cache (disabled by default): the number of analyses kept in memory (0 disables the in-memory cache) and the directory in which fill-reducing orderings are persisted (\"\" disables persistence).");
+    m.def("clear_symbolic_factorization_cache", []() { SymbolicFactorizationCache::instance().clear(); },
+          "Free the symbolic factorizations held in memory and reset the cache statistics.");
+    m.def("symbolic_factorization_cache_stats", []() {
+            const auto &cache = SymbolicFactorizationCache::instance();
+            py::dict stats;
+            stats["size"]      = cache.size();
+            stats["capacity"]  = cache.capacity();
+            stats["directory"] = cache.directory();
+            stats["hits"]      = cache.hits();
+            stats["diskHits"]  = cache.diskHits();
+            stats["misses"]    = cache.misses();
+            return stats;
+        });
+
+    const char *eigsDoc = "Compute the n eigenpairs (lambdas, modes) of H x = lambda M x closest to sigma using a CHOLMOD factorization of H - sigma M.\n"
+                          "M is None (identity), a vector of lumped masses, or a TripletMatrix/SuiteSparseMatrix; only the upper triangles of H and M are read.\n"
+                          "The rows/columns of fixedVars are removed from the problem, and the returned modes are zero there.";
+    m.def("shift_invert_eigs", &shiftInvertEigs<ShiftInvertEigensolver::TMatrix>, py::arg("H"), py::arg("n") = 7, py::arg("sigma") = -0.001, py::arg("M") = py::none(),
+          py::arg("fixedVars") = std::vector<size_t>(), py::arg("tol") = 1e-10, py::arg("krylovDim") = 0, py::arg("maxRestarts") = 1000, eigsDoc);
+    m.def("shift_invert_eigs", &shiftInvertEigs<SuiteSparseMatrix>, py::arg("H"), py::arg("n") = 7, py::arg("sigma") = -0.001, py::arg("M") = py::none(),
+          py::arg("fixedVars") = std::vector<size_t>(), py::arg("tol") = 1e-10, py::arg("krylovDim") = 0, py::arg("maxRestarts") = 1000, eigsDoc);
 }
@@ -63,6 +63,20 @@ void bindTensors(py::module& module, py::module& detail_module) {
                 ss << _Dimension << "D elasticity tensor with orthotropic moduli: ";
                 E.printOrthotropic(ss);
                 return ss.str(); })
+        .def(py::pickle([](const ETensor &E) {
+                    typename ETensor::DType D;
+                    for (int i = 0; i < D.rows(); ++i)
+                        for (int j = 0; j < D.cols(); ++j) D(i, j) = E.D(i, j);
+                    return py::make_tuple(D);
+                },
+                [](const py::tuple &t) {
+                    if (t.size() != 1) throw std::runtime_error("Invalid state!");
+                    const auto D = t[0].cast<typename ETensor::DType>();
+                    ETensor E;
+                    for (int i = 0; i < D.rows(); ++i)
+                        for (int j = 0; j < D.cols(); ++j) E.D(i, j) = D(i, j);
+                    return E;
+                }))
         ;
 
     if (_Dimension == 3) {
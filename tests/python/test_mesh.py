@@ -0,0 +1,177 @@
+import os
+import pickle
+import tempfile
+import unittest
+import numpy as np
+import mesh
+
+def shuffledGrid(n, seed=0):
+    """Triangulated n x n grid on the unit square with shuffled vertices and
+    triangles."""
+    rng = np.random.RandomState(seed)
+    x = np.linspace(0, 1, n + 1)
+    V = np.array([[xi, yj] for xi in x for yj in x])
+    F = []
+    for i in range(n):
+        for j in range(n):
+            v00, v01 = i * (n + 1) + j, i * (n + 1) + j + 1
+            v10, v11 = v00 + n + 1, v01 + n + 1
+            F += [[v00, v10, v11], [v00, v11, v01]]
+    perm = rng.permutation(len(V))
+    Vshuffled = np.empty_like(V)
+    Vshuffled[perm] = V
+    return Vshuffled, perm[np.array(F)][rng.permutation(len(F))]
+
+class MeshReorderingTest(unittest.TestCase):
+    def setUp(self):
+        self.V, self.F = shuffledGrid(8)
+        self.m = mesh.Mesh(self.V, self.F, degree=2, ordering='hilbert')
+        self.unreordered = mesh.Mesh(self.V, self.F, degree=2)
+
+    def test_arrays_use_input_numbering(self):
+        m = self.m
+        self.assertTrue(m.isReordered())
+        self.assertTrue(np.array_equal(m.vertices(), self.V))
+        self.assertTrue(np.array_equal(m.elements(), self.F))
+        self.assertTrue(np.array_equal(m.nodes(), self.unreordered.nodes()))
+        self.assertTrue(np.array_equal(m.nodes()[:m.numVertices()], self.V))
+        for name in ['boundaryVertices', 'boundaryElements', 'elementsAdjacentBoundary']:
+            a, b = getattr(m, name)(), getattr(self.unreordered, name)()
+            self.assertEqual(sorted(map(str, a.tolist())), sorted(map(str, b.tolist())), name)
+
+        # Boundary arrays index the same vertices/elements.
+        bv = m.boundaryVertices()
+        self.assertTrue(np.all(np.any((self.V[bv] < 1e-12) | (self.V[bv] > 1 - 1e-12), axis=1)))
+        for be, e in zip(m.boundaryElements(), m.elementsAdjacentBoundary()):
+            self.assertTrue(set(be) <= set(self.F[e]))
+
+        # The internal numbering is exposed by the original*Indices arrays.
+        ov, oe = m.originalVertexIndices(), m.originalElementIndices()
+        self.assertTrue(np.array_equal(np.sort(ov), np.arange(m.numVertices())))
+        self.assertTrue(np.array_equal(np.sort(oe), np.arange(m.numElements())))
+
+        m.setVertices(self.V + 1.0)
+        self.assertTrue(np.array_equal(m.vertices(), self.V + 1.0))
+        m.setVertices(self.unreordered.nodes() * 2.0)
+        self.assertTrue(np.array_equal(m.nodes(), self.unreordered.nodes() * 2.0))
+
+    def test_adjacency_uses_input_numbering(self):
+        m, F = self.m, self.F
+        indptr, indices = m.vertexElementAdjacency()
+        for v in range(m.numVertices()):
+            self.assertTrue(np.array_equal(indices[indptr[v]:indptr[v + 1]], np.flatnonzero(np.any(F == v, axis=1))))
+        indptr, indices = m.vertexVertexAdjacency()
+        for v in range(m.numVertices()):
+            expected = np.setdiff1d(np.unique(F[np.any(F == v, axis=1)]), [v])
+            self.assertTrue(np.array_equal(indices[indptr[v]:indptr[v + 1]], expected))
+        indptr, indices = m.elementElementAdjacency()
+        for e in range(m.numElements()):
+            for f in indices[indptr[e]:indptr[e + 1]]:
+                self.assertEqual(len(set(F[e]) & set(F[f])), 2)
+        for t in range(m.numElements()):
+            self.assertEqual(sorted(m.trisAdjTri(t)), sorted(self.unreordered.trisAdjTri(t)))
+        for v in range(m.numVertices()):
+            self.assertEqual(sorted(m.vtsAdjVtx(v)), sorted(self.unreordered.vtsAdjVtx(v)))
+        self.assertTrue(np.array_equal(m.valences(), self.unreordered.valences()))
+
+    def test_save_uses_input_numbering(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'reordered.msh')
+            self.m.save(path)
+            loaded = mesh.Mesh(path, embeddingDimension=2)
+        self.assertTrue(np.array_equal(loaded.elements(), self.F))
+        self.assertTrue(np.allclose(loaded.vertices(), self.V, atol=1e-12))
+
+    def test_field_writer_uses_input_numbering(self):
+        contents = []
+        with tempfile.TemporaryDirectory() as d:
+            for i, m in enumerate([self.m, self.unreordered]):
+                path = os.path.join(d, '{}.msh'.format(i))
+                writer = m.field_writer(path)
+                writer.addField('x', self.unreordered.nodes()[:, 0], mesh.MSHFieldWriter.DomainType.PER_NODE)
+                writer.addField('e', np.arange(m.numElements(), dtype=float), mesh.MSHFieldWriter.DomainType.PER_ELEMENT)
+                del writer
+                with open(path, 'rb') as f: contents.append(f.read())
+        self.assertEqual(contents[0], contents[1])
+
+    def test_differential_operators_use_input_numbering(self):
+        import differential_operators
+        for forceP1 in [False, True]:
+            L, L0 = (differential_operators.laplacian(m, forceP1=forceP1).to_scipy() for m in [self.m, self.unreordered])
+            self.assertAlmostEqual(abs(L - L0).max(), 0.0, places=12)
+            U, U0 = (differential_operators.laplacian(m, forceP1=forceP1, upperTriOnly=True).to_scipy() for m in [self.m, self.unreordered])
+            self.assertAlmostEqual(abs(U - U0).max(), 0.0, places=12)
+        # (The quadratic lumped mass matrix vanishes at the vertices.)
+        B, B0 = (differential_operators.bilaplacian(m, forceP1=True) for m in [self.m, self.unreordered])
+        self.assertAlmostEqual(abs(B - B0).max(), 0.0, places=9)
+
+class MeshArrayCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.V, self.F = shuffledGrid(4)
+        self.m = mesh.Mesh(self.V, self.F, degree=2)
+
+    def test_arrays_are_cached_and_read_only(self):
+        m = self.m
+        for name in ['vertices', 'nodes', 'elements', 'boundaryElements', 'boundaryVertices']:
+            a = getattr(m, name)()
+            self.assertIs(getattr(m, name)(), a)
+            self.assertFalse(a.flags.writeable)
+            with self.assertRaises(ValueError): a[0] = 0
+        geom = m.visualizationGeometry()
+        self.assertIs(m.visualizationGeometry(), geom)
+        self.assertTrue(all(not a.flags.writeable for a in geom))
+
+    def test_set_vertices_invalidates_geometry(self):
+        m = self.m
+        V, N, geom, E = m.vertices(), m.nodes(), m.visualizationGeometry(), m.elements()
+        Vnew = 2.0 * V + 1.0
+        m.setVertices(Vnew)
+
+        self.assertTrue(np.array_equal(m.vertices(), Vnew))
+        self.assertTrue(np.allclose(m.nodes(), 2.0 * N + 1.0))
+        self.assertTrue(np.allclose(m.visualizationGeometry()[0][:, :2], 2.0 * geom[0][:, :2] + 1.0))
+        # Earlier arrays are left untouched.
+        self.assertTrue(np.array_equal(V, self.V))
+        self.assertTrue(np.array_equal(m.nodes()[:m.numVertices()], m.vertices()))
+        # Connectivity does not depend on the geometry.
+        self.assertIs(m.elements(), E)
+
+        # Each update is picked up, including one passing all nodes.
+        Nnew = m.nodes() - 1.0
+        m.setVertices(Nnew)
+        self.assertTrue(np.allclose(m.nodes(), Nnew))
+        self.assertTrue(np.allclose(m.vertices(), 2.0 * V))
+
+class MeshPickleTest(unittest.TestCase):
+    def setUp(self):
+        self.V, self.F = shuffledGrid(6)
+
+    def assertSameMesh(self, a, b):
+        self.assertEqual(a.isReordered(), b.isReordered())
+        for name in ['vertices', 'nodes', 'elements', 'originalVertexIndices', 'originalElementIndices']:
+            self.assertTrue(np.array_equal(getattr(a, name)(), getattr(b, name)()), name)
+
+    def test_round_trip(self):
+        for degree in [1, 2]:
+            for ordering in ['none', 'hilbert']:
+                m = mesh.Mesh(self.V, self.F, degree=degree, ordering=ordering)
+                self.assertSameMesh(pickle.loads(pickle.dumps(m)), m)
+                # Only the edge nodes are stored besides the vertices.
+                state = m.__getstate__()
+                self.assertEqual(len(state[0]), m.numVertices())
+                self.assertEqual(len(state[4]), m.numNodes() - m.numVertices())
+                m.setVertices(m.vertices() ** 2)
+                self.assertSameMesh(pickle.loads(pickle.dumps(m)), m)
+
+    def test_size_mismatch(self):
+        m = mesh.Mesh(self.V, self.F, degree=2, ordering='hilbert')
+        state = m.__getstate__()
+        # Dropping a single permutation array, or some of the edge nodes.
+        for i, truncate in [(2, 0), (3, 0), (4, -1)]:
+            bad = list(state)
+            bad[i] = bad[i][:truncate]
+            restored = type(m).__new__(type(m))
+            with self.assertRaises(RuntimeError): restored.__setstate__(tuple(bad))
+
+if __name__ == '__main__':
+    unittest.main()
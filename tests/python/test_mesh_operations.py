@@ -0,0 +1,81 @@
+import unittest
+import numpy as np
+from mesh_operations import VertexMerger, mergedMesh, mergedVertexIndices, _uniqueRows
+
+def addBasedMerge(meshes, tolerance = None):
+    '''Reference: merge the meshes' vertices by calling `add` on each
+    triangle corner in turn (the original mergedMesh implementation).'''
+    vm = VertexMerger(tolerance=tolerance)
+    tris = [np.array([[vm.add(V[i]) for i in tri] for tri in F], dtype=np.int64).reshape(-1, 3) for V, F in meshes]
+    return vm.vertices(), np.vstack(tris)
+
+def randomSoup(rng, numTris, numPoints, jitter = 0.0):
+    '''Triangle soup whose corners are drawn (with repetition) from numPoints
+    points, each copy displaced by up to jitter.'''
+    P = rng.randint(0, 20, (numPoints, 3)).astype(np.float64) * 0.5
+    F = rng.randint(0, numPoints, (numTris, 3))
+    V = P[F.ravel()] + rng.uniform(-jitter, jitter, (3 * numTris, 3))
+    return V, np.arange(3 * numTris).reshape(-1, 3)
+
+class MergedMeshTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.meshes = [randomSoup(rng, 40, 30), randomSoup(rng, 25, 30)]
+        # Add a dangling vertex to the second mesh.
+        V, F = self.meshes[1]
+        self.meshes[1] = (np.vstack([V, [[100.0, 0, 0]]]), F)
+        self.jittered = [randomSoup(rng, 40, 30, jitter=1e-4)]
+
+    def test_matches_add_based_merge(self):
+        V, F = mergedMesh(self.meshes)
+        Vref, Fref = addBasedMerge(self.meshes)
+        self.assertTrue(np.array_equal(V, Vref))
+        self.assertTrue(np.array_equal(F, Fref))
+        # First-appearance numbering: each triangle corner either reuses a
+        # vertex or introduces the next one.
+        self.assertTrue(np.all(np.maximum.accumulate(F.ravel()) <= np.arange(F.size)))
+
+    def test_tolerance(self):
+        V, F = mergedMesh(self.jittered, tolerance=0.01)
+        Vref, Fref = addBasedMerge(self.jittered, tolerance=0.01)
+        self.assertTrue(np.array_equal(V, Vref))
+        self.assertTrue(np.array_equal(F, Fref))
+        self.assertLess(len(V), len(mergedMesh(self.jittered)[0]))
+
+    def test_keep_dangling_vertices(self):
+        V, F = mergedMesh(self.meshes, removeDanglingVertices=False)
+        Vall = np.vstack([M[0] for M in self.meshes])
+        self.assertEqual(len(V), len(np.unique(Vall, axis=0)))
+        self.assertIn([100.0, 0, 0], V.tolist())
+        Fref = np.vstack([M[1] + sum(len(N[0]) for N in self.meshes[:k]) for k, M in enumerate(self.meshes)])
+        self.assertTrue(np.array_equal(V[F], Vall[Fref]))
+
+    def test_empty_input(self):
+        first, inverse = _uniqueRows(np.empty((0, 3)))
+        self.assertEqual(len(first), 0)
+        self.assertEqual(len(inverse), 0)
+        idx, first = mergedVertexIndices(np.empty((0, 3)), tolerance=0.1)
+        self.assertEqual(len(idx), 0)
+        V, F = mergedMesh([(np.zeros((2, 3)), np.empty((0, 3), dtype=int))])
+        self.assertEqual(V.shape, (0, 3))
+        self.assertEqual(F.shape, (0, 3))
+
+class VertexMergerTest(unittest.TestCase):
+    def test_add_points_matches_add(self):
+        rng = np.random.RandomState(1)
+        for tolerance in [None, 0.01]:
+            batches = [randomSoup(rng, 10, 8, jitter=1e-4 if tolerance else 0.0)[0] for _ in range(3)] + [np.empty((0, 3))]
+            vm, ref = VertexMerger(tolerance=tolerance), VertexMerger(tolerance=tolerance)
+            for P in batches:
+                idx = vm.addPoints(P)
+                self.assertTrue(np.array_equal(idx, [ref.add(p) for p in P]))
+            self.assertEqual(vm.numVertices(), ref.numVertices())
+            self.assertTrue(np.array_equal(vm.vertices(), ref.vertices()))
+
+    def test_empty(self):
+        vm = VertexMerger()
+        self.assertEqual(len(vm.addPoints(np.empty((0, 3)))), 0)
+        self.assertEqual(vm.vertices().shape, (0, 3))
+
+if __name__ == '__main__':
+    unittest.main()
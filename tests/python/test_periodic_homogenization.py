@@ -0,0 +1,130 @@
+import contextlib
+import io
+import tempfile
+import threading
+import unittest
+import numpy as np
+import mesh
+import tensors
+import periodic_homogenization
+
+def periodicGrid(n, perturbation):
+    """Triangulated n x n grid on the unit square with its interior vertices
+    displaced (keeping the periodic boundary vertices matched)."""
+    x = np.linspace(0, 1, n + 1)
+    V = np.array([[xi, yj] for xi in x for yj in x])
+    interior = np.all((V > 1e-8) & (V < 1 - 1e-8), axis=1)
+    V[interior] += perturbation * np.sin(7 * V[interior][:, ::-1])
+    F = []
+    for i in range(n):
+        for j in range(n):
+            v00, v01 = i * (n + 1) + j, i * (n + 1) + j + 1
+            v10, v11 = v00 + n + 1, v01 + n + 1
+            F += [[v00, v10, v11], [v00, v11, v01]]
+    return V, np.array(F)
+
+def benchmarkReport():
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        periodic_homogenization.benchmark_report()
+    return out.getvalue()
+
+class HomogenizeBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.C = tensors.ElasticityTensor2D(1.0, 0.3)
+        self.meshes = [mesh.Mesh(*periodicGrid(6, p)) for p in [0.0, 0.02, 0.04]]
+
+    def test_batch_matches_individual_homogenization(self):
+        Ch = periodic_homogenization.homogenize_batch(self.meshes, self.C, numThreads=2)
+        self.assertEqual(Ch.shape, (len(self.meshes), 3, 3))
+        for k, m in enumerate(self.meshes):
+            ref = periodic_homogenization.homogenize(m, self.C).Ch.D
+            self.assertTrue(np.allclose(Ch[k], ref, rtol=1e-10, atol=1e-12))
+
+    def test_benchmark_suppressed_only_in_batch_jobs(self):
+        periodic_homogenization.benchmark_reset()
+        periodic_homogenization.homogenize_batch(self.meshes, self.C)
+        self.assertNotIn('Cell Problems', benchmarkReport())
+
+        # Calls from any other thread are recorded.
+        periodic_homogenization.benchmark_reset()
+        worker = threading.Thread(target=periodic_homogenization.homogenize, args=(self.meshes[0], self.C))
+        worker.start()
+        worker.join()
+        report = benchmarkReport()
+        if report: # (empty if benchmarking is disabled)
+            self.assertIn('Cell Problems', report)
+        periodic_homogenization.benchmark_reset()
+
+class ProbeBatchTest(unittest.TestCase):
+    def test_probe_batch_matches_probe(self):
+        m = mesh.Mesh(*periodicGrid(6, 0.03))
+        hr = periodic_homogenization.homogenize(m, tensors.ElasticityTensor2D(1.0, 0.3))
+        macroStrains = np.random.RandomState(0).uniform(-1, 1, (4, 3))
+
+        u, strain_u = periodic_homogenization.probe_batch(m, hr, macroStrains)
+        self.assertEqual(u.shape, (len(macroStrains), m.numNodes(), 2))
+        self.assertEqual(strain_u.shape, (len(macroStrains), m.numElements(), 3))
+        for k, e in enumerate(macroStrains):
+            u_k, strain_k = periodic_homogenization.probe(m, hr, tensors.SymmetricMatrix(e))
+            self.assertTrue(np.allclose(u[k], u_k, rtol=1e-12, atol=1e-12))
+            for ei in range(m.numElements()):
+                batchStrain = tensors.SymmetricMatrix(strain_u[k, ei]).toMatrix
+                self.assertTrue(np.allclose(batchStrain, strain_k(ei).toMatrix, rtol=1e-12, atol=1e-12))
+
+    def test_reordered_mesh_uses_input_numbering(self):
+        V, F = periodicGrid(6, 0.03)
+        F = F[np.random.RandomState(1).permutation(len(F))]
+        C = tensors.ElasticityTensor2D(1.0, 0.3)
+        meshes = [mesh.Mesh(V, F, degree=2, ordering=o) for o in ['none', 'hilbert']]
+        self.assertTrue(meshes[1].isReordered())
+        hr, hr0 = (periodic_homogenization.homogenize(m, C) for m in reversed(meshes))
+        for w, w0 in zip(hr.w_ij, hr0.w_ij):
+            self.assertTrue(np.allclose(w, w0, rtol=1e-8, atol=1e-10))
+
+        macroStrains = np.random.RandomState(0).uniform(-1, 1, (2, 3))
+        u, strain_u = periodic_homogenization.probe_batch(meshes[1], hr, macroStrains)
+        u0, strain_u0 = periodic_homogenization.probe_batch(meshes[0], hr0, macroStrains)
+        self.assertTrue(np.allclose(u, u0, rtol=1e-8, atol=1e-10))
+        self.assertTrue(np.allclose(strain_u, strain_u0, rtol=1e-8, atol=1e-10))
+        u_k, strain_k = periodic_homogenization.probe(meshes[1], hr, tensors.SymmetricMatrix(macroStrains[0]))
+        self.assertTrue(np.allclose(u_k, u0[0], rtol=1e-8, atol=1e-10))
+
+class HomogenizationCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cacheDir = tempfile.TemporaryDirectory()
+        periodic_homogenization.configure_homogenization_cache(directory=self.cacheDir.name, max_bytes=0, store_fluctuations=True)
+        self.mesh = mesh.Mesh(*periodicGrid(6, 0.03))
+        self.C = tensors.ElasticityTensor2D(1.0, 0.3)
+
+    def tearDown(self):
+        periodic_homogenization.configure_homogenization_cache(directory='', store_fluctuations=False)
+        self.cacheDir.cleanup()
+
+    def stats(self):
+        s = periodic_homogenization.homogenization_cache_stats()
+        return s['hits'], s['misses']
+
+    def test_cache_hit_matches_recompute(self):
+        hits, misses = self.stats()
+        first = periodic_homogenization.homogenize(self.mesh, self.C)
+        self.assertEqual(self.stats(), (hits, misses + 1))
+        cached = periodic_homogenization.homogenize(self.mesh, self.C)
+        self.assertEqual(self.stats(), (hits + 1, misses + 1))
+
+        # A different material is a different entry.
+        periodic_homogenization.homogenize(self.mesh, tensors.ElasticityTensor2D(2.0, 0.3))
+        self.assertEqual(self.stats(), (hits + 1, misses + 2))
+
+        periodic_homogenization.configure_homogenization_cache(directory='')
+        recomputed = periodic_homogenization.homogenize(self.mesh, self.C)
+        self.assertEqual(self.stats(), (hits + 1, misses + 2))
+
+        for hr in [first, cached]:
+            self.assertTrue(np.allclose(hr.Ch.D, recomputed.Ch.D, rtol=1e-12, atol=1e-14))
+            self.assertEqual(len(hr.w_ij), len(recomputed.w_ij))
+            for w, w_ref in zip(hr.w_ij, recomputed.w_ij):
+                self.assertTrue(np.allclose(w, w_ref, rtol=1e-12, atol=1e-14))
+
+if __name__ == '__main__':
+    unittest.main()
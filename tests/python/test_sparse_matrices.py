@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+import sparse_matrices
+
+class ToScipyTest(unittest.TestCase):
+    def tripletMatrix(self):
+        # Unsorted, with a repeated entry
+        I = np.array([3, 0, 1, 3, 2])
+        J = np.array([1, 0, 2, 1, 2])
+        V = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+        return sparse_matrices.TripletMatrix.from_coo(I, J, V, 4, 3), (I, J, V)
+
+    def test_triplet_round_trip(self):
+        A, (I, J, V) = self.tripletMatrix()
+        S = A.to_scipy()
+        self.assertEqual(S.shape, (4, 3))
+        dense = np.zeros((4, 3))
+        np.add.at(dense, (I, J), V)
+        self.assertTrue(np.array_equal(S.toarray(), dense))
+
+        # The arrays are views of the matrix's, which they keep alive.
+        for a in [S.row, S.col, S.data]:
+            self.assertTrue(np.may_share_memory(a, A.V))
+            self.assertFalse(a.flags.writeable)
+        nnz = A.nnz
+        del A
+        self.assertEqual(S.nnz, nnz)
+        self.assertTrue(np.array_equal(S.toarray(), dense))
+        A, _ = self.tripletMatrix()
+
+        # scipy's duplicate summing and sorting work on the read-only views.
+        S.sum_duplicates()
+        self.assertEqual(S.nnz, 4)
+        self.assertTrue(np.array_equal(S.toarray(), dense))
+        C = S.tocsc()
+        C.sort_indices()
+        self.assertTrue(np.array_equal(C.toarray(), dense))
+
+        # The matrix itself is unchanged.
+        self.assertEqual(A.nnz, len(V))
+        self.assertTrue(np.array_equal(A.V, V))
+
+    def test_suitesparse_round_trip(self):
+        A, _ = self.tripletMatrix()
+        A.sumRepeated()
+        ref = A.to_scipy().toarray()
+        B = sparse_matrices.SuiteSparseMatrix(A)
+        S = B.to_scipy()
+        self.assertEqual(S.shape, (4, 3))
+        self.assertTrue(np.array_equal(S.toarray(), ref))
+        self.assertTrue(S.has_sorted_indices)
+        self.assertTrue(S.has_canonical_format)
+        for a, b in [(S.data, B.Ax), (S.indices, B.Ai), (S.indptr, B.Ap)]:
+            self.assertTrue(np.array_equal(a, b))
+            self.assertFalse(a.flags.writeable)
+        self.assertTrue(np.shares_memory(S.indices, B.Ai))
+        del B
+        self.assertTrue(np.array_equal(S.toarray(), ref))
+        S.sum_duplicates()
+        S.sort_indices()
+        self.assertTrue(S.has_sorted_indices)
+        self.assertTrue(np.array_equal(S.toarray(), ref))
+
+if __name__ == '__main__':
+    unittest.main()
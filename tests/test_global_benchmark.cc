@@ -0,0 +1,57 @@
+#include <MeshFEM/GlobalBenchmark.hh>
+#include <MeshFEM/Parallelism.hh>
+#include <iostream>
+#include <sstream>
+#include <thread>
+// WARNING: catch2/catch.hpp sets a BENCHMARK macro, so we must include it
+// after MeshFEM.
+#include <catch2/catch.hpp>
+
+static std::string benchmarkReport() {
+    std::ostringstream ss;
+    std::streambuf *orig = std::cout.rdbuf(ss.rdbuf());
+    BENCHMARK_REPORT();
+    std::cout.rdbuf(orig);
+    return ss.str();
+}
+
+TEST_CASE("benchmark calls are suppressed only in batch jobs", "[benchmark]") {
+    BENCHMARK_RESET();
+    BENCHMARK_CLEAR_MESSAGES();
+
+    // Calls from threads other than the one that loaded the library are
+    // recorded.
+    std::thread worker([]() {
+        BENCHMARK_SCOPED_TIMER_SECTION timer("Worker Thread Section");
+        BENCHMARK_ADD_MESSAGE("worker thread message");
+    });
+    worker.join();
+
+    // Calls from concurrently running batch jobs are not.
+    auto job = [](size_t /* i */) {
+        BENCHMARK_SCOPED_SUPPRESS suppressBenchmark;
+        BENCHMARK_SCOPED_TIMER_SECTION timer("Batch Job Section");
+        BENCHMARK_ADD_MESSAGE("batch job message");
+    };
+#if MESHFEM_WITH_TBB
+    tbb::parallel_for(size_t(0), size_t(16), job);
+#else
+    for (size_t i = 0; i < 16; ++i) job(i);
+#endif
+
+    // Suppression ends with the job.
+    { BENCHMARK_SCOPED_TIMER_SECTION timer("After Batch Section"); }
+
+    // (The report is empty if benchmarking is disabled.)
+    const std::string report = benchmarkReport();
+    if (!report.empty()) {
+        REQUIRE(report.find("Worker Thread Section") != std::string::npos);
+        REQUIRE(report.find("worker thread message") != std::string::npos);
+        REQUIRE(report.find("After Batch Section")   != std::string::npos);
+    }
+    REQUIRE(report.find("Batch Job Section") == std::string::npos);
+    REQUIRE(report.find("batch job message") == std::string::npos);
+
+    BENCHMARK_RESET();
+    BENCHMARK_CLEAR_MESSAGES();
+}
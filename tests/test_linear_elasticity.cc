@@ -0,0 +1,157 @@
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/LinearElasticity.hh>
+#include <MeshFEM/BoundaryConditions.hh>
+#include <catch2/catch.hpp>
+////////////////////////////////////////////////////////////////////////////////
+
+// Triangulated n x n grid on the unit square.
+static void elasticityTestGrid(size_t n, std::vector<MeshIO::IOVertex> &V, std::vector<MeshIO::IOElement> &E) {
+    V.clear(), E.clear();
+    for (size_t i = 0; i <= n; ++i)
+        for (size_t j = 0; j <= n; ++j)
+            V.emplace_back(Real(i) / n, Real(j) / n);
+    for (size_t i = 0; i < n; ++i) {
+        for (size_t j = 0; j < n; ++j) {
+            const size_t v00 = i * (n + 1) + j,       v01 = i * (n + 1) + j + 1,
+                         v10 = (i + 1) * (n + 1) + j, v11 = (i + 1) * (n + 1) + j + 1;
+            E.emplace_back(v00, v10, v11);
+            E.emplace_back(v00, v11, v01);
+        }
+    }
+}
+
+using Mesh2D = LinearElasticity::Mesh<2, 2>;
+using Sim2D  = LinearElasticity::Simulator<Mesh2D>;
+
+// Clamp the left side of the unit square and stretch the right side.
+static void applyStretchConditions(Sim2D &sim) {
+    using V2 = VectorND<2>;
+    std::vector<CondPtr<2>> conds;
+    conds.push_back(std::make_shared<DirichletCondition<2>>(
+            std::make_shared<BBox<V2>>(V2(-0.1, -0.1), V2(0.01, 1.1)), V2::Zero(), ComponentMask("xy")));
+    conds.push_back(std::make_shared<DirichletCondition<2>>(
+            std::make_shared<BBox<V2>>(V2(0.99, -0.1), V2(1.1, 1.1)), V2(0.05, 0.0), ComponentMask("x")));
+    sim.applyBoundaryConditions(conds);
+}
+
+// Assign a different isotropic material to each element.
+static void setVaryingMaterials(Sim2D &sim, Real scale) {
+    for (auto e : sim.mesh().elements())
+        e->configure(LinearElasticity::ETensorStoreGetter<2>(ElasticityTensor<Real, 2>(1.0 + scale * (e.index() % 5), 0.3)));
+}
+
+static Real maxAbsDifference(const SuiteSparseMatrix &A, const TripletMatrix<> &B) {
+    TripletMatrix<> diff = A.getTripletMatrix();
+    for (const auto &t : B.nz) diff.nz.emplace_back(t.i, t.j, -t.v);
+    diff.sumRepeated();
+    Real result = 0;
+    for (const auto &t : diff.nz) result = std::max(result, std::abs(t.v));
+    return result;
+}
+
+TEST_CASE("stiffness reassembly into cached pattern", "[linear_elasticity]") {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    elasticityTestGrid(6, V, E);
+
+    Sim2D cached(E, V), fresh(E, V);
+    cached.setCacheStiffnessPattern(true);
+    for (Sim2D *sim : { &cached, &fresh }) {
+        setVaryingMaterials(*sim, 1.0);
+        applyStretchConditions(*sim);
+    }
+
+    Sim2D::VField f(cached.numDoFs());
+    f.clear();
+
+    auto compare = [&]() {
+        SuiteSparseMatrix K;
+        cached.assembleStiffnessMatrix(K);
+        TripletMatrix<> Kfresh;
+        fresh.m_assembleStiffnessMatrix(Kfresh);
+        REQUIRE(maxAbsDifference(K, Kfresh) < 1e-12);
+
+        auto uc = cached.solve(f), uf = fresh.solve(f);
+        Real diff = 0;
+        for (size_t i = 0; i < uc.domainSize(); ++i) diff = std::max(diff, (uc(i) - uf(i)).norm());
+        REQUIRE(diff < 1e-12);
+    };
+    compare();
+
+    // Change the stiffness values (material and geometry) but not the
+    // sparsity pattern; the cached simulator only refactors numerically.
+    std::vector<MeshIO::IOVertex> Vperturbed(V);
+    for (size_t i = 0; i < V.size(); ++i)
+        Vperturbed[i][1] += 0.02 * std::sin(7.0 * V[i][0]) * V[i][1];
+    for (Sim2D *sim : { &cached, &fresh }) {
+        setVaryingMaterials(*sim, 3.0);
+        sim->updateMeshNodePositions(Vperturbed);
+    }
+    compare();
+}
+
+TEST_CASE("chunked stiffness assembly matches unchunked assembly", "[linear_elasticity]") {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    elasticityTestGrid(8, V, E);
+    Sim2D sim(E, V);
+    setVaryingMaterials(sim, 1.0);
+
+    TripletMatrix<> Kfull, Kchunked, Krepeat;
+    sim.setAssemblyMemoryBudget(size_t(1) << 30);
+    sim.m_assembleStiffnessMatrix(Kfull);
+
+    // Room for only a few elements' triplets per chunk.
+    sim.setAssemblyMemoryBudget(100 * sizeof(TripletMatrix<>::Triplet));
+    sim.m_assembleStiffnessMatrix(Kchunked);
+    sim.m_assembleStiffnessMatrix(Krepeat);
+
+    REQUIRE(tripletsSortedAndUnique(Kchunked));
+    REQUIRE(maxAbsDifference(SuiteSparseMatrix(Kfull), Kchunked) < 1e-12);
+
+    // Repeated entries are summed in a fixed order.
+    REQUIRE(Kchunked.nnz() == Krepeat.nnz());
+    for (size_t k = 0; k < Kchunked.nnz(); ++k) {
+        REQUIRE(Kchunked.nz[k].i == Krepeat.nz[k].i);
+        REQUIRE(Kchunked.nz[k].j == Krepeat.nz[k].j);
+        REQUIRE(Kchunked.nz[k].v == Krepeat.nz[k].v);
+    }
+}
+
+TEST_CASE("matrix-free PCG simulator matches direct solve", "[linear_elasticity]") {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    elasticityTestGrid(6, V, E);
+
+    Sim2D direct(E, V), pcg(E, V);
+    PCGOptions opts;
+    opts.tolerance = 1e-13;
+    pcg.setPCGOptions(opts);
+    pcg.setSolverBackend(Sim2D::SolverBackend::MATRIX_FREE_PCG);
+    for (Sim2D *sim : { &direct, &pcg }) {
+        setVaryingMaterials(*sim, 1.0);
+        applyStretchConditions(*sim);
+    }
+
+    std::vector<Sim2D::VField> loads;
+    for (size_t k = 0; k < 3; ++k) {
+        Sim2D::VField f(direct.numDoFs());
+        for (size_t i = 0; i < f.domainSize(); ++i) f(i) = VectorND<2>(std::sin(1.0 + i + k), std::cos(2.0 * i - k));
+        loads.push_back(f);
+    }
+
+    auto maxDiff = [](const Sim2D::VField &a, const Sim2D::VField &b) {
+        Real diff = 0;
+        for (size_t i = 0; i < a.domainSize(); ++i) diff = std::max(diff, (a(i) - b(i)).norm());
+        return diff;
+    };
+
+    auto uDirect = direct.solve(loads[0]);
+    REQUIRE(maxDiff(pcg.solve(loads[0]), uDirect) < 1e-8);
+
+    // Multiple loads are solved concurrently.
+    auto uPCG = pcg.solve(loads);
+    REQUIRE(uPCG.size() == loads.size());
+    for (size_t k = 0; k < loads.size(); ++k)
+        REQUIRE(maxDiff(uPCG[k], direct.solve(loads[k])) < 1e-8);
+}
@@ -0,0 +1,85 @@
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/filters/merge_duplicate_vertices.hh>
+#include <catch2/catch.hpp>
+#include <random>
+////////////////////////////////////////////////////////////////////////////////
+
+// Serial version of the greedy merge: only the kept points are inserted into
+// the grid, and each point is matched with getClosestPoint.
+size_t serialRenumbering(const std::vector<Point3D> &points, Real threshold,
+                         std::vector<size_t> &renumber) {
+    CollisionGrid<Real, Point3D> cgrid(std::max<Real>(threshold, 1e-3));
+    std::vector<size_t> keptIdx;
+    renumber.assign(points.size(), 0);
+    for (size_t i = 0; i < points.size(); ++i) {
+        auto cp = cgrid.getClosestPoint(points[i], threshold);
+        if (cp.first >= 0) { renumber[i] = renumber[keptIdx[cp.first]]; continue; }
+        renumber[i] = keptIdx.size();
+        cgrid.addPoint(points[i], keptIdx.size());
+        keptIdx.push_back(i);
+    }
+    return keptIdx.size();
+}
+
+// Jittered copies of points on an n^3 lattice with spacing 0.1, some of them
+// landing within the threshold of more than one kept point.
+std::vector<Point3D> jitteredLatticePoints(size_t numPoints, int n) {
+    std::mt19937 gen(0);
+    std::uniform_real_distribution<Real> jitter(-0.04, 0.04);
+    std::uniform_int_distribution<int> coord(0, n - 1);
+    std::vector<Point3D> points;
+    for (size_t i = 0; i < numPoints; ++i)
+        points.emplace_back(0.1 * coord(gen) + jitter(gen), 0.1 * coord(gen) + jitter(gen), 0.1 * coord(gen) + jitter(gen));
+    return points;
+}
+
+TEST_CASE("merge_duplicate_vertices", "[merge]") {
+    auto compare = [](const std::vector<Point3D> &points, Real threshold) {
+        std::vector<size_t> renumber, refRenumber;
+        size_t n    = merge_duplicate_vertices_renumbering(points, threshold, renumber);
+        size_t nRef = serialRenumbering(points, threshold, refRenumber);
+        REQUIRE(n == nRef);
+        REQUIRE(renumber == refRenumber);
+    };
+
+    SECTION("dense clusters") {
+        auto points = jitteredLatticePoints(2000, 5);
+        for (Real threshold : {0.0, 0.01, 0.05, 0.2})
+            compare(points, threshold);
+    }
+
+    SECTION("several sweep blocks") {
+        auto points = jitteredLatticePoints(150000, 30);
+        for (Real threshold : {0.0, 0.03, 0.1})
+            compare(points, threshold);
+    }
+
+    SECTION("equidistant kept points") {
+        // The last match in getClosestPoint's visiting order wins: the later
+        // cell in lexicographic order, then the later point within a cell.
+        std::vector<size_t> renumber;
+        std::vector<Point3D> points = { Point3D(-0.5, 0, 0), Point3D(0.5, 0, 0), Point3D(0, 0, 0) };
+        REQUIRE(merge_duplicate_vertices_renumbering(points, 0.6, renumber) == 2);
+        REQUIRE(renumber == std::vector<size_t>({0, 1, 1}));
+
+        points = { Point3D(0.5, 0, 0), Point3D(-0.5, 0, 0), Point3D(0, 0, 0) };
+        REQUIRE(merge_duplicate_vertices_renumbering(points, 0.6, renumber) == 2);
+        REQUIRE(renumber == std::vector<size_t>({0, 1, 0}));
+
+        points = { Point3D(1, 0, 0), Point3D(1, 1, 0), Point3D(1, 0.5, 0) };
+        REQUIRE(merge_duplicate_vertices_renumbering(points, 0.6, renumber) == 2);
+        REQUIRE(renumber == std::vector<size_t>({0, 1, 1}));
+
+        points = { Point3D(1, 0.5, 0.25), Point3D(1, 0.5, -0.25), Point3D(1, 0.5, 0) };
+        REQUIRE(merge_duplicate_vertices_renumbering(points, 0.3, renumber) == 2);
+        REQUIRE(renumber == std::vector<size_t>({0, 1, 0}));
+    }
+
+    SECTION("exact duplicates in a mesh") {
+        std::vector<MeshIO::IOVertex> vertices = { {0, 0, 0}, {1, 0, 0}, {0, 1, 0}, {1, 0, 0}, {1, 1, 0}, {0, 1, 0} };
+        std::vector<MeshIO::IOElement> elements = { {0, 1, 2}, {3, 4, 5} };
+        merge_duplicate_vertices(vertices, elements, vertices, elements, 0.0);
+        REQUIRE(vertices.size() == 4);
+        REQUIRE(elements[1] == MeshIO::IOElement({1, 3, 2}));
+    }
+}
@@ -0,0 +1,80 @@
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/MeshArchive.hh>
+#include <MeshFEM/MSHFieldParser.hh>
+#include <MeshFEM/MSHFieldWriter.hh>
+#include <catch2/catch.hpp>
+#include <cstdint>
+#include <cstdio>
+#include <sstream>
+////////////////////////////////////////////////////////////////////////////////
+
+TEST_CASE("mesh archive", "[meshio]") {
+    std::vector<MeshIO::IOVertex> V = { {0, 0, 0}, {1, 0, 0}, {0, 1, 0}, {0, 0, 1}, {1, 1, 1} };
+    std::vector<MeshIO::IOElement> E = { {0, 1, 2, 3}, {1, 2, 3, 4} };
+
+    std::vector<bool> compressionModes = { false };
+    if (MeshIO::MeshArchive::compressionSupported()) compressionModes.push_back(true);
+
+    SECTION("MeshIO") {
+        for (bool compress : compressionModes) {
+            const std::string path = "mesh_archive_test.mfa";
+            MeshIO::save(path, V, E, compress ? MeshIO::FMT_MFA_COMPRESSED : MeshIO::FMT_MFA);
+
+            std::vector<MeshIO::IOVertex>  lV;
+            std::vector<MeshIO::IOElement> lE;
+            REQUIRE(MeshIO::load(path, lV, lE) == MeshIO::MESH_TET);
+            REQUIRE(lE == E);
+            REQUIRE(lV.size() == V.size());
+            for (size_t i = 0; i < V.size(); ++i) REQUIRE(lV[i].point == V[i].point);
+
+            MeshIO::MeshArchive archive(path);
+            REQUIRE(archive.meshType() == MeshIO::MESH_TET);
+            const auto &vertices = archive.get(MeshIO::ArchiveArrayRole::Vertices, "vertices");
+            if (!compress) { // views of the mapped file
+                REQUIRE(!vertices.compressed);
+                REQUIRE(reinterpret_cast<uintptr_t>(archive.data(vertices)) % 64 == 0);
+            }
+            REQUIRE(archive.elements()(1, 3) == 4);
+            REQUIRE(archive.vertices()(4, 2) == 1.0);
+            std::remove(path.c_str());
+        }
+
+        // Truncated archives are rejected.
+        std::stringstream ss;
+        MeshIO::save(ss, V, E, MeshIO::FMT_MFA);
+        std::stringstream truncated(ss.str().substr(0, ss.str().size() - 4));
+        REQUIRE_THROWS(MeshIO::MeshArchive(truncated));
+    }
+
+    SECTION("fields") {
+        ScalarField<Real> s(V.size());
+        for (size_t i = 0; i < V.size(); ++i) s[i] = 0.25 * i;
+        VectorField<Real, 3> v(E.size());
+        for (size_t i = 0; i < E.size(); ++i) v(i) = Vector3D(i, -1.0, 2.0);
+        SymmetricMatrixField<Real, 3> m(E.size());
+        for (size_t i = 0; i < E.size(); ++i) m.data().col(i) << i, 1, 2, 3, 4, 5;
+
+        for (bool compress : compressionModes) {
+            for (const std::string path : { "mesh_archive_fields.msh", "mesh_archive_fields.mfa" }) {
+                MSHFieldWriter writer(path, V, E, MeshIO::MESH_TET);
+                if (compress && writer.archive()) writer.setArchiveCompression(true);
+                writer.addField("s", s, DomainType::PER_NODE);
+                writer.addField("v", v, DomainType::PER_ELEMENT);
+                writer.addField("m", m, DomainType::PER_ELEMENT);
+            }
+
+            MSHFieldParser<3> msh("mesh_archive_fields.msh");
+            for (bool lazy : { false, true }) {
+                MSHFieldParser<3> mfa("mesh_archive_fields.mfa", false, lazy);
+                REQUIRE(mfa.lazy() == lazy);
+                REQUIRE(mfa.elements() == msh.elements());
+                REQUIRE(mfa.scalarFieldNames(DomainType::PER_NODE) == std::vector<std::string>{"s"});
+                REQUIRE(mfa.scalarField("s").values() == msh.scalarField("s").values());
+                REQUIRE(mfa.vectorField("v", DomainType::PER_ELEMENT).data() == msh.vectorField("v").data());
+                REQUIRE(mfa.symmetricMatrixField("m").data() == msh.symmetricMatrixField("m").data());
+            }
+        }
+        std::remove("mesh_archive_fields.msh");
+        std::remove("mesh_archive_fields.mfa");
+    }
+}
@@ -0,0 +1,49 @@
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/MeshIO.hh>
+#include <catch2/catch.hpp>
+#include <sstream>
+////////////////////////////////////////////////////////////////////////////////
+
+TEST_CASE("ASCII mesh parsing", "[meshio]") {
+    std::vector<MeshIO::IOVertex>  V;
+    std::vector<MeshIO::IOElement> E;
+
+    SECTION("MSH") {
+        // Comments, blank lines, Windows line endings and element tags; the
+        // stream must be left just after $EndElements.
+        std::istringstream is("$MeshFormat\r\n2.2 0 8\r\n$EndMeshFormat\r\n$Nodes\r\n4\r\n"
+                              "1 0 0 0\r\n# comment\r\n2 1e0 0 0\r\n   3 0 1 0\r\n4 0 0 1.5\r\n$EndNodes\r\n"
+                              "$Elements\r\n2\r\n1 2 0 1 2 3\r\n\r\n2 2 2 7 9 2 3 4\r\n$EndElements\r\n$NodeData\r\n");
+        MeshIO::MeshIO_MSH io;
+        REQUIRE(io.load(is, V, E, MeshIO::MESH_GUESS) == MeshIO::MESH_TRI);
+        REQUIRE(V.size() == 4);
+        REQUIRE(V[1].point == Point3D(1, 0, 0));
+        REQUIRE(V[3].point == Point3D(0, 0, 1.5));
+        REQUIRE(E == std::vector<MeshIO::IOElement>({ {0, 1, 2}, {1, 2, 3} }));
+        std::string rest;
+        std::getline(is >> std::ws, rest);
+        REQUIRE(rest == "$NodeData\r");
+
+        std::istringstream bad("$MeshFormat\n2.2 0 8\n$EndMeshFormat\n$Nodes\n2\n1 0 0 0\n3 0 0 0\n$EndNodes\n");
+        REQUIRE_THROWS_WITH(io.load(bad, V, E, MeshIO::MESH_GUESS), "Unsupported MSH file format");
+    }
+
+    SECTION("OFF") {
+        std::istringstream is("OFF\n4 2 0\n0 0 0\n1 0 0\n0 1 0\n1 1 0\n3 0 1 2\n4 1 3 2 0\n");
+        REQUIRE(MeshIO::load(is, V, E, MeshIO::FMT_OFF) == MeshIO::MESH_TRI_QUAD);
+        REQUIRE(E[1] == MeshIO::IOElement(1, 3, 2, 0));
+
+        std::istringstream bad("OFF\n3 1 0\n0 0 0\n1 0 0\n0 1 0\n4 0 1 2\n");
+        REQUIRE_THROWS_WITH(MeshIO::load(bad, V, E, MeshIO::FMT_OFF), "Error in load: bad i/o");
+    }
+
+    SECTION("OBJ") {
+        std::istringstream is("# obj\nv 0 0 0\nv 1 0\nv 1 1 0\nvn 0 0 1\nf 1/1/1 2//1 3\n");
+        REQUIRE(MeshIO::load(is, V, E, MeshIO::FMT_OBJ) == MeshIO::MESH_TRI);
+        REQUIRE(V[1].point == Point3D(1, 0, 0));
+        REQUIRE(E == std::vector<MeshIO::IOElement>({ {0, 1, 2} }));
+
+        std::istringstream bad("v 0 0 0\nv 1 0\nf 1 2 3\n");
+        REQUIRE_THROWS_WITH(MeshIO::load(bad, V, E, MeshIO::FMT_OBJ), "Bad node index.");
+    }
+}
@@ -0,0 +1,134 @@
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/FEMMesh.hh>
+#include <MeshFEM/MeshReordering.hh>
+#include <MeshFEM/MSHFieldWriter.hh>
+#include <catch2/catch.hpp>
+#include <algorithm>
+#include <cstdio>
+#include <fstream>
+#include <random>
+#include <sstream>
+////////////////////////////////////////////////////////////////////////////////
+
+// Triangulated n x n grid on the unit square with shuffled vertices and
+// elements.
+void shuffledGrid(size_t n, std::vector<MeshIO::IOVertex> &V, std::vector<MeshIO::IOElement> &E) {
+    std::vector<size_t> perm((n + 1) * (n + 1));
+    for (size_t i = 0; i < perm.size(); ++i) perm[i] = i;
+    std::mt19937 gen(0);
+    std::shuffle(perm.begin(), perm.end(), gen);
+
+    V.assign(perm.size(), MeshIO::IOVertex());
+    for (size_t i = 0; i <= n; ++i)
+        for (size_t j = 0; j <= n; ++j)
+            V[perm[i * (n + 1) + j]] = MeshIO::IOVertex(Real(i) / n, Real(j) / n);
+    E.clear();
+    for (size_t i = 0; i < n; ++i) {
+        for (size_t j = 0; j < n; ++j) {
+            const size_t v00 = perm[i * (n + 1) + j],     v01 = perm[i * (n + 1) + j + 1],
+                         v10 = perm[(i + 1) * (n + 1) + j], v11 = perm[(i + 1) * (n + 1) + j + 1];
+            E.emplace_back(v00, v10, v11);
+            E.emplace_back(v00, v11, v01);
+        }
+    }
+    std::shuffle(E.begin(), E.end(), gen);
+}
+
+template<class Mesh>
+size_t bandwidth(const Mesh &m) {
+    size_t bw = 0;
+    for (auto e : m.elements())
+        for (auto a : e.vertices())
+            for (auto b : e.vertices())
+                bw = std::max<size_t>(bw, std::max(a.index(), b.index()) - std::min(a.index(), b.index()));
+    return bw;
+}
+
+TEST_CASE("mesh reordering", "[reordering]") {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    shuffledGrid(16, V, E);
+    using Mesh = FEMMesh<2, 2, VectorND<2>>;
+    Mesh original(E, V);
+
+    for (auto ordering : { MeshOrdering::Morton, MeshOrdering::Hilbert, MeshOrdering::RCM }) {
+        SECTION(meshOrderingName(ordering)) {
+            Mesh m(E, V, ordering);
+            const auto &perm = m.permutation();
+            REQUIRE(m.isReordered());
+            REQUIRE(m.numNodes() == original.numNodes());
+            REQUIRE(m.numBoundaryElements() == original.numBoundaryElements());
+
+            for (auto v : m.vertices()) {
+                const size_t vi = perm.originalVertex.at(v.index());
+                REQUIRE(perm.vertex.at(vi) == size_t(v.index()));
+                REQUIRE((v.node()->p - truncateFrom3D<VectorND<2>>(V[vi].point)).norm() == 0.0);
+            }
+            for (auto e : m.elements()) {
+                const size_t ei = perm.originalElement.at(e.index());
+                REQUIRE(perm.element.at(ei) == size_t(e.index()));
+                for (size_t c = 0; c < 3; ++c)
+                    REQUIRE(perm.originalVertex[e.vertex(c).index()] == E[ei][c]);
+            }
+
+            if (ordering == MeshOrdering::RCM)
+                REQUIRE(bandwidth(m) <= 3 * 16);
+            REQUIRE(bandwidth(m) < bandwidth(original));
+        }
+    }
+}
+
+static std::string fileContents(const std::string &path) {
+    std::ifstream is(path, std::ios::binary);
+    std::stringstream ss;
+    ss << is.rdbuf();
+    return ss.str();
+}
+
+// Write a mesh and fields evaluated on its nodes/elements (which don't depend
+// on the mesh's numbering) and return the file's contents.
+template<class Mesh>
+static std::string writeMeshFields(const Mesh &m, bool linearSubsample, bool binary) {
+    const std::string path = "mesh_reordering_fields.msh";
+    auto nodeValue = [](const VectorND<2> &p) { return std::sin(3.0 * p[0]) + p[1] * p[1]; };
+    {
+        MSHFieldWriter writer(path, m, linearSubsample, MeshIO::MESH_GUESS, binary);
+        ScalarField<Real> nodeField(m.numNodes());
+        for (auto n : m.nodes()) nodeField[n.index()] = nodeValue(n->p);
+        VectorField<Real, 2> barycenters(m.numElements());
+        std::vector<Interpolant<Real, 2, 2>> elementNodeField(m.numElements());
+        for (auto e : m.elements()) {
+            barycenters(e.index()).setZero();
+            for (auto v : e.vertices()) barycenters(e.index()) += v.node()->p / e.numVertices();
+            for (auto n : e.nodes()) elementNodeField[e.index()][n.localIndex()] = nodeValue(n->p);
+        }
+        writer.addField("nodes", nodeField, DomainType::PER_NODE);
+        writer.addField("barycenters", barycenters, DomainType::PER_ELEMENT);
+        writer.addField("element nodes", elementNodeField, DomainType::PER_ELEMENT);
+    }
+    std::string result = fileContents(path);
+    std::remove(path.c_str());
+    return result;
+}
+
+TEST_CASE("reordered mesh output matches unreordered mesh", "[reordering]") {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    shuffledGrid(8, V, E);
+    using Mesh = FEMMesh<2, 2, VectorND<2>>;
+    Mesh original(E, V);
+
+    for (auto ordering : { MeshOrdering::Morton, MeshOrdering::Hilbert, MeshOrdering::RCM }) {
+        SECTION(meshOrderingName(ordering)) {
+            Mesh m(E, V, ordering);
+            REQUIRE(m.isReordered());
+            for (bool linearSubsample : { true, false }) {
+                for (bool binary : { true, false }) {
+                    const std::string expected = writeMeshFields(original, linearSubsample, binary);
+                    REQUIRE(!expected.empty());
+                    REQUIRE(writeMeshFields(m, linearSubsample, binary) == expected);
+                }
+            }
+        }
+    }
+}
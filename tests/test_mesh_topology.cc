@@ -0,0 +1,282 @@
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/MeshIO.hh>
+#include <MeshFEM/Geometry.hh>
+#include <MeshFEM/TriMesh.hh>
+#include <MeshFEM/TetMesh.hh>
+#include <MeshFEM/FEMMesh.hh>
+#include <MeshFEM/algorithms/mesh_adjacency.hh>
+#include <catch2/catch.hpp>
+#include <algorithm>
+#include <array>
+#include <map>
+#include <random>
+#include <set>
+////////////////////////////////////////////////////////////////////////////////
+
+// Expose the index arrays (and the traversal helpers used to build them).
+struct TriMeshTopology : public TriMesh<> {
+    using TriMesh<>::TriMesh;
+    using TriMesh<>::V;
+    using TriMesh<>::O;
+    using TriMesh<>::VH;
+    using TriMesh<>::bV;
+    using TriMesh<>::bTipTail;
+    using TriMesh<>::HEVertex;
+    using TriMesh<>::m_vertexOfHE;
+    using TriMesh<>::m_bdryEIdxConvUnguarded;
+};
+
+struct TetMeshTopology : public TetMesh<> {
+    using TetMesh<>::TetMesh;
+    using TetMesh<>::V;
+    using TetMesh<>::O;
+    using TetMesh<>::VH;
+    using TetMesh<>::bO;
+    using TetMesh<>::bV;
+    using TetMesh<>::Vb;
+    using TetMesh<>::m_vertexOfHalfFace;
+};
+
+// Reference construction of the TriMesh adjacency (O, VH, bV, bTipTail),
+// pairing half-edges through a std::map keyed on the edge's vertices.
+static void referenceTopology(const TriMeshTopology &m, std::vector<int> &O, std::vector<int> &VH,
+                              std::vector<int> &bV, std::vector<int> &bTipTail) {
+    using HEV = TriMeshTopology::HEVertex;
+    const size_t nHalfEdges = m.V.size();
+    O.assign(nHalfEdges, -1);
+    VH.assign(m.numVertices(), -1);
+    bV.clear(), bTipTail.clear();
+
+    std::map<UnorderedPair, int> halfEdgeForEdge;
+    for (size_t he = 0; he < nHalfEdges; ++he) {
+        auto res = halfEdgeForEdge.emplace(UnorderedPair(m.m_vertexOfHE<HEV::TIP>(he), m.m_vertexOfHE<HEV::TAIL>(he)), he);
+        if (res.second) continue;
+        O[res.first->second] = he;
+        O[he] = res.first->second;
+        halfEdgeForEdge.erase(res.first);
+    }
+
+    std::vector<int> Vb(m.numVertices(), -1);
+    for (const auto &entry : halfEdgeForEdge) {
+        const int vhe = entry.second;
+        O[vhe] = m.m_bdryEIdxConvUnguarded(bTipTail.size() / 2);
+        const int  tipVV = m.m_vertexOfHE<HEV::TAIL>(vhe);
+        const int tailVV = m.m_vertexOfHE<HEV::TIP >(vhe);
+        if (Vb[ tipVV] == -1) { Vb[ tipVV] = bV.size(); bV.push_back( tipVV); }
+        if (Vb[tailVV] == -1) { Vb[tailVV] = bV.size(); bV.push_back(tailVV); }
+        VH[tailVV] = vhe;
+        bTipTail.push_back(Vb[ tipVV]);
+        bTipTail.push_back(Vb[tailVV]);
+    }
+    for (size_t he = 0; he < nHalfEdges; ++he) {
+        const int vtip = m.m_vertexOfHE<HEV::TIP>(he);
+        if (VH[vtip] == -1) VH[vtip] = he;
+    }
+}
+
+// Reference construction of the TetMesh adjacency (O, VH, bO, bV, Vb),
+// pairing half-faces through a std::map keyed on the face's vertices.
+static void referenceTopology(const TetMeshTopology &m, std::vector<int> &O, std::vector<int> &VH,
+                              std::vector<int> &bO, std::vector<int> &bV, std::vector<int> &Vb) {
+    const size_t nHalfFaces = m.V.size();
+    O.assign(nHalfFaces, -1);
+    VH.assign(m.numVertices(), -1);
+    Vb.assign(m.numVertices(), -1);
+    bO.clear(), bV.clear();
+
+    std::map<UnorderedTriplet, int> halfFaceForFace;
+    for (size_t hf = 0; hf < nHalfFaces; ++hf) {
+        auto res = halfFaceForFace.emplace(UnorderedTriplet(m.m_vertexOfHalfFace(0, hf),
+                                                            m.m_vertexOfHalfFace(1, hf),
+                                                            m.m_vertexOfHalfFace(2, hf)), hf);
+        if (res.second) continue;
+        O[res.first->second] = hf;
+        O[hf] = res.first->second;
+        halfFaceForFace.erase(res.first);
+    }
+
+    for (const auto &entry : halfFaceForFace) {
+        const int bhf = entry.second;
+        bO.push_back(bhf);
+        O[bhf] = -int(bO.size());
+        for (int c = 0; c < 3; ++c) {
+            const int v = m.m_vertexOfHalfFace(c, bhf);
+            if (Vb[v] != -1) continue;
+            Vb[v] = bV.size();
+            bV.push_back(v);
+            VH[v] = bhf;
+        }
+    }
+    for (size_t hf = 0; hf < nHalfFaces; ++hf) {
+        for (int c = 0; c < 3; ++c) {
+            const int v = m.m_vertexOfHalfFace(c, hf);
+            if (VH[v] == -1) VH[v] = hf;
+        }
+    }
+}
+
+// Simplicial grid of n^K cells with a few cells removed (leaving holes/voids
+// and thus several boundary components), shuffled vertex labels and shuffled
+// elements. Squares are split into two triangles, cubes into six tets.
+template<size_t K>
+static void simplexGridWithHoles(size_t n, std::vector<MeshIO::IOVertex> &V, std::vector<MeshIO::IOElement> &E) {
+    const size_t nz = (K == 3) ? n : 0;
+    auto vtx = [&](size_t i, size_t j, size_t k) { return (k * (n + 1) + j) * (n + 1) + i; };
+    V.clear(), E.clear();
+    for (size_t k = 0; k <= nz; ++k)
+        for (size_t j = 0; j <= n; ++j)
+            for (size_t i = 0; i <= n; ++i)
+                V.emplace_back(Real(i) / n, Real(j) / n, (K == 3) ? Real(k) / n : 0.0);
+
+    auto isHole = [&](size_t i, size_t j, size_t k) {
+        return ((i == 1) && (j == 1) && (k == (K == 3))) || ((i == n - 2) && (j == n - 3) && (k == nz / 2));
+    };
+
+    std::array<size_t, 3> perm;
+    for (size_t k = 0; k < std::max<size_t>(nz, 1); ++k) {
+        for (size_t j = 0; j < n; ++j) {
+            for (size_t i = 0; i < n; ++i) {
+                if (isHole(i, j, k)) continue;
+                if (K == 2) {
+                    E.emplace_back(vtx(i, j, 0), vtx(i + 1, j, 0), vtx(i + 1, j + 1, 0));
+                    E.emplace_back(vtx(i, j, 0), vtx(i + 1, j + 1, 0), vtx(i, j + 1, 0));
+                    continue;
+                }
+                perm = {{0, 1, 2}};
+                do {
+                    std::array<size_t, 3> c = {{i, j, k}};
+                    std::array<size_t, 4> t;
+                    t[0] = vtx(c[0], c[1], c[2]);
+                    for (size_t s = 0; s < 3; ++s) {
+                        ++c[perm[s]];
+                        t[s + 1] = vtx(c[0], c[1], c[2]);
+                    }
+                    E.emplace_back(t[0], t[1], t[2], t[3]);
+                } while (std::next_permutation(perm.begin(), perm.end()));
+            }
+        }
+    }
+
+    std::vector<size_t> relabel(V.size());
+    for (size_t i = 0; i < relabel.size(); ++i) relabel[i] = i;
+    std::mt19937 gen(0);
+    std::shuffle(relabel.begin(), relabel.end(), gen);
+    std::vector<MeshIO::IOVertex> shuffledV(V.size());
+    for (size_t i = 0; i < V.size(); ++i) shuffledV[relabel[i]] = V[i];
+    V.swap(shuffledV);
+    for (auto &e : E)
+        for (size_t c = 0; c < e.size(); ++c) e[c] = relabel[e[c]];
+    std::shuffle(E.begin(), E.end(), gen);
+}
+
+// Corner array V for the element soup E.
+static std::vector<int> cornerVertices(const std::vector<MeshIO::IOElement> &E) {
+    std::vector<int> V;
+    for (const auto &e : E)
+        for (size_t c = 0; c < e.size(); ++c) V.push_back(e[c]);
+    return V;
+}
+
+TEST_CASE("TriMesh topology matches map-based construction", "[topology]") {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    simplexGridWithHoles<2>(12, V, E);
+    TriMeshTopology m(E, V.size());
+
+    std::vector<int> O, VH, bV, bTipTail;
+    referenceTopology(m, O, VH, bV, bTipTail);
+    REQUIRE(m.V        == cornerVertices(E));
+    REQUIRE(m.O        == O);
+    REQUIRE(m.VH       == VH);
+    REQUIRE(m.bV       == bV);
+    REQUIRE(m.bTipTail == bTipTail);
+}
+
+TEST_CASE("TetMesh topology matches map-based construction", "[topology]") {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    simplexGridWithHoles<3>(6, V, E);
+    TetMeshTopology m(E, V.size());
+
+    std::vector<int> O, VH, bO, bV, Vb;
+    referenceTopology(m, O, VH, bO, bV, Vb);
+    REQUIRE(m.V  == cornerVertices(E));
+    REQUIRE(m.O  == O);
+    REQUIRE(m.VH == VH);
+    REQUIRE(m.bO == bO);
+    REQUIRE(m.bV == bV);
+    REQUIRE(m.Vb == Vb);
+}
+
+// Compare the CSR adjacencies of m against a reference built from the
+// element corners (all in the mesh's numbering).
+template<class Mesh>
+static void checkAdjacency(const Mesh &m) {
+    const size_t nv = m.numVertices(), ne = m.numSimplices();
+    std::vector<std::set<int>> vertexElements(nv), vertexVertices(nv);
+    std::map<std::vector<int>, std::vector<int>> elementsOfFace;
+    for (size_t e = 0; e < ne; ++e) {
+        const auto s = m.simplex(e);
+        for (size_t c = 0; c < s.numVertices(); ++c) {
+            const int v = s.vertex(c).index();
+            vertexElements[v].insert(e);
+            std::vector<int> face;
+            for (size_t d = 0; d < s.numVertices(); ++d) {
+                if (d == c) continue;
+                vertexVertices[v].insert(s.vertex(d).index());
+                face.push_back(s.vertex(d).index());
+            }
+            std::sort(face.begin(), face.end());
+            elementsOfFace[face].push_back(e);
+        }
+    }
+
+    auto rows = [](const CSRAdjacency &adj) {
+        std::vector<std::vector<int>> result;
+        for (size_t i = 0; i < adj.size(); ++i)
+            result.emplace_back(adj.indices.begin() + adj.indptr[i], adj.indices.begin() + adj.indptr[i + 1]);
+        return result;
+    };
+    auto sets = [](const std::vector<std::set<int>> &s) {
+        std::vector<std::vector<int>> result;
+        for (const auto &entry : s) result.emplace_back(entry.begin(), entry.end());
+        return result;
+    };
+    REQUIRE(rows(vertex_element_adjacency(m)) == sets(vertexElements));
+    REQUIRE(rows(vertex_vertex_adjacency(m))  == sets(vertexVertices));
+
+    // Array variant, from the element corners and vertex-element adjacency.
+    const size_t cornersPerElement = Mesh::K + 1;
+    std::vector<int> corners;
+    for (size_t e = 0; e < ne; ++e)
+        for (size_t c = 0; c < cornersPerElement; ++c) corners.push_back(m.simplex(e).vertex(c).index());
+    const CSRAdjacency ve = vertex_element_adjacency(m);
+    REQUIRE(rows(vertex_vertex_adjacency(nv, ve.indptr.data(), ve.indices.data(), corners.data(), cornersPerElement)) == sets(vertexVertices));
+
+    std::vector<std::vector<int>> elementElements(ne);
+    for (size_t e = 0; e < ne; ++e) {
+        const auto s = m.simplex(e);
+        for (size_t c = 0; c < s.numVertices(); ++c) {
+            std::vector<int> face;
+            for (size_t d = 0; d < s.numVertices(); ++d)
+                if (d != c) face.push_back(s.vertex(d).index());
+            std::sort(face.begin(), face.end());
+            for (int other : elementsOfFace.at(face))
+                if (size_t(other) != e) elementElements[e].push_back(other);
+        }
+    }
+    REQUIRE(rows(element_element_adjacency(m)) == elementElements);
+}
+
+TEST_CASE("CSR mesh adjacency", "[topology]") {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    SECTION("triangle mesh") {
+        simplexGridWithHoles<2>(12, V, E);
+        checkAdjacency(FEMMesh<2, 2, VectorND<2>>(E, V, MeshOrdering::Hilbert));
+    }
+    SECTION("tet mesh") {
+        simplexGridWithHoles<3>(6, V, E);
+        checkAdjacency(FEMMesh<3, 1, VectorND<3>>(E, V, MeshOrdering::Hilbert));
+    }
+}
@@ -0,0 +1,94 @@
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/MSHFieldParser.hh>
+#include <MeshFEM/MSHFieldWriter.hh>
+#include <catch2/catch.hpp>
+#include <cstdio>
+#include <fstream>
+#include <sstream>
+////////////////////////////////////////////////////////////////////////////////
+
+TEST_CASE("lazy MSHFieldParser", "[msh]") {
+    std::vector<MeshIO::IOVertex> V = { {0, 0}, {1, 0}, {0, 1}, {1, 1} };
+    std::vector<MeshIO::IOElement> E = { {0, 1, 2}, {1, 3, 2} };
+
+    for (bool binary : {true, false}) {
+        const std::string path = binary ? "lazy_field_parser_test_bin.msh" : "lazy_field_parser_test_ascii.msh";
+        {
+            MSHFieldWriter writer(path, V, E, MeshIO::MESH_TRI, binary);
+            for (int k = 0; k < 5; ++k) {
+                ScalarField<Real> s(V.size());
+                for (size_t i = 0; i < V.size(); ++i) s[i] = k + 0.5 * i;
+                writer.addField("s" + std::to_string(k), s, DomainType::PER_NODE);
+            }
+            VectorField<Real, 2> v(E.size());
+            for (size_t i = 0; i < E.size(); ++i) v(i) = Vector2D(i, -1.0);
+            writer.addField("v", v, DomainType::PER_ELEMENT);
+            std::vector<Interpolant<Real, 2, 1>> interp(E.size());
+            for (size_t i = 0; i < E.size(); ++i) { interp[i][0] = i; interp[i][1] = 1; interp[i][2] = 2; }
+            writer.addField("si", interp, DomainType::PER_ELEMENT);
+        }
+
+        MSHFieldParser<2> eager(path), lazy(path, false, true);
+        REQUIRE(lazy.lazy());
+        REQUIRE(lazy.scalarFieldNames() == eager.scalarFieldNames());
+        REQUIRE(lazy.vectorFieldNames(DomainType::PER_ELEMENT) == std::vector<std::string>{"v"});
+        REQUIRE(lazy.scalarInterpolantFieldNames() == std::vector<std::string>{"si"});
+
+        // Fields are decoded again after being evicted from the cache.
+        lazy.setFieldCacheSize(1);
+        for (int pass = 0; pass < 2; ++pass) {
+            for (const auto &name : eager.scalarFieldNames())
+                REQUIRE(lazy.scalarField(name).values() == eager.scalarField(name).values());
+        }
+        REQUIRE(lazy.vectorField("v").data() == eager.vectorField("v").data());
+        const auto &li = lazy.scalarInterpolantField("si"), &ei = eager.scalarInterpolantField("si");
+        for (size_t i = 0; i < E.size(); ++i) {
+            for (size_t j = 0; j < ei[i].size(); ++j)
+                REQUIRE(li[i][j] == ei[i][j]);
+        }
+        REQUIRE_THROWS(lazy.scalarField("s0", DomainType::PER_ELEMENT));
+        std::remove(path.c_str());
+    }
+}
+
+TEST_CASE("asynchronous MSHFieldWriter", "[msh]") {
+    std::vector<MeshIO::IOVertex> V = { {0, 0}, {1, 0}, {0, 1}, {1, 1} };
+    std::vector<MeshIO::IOElement> E = { {0, 1, 2}, {1, 3, 2} };
+
+    auto fileContents = [](const std::string &path) {
+        std::ifstream is(path, std::ios::binary);
+        std::stringstream ss;
+        ss << is.rdbuf();
+        return ss.str();
+    };
+
+    for (bool binary : {true, false}) {
+        std::string contents[2];
+        for (bool async : {false, true}) {
+            const std::string path = "async_field_writer_test.msh";
+            {
+                MSHFieldWriter writer(path, V, E, MeshIO::MESH_TRI, binary);
+                writer.setAsynchronous(async, 1);
+                REQUIRE(writer.asynchronous() == async);
+                for (int k = 0; k < 5; ++k) {
+                    ScalarField<Real> s(V.size());
+                    for (size_t i = 0; i < V.size(); ++i) s[i] = k + i / 3.0;
+                    writer.addField("s" + std::to_string(k), s, DomainType::PER_NODE);
+                }
+                SymmetricMatrixField<Real, 2> sm(E.size());
+                for (size_t i = 0; i < E.size(); ++i) { auto m = sm(i); m(0, 0) = i; m(1, 1) = 2; m(0, 1) = 0.5; }
+                writer.addField("sm", sm, DomainType::PER_ELEMENT);
+                std::vector<Interpolant<Real, 2, 1>> interp(E.size());
+                for (size_t i = 0; i < E.size(); ++i) { interp[i][0] = i; interp[i][1] = 1; interp[i][2] = 2; }
+                writer.addField("si", interp, DomainType::PER_ELEMENT);
+                writer.flush();
+                contents[async] = fileContents(path);
+            }
+            MSHFieldParser<2> parser(path);
+            REQUIRE(parser.scalarFieldNames().size() == 5);
+            REQUIRE(parser.symmetricMatrixField("sm")(1)(0, 0) == 1.0);
+            std::remove(path.c_str());
+        }
+        REQUIRE(contents[0] == contents[1]);
+    }
+}
@@ -0,0 +1,194 @@
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/LinearElasticity.hh>
+#include <MeshFEM/PeriodicHomogenization.hh>
+#include <MeshFEM/IncrementalHomogenization.hh>
+#include <catch2/catch.hpp>
+#include <array>
+#include <algorithm>
+#if MESHFEM_WITH_TBB
+#include <tbb/task_arena.h>
+#endif
+////////////////////////////////////////////////////////////////////////////////
+
+// Periodic grid of n^N cells on the unit square/cube with the center cell
+// removed (n odd), so that the homogenized tensor depends on the geometry.
+// Each square is split into two triangles and each cube into the six
+// tetrahedra around its main diagonal, so the triangulation is translation
+// invariant (and the opposite faces match).
+template<size_t N>
+static void periodicTestGrid(size_t n, std::vector<MeshIO::IOVertex> &V, std::vector<MeshIO::IOElement> &E) {
+    V.clear(), E.clear();
+    const size_t nz = (N == 3) ? n : 0;
+    auto vtx = [&](size_t i, size_t j, size_t k) { return (k * (n + 1) + j) * (n + 1) + i; };
+    for (size_t k = 0; k <= nz; ++k)
+        for (size_t j = 0; j <= n; ++j)
+            for (size_t i = 0; i <= n; ++i)
+                V.emplace_back(Real(i) / n, Real(j) / n, (N == 3) ? Real(k) / n : 0.0);
+
+    std::array<size_t, 3> perm = {{0, 1, 2}};
+    for (size_t k = 0; k < std::max<size_t>(nz, 1); ++k) {
+        for (size_t j = 0; j < n; ++j) {
+            for (size_t i = 0; i < n; ++i) {
+                if ((i == n / 2) && (j == n / 2) && ((N == 2) || (k == n / 2))) continue;
+                if (N == 2) {
+                    E.emplace_back(vtx(i, j, 0), vtx(i + 1, j, 0), vtx(i + 1, j + 1, 0));
+                    E.emplace_back(vtx(i, j, 0), vtx(i + 1, j + 1, 0), vtx(i, j + 1, 0));
+                    continue;
+                }
+                // Kuhn subdivision: one tet per monotone path from corner
+                // (0, 0, 0) to (1, 1, 1).
+                std::sort(perm.begin(), perm.end());
+                do {
+                    std::array<size_t, 3> c = {{i, j, k}};
+                    std::array<size_t, 4> t;
+                    t[0] = vtx(c[0], c[1], c[2]);
+                    for (size_t s = 0; s < 3; ++s) {
+                        ++c[perm[s]];
+                        t[s + 1] = vtx(c[0], c[1], c[2]);
+                    }
+                    // Orient positively.
+                    Eigen::Matrix3d J;
+                    for (size_t s = 0; s < 3; ++s)
+                        J.col(s) = (V[t[s + 1]].point - V[t[0]].point).template cast<double>();
+                    if (J.determinant() < 0) std::swap(t[2], t[3]);
+                    E.emplace_back(t[0], t[1], t[2], t[3]);
+                } while (std::next_permutation(perm.begin(), perm.end()));
+            }
+        }
+    }
+}
+
+// Smooth perturbation of the interior vertices (vanishing on the cell
+// boundary).
+template<size_t N>
+static std::vector<MeshIO::IOVertex> perturbedVertices(const std::vector<MeshIO::IOVertex> &V, Real amplitude) {
+    std::vector<MeshIO::IOVertex> result(V);
+    for (auto &v : result) {
+        Real bump = 1.0;
+        for (size_t d = 0; d < N; ++d) bump *= std::sin(M_PI * v[d]);
+        Eigen::Vector3d p = v.point;
+        for (size_t c = 0; c < N; ++c)
+            v[c] += amplitude * bump * std::sin(2 * M_PI * p[(c + 1) % N] + c);
+    }
+    return result;
+}
+
+template<size_t N>
+using PHSim = LinearElasticity::Simulator<LinearElasticity::Mesh<N, 1>>;
+
+template<size_t N>
+static void setTestMaterial(PHSim<N> &sim) {
+    LinearElasticity::ETensorStoreGetter<N> store(ElasticityTensor<Real, N>(1.0, 0.3));
+    for (auto e : sim.mesh().elements()) e->configure(store);
+}
+
+template<size_t N>
+static typename PHSim<N>::ETensor fullHomogenization(const std::vector<MeshIO::IOElement> &E, const std::vector<MeshIO::IOVertex> &V) {
+    PHSim<N> sim(E, V);
+    setTestMaterial<N>(sim);
+    std::vector<typename PHSim<N>::VField> w;
+    PeriodicHomogenization::solveCellProblems(w, sim);
+    return PeriodicHomogenization::homogenizedElasticityTensorDisplacementForm(w, sim);
+}
+
+template<class ETensor>
+static Real relativeError(const ETensor &A, const ETensor &B) {
+    return std::sqrt((A - B).frobeniusNormSq() / B.frobeniusNormSq());
+}
+
+template<class Field>
+static Real maxFieldDifference(const Field &a, const Field &b) {
+    return (a.data() - b.data()).cwiseAbs().maxCoeff();
+}
+
+// Per-element homogenization stages, run with at most numThreads threads.
+template<size_t N>
+struct HomogenizationStages {
+    typename PHSim<N>::VField load;
+    typename PHSim<N>::SMField avgStrain;
+    typename PHSim<N>::ETensor Ch, ChDisplacementForm;
+
+    HomogenizationStages(const std::vector<MeshIO::IOElement> &E, const std::vector<MeshIO::IOVertex> &V, int numThreads) {
+        auto run = [&]() {
+            PHSim<N> sim(E, V);
+            setTestMaterial<N>(sim);
+            std::vector<typename PHSim<N>::VField> w;
+            PeriodicHomogenization::solveCellProblems(w, sim);
+            load = sim.constantStrainLoad(PHSim<N>::SMatrix::CanonicalBasis(1));
+            avgStrain = sim.averageStrainField(w[0]);
+            Ch = PeriodicHomogenization::homogenizedElasticityTensor(w, sim);
+            ChDisplacementForm = PeriodicHomogenization::homogenizedElasticityTensorDisplacementForm(w, sim);
+        };
+#if MESHFEM_WITH_TBB
+        tbb::task_arena arena(numThreads);
+        arena.execute(run);
+#else
+        (void) numThreads;
+        run();
+#endif
+    }
+};
+
+template<size_t N>
+static void testParallelStagesMatchSerial(size_t gridSize) {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    periodicTestGrid<N>(gridSize, V, E);
+    V = perturbedVertices<N>(V, 0.02 / gridSize);
+
+    HomogenizationStages<N> serial(E, V, 1), parallel(E, V, 4);
+    REQUIRE(maxFieldDifference(serial.load,      parallel.load)      < 1e-12);
+    REQUIRE(maxFieldDifference(serial.avgStrain, parallel.avgStrain) < 1e-12);
+    REQUIRE(relativeError(parallel.Ch,                 serial.Ch)                 < 1e-12);
+    REQUIRE(relativeError(parallel.ChDisplacementForm, serial.ChDisplacementForm) < 1e-12);
+    // The two homogenized tensor formulas agree.
+    REQUIRE(relativeError(parallel.ChDisplacementForm, parallel.Ch) < 1e-8);
+}
+
+TEST_CASE("parallel homogenization stages match serial evaluation", "[homogenization]") {
+    SECTION("2D") { testParallelStagesMatchSerial<2>(7); }
+    SECTION("3D") { testParallelStagesMatchSerial<3>(3); }
+}
+
+template<size_t N>
+static void testIncrementalHomogenization(size_t gridSize) {
+    std::vector<MeshIO::IOVertex> V;
+    std::vector<MeshIO::IOElement> E;
+    periodicTestGrid<N>(gridSize, V, E);
+
+    PHSim<N> sim(E, V);
+    setTestMaterial<N>(sim);
+    PeriodicHomogenization::IncrementalHomogenizer<PHSim<N>> ih(sim);
+
+    const auto Ch0 = ih.evaluate(V);
+    REQUIRE(ih.numFullSolves() == 1);
+    REQUIRE(relativeError(Ch0, fullHomogenization<N>(E, V)) < 1e-10);
+
+    // A small perturbation is predicted to second order.
+    const auto V1 = perturbedVertices<N>(V, 1e-3);
+    const auto Ch1 = ih.evaluate(V1);
+    REQUIRE(ih.lastEvaluationPredicted());
+    REQUIRE(ih.numFullSolves() == 1);
+    const auto Ch1Ref = fullHomogenization<N>(E, V1);
+    const Real changed = relativeError(Ch0, Ch1Ref);
+    REQUIRE(changed > 0);
+    INFO("change " << changed << " prediction error " << relativeError(Ch1, Ch1Ref));
+    REQUIRE(relativeError(Ch1, Ch1Ref) < 1e-2 * changed);
+
+    // A rejected prediction re-solves on the existing simulator (keeping its
+    // periodic conditions and symbolic factorization) and must agree with a
+    // from-scratch homogenization.
+    auto opts = ih.options();
+    opts.tolerance = 0.0;
+    ih.setOptions(opts);
+    const auto V2 = perturbedVertices<N>(V, 2e-3);
+    const auto Ch2 = ih.evaluate(V2);
+    REQUIRE(!ih.lastEvaluationPredicted());
+    REQUIRE(ih.numFullSolves() == 2);
+    REQUIRE(relativeError(Ch2, fullHomogenization<N>(E, V2)) < 1e-10);
+}
+
+TEST_CASE("incremental homogenization matches full re-homogenization", "[homogenization]") {
+    SECTION("2D") { testIncrementalHomogenization<2>(5); }
+    SECTION("3D") { testIncrementalHomogenization<3>(3); }
+}
@@ -0,0 +1,62 @@
+////////////////////////////////////////////////////////////////////////////////
+#include <MeshFEM/PeriodicBoundaryMatcher.hh>
+#include <catch2/catch.hpp>
+#include <algorithm>
+#include <random>
+////////////////////////////////////////////////////////////////////////////////
+
+using namespace PeriodicBoundaryMatcher;
+
+////////////////////////////////////////////////////////////////////////////////
+
+// Shuffled boundary points of an n x n x n lattice on the unit cube.
+std::vector<VectorND<3>> latticeBoundaryPoints(size_t n) {
+    std::vector<VectorND<3>> pts;
+    for (size_t i = 0; i <= n; ++i) {
+        for (size_t j = 0; j <= n; ++j) {
+            for (size_t k = 0; k <= n; ++k) {
+                if ((i % n) && (j % n) && (k % n)) continue;
+                pts.emplace_back(Real(i) / n, Real(j) / n, Real(k) / n);
+            }
+        }
+    }
+    std::mt19937 gen(0);
+    std::shuffle(pts.begin(), pts.end(), gen);
+    return pts;
+}
+
+TEST_CASE("sort-based periodic matching", "[periodic]") {
+    BBox<VectorND<3>> cell(VectorND<3>(VectorND<3>::Zero()), VectorND<3>(VectorND<3>::Ones()));
+    auto pts = latticeBoundaryPoints(7);
+    // Perturb the points by less than the matching tolerance.
+    for (auto &p : pts) {
+        for (size_t c = 0; c < 3; ++c)
+            if ((p[c] != 0.0) && (p[c] != 1.0)) p[c] += 1e-9 * std::sin(1e3 * p.sum() + c);
+    }
+
+    std::vector<FaceMembership<3>> fm;
+    determineCellBoundaryFaceMembership(pts, cell, fm, 1e-7);
+
+    std::vector<std::vector<size_t>> nodeSets, refNodeSets;
+    std::vector<size_t> nodeSetForNode, refNodeSetForNode;
+
+    SECTION("matching agrees with the collision grid implementation") {
+        match(pts, cell, fm, nodeSets, nodeSetForNode);
+        matchCollisionGrid(pts, cell, fm, refNodeSets, refNodeSetForNode);
+        REQUIRE(nodeSets == refNodeSets);
+        REQUIRE(nodeSetForNode == refNodeSetForNode);
+        REQUIRE(nodeSets.size() == 7 * 7 * 7 - 6 * 6 * 6); // one set per minimal node
+    }
+
+    SECTION("matching permitting mismatches agrees with the collision grid implementation") {
+        // Remove a max face node to create a mismatch.
+        for (size_t i = 0; i < pts.size(); ++i) {
+            if (fm[i].count() == 1 && fm[i].onMaxFace(0)) { pts.erase(pts.begin() + i); fm.erase(fm.begin() + i); break; }
+        }
+        REQUIRE_THROWS(match(pts, cell, fm, nodeSets, nodeSetForNode));
+        matchPermittingMismatch(pts, cell, fm, nodeSets, nodeSetForNode);
+        matchPermittingMismatchCollisionGrid(pts, cell, fm, refNodeSets, refNodeSetForNode);
+        REQUIRE(nodeSets == refNodeSets);
+        REQUIRE(nodeSetForNode == refNodeSetForNode);
+    }
+}
@@ -1,4 +1,7 @@
 #include <MeshFEM/SparseMatrices.hh>
+#include <MeshFEM/MatrixFreePCG.hh>
+#include <MeshFEM/ShiftInvertEigensolver.hh>
+#include <cstdio>
 // WARNING: catch2/catch.hpp sets a BENCHMARK macro, so we must include it
 // after MeshFEM.
 #include <catch2/catch.hpp>
@@ -20,3 +23,272 @@ TEST_CASE("sparse matrix format conversions", "[sparse_matrix]" ) {
     A.sumRepeated();
     REQUIRE(A.nnz() == 0); // A - B should be exactly zero
 }
+
+TEST_CASE("batched nonzero insertion matches addNZ", "[sparse_matrix]" ) {
+    // Unsorted triplets with repeated entries and an explicit zero.
+    const std::vector<SuiteSparse_long> I = {3, 0, 2, 3, 1, 0, 2};
+    const std::vector<SuiteSparse_long> J = {4, 0, 2, 4, 1, 0, 3};
+    const std::vector<Real>             V = {1.5, 2.0, 0.0, -0.5, 3.0, 1.0, 4.0};
+    const size_t count = I.size();
+
+    SECTION("triplet matrix") {
+        TripletMatrix<> A(5, 5), B(5, 5);
+        for (size_t k = 0; k < count; ++k) A.addNZ(I[k], J[k], V[k]);
+        B.addNZBatch(I.data(), J.data(), V.data(), count);
+        REQUIRE(A.nnz() == B.nnz());
+        for (size_t k = 0; k < A.nnz(); ++k) {
+            REQUIRE(A.nz[k].i == B.nz[k].i);
+            REQUIRE(A.nz[k].j == B.nz[k].j);
+            REQUIRE(A.nz[k].v == B.nz[k].v);
+        }
+
+        // Out-of-bounds indices are rejected before anything is added.
+        const SuiteSparse_long badI[] = {0, 5}, badJ[] = {0, 0};
+        const Real badV[] = {1.0, 1.0};
+        REQUIRE_THROWS(B.addNZBatch(badI, badJ, badV, 2));
+        REQUIRE(B.nnz() == A.nnz());
+    }
+
+    SECTION("compressed column matrix") {
+        TripletMatrix<> pattern(5, 5);
+        for (size_t k = 0; k < count; ++k) pattern.nz.emplace_back(I[k], J[k], 1.0);
+        pattern.sumRepeated();
+        SuiteSparseMatrix A(pattern), B(pattern);
+        A.setZero(), B.setZero();
+        for (size_t k = 0; k < count; ++k) A.addNZ(I[k], J[k], V[k]);
+        B.addNZBatch(I.data(), J.data(), V.data(), count);
+        REQUIRE(A.Ax == B.Ax);
+
+        const SuiteSparse_long absentI[] = {4}, absentJ[] = {4};
+        const Real absentV[] = {1.0};
+        REQUIRE_THROWS(B.addNZBatch(absentI, absentJ, absentV, 1));
+    }
+}
+
+TEST_CASE("block solve matches individual solves", "[sparse_matrix]" ) {
+    // 1D Laplacian with one end pinned
+    const size_t n = 10;
+    TripletMatrix<> K(n, n);
+    for (size_t i = 0; i < n; ++i) {
+        K.addNZ(i, i, 2.0);
+        if (i + 1 < n) K.addNZ(i, i + 1, -1.0);
+    }
+
+    SPSDSystem<Real> sys(K);
+    sys.fixVariables({0}, {0.5});
+
+    using MXd = SPSDSystem<Real>::MXd;
+    MXd F = MXd::Random(n, 3), U;
+    sys.solveBlock(F, U);
+
+    REQUIRE(size_t(U.rows()) == n);
+    REQUIRE(U.cols() == 3);
+    for (int k = 0; k < F.cols(); ++k) {
+        Eigen::VectorXd f = F.col(k), u;
+        sys.solve(f, u);
+        REQUIRE((U.col(k) - u).norm() < 1e-12);
+    }
+}
+
+TEST_CASE("compressed column system setup matches fixVariables", "[sparse_matrix]" ) {
+    // 1D Laplacian with a variable coefficient and both ends fixed.
+    const size_t n = 10;
+    auto laplacian = [&](Real scale) {
+        TripletMatrix<> K(n, n);
+        for (size_t i = 0; i + 1 < n; ++i) {
+            Real k = 1.0 + scale * (i % 3);
+            K.addNZ(i, i, k); K.addNZ(i + 1, i + 1, k);
+            K.addNZ(i, i + 1, -k);
+        }
+        K.symmetry_mode = TripletMatrix<>::SymmetryMode::UPPER_TRIANGLE;
+        return K;
+    };
+    const std::vector<size_t> fixedVars = {0, n - 1};
+    const std::vector<Real> fixedVarValues = {0.5, -0.25};
+    Eigen::VectorXd f = Eigen::VectorXd::Random(n), u, uRef;
+
+    SPSDSystem<Real> sys;
+    for (Real scale : {1.0, 2.0}) {
+        TripletMatrix<> K = laplacian(scale);
+        SPSDSystem<Real> ref(K);
+        ref.fixVariables(fixedVars, fixedVarValues);
+        ref.solve(f, uRef);
+
+        // The second iteration only refactors numerically.
+        sys.setWithFixedVariables(SuiteSparseMatrix(K), fixedVars, fixedVarValues, scale != 1.0);
+        sys.solve(f, u);
+        REQUIRE((u - uRef).norm() < 1e-12 * uRef.norm());
+    }
+}
+
+TEST_CASE("matrix-free PCG matches direct solve", "[sparse_matrix]" ) {
+    // Singular 1D Neumann Laplacian, made well-posed by a zero-mean constraint
+    // (analogous to a no-rigid-translation constraint).
+    const size_t n = 12;
+    Eigen::MatrixXd K = Eigen::MatrixXd::Zero(n, n);
+    for (size_t i = 0; i + 1 < n; ++i) {
+        K(i, i) += 1.0; K(i + 1, i + 1) += 1.0;
+        K(i, i + 1) -= 1.0; K(i + 1, i) -= 1.0;
+    }
+    auto applyK = [&](const Eigen::VectorXd &x, Eigen::VectorXd &y) { y = K * x; };
+
+    Eigen::VectorXd f = Eigen::VectorXd::Random(n);
+    f.array() -= f.mean(); // compatible load
+
+    TripletMatrix<> C(1, n);
+    for (size_t i = 0; i < n; ++i) C.addNZ(0, i, 1.0);
+
+    PCGOptions opts;
+    opts.tolerance = 1e-14;
+
+    SECTION("linear constraint") {
+        ConstrainedPCG<2> pcg;
+        pcg.setConstraints(n, {}, {}, C, {0.0});
+        aligned_std_vector<Eigen::Matrix2d> blocks(n / 2);
+        for (size_t b = 0; b < n / 2; ++b) blocks[b] = K.block<2, 2>(2 * b, 2 * b);
+        pcg.setPreconditioner(PCGPreconditioner::BLOCK_JACOBI, blocks);
+
+        Eigen::VectorXd x;
+        pcg.solve(applyK, f, x, opts);
+
+        // Reference: KKT system
+        Eigen::MatrixXd A = Eigen::MatrixXd::Zero(n + 1, n + 1);
+        A.topLeftCorner(n, n) = K;
+        A.block(n, 0, 1, n).setOnes();
+        A.block(0, n, n, 1).setOnes();
+        Eigen::VectorXd b = Eigen::VectorXd::Zero(n + 1);
+        b.head(n) = f;
+        Eigen::VectorXd xref = A.fullPivLu().solve(b).head(n);
+        REQUIRE((x - xref).norm() < 1e-10 * xref.norm());
+    }
+
+    SECTION("fixed variables") {
+        ConstrainedPCG<1> pcg;
+        pcg.setConstraints(n, {0, n - 1}, {0.5, -0.25}, TripletMatrix<>(), {});
+        aligned_std_vector<Eigen::Matrix<Real, 1, 1>> blocks(n);
+        for (size_t i = 0; i < n; ++i) blocks[i](0, 0) = K(i, i);
+        pcg.setPreconditioner(PCGPreconditioner::JACOBI, blocks);
+
+        Eigen::VectorXd x;
+        pcg.solve(applyK, f, x, opts);
+        REQUIRE(x[0]     == 0.5);
+        REQUIRE(x[n - 1] == -0.25);
+        Eigen::VectorXd r = f - K * x;
+        REQUIRE(r.segment(1, n - 2).norm() < 1e-10 * f.norm());
+    }
+}
+
+TEST_CASE("shift-invert Krylov-Schur matches dense eigensolver", "[sparse_matrix]" ) {
+    // Generalized problem H x = lambda M x for a (singular) 1D Laplacian H
+    // and a tridiagonal SPD mass matrix M.
+    const size_t n = 200, nev = 6;
+    Eigen::MatrixXd H = Eigen::MatrixXd::Zero(n, n), M = Eigen::MatrixXd::Zero(n, n);
+    for (size_t i = 0; i + 1 < n; ++i) {
+        Real k = 1.0 + (i % 7) / 3.0;
+        H(i, i) += k; H(i + 1, i + 1) += k;
+        H(i, i + 1) -= k; H(i + 1, i) -= k;
+        M(i, i + 1) = M(i + 1, i) = 0.5;
+    }
+    M.diagonal().setConstant(2.0);
+
+    const Real sigma = -0.001;
+    Eigen::LDLT<Eigen::MatrixXd> factorization(H - sigma * M);
+    auto applyM  = [&](const Eigen::VectorXd &x, Eigen::VectorXd &y) { y = M * x; };
+    auto applyOP = [&](const Eigen::VectorXd &x, Eigen::VectorXd &y) { y = factorization.solve(M * x); };
+
+    Eigen::VectorXd theta;
+    Eigen::MatrixXd vecs;
+    krylovSchurLargestMagnitude(applyOP, applyM, n, nev, theta, vecs);
+
+    Eigen::GeneralizedSelfAdjointEigenSolver<Eigen::MatrixXd> ges(H, M);
+    for (size_t k = 0; k < nev; ++k) {
+        const Real lambda = sigma + 1.0 / theta[k];
+        REQUIRE(std::abs(lambda - ges.eigenvalues()[k]) < 1e-10);
+        REQUIRE((H * vecs.col(k) - lambda * M * vecs.col(k)).norm() < 1e-8);
+    }
+    REQUIRE((vecs.transpose() * M * vecs - Eigen::MatrixXd::Identity(nev, nev)).norm() < 1e-10);
+}
+
+TEST_CASE("symbolic factorization cache keys and persisted orderings", "[sparse_matrix]" ) {
+    // Upper triangle of a tridiagonal SPD matrix
+    SuiteSparseMatrix A(4, 4);
+    A.Ap = {0, 1, 3, 5, 7};
+    A.Ai = {0, 0, 1, 1, 2, 2, 3};
+    A.Ax = {4, -1, 4, -1, 4, -1, 4};
+    A.nz = 7;
+
+    cholmod_sparse cA;
+    cA.nrow = cA.ncol = 4;
+    cA.nzmax = A.nz;
+    cA.p = A.Ap.data();
+    cA.i = A.Ai.data();
+    cA.x = A.Ax.data();
+    cA.nz = cA.z = nullptr;
+    cA.stype  = 1;
+    cA.itype  = CHOLMOD_LONG;
+    cA.xtype  = CHOLMOD_REAL;
+    cA.dtype  = CHOLMOD_DOUBLE;
+    cA.sorted = cA.packed = 1;
+
+    cholmod_common c;
+    cholmod_l_start(&c);
+
+    using Cache = SymbolicFactorizationCache;
+    auto &cache = Cache::instance();
+    const Cache::Key k = Cache::key(cA, c);
+
+    SECTION("keys depend only on the pattern and analysis settings") {
+        A.Ax[2] = -10;
+        REQUIRE(Cache::key(cA, c) == k);
+        A.Ai[4] = 1;
+        REQUIRE(!(Cache::key(cA, c) == k));
+        A.Ai[4] = 2;
+        c.supernodal = CHOLMOD_SUPERNODAL;
+        REQUIRE(!(Cache::key(cA, c) == k));
+    }
+
+    SECTION("in-memory cache is opt-in") {
+        REQUIRE(cache.capacity() == 0);
+        cache.clear();
+        cholmod_factor *L = cache.analyze(&cA, &c);
+        REQUIRE(L != nullptr);
+        cholmod_l_free_factor(&L, &c);
+        REQUIRE(cache.size() == 0);
+
+        cache.setCapacity(2);
+        for (size_t i = 0; i < 2; ++i) {
+            L = cache.analyze(&cA, &c);
+            REQUIRE(L != nullptr);
+            REQUIRE(cholmod_l_factorize(&cA, L, &c));
+            REQUIRE(c.status == CHOLMOD_OK);
+            cholmod_l_free_factor(&L, &c);
+        }
+        REQUIRE(cache.size() == 1);
+        REQUIRE(cache.hits() == 1);
+
+        cache.clear();
+        REQUIRE(cache.size() == 0);
+        REQUIRE(cache.hits() == 0);
+        cache.setCapacity(0);
+    }
+
+    SECTION("permutation round trip") {
+        const std::string oldDir = cache.directory();
+        const std::string dir = "symbolic_factorization_cache_test";
+        cache.setDirectory(dir);
+        std::vector<SuiteSparse_long> perm = {2, 0, 3, 1}, loaded;
+        cache.storePermutation(k, perm);
+        REQUIRE(cache.loadPermutation(k, loaded));
+        REQUIRE(loaded == perm);
+
+        Cache::Key other = k;
+        other.hash2 ^= 1;
+        REQUIRE(!cache.loadPermutation(other, loaded));
+
+        std::remove((dir + "/" + k.str() + ".perm").c_str());
+        std::remove(dir.c_str());
+        cache.setDirectory(oldDir);
+    }
+
+    cholmod_l_finish(&c);
+}